@@ -0,0 +1,43 @@
+# almacenamiento/__init__.py
+"""Motores de almacenamiento intercambiables detrás de database.py.
+
+Cada motor se importa la primera vez que se pide: al arrancar con SQLite
+no se cargan el serializador ni los motores de archivo.
+"""
+from importlib import import_module
+
+from .base import MotorAlmacenamiento
+
+# nombre -> (módulo, clase)
+MOTORES = {
+    "sqlite": ("motor_sqlite", "MotorSQLite"),
+    "json": ("motor_json", "MotorJSON"),
+    "diario": ("motor_diario", "MotorDiario"),
+}
+
+
+def clase_motor(nombre):
+    try:
+        modulo, clase = MOTORES[nombre]
+    except KeyError:
+        raise ValueError(f"Motor de almacenamiento desconocido: {nombre}") from None
+    return getattr(import_module(f".{modulo}", __name__), clase)
+
+
+def crear_motor(nombre, ruta, formato=None):
+    """`formato` (ver serializacion.FORMATOS) solo aplica a los motores de archivo json y diario."""
+    clase = clase_motor(nombre)
+    if formato and nombre != "sqlite":
+        return clase(ruta, formato)
+    return clase(ruta)
+
+
+def __getattr__(nombre):
+    # `from almacenamiento import MotorJSON` sigue funcionando, importando el motor en ese momento
+    for motor, (_, clase) in MOTORES.items():
+        if clase == nombre:
+            return clase_motor(motor)
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+
+
+__all__ = ["MotorAlmacenamiento", "MotorDiario", "MotorJSON", "MotorSQLite", "MOTORES", "clase_motor", "crear_motor"]
@@ -0,0 +1,328 @@
+# almacenamiento/base.py
+"""Interfaz común de los motores de almacenamiento."""
+from .busqueda import ordenar_resultados, terminos, texto_contrato
+from .cuentas import cuenta_vacia, estado_cuenta, fila_cuenta, morosos, registrar_abono
+from .montos import centavos, sumar_por
+from .rangos import en_rango, rango_fechas
+from .resumen import ResumenDiario, plan_de
+
+CAMPOS_CONTRATO = ("nombre", "cedula", "direccion", "telefono", "plan", "mensualidad", "fecha_inicio", "estado")
+CAMPOS_AFILIADO = ("nombre", "apellido", "parentesco", "telefono")
+ESTADOS = ("Activo", "Suspendido", "Cancelado")
+
+# columnas por las que se puede ordenar una página
+ORDEN_ABONOS = ("id", "contrato_id", "nombre", "cedula", "fecha", "monto", "observacion")
+ORDEN_CONTRATOS = ("id", "nombre", "cedula", "plan", "mensualidad", "estado", "fecha_inicio")
+ORDEN_CUENTAS = ORDEN_CONTRATOS + ("pagado", "meses_cubiertos", "proximo_vencimiento", "deuda", "meses_atraso")
+# agrupaciones de sumar_abonos
+SUMAS_ABONOS = (None, "contrato", "periodo")
+
+
+def validar_orden(orden, permitidas):
+    if orden not in permitidas:
+        raise ValueError(f"No se puede ordenar por {orden}")
+    return orden
+
+
+def validar_suma(por):
+    if por not in SUMAS_ABONOS:
+        raise ValueError(f"No se puede sumar por {por}")
+    return por
+
+
+def validar_cambios_contrato(nuevos_datos):
+    """Rechaza campos que no son del contrato o que vienen vacíos (None); igual en todos los motores."""
+    desconocidos = set(nuevos_datos) - set(CAMPOS_CONTRATO) - {"afiliados"}
+    if desconocidos:
+        raise ValueError(f"Campos desconocidos: {', '.join(sorted(desconocidos))}")
+    nulos = [k for k in CAMPOS_CONTRATO if k in nuevos_datos and nuevos_datos[k] is None]
+    if nulos:
+        raise ValueError(f"Campos sin valor: {', '.join(nulos)}")
+    return nuevos_datos
+
+
+def ordenar(filas, orden, descendente):
+    """Orden estable por `orden` y luego por id, como las consultas SQL."""
+    return sorted(filas, key=lambda f: (f[orden], f["id"]), reverse=descendente)
+
+
+def periodo(fecha):
+    """Mes de una fecha ISO como entero (año*12 + mes - 1), para restar y agrupar."""
+    return int(fecha[:4]) * 12 + int(fecha[5:7]) - 1
+
+
+def periodo_o(fecha, defecto=-1):
+    """periodo(fecha), o `defecto` si falta o no es ISO."""
+    try:
+        return periodo(fecha)
+    except (TypeError, ValueError):
+        return defecto
+
+
+def columnas_de(abonos, despues_de):
+    """Columnas paralelas de los abonos con id mayor que `despues_de` (ver columnas_abonos)."""
+    columnas = {"id": [], "contrato_id": [], "periodo": [], "centavos": [], "cobrador": []}
+    for a in sorted((a for a in abonos if a["id"] > despues_de), key=lambda a: a["id"]):
+        columnas["id"].append(a["id"])
+        columnas["contrato_id"].append(a["contrato_id"])
+        columnas["periodo"].append(periodo_o(a.get("fecha")))
+        columnas["centavos"].append(centavos(a["monto"]))
+        columnas["cobrador"].append(a.get("cobrador") or "")
+    return columnas
+
+
+def sumas_de(columnas, por):
+    """Total en centavos de unas columnas de abonos (ver sumar_abonos)."""
+    if por is None:
+        return sum(columnas["centavos"])
+    return sumar_por(columnas["contrato_id" if por == "contrato" else "periodo"], columnas["centavos"])
+
+
+def filtrar_abonos(abonos, filtro):
+    """Los abonos que cumplen las claves `desde`, `hasta` y `cobrador` de `filtro`."""
+    inicio, fin = rango_fechas(filtro.get("desde"), filtro.get("hasta"))
+    if inicio or fin:
+        abonos = [a for a in abonos if en_rango(a.get("fecha"), inicio, fin)]
+    if filtro.get("cobrador") is not None:
+        abonos = [a for a in abonos if (a.get("cobrador") or "") == filtro["cobrador"]]
+    return abonos
+
+
+def unir_abono(abono, contrato):
+    unido = dict(abono)
+    unido["nombre"] = contrato["nombre"] if contrato else ""
+    unido["cedula"] = contrato["cedula"] if contrato else ""
+    return unido
+
+
+class MotorAlmacenamiento:
+    """Cada motor guarda contratos (con sus afiliados) y abonos.
+
+    Los contratos y abonos entran y salen como dicts con las mismas claves
+    que siempre tuvo contratos.json, así main.py no depende del motor.
+    """
+
+    nombre = "base"
+    extension_respaldo = ".bak"
+
+    def version_datos(self):
+        """Marca que cambia con cada escritura, de este proceso o de otra caja.
+
+        La usa la caché de consultas de database.py; None (por defecto) quiere
+        decir que el motor no sabe darla y entonces no se guarda nada en caché.
+        """
+        return None
+
+    def version_contratos(self):
+        """Como version_datos, pero cambia solo con los contratos y sus pausas, no con los abonos.
+
+        La usa reportes.py para no rearmar las columnas de contratos en cada
+        reporte; None (por defecto) quiere decir que se rearman siempre.
+        """
+        return None
+
+    # --- contratos ---
+    def insertar_contrato(self, contrato, id_manual=None):
+        raise NotImplementedError
+
+    def obtener_contratos(self, estado=None):
+        raise NotImplementedError
+
+    def obtener_contrato_por_id(self, contrato_id):
+        raise NotImplementedError
+
+    def buscar_contrato_por_cedula(self, cedula, estado=None):
+        raise NotImplementedError
+
+    def buscar_contratos(self, consulta, limite=50, estado=None):
+        """Contratos cuyo titular o afiliados contienen todos los términos de `consulta`.
+
+        Ignora tildes y mayúsculas; busca en nombre, cédula, dirección, teléfono
+        y en nombre/apellido/teléfono de los afiliados. Con `estado`, solo los que
+        lo tienen (filtrados antes de recortar a `limite`).
+        """
+        lista = terminos(consulta)
+        if not lista:
+            return []
+        encontrados = [c for c in self.obtener_contratos(estado)
+                       if all(t in texto_contrato(c) for t in lista)]
+        return ordenar_resultados(encontrados, consulta)[:limite]
+
+    def contar_contratos(self, estado=None):
+        return len(self.obtener_contratos(estado))
+
+    def obtener_contratos_pagina(self, estado=None, offset=0, limite=100, orden="id", descendente=False):
+        """Una ventana de `limite` contratos a partir de `offset`, ya ordenada."""
+        validar_orden(orden, ORDEN_CONTRATOS)
+        return ordenar(self.obtener_contratos(estado), orden, descendente)[offset:offset + limite]
+
+    def obtener_contratos_desde(self, estado=None, despues_de=0, limite=100):
+        """Hasta `limite` contratos con id mayor que `despues_de`, por id (paginación por cursor)."""
+        return [c for c in self.obtener_contratos(estado) if c["id"] > despues_de][:limite]
+
+    def obtener_contratos_iniciados(self, desde=None, hasta=None, estado=None):
+        """Contratos con fecha_inicio entre `desde` y `hasta` (días incluidos; None deja el extremo
+        abierto), por fecha_inicio y luego id."""
+        inicio, fin = rango_fechas(desde, hasta)
+        contratos = [c for c in self.obtener_contratos(estado) if en_rango(c.get("fecha_inicio"), inicio, fin)]
+        return ordenar(contratos, "fecha_inicio", False)
+
+    def claves_contratos(self):
+        """Pares (id, cédula) de todos los contratos, para detectar duplicados sin leerlos completos."""
+        return [(c["id"], c["cedula"]) for c in self.obtener_contratos()]
+
+    def editar_contrato(self, contrato_id, nuevos_datos):
+        """Solo campos de CAMPOS_CONTRATO y "afiliados"; los demás dan ValueError (`validar_cambios_contrato`)."""
+        raise NotImplementedError
+
+    def cambiar_estado(self, contrato_id, nuevo_estado, fecha=None):
+        """`fecha` (ISO, por defecto hoy) queda como inicio o fin de la pausa de cuotas."""
+        raise NotImplementedError
+
+    # --- abonos ---
+    def insertar_abono(self, abono):
+        raise NotImplementedError
+
+    def insertar_abonos(self, abonos):
+        """Varios abonos de una vez (una planilla de cobro); devuelve sus ids en el mismo orden.
+
+        Implementación genérica: uno por uno. Los motores la reemplazan por una sola escritura.
+        """
+        return [self.insertar_abono(a) for a in abonos]
+
+    def obtener_abonos(self, contrato_id=None, cedula=None):
+        raise NotImplementedError
+
+    def obtener_abonos_con_contrato(self, filtro=None):
+        """Abonos con `nombre` y `cedula` del contrato, resueltos en una sola pasada.
+
+        `filtro` admite las claves `contrato_id` y `cedula` (mismo criterio que
+        obtener_abonos), `desde` y `hasta` (días incluidos, ver rangos.py) y
+        `cobrador`. Implementación genérica: una carga y un dict en memoria.
+        """
+        filtro = filtro or {}
+        abonos = filtrar_abonos(self.obtener_abonos(filtro.get("contrato_id"), filtro.get("cedula")), filtro)
+        contratos = {c["id"]: c for c in self.obtener_contratos()}
+        return [unir_abono(a, contratos.get(a["contrato_id"])) for a in abonos]
+
+    def contar_abonos(self, filtro=None):
+        return len(self.obtener_abonos_con_contrato(filtro))
+
+    def obtener_abonos_pagina(self, filtro=None, offset=0, limite=100, orden="id", descendente=False):
+        """Una ventana de abonos unidos con su contrato, ya ordenada."""
+        validar_orden(orden, ORDEN_ABONOS)
+        return ordenar(self.obtener_abonos_con_contrato(filtro), orden, descendente)[offset:offset + limite]
+
+    def columnas_abonos(self, despues_de=0):
+        """Abonos con id mayor que `despues_de`, por id, como columnas para reportes.
+
+        Devuelve {"id": [...], "contrato_id": [...], "periodo": [...], "centavos": [...],
+        "cobrador": [...]}, con `periodo` = año*12 + mes - 1 (-1 si la fecha no es ISO)
+        y el monto en centavos enteros.
+        """
+        return columnas_de(self.obtener_abonos(), despues_de)
+
+    def sumar_abonos(self, por=None):
+        """Total exacto de los abonos en centavos.
+
+        `por` None da un solo entero; "contrato" da {contrato_id: centavos} y
+        "periodo" {año*12 + mes - 1: centavos}.
+        """
+        return sumas_de(self.columnas_abonos(), validar_suma(por))
+
+    def obtener_abonos_desde(self, filtro=None, despues_de=0, limite=100):
+        """Hasta `limite` abonos unidos con id mayor que `despues_de`, por id."""
+        return [a for a in self.obtener_abonos_con_contrato(filtro) if a["id"] > despues_de][:limite]
+
+    def obtener_abonos_entre(self, desde=None, hasta=None, cobrador=None):
+        """Abonos unidos con fecha entre `desde` y `hasta` (días incluidos; None deja el extremo
+        abierto), opcionalmente de un solo `cobrador`, por fecha y luego id."""
+        filtro = {"desde": desde, "hasta": hasta, "cobrador": cobrador}
+        return ordenar(self.obtener_abonos_con_contrato(filtro), "fecha", False)
+
+    # --- estado de cuenta ---
+    def obtener_cuentas(self, estado=None):
+        """Contratos (sin afiliados) con los campos de cuentas.CAMPOS_CUENTA.
+
+        Implementación genérica: recorre todos los abonos. Los motores la
+        reemplazan por el saldo que mantienen al escribir.
+        """
+        cuentas = {}
+        for a in self.obtener_abonos():
+            registrar_abono(cuentas.setdefault(a["contrato_id"], cuenta_vacia()), centavos(a["monto"]), a.get("fecha"))
+        return [fila_cuenta(c, cuentas.get(c["id"], cuenta_vacia())) for c in self.obtener_contratos(estado)]
+
+    def obtener_cuentas_de(self, ids, hoy=None):
+        """Estados de cuenta (como en obtener_cuentas_pagina) de los contratos `ids` que existan, por id."""
+        ids = set(ids)
+        return [estado_cuenta(f, hoy) for f in self.obtener_cuentas() if f["id"] in ids]
+
+    def obtener_cuentas_pagina(self, estado=None, offset=0, limite=100, orden="id", descendente=False, hoy=None):
+        """Una ventana de estados de cuenta (ver cuentas.estado_cuenta), ya ordenada."""
+        validar_orden(orden, ORDEN_CUENTAS)
+        filas = [estado_cuenta(f, hoy) for f in self.obtener_cuentas(estado)]
+        return ordenar(filas, orden, descendente)[offset:offset + limite]
+
+    def columnas_contratos(self):
+        """Todos los contratos como columnas para reportes.
+
+        Devuelve {"id", "plan", "estado", "mensualidad_centavos", "inicio", "pausa"};
+        `inicio` y `pausa` son el periodo de fecha_inicio y de pausado_desde (-1 si no hay).
+        """
+        columnas = {"id": [], "plan": [], "estado": [], "mensualidad_centavos": [], "inicio": [], "pausa": []}
+        for c in self.obtener_cuentas():
+            columnas["id"].append(c["id"])
+            columnas["plan"].append(c["plan"])
+            columnas["estado"].append(c["estado"])
+            columnas["mensualidad_centavos"].append(centavos(c["mensualidad"] or 0))
+            columnas["inicio"].append(periodo_o(c.get("fecha_inicio")))
+            columnas["pausa"].append(periodo_o(c.get("pausado_desde")))
+        return columnas
+
+    def obtener_morosos(self, estado="Activo", hoy=None):
+        """Contratos con cuotas vencidas sin pagar, de mayor a menor deuda."""
+        return morosos(self.obtener_cuentas(estado), hoy)
+
+    # --- cierre de caja ---
+    def resumen_diario(self, desde=None, hasta=None):
+        """Filas de resumen.CAMPOS_RESUMEN de los días entre `desde` y `hasta` (incluidos; None deja
+        el extremo abierto), por día, cobrador y plan.
+
+        Implementación genérica: recorre los abonos del rango. Los motores
+        guardan el resumen y lo actualizan con cada abono.
+        """
+        inicio, fin = rango_fechas(desde, hasta)
+        contratos = {c["id"]: c for c in self.obtener_contratos()}
+        resumen = ResumenDiario()
+        for a in self.obtener_abonos():
+            if en_rango(a.get("fecha"), inicio, fin):
+                resumen.sumar(a["fecha"][:10], a.get("cobrador") or "", plan_de(contratos.get(a["contrato_id"])),
+                              centavos(a["monto"]), a["id"])
+        return resumen.filas()
+
+    def cerrar_dia(self, cierre):
+        """Guarda el cierre de caja `cierre` (dict con "dia", ver database.cerrar_dia).
+
+        ValueError si ese día ya estaba cerrado.
+        """
+        raise NotImplementedError
+
+    def obtener_cierres(self, desde=None, hasta=None):
+        """Los cierres de los días entre `desde` y `hasta` (incluidos; None deja el extremo abierto), por día."""
+        raise NotImplementedError
+
+    # --- volcado completo / respaldo ---
+    def exportar_datos(self):
+        """Devuelve {"contratos": [...], "abonos": [...]} con todo el contenido."""
+        return {"contratos": self.obtener_contratos(), "abonos": self.obtener_abonos()}
+
+    def importar_datos(self, data):
+        """Agrega contratos y abonos en bloque. Devuelve {id_original: id_nuevo} de contratos."""
+        raise NotImplementedError
+
+    def respaldar(self, destino):
+        """Escribe una copia consistente del almacenamiento en `destino`."""
+        raise NotImplementedError
+
+    def cerrar(self):
+        pass
@@ -0,0 +1,122 @@
+# almacenamiento/bloqueo.py
+"""Candado entre procesos (y entre hilos) para los archivos compartidos por varias cajas.
+
+Se toma sobre un archivo aparte, `<ruta>.lock`, junto a los datos: con
+fcntl.lockf en Linux/macOS (bloqueos POSIX, que también respetan NFS y
+la mayoría de los montajes SMB) y con msvcrt.locking en Windows. Es un
+candado de cortesía: solo excluye a quien también lo pide, que son todas
+las copias del programa.
+"""
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from .serializacion import version_de
+
+
+def version_en_disco(ruta):
+    """Versión guardada en la cabecera del documento (sin leerlo entero); 0 si no tiene o no existe."""
+    try:
+        with open(ruta, "rb") as f:
+            inicio = f.read(128)
+    except FileNotFoundError:
+        return 0
+    return version_de(inicio)
+
+
+def reemplazar(origen, destino, intentos=20):
+    """os.replace con reintentos: en Windows falla mientras otro proceso tiene el destino abierto."""
+    for n in range(intentos):
+        try:
+            os.replace(origen, destino)
+            return
+        except PermissionError:
+            if n == intentos - 1:
+                raise
+            time.sleep(0.01 * (n + 1))
+
+
+class CandadoArchivo:
+    """Exclusión mutua reentrante: entre hilos con un RLock y entre procesos con el archivo `.lock`.
+
+    Lleva la cuenta de cuántas veces se tomó y de cuánto se esperó y retuvo,
+    para ver si las cajas se están estorbando.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta + ".lock"
+        self._hilos = threading.RLock()
+        self._nivel = 0
+        self._dueno = None
+        self._archivo = None
+        self._desde = 0.0
+        self.tomas = 0
+        self.espera_total = 0.0
+        self.retencion_total = 0.0
+
+    @property
+    def poseido(self):
+        """True si el hilo actual tiene el candado."""
+        return self._nivel > 0 and self._dueno == threading.get_ident()
+
+    def __enter__(self):
+        inicio = time.perf_counter()
+        self._hilos.acquire()
+        if self._nivel == 0:
+            try:
+                self._tomar()
+            except BaseException:
+                self._hilos.release()
+                raise
+            self._dueno = threading.get_ident()
+            self._desde = time.perf_counter()
+            self.tomas += 1
+            self.espera_total += self._desde - inicio
+        self._nivel += 1
+        return self
+
+    def __exit__(self, *exc):
+        self._nivel -= 1
+        if self._nivel == 0:
+            self.retencion_total += time.perf_counter() - self._desde
+            self._dueno = None
+            try:
+                self._soltar()
+            finally:
+                self._hilos.release()
+        else:
+            self._hilos.release()
+
+    def _tomar(self):
+        if self._archivo is None:
+            self._archivo = open(self.ruta, "a+b")
+        if fcntl is not None:
+            fcntl.lockf(self._archivo, fcntl.LOCK_EX)
+            return
+        # msvcrt bloquea desde la posición actual; LK_LOCK reintenta por un segundo y luego falla
+        self._archivo.seek(0)
+        while True:
+            try:
+                msvcrt.locking(self._archivo.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                pass
+
+    def _soltar(self):
+        if fcntl is not None:
+            fcntl.lockf(self._archivo, fcntl.LOCK_UN)
+        else:
+            self._archivo.seek(0)
+            msvcrt.locking(self._archivo.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def cerrar(self):
+        with self._hilos:
+            if self._archivo is not None and self._nivel == 0:
+                self._archivo.close()
+                self._archivo = None
@@ -0,0 +1,91 @@
+# almacenamiento/busqueda.py
+"""Búsqueda de contratos por texto parcial, sin distinguir tildes ni mayúsculas."""
+import unicodedata
+from collections import defaultdict
+
+# coincidencias que se ordenan antes de recortar al límite pedido
+CANDIDATOS_BUSQUEDA = 500
+
+
+def normalizar(texto):
+    """Quita tildes y pasa a minúsculas: "José PÉREZ" -> "jose perez"."""
+    texto = str(texto or "")
+    if texto.isascii():
+        return texto.casefold()  # sin tildes que quitar: evita descomponer letra por letra
+    descompuesto = unicodedata.normalize("NFKD", texto)
+    return "".join(ch for ch in descompuesto if not unicodedata.combining(ch)).casefold()
+
+
+def texto_contrato(contrato):
+    """Todo lo buscable de un contrato (titular y afiliados) en un solo texto normalizado."""
+    partes = [contrato.get("nombre"), contrato.get("cedula"), contrato.get("direccion"), contrato.get("telefono")]
+    for a in contrato.get("afiliados") or []:
+        partes.extend((a.get("nombre"), a.get("apellido"), a.get("telefono")))
+    return normalizar(" ".join(p for p in partes if p))
+
+
+def terminos(consulta):
+    return normalizar(consulta).split()
+
+
+def trigramas(termino):
+    return {termino[i:i + 3] for i in range(len(termino) - 2)}
+
+
+def ordenar_resultados(contratos, consulta):
+    """Primero los titulares cuyo nombre empieza por la consulta, luego por nombre."""
+    prefijo = normalizar(consulta).strip()
+    return sorted(contratos, key=lambda c: (not normalizar(c["nombre"]).startswith(prefijo),
+                                            normalizar(c["nombre"]), c["id"]))
+
+
+class IndiceTrigramas:
+    """Índice invertido trigrama -> ids, mantenido contrato por contrato.
+
+    Un término de 3+ letras reduce los candidatos a la intersección de sus
+    trigramas; después se confirma la subcadena sobre el texto completo.
+    """
+
+    def __init__(self):
+        self.textos = {}
+        self.indice = defaultdict(set)
+
+    def agregar(self, contrato_id, texto):
+        self.quitar(contrato_id)
+        self.textos[contrato_id] = texto
+        for t in trigramas(texto):
+            self.indice[t].add(contrato_id)
+
+    def quitar(self, contrato_id):
+        anterior = self.textos.pop(contrato_id, None)
+        if anterior is None:
+            return
+        for t in trigramas(anterior):
+            ids = self.indice.get(t)
+            if ids is not None:
+                ids.discard(contrato_id)
+                if not ids:
+                    del self.indice[t]
+
+    def buscar(self, consulta, limite=None, admite=None):
+        lista = terminos(consulta)
+        if not lista:
+            return []
+        conjuntos = sorted((self.indice.get(t, set()) for termino in lista for t in trigramas(termino)), key=len)
+        candidatos = None
+        for ids in conjuntos:  # del más chico al más grande: la intersección se achica rápido
+            candidatos = set(ids) if candidatos is None else candidatos & ids
+            if not candidatos:
+                return []
+        if candidatos is None:
+            candidatos = self.textos.keys()  # solo términos cortos: se revisan todos
+        encontrados = []
+        for contrato_id in candidatos:
+            if admite is not None and not admite(contrato_id):
+                continue
+            texto = self.textos[contrato_id]
+            if all(termino in texto for termino in lista):
+                encontrados.append(contrato_id)
+                if limite is not None and len(encontrados) >= limite:
+                    break
+        return encontrados
@@ -0,0 +1,28 @@
+# almacenamiento/contadores.py
+"""Bytes leídos y escritos por categoría de archivo (datos, diario, respaldos...), para el diagnóstico.
+
+Siempre están activos: se suman una vez por lectura o escritura de archivo
+completo, nunca por registro, así que no cuestan nada frente a la E/S.
+"""
+import threading
+
+_bloqueo = threading.Lock()
+_bytes = {}
+
+
+def sumar(categoria, leidos=0, escritos=0):
+    with _bloqueo:
+        actual = _bytes.setdefault(categoria, [0, 0])
+        actual[0] += leidos
+        actual[1] += escritos
+
+
+def bytes_por_categoria():
+    """{categoría: {"leidos": n, "escritos": n}}."""
+    with _bloqueo:
+        return {c: {"leidos": l, "escritos": e} for c, (l, e) in _bytes.items()}
+
+
+def reiniciar():
+    with _bloqueo:
+        _bytes.clear()
@@ -0,0 +1,109 @@
+# almacenamiento/cuentas.py
+"""Estado de cuenta de cada contrato: pagado, cuotas cubiertas, próximo vencimiento y deuda.
+
+Los motores guardan por contrato solo lo que no depende de la fecha (total
+pagado, cantidad de abonos, pausas por suspensión) y lo actualizan con cada
+abono o cambio de estado. La deuda depende del día de hoy, así que se
+calcula al leer en O(1) por contrato con `estado_cuenta`.
+
+Dentro de la cuenta `pagado` va en centavos; las filas que salen de los
+motores lo llevan en pesos, como la mensualidad (ver montos.py).
+"""
+import calendar
+from datetime import date
+
+from .montos import centavos, pesos
+
+# lo que guarda cada motor por contrato
+CAMPOS_CUENTA = ("pagado", "num_abonos", "ultimo_abono", "pausado_desde", "meses_pausados")
+
+
+def cuenta_vacia():
+    return {"pagado": 0, "num_abonos": 0, "ultimo_abono": "", "pausado_desde": None, "meses_pausados": 0}
+
+
+def leer_fecha(texto):
+    """Fecha ISO, con o sin hora, como date; None si no se entiende."""
+    try:
+        return date.fromisoformat(str(texto or "")[:10])
+    except ValueError:
+        return None
+
+
+def sumar_meses(fecha, meses):
+    """Mismo día `meses` después; si ese mes es más corto, su último día."""
+    mes = fecha.month - 1 + meses
+    anio, mes = fecha.year + mes // 12, mes % 12 + 1
+    return date(anio, mes, min(fecha.day, calendar.monthrange(anio, mes)[1]))
+
+
+def meses_entre(desde, hasta):
+    """Meses completos de `desde` a `hasta` (0 si `hasta` es anterior)."""
+    meses = (hasta.year - desde.year) * 12 + hasta.month - desde.month
+    if sumar_meses(desde, meses) > hasta:
+        meses -= 1
+    return max(0, meses)
+
+
+def registrar_abono(cuenta, monto_centavos, fecha):
+    """Suma un abono a la cuenta (en el lugar)."""
+    cuenta["pagado"] += monto_centavos
+    cuenta["num_abonos"] += 1
+    cuenta["ultimo_abono"] = max(cuenta["ultimo_abono"], fecha or "")
+
+
+def fila_cuenta(contrato, cuenta):
+    """Contrato sin afiliados junto con su cuenta, con `pagado` en pesos."""
+    fila = {k: v for k, v in contrato.items() if k != "afiliados"}
+    fila.update(cuenta)
+    fila["pagado"] = pesos(cuenta["pagado"])
+    return fila
+
+
+def registrar_cambio_estado(cuenta, anterior, nuevo, fecha):
+    """Fuera de "Activo" no corren cuotas: se anota desde cuándo y, al reactivar, cuántos meses fueron."""
+    if anterior == "Activo" and nuevo != "Activo" and not cuenta["pausado_desde"]:
+        cuenta["pausado_desde"] = fecha
+    elif nuevo == "Activo" and cuenta["pausado_desde"]:
+        desde, hasta = leer_fecha(cuenta["pausado_desde"]), leer_fecha(fecha)
+        if desde and hasta:
+            cuenta["meses_pausados"] += meses_entre(desde, hasta)
+        cuenta["pausado_desde"] = None
+
+
+def cuotas_vencidas(fila, hoy):
+    """Cuotas exigibles a `hoy`: la primera vence en fecha_inicio y luego una por mes."""
+    inicio = leer_fecha(fila.get("fecha_inicio"))
+    if inicio is None:
+        return 0
+    corte = hoy
+    pausa = leer_fecha(fila.get("pausado_desde"))
+    if pausa is not None and pausa < corte:
+        corte = pausa
+    if corte < inicio:
+        return 0
+    return max(0, meses_entre(inicio, corte) + 1 - (fila.get("meses_pausados") or 0))
+
+
+def estado_cuenta(fila, hoy=None):
+    """Copia de `fila` (contrato + campos de cuenta) con las columnas calculadas a la fecha `hoy`."""
+    hoy = hoy or date.today()
+    # en centavos la división es exacta: 3 x 33.33 cubre 3 cuotas, no 2.9999
+    mensualidad = centavos(fila.get("mensualidad") or 0)
+    pagado = centavos(fila.get("pagado") or 0)
+    cubiertos = pagado // mensualidad if mensualidad > 0 else 0
+    vencidas = cuotas_vencidas(fila, hoy)
+    inicio = leer_fecha(fila.get("fecha_inicio"))
+    resultado = dict(fila)
+    resultado["meses_cubiertos"] = cubiertos
+    resultado["proximo_vencimiento"] = sumar_meses(inicio, cubiertos).isoformat() if inicio else ""
+    resultado["cuotas_vencidas"] = vencidas
+    resultado["deuda"] = pesos(max(0, vencidas * mensualidad - pagado))
+    resultado["meses_atraso"] = max(0, vencidas - cubiertos)
+    return resultado
+
+
+def morosos(filas, hoy=None):
+    """Cuentas con deuda, de la mayor a la menor."""
+    cuentas = (estado_cuenta(f, hoy) for f in filas)
+    return sorted((c for c in cuentas if c["deuda"] > 0), key=lambda c: (-c["deuda"], c["id"]))
@@ -0,0 +1,143 @@
+# almacenamiento/migracion.py
+"""Migración única desde contratos.json y las bases SQLite antiguas del repo.
+
+Uso:
+    python -m almacenamiento.migracion                 # migra todo lo que encuentre
+    python -m almacenamiento.migracion --json contratos.json --legado cristorey.db
+"""
+import argparse
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+from .serializacion import leer
+
+ARCHIVOS_LEGADO = ("cristorey.db", "funeraria.db", "cristo_rey.db")
+
+
+def leer_json(ruta):
+    """contratos.json en cualquiera de los formatos de serializacion."""
+    data = leer(ruta)
+    return {"contratos": data.get("contratos", []), "abonos": data.get("abonos", [])}
+
+
+def _fecha_iso(valor):
+    """Las bases viejas guardaban dd/mm/yyyy; el sistema usa yyyy-mm-dd."""
+    if not valor:
+        return ""
+    try:
+        return datetime.strptime(valor, "%d/%m/%Y").strftime("%Y-%m-%d")
+    except ValueError:
+        return valor
+
+
+def _columnas(con, tabla):
+    return {fila[1] for fila in con.execute(f"PRAGMA table_info({tabla})")}
+
+
+def leer_legado(ruta):
+    """Lee cualquiera de los tres esquemas antiguos y lo normaliza al formato actual.
+
+    - cristo_rey.db: contratos sin mensualidad (valor_total/saldo), fechas dd/mm/yyyy.
+    - cristorey.db: mismas columnas que contratos.json, afiliados como texto JSON.
+    - funeraria.db: tabla afiliados aparte (id_contrato) y abonos.id_contrato.
+    """
+    con = sqlite3.connect(f"file:{ruta}?mode=ro", uri=True)
+    con.row_factory = sqlite3.Row
+    try:
+        cols = _columnas(con, "contratos")
+        afiliados_tabla = {}
+        if "afiliados" not in cols and _columnas(con, "afiliados"):
+            for a in con.execute("SELECT * FROM afiliados ORDER BY id"):
+                afiliados_tabla.setdefault(a["id_contrato"], []).append({
+                    "nombre": a["nombre"] or "",
+                    "apellido": "",
+                    "parentesco": a["parentesco"] or "",
+                    "telefono": "",
+                })
+
+        contratos = []
+        for fila in con.execute("SELECT * FROM contratos ORDER BY id"):
+            c = dict(fila)
+            if "afiliados" in cols:
+                afiliados = json.loads(c["afiliados"]) if c["afiliados"] else []
+            else:
+                afiliados = afiliados_tabla.get(c["id"], [])
+            contratos.append({
+                "id": c["id"],
+                "nombre": (c.get("nombre") or "").strip(),
+                "cedula": (c.get("cedula") or "").strip(),
+                "direccion": c.get("direccion") or "",
+                "telefono": c.get("telefono") or "",
+                "plan": c.get("plan") or "",
+                "mensualidad": float(c.get("mensualidad") or 0),
+                "fecha_inicio": _fecha_iso(c.get("fecha_inicio")),
+                "estado": c.get("estado") or "Activo",
+                "afiliados": afiliados,
+            })
+
+        cols_ab = _columnas(con, "abonos")
+        campo_contrato = "contrato_id" if "contrato_id" in cols_ab else "id_contrato"
+        abonos = []
+        for fila in con.execute("SELECT * FROM abonos ORDER BY id"):
+            a = dict(fila)
+            abonos.append({
+                "id": a["id"],
+                "contrato_id": a[campo_contrato],
+                "fecha": a.get("fecha") or "",
+                "monto": float(a.get("monto") or 0),
+                "observacion": a.get("observacion") or "",
+            })
+    finally:
+        con.close()
+    return {"contratos": contratos, "abonos": abonos}
+
+
+def sin_duplicados(data, cedulas_existentes):
+    """Descarta contratos cuya cédula ya está migrada (y los abonos de esos contratos)."""
+    descartados = {c["id"] for c in data["contratos"] if c["cedula"] in cedulas_existentes}
+    return {
+        "contratos": [c for c in data["contratos"] if c["id"] not in descartados],
+        "abonos": [a for a in data["abonos"] if a["contrato_id"] not in descartados],
+    }, len(descartados)
+
+
+def migrar(motor, ruta_json=None, rutas_legado=()):
+    """Vuelca las fuentes indicadas en `motor`. Devuelve un resumen por fuente."""
+    resumen = []
+    cedulas = {c["cedula"] for c in motor.obtener_contratos()}
+    fuentes = []
+    if ruta_json and os.path.exists(ruta_json):
+        fuentes.append((ruta_json, leer_json))
+    fuentes.extend((r, leer_legado) for r in rutas_legado if os.path.exists(r))
+
+    for ruta, lector in fuentes:
+        data, omitidos = sin_duplicados(lector(ruta), cedulas)
+        motor.importar_datos(data)
+        cedulas.update(c["cedula"] for c in data["contratos"])
+        resumen.append({
+            "fuente": ruta,
+            "contratos": len(data["contratos"]),
+            "abonos": len(data["abonos"]),
+            "omitidos": omitidos,
+        })
+    return resumen
+
+
+def main(argv=None):
+    import database
+
+    parser = argparse.ArgumentParser(description="Migra los datos existentes al motor configurado.")
+    parser.add_argument("--json", default=database.DB_FILE, help="archivo contratos.json de origen")
+    parser.add_argument("--legado", nargs="*", default=list(ARCHIVOS_LEGADO),
+                        help="bases SQLite antiguas a incorporar")
+    args = parser.parse_args(argv)
+
+    for r in migrar(database.obtener_motor(), args.json, args.legado):
+        print(f"{r['fuente']}: {r['contratos']} contratos, {r['abonos']} abonos, "
+              f"{r['omitidos']} omitidos por cédula repetida")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# almacenamiento/montos.py
+"""Dinero en centavos enteros.
+
+Los motores guardan y suman montos y mensualidades como centavos (int):
+sumar cientos de miles de abonos en float va acumulando error, y Decimal es
+demasiado lento en los recorridos grandes. Los dicts que entran y salen de
+los motores siguen llevando pesos (`monto`, `mensualidad`, `pagado`,
+`deuda`); la conversión se hace solo en ese borde con `centavos` y `pesos`.
+"""
+from collections import defaultdict
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+_CENTAVO = Decimal("0.01")
+
+
+def centavos(valor):
+    """Pesos (int, float, texto o Decimal) como centavos enteros; el medio centavo redondea hacia arriba.
+
+    Lanza ValueError si `valor` no es un número finito.
+    """
+    if type(valor) is int:
+        return valor * 100
+    if type(valor) is float:
+        resultado = round(valor * 100) if valor == valor and abs(valor) < 1e15 else None
+        if resultado is not None and resultado / 100 == valor:
+            return resultado
+    try:
+        # str() de un float es su representación decimal más corta: 1.005 se toma como 1.005, no 1.00499...
+        return int(Decimal(str(valor).strip()).quantize(_CENTAVO, ROUND_HALF_UP) * 100)
+    except (InvalidOperation, ValueError, OverflowError):
+        raise ValueError(f"Monto inválido: {valor!r}") from None
+
+
+def pesos(valor_centavos):
+    """Centavos como pesos (float); el float más cercano, así centavos(pesos(c)) == c."""
+    return valor_centavos / 100
+
+
+def redondear(valor):
+    """El mismo monto redondeado al centavo, en pesos."""
+    return pesos(centavos(valor))
+
+
+def normalizar(datos, campo):
+    """Copia de `datos` con `campo` redondeado al centavo (si está y no es None)."""
+    if datos.get(campo) is None:
+        return datos
+    return {**datos, campo: redondear(datos[campo])}
+
+
+def sumar_por(claves, montos_centavos):
+    """{clave: total en centavos} recorriendo dos columnas paralelas."""
+    totales = defaultdict(int)
+    for clave, monto in zip(claves, montos_centavos):
+        totales[clave] += monto
+    return dict(totales)
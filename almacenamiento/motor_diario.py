@@ -0,0 +1,199 @@
+# almacenamiento/motor_diario.py
+"""Motor JSON con diario de solo-anexar.
+
+Cada cambio se agrega como una línea JSON (con fsync) a `<archivo>.diario`
+en lugar de reescribir el documento. Al leer se aplica el diario sobre la
+última instantánea; cada COMPACTAR_CADA cambios el diario se pliega en una
+instantánea nueva escrita en un temporal y renombrada de forma atómica.
+"""
+import json
+import os
+
+from . import contadores, serializacion
+from .bloqueo import reemplazar
+from .motor_json import MotorJSON, _sincronizado
+from .repositorio import RepositorioIndexado
+
+COMPACTAR_CADA = 1000
+
+
+class DiarioDanado(Exception):
+    pass
+
+
+class _DiarioDesfasado(Exception):
+    """El diario leído no continúa la secuencia: otra caja compactó mientras se leía."""
+
+
+class MotorDiario(MotorJSON):
+    """Con varias cajas, cada una anexa con el candado tomado después de leer la cola que
+    agregaron las demás; las lecturas solo procesan lo nuevo desde la última posición leída."""
+
+    nombre = "diario"
+
+    def __init__(self, ruta, formato=serializacion.FORMATO_POR_DEFECTO, compactar_cada=COMPACTAR_CADA):
+        self.ruta_diario = ruta + ".diario"
+        self.compactar_cada = compactar_cada
+        self._seq = 0
+        self._pendientes = 0
+        self._posicion = 0
+        super().__init__(ruta, formato)
+
+    def _firma_archivo(self):
+        # el inodo cambia con cada instantánea nueva aunque la fecha y el tamaño coincidan
+        st = os.stat(self.ruta)
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _tamano_diario(self):
+        try:
+            return os.path.getsize(self.ruta_diario)
+        except FileNotFoundError:
+            return 0
+
+    def _repositorio(self):
+        self._crear_base_si_no_existe()
+        if self._repo is None or self._firma_archivo() != self._firma or self._tamano_diario() < self._posicion:
+            self._cargar()
+        elif self._tamano_diario() > self._posicion:
+            try:
+                self._pendientes += self._reproducir(self._repo)
+            except _DiarioDesfasado:
+                self._cargar()
+        return self._repo
+
+    def _repositorio_al_dia(self):
+        return self._repositorio()
+
+    def _cargar(self):
+        try:
+            self._leer_todo()
+        except _DiarioDesfasado:
+            # otra caja compactó entre la lectura de la instantánea y la del diario
+            with self._candado:
+                self._leer_todo()
+
+    def _leer_todo(self):
+        """Instantánea más diario completo, desde cero."""
+        self._firma = self._firma_archivo()
+        data = serializacion.leer(self.ruta)
+        self._seq = data.pop("secuencia", 0)
+        self._repo = RepositorioIndexado(data)
+        self._posicion = 0
+        self._pendientes = self._reproducir(self._repo)
+
+    def _reproducir(self, repo):
+        """Aplica las operaciones del diario desde la última posición leída."""
+        try:
+            with open(self.ruta_diario, "rb") as f:
+                f.seek(self._posicion)
+                lineas = f.readlines()
+        except FileNotFoundError:
+            return 0
+        contadores.sumar("diario", leidos=sum(map(len, lineas)))
+        aplicadas = 0
+        for n, linea in enumerate(lineas, start=1):
+            try:
+                if not linea.endswith(b"\n"):
+                    raise ValueError("línea incompleta")
+                op = json.loads(linea)
+            except ValueError:
+                if n == len(lineas):
+                    if self._candado.poseido:
+                        # escritura interrumpida: se descarta la cola para poder seguir anexando
+                        with open(self.ruta_diario, "r+b") as f:
+                            f.truncate(self._posicion)
+                    # sin el candado puede ser otra caja a mitad de escribir: se relee la próxima vez
+                    break
+                raise DiarioDanado(f"{self.ruta_diario}: línea ilegible en el byte {self._posicion}") from None
+            if op["seq"] > self._seq + 1:
+                if self._candado.poseido:
+                    raise DiarioDanado(f"{self.ruta_diario}: falta la operación {self._seq + 1}")
+                raise _DiarioDesfasado()
+            self._posicion += len(linea)
+            if op["seq"] <= self._seq:
+                continue  # ya incluida en la instantánea (compactación interrumpida)
+            _aplicar(repo, op)
+            self._seq = op["seq"]
+            aplicadas += 1
+        return aplicadas
+
+    def _escribir(self, cambio):
+        # anexar es barato: no hace falta compare-and-swap, basta leer la cola y anexar sin soltar el candado
+        with self._candado:
+            repo = self._repositorio()
+            resultado, operacion = cambio(repo)
+            self._persistir(operacion)
+        return resultado
+
+    def _persistir(self, operacion):
+        linea = json.dumps({"seq": self._seq + 1, **operacion}, ensure_ascii=False, separators=(",", ":"))
+        linea = (linea + "\n").encode("utf-8")
+        try:
+            with open(self.ruta_diario, "ab") as f:
+                f.write(linea)
+                f.flush()
+                os.fsync(f.fileno())
+        except BaseException:
+            self._repo = None
+            raise
+        contadores.sumar("diario", escritos=len(linea))
+        self._seq += 1
+        self._posicion += len(linea)
+        self._pendientes += 1
+        if self._pendientes >= self.compactar_cada:
+            self.compactar()
+
+    def guardar_datos(self, data):
+        """Escribe una instantánea completa (de un documento o del repositorio) y vacía el diario."""
+        repo = data if isinstance(data, RepositorioIndexado) else None
+        with self._candado:
+            documento = {**(repo.documento() if repo else data), "secuencia": self._seq}
+            documento.pop("version", None)
+            temporal = f"{self.ruta}.{os.getpid()}.tmp"
+            try:
+                serializacion.escribir(temporal, documento, self.formato)
+                reemplazar(temporal, self.ruta)
+                # si se corta aquí, la instantánea ya tiene `secuencia` y el diario se ignora al releer
+                if os.path.exists(self.ruta_diario):
+                    os.remove(self.ruta_diario)
+            except BaseException:
+                self._repo = None
+                raise
+            self._pendientes = 0
+            self._posicion = 0
+            if repo is not None and repo is self._repo:
+                self._firma = self._firma_archivo()
+            else:
+                self._repo = None
+
+    @_sincronizado
+    def compactar(self):
+        """Pliega el diario en una instantánea nueva."""
+        with self._candado:
+            self.guardar_datos(self._repositorio())
+
+    @_sincronizado
+    def respaldar(self, destino):
+        serializacion.escribir(destino, self._repositorio().documento(), self.formato)
+
+    @_sincronizado
+    def cerrar(self):
+        if self._repo is not None and self._pendientes:
+            self.compactar()
+
+
+def _aplicar(repo, op):
+    tipo = op["op"]
+    if tipo == "contrato":
+        repo.agregar_contrato(op["contrato"])
+    elif tipo == "editar":
+        repo.actualizar_contrato(op["id"], op["datos"], op.get("fecha"))
+    elif tipo == "abono":
+        repo.agregar_abono(op["abono"])
+    elif tipo == "abonos":
+        for abono in op["abonos"]:
+            repo.agregar_abono(abono)
+    elif tipo == "cierre":
+        repo.agregar_cierre(op["cierre"])
+    else:
+        raise DiarioDanado(f"operación desconocida: {tipo}")
@@ -0,0 +1,526 @@
+# almacenamiento/motor_json.py
+"""Motor de archivo JSON único (el formato histórico de contratos.json)."""
+import bisect
+import copy
+import functools
+import os
+import random
+import threading
+import time
+from array import array
+from datetime import date
+from shutil import copy2
+
+from . import serializacion
+from .bloqueo import CandadoArchivo, reemplazar, version_en_disco
+from .base import (ORDEN_ABONOS, ORDEN_CONTRATOS, ORDEN_CUENTAS, MotorAlmacenamiento, ordenar, periodo_o,
+                   unir_abono, validar_cambios_contrato, validar_orden, validar_suma)
+from .busqueda import CANDIDATOS_BUSQUEDA, ordenar_resultados
+from .cuentas import estado_cuenta
+from .montos import centavos, normalizar
+from .rangos import en_rango, rango_fechas
+from .registros import FALTA
+from .repositorio import RepositorioIndexado
+
+# compare-and-swap fallidos seguidos antes de escribir con el candado tomado de principio a fin
+REINTENTOS = 5
+
+
+class _VersionCambiada(Exception):
+    """Otra caja guardó entre la lectura y el intento de guardar."""
+
+
+def _sincronizado(metodo):
+    """El repositorio en memoria no admite lecturas y escrituras simultáneas entre hilos."""
+    @functools.wraps(metodo)
+    def envoltura(self, *args, **kwargs):
+        with self._bloqueo:
+            return metodo(self, *args, **kwargs)
+    return envoltura
+
+
+class MotorJSON(MotorAlmacenamiento):
+    """Varias cajas pueden compartir el archivo (por ejemplo en una unidad de red).
+
+    Cada escritura es un compare-and-swap sobre el número de versión del
+    documento: el archivo nuevo se escribe en un temporal sin ningún candado
+    y, con el candado entre procesos tomado, solo se comprueba que la versión
+    en disco siga siendo la leída y se renombra. Si otra caja guardó antes,
+    se relee su documento y se vuelve a aplicar el cambio encima, así dos
+    abonos o dos ediciones de campos distintos nunca se pisan.
+    """
+
+    nombre = "json"
+    extension_respaldo = ".json"
+
+    def __init__(self, ruta, formato=serializacion.FORMATO_POR_DEFECTO):
+        self.ruta = ruta
+        # formato en que se guarda; al leer se reconoce cualquiera de serializacion.FORMATOS
+        self.formato = serializacion.validar_formato(formato)
+        self._bloqueo = threading.RLock()
+        self._candado = CandadoArchivo(ruta)
+        self._repo = None
+        self._firma = None
+        self.conflictos = 0
+        self._crear_base_si_no_existe()
+
+    def _crear_base_si_no_existe(self):
+        if not os.path.exists(self.ruta):
+            with self._candado:
+                if not os.path.exists(self.ruta):
+                    self.guardar_datos({"contratos": [], "abonos": []})
+
+    def _firma_archivo(self):
+        st = os.stat(self.ruta)
+        return (st.st_mtime_ns, st.st_size)
+
+    def _repositorio(self):
+        """Repositorio en memoria; se recarga solo si el archivo cambió en disco."""
+        self._crear_base_si_no_existe()
+        firma = self._firma_archivo()
+        if self._repo is None or firma != self._firma:
+            self._repo = RepositorioIndexado(serializacion.leer(self.ruta))
+            self._firma = firma
+        return self._repo
+
+    def _repositorio_al_dia(self):
+        """Como _repositorio, pero comparando también la versión: en un disco de red la fecha
+        de modificación puede no cambiar entre dos guardados seguidos."""
+        repo = self._repositorio()
+        if repo.version != version_en_disco(self.ruta):
+            self._repo = None
+            repo = self._repositorio()
+        return repo
+
+    @_sincronizado
+    def version_datos(self):
+        # _repositorio relee si el archivo cambió en disco (y el diario reproduce lo que anexaron otras cajas)
+        repo = self._repositorio()
+        return repo.numero, repo.generacion
+
+    @_sincronizado
+    def version_contratos(self):
+        repo = self._repositorio()
+        return repo.numero, repo.generacion_contratos
+
+    def cargar_datos(self):
+        return self._repositorio().documento()
+
+    def _volcar(self, data, version):
+        """Escribe el documento con `version` en un temporal propio y devuelve su ruta."""
+        documento = {"version": version}
+        documento.update(data)
+        documento["version"] = version
+        temporal = f"{self.ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        serializacion.escribir(temporal, documento, self.formato)
+        return temporal
+
+    def guardar_datos(self, data):
+        """Reemplaza el documento completo, con el candado tomado y la versión siguiente.
+
+        `data` es un documento ({"contratos": [...], "abonos": [...]}) o el
+        repositorio en memoria, que en ese caso sigue valiendo después.
+        """
+        repo = data if isinstance(data, RepositorioIndexado) else None
+        temporal = None
+        try:
+            with self._candado:
+                documento = repo.documento() if repo else data
+                version = max(documento.get("version", 0), version_en_disco(self.ruta)) + 1
+                temporal = self._volcar(documento, version)
+                reemplazar(temporal, self.ruta)
+                if repo:
+                    repo.version = version
+                else:
+                    data["version"] = version
+        except BaseException:
+            # el repositorio ya tiene el cambio pero el archivo no: releer la próxima vez
+            self._repo = None
+            if temporal and os.path.exists(temporal):
+                os.remove(temporal)
+            raise
+        if repo is not None and repo is self._repo:
+            self._firma = self._firma_archivo()
+        else:
+            self._repo = None
+
+    def _guardar_si_version(self, repo, version):
+        """Compare-and-swap: guarda el repositorio solo si en disco sigue la versión `version`."""
+        temporal = None
+        guardado = False
+        try:
+            temporal = self._volcar(repo.documento(), version + 1)
+            with self._candado:
+                if version_en_disco(self.ruta) == version:
+                    reemplazar(temporal, self.ruta)
+                    guardado = True
+        finally:
+            if not guardado:
+                self._repo = None
+                if temporal and os.path.exists(temporal):
+                    os.remove(temporal)
+        if not guardado:
+            raise _VersionCambiada()
+        repo.version = version + 1
+        self._firma = self._firma_archivo()
+
+    def _escribir(self, cambio):
+        """Aplica `cambio(repo) -> (resultado, operacion)` y lo lleva a disco.
+
+        `cambio` debe validar antes de modificar el repositorio, porque ante
+        un choque se vuelve a llamar sobre el documento de la otra caja.
+        `operacion` describe el cambio para los motores que solo anotan la
+        diferencia; este reescribe el documento completo.
+        """
+        for intento in range(REINTENTOS):
+            repo = self._repositorio_al_dia()
+            version = repo.version
+            resultado, _operacion = cambio(repo)
+            try:
+                self._guardar_si_version(repo, version)
+                return resultado
+            except _VersionCambiada:
+                self.conflictos += 1
+                # espera al azar para que las cajas que chocaron no vuelvan a chocar igual
+                time.sleep(random.uniform(0, 0.01 * (intento + 1)))
+        # demasiados choques seguidos: releer, aplicar y guardar sin soltar el candado
+        with self._candado:
+            repo = self._repositorio_al_dia()
+            resultado, _operacion = cambio(repo)
+            self.guardar_datos(repo)
+        return resultado
+
+    # --- contratos ---
+    @_sincronizado
+    def insertar_contrato(self, contrato, id_manual=None):
+        def cambio(repo):
+            if id_manual is not None:
+                if repo.contrato(id_manual) is not None:
+                    raise ValueError(f"El ID {id_manual} ya existe.")
+                contrato_id = id_manual
+            else:
+                contrato_id = repo.siguiente_id("contratos")
+            nuevo = {"id": contrato_id, **normalizar(contrato, "mensualidad")}
+            repo.agregar_contrato(nuevo)
+            return contrato_id, {"op": "contrato", "contrato": nuevo}
+        return self._escribir(cambio)
+
+    @_sincronizado
+    def obtener_contratos(self, estado=None):
+        return [c.a_dict() for c in self._repositorio().contratos_con_estado(estado)]
+
+    @_sincronizado
+    def obtener_contratos_iniciados(self, desde=None, hasta=None, estado=None):
+        inicio, fin = rango_fechas(desde, hasta)
+        contratos = self._repositorio().contratos_iniciados_entre(inicio, fin)
+        if estado:
+            contratos = [c for c in contratos if c.estado == estado]
+        return [c.a_dict() for c in ordenar(contratos, "fecha_inicio", False)]
+
+    @_sincronizado
+    def obtener_contrato_por_id(self, contrato_id):
+        contrato = self._repositorio().contrato(contrato_id)
+        return contrato.a_dict() if contrato else None
+
+    @_sincronizado
+    def claves_contratos(self):
+        return [(c.id, c.cedula) for c in self._repositorio().contratos]
+
+    @_sincronizado
+    def buscar_contrato_por_cedula(self, cedula, estado=None):
+        return [c.a_dict() for c in self._repositorio().contratos_con_cedula(cedula)
+                if not estado or c.estado == estado]
+
+    @_sincronizado
+    def buscar_contratos(self, consulta, limite=50, estado=None):
+        repo = self._repositorio()
+        # el estado se filtra al juntar candidatos: si no, el tope de candidatos podría dejarlos afuera
+        admite = (lambda i: repo.contrato(i).estado == estado) if estado else None
+        ids = repo.indice_texto.buscar(consulta, limite=CANDIDATOS_BUSQUEDA, admite=admite)
+        encontrados = ordenar_resultados([repo.contrato(i) for i in ids], consulta)[:limite]
+        return [c.a_dict() for c in encontrados]
+
+    @_sincronizado
+    def contar_contratos(self, estado=None):
+        repo = self._repositorio()
+        if estado:
+            return len(repo.contratos_por_estado.get(estado, ()))
+        return len(repo.contratos)
+
+    def _contratos_ordenados(self, estado, orden, descendente):
+        repo = self._repositorio()
+
+        def calcular():
+            return ordenar(repo.contratos_con_estado(estado), orden, descendente)
+
+        return repo.vista(("contratos", estado, orden, descendente), calcular)
+
+    @_sincronizado
+    def obtener_contratos_pagina(self, estado=None, offset=0, limite=100, orden="id", descendente=False):
+        validar_orden(orden, ORDEN_CONTRATOS)
+        filas = self._contratos_ordenados(estado, orden, descendente)
+        return [c.a_dict() for c in filas[offset:offset + limite]]
+
+    @_sincronizado
+    def obtener_contratos_desde(self, estado=None, despues_de=0, limite=100):
+        filas = self._contratos_ordenados(estado, "id", False)
+        ids = self._repositorio().vista(("ids contratos", estado), lambda: [c.id for c in filas])
+        inicio = bisect.bisect_right(ids, despues_de)
+        return [c.a_dict() for c in filas[inicio:inicio + limite]]
+
+    def editar_contrato(self, contrato_id, nuevos_datos):
+        validar_cambios_contrato(nuevos_datos)
+        self._editar(contrato_id, nuevos_datos, date.today().isoformat() if "estado" in nuevos_datos else None)
+
+    def cambiar_estado(self, contrato_id, nuevo_estado, fecha=None):
+        self._editar(contrato_id, {"estado": nuevo_estado}, fecha or date.today().isoformat())
+
+    @_sincronizado
+    def _editar(self, contrato_id, nuevos_datos, fecha):
+        nuevos_datos = normalizar(nuevos_datos, "mensualidad")
+
+        def cambio(repo):
+            if repo.contrato(contrato_id) is None:
+                raise ValueError("Contrato no encontrado")
+            repo.actualizar_contrato(contrato_id, nuevos_datos, fecha)
+            operacion = {"op": "editar", "id": contrato_id, "datos": nuevos_datos}
+            if fecha:
+                # la pausa de cuotas debe reproducirse con la fecha original, no la de la relectura
+                operacion["fecha"] = fecha
+            return None, operacion
+        self._escribir(cambio)
+
+    # --- abonos ---
+    @_sincronizado
+    def insertar_abono(self, abono):
+        def cambio(repo):
+            # el id sale del documento al día: si otra caja agregó un abono, este toma el siguiente
+            nuevo = {"id": repo.siguiente_id("abonos"), **normalizar(abono, "monto")}
+            repo.agregar_abono(nuevo)
+            return nuevo["id"], {"op": "abono", "abono": nuevo}
+        return self._escribir(cambio)
+
+    @_sincronizado
+    def insertar_abonos(self, abonos):
+        # todos los montos se validan antes de tocar el repositorio
+        listos = [normalizar(a, "monto") for a in abonos]
+
+        def cambio(repo):
+            primero = repo.siguiente_id("abonos")
+            nuevos = [{"id": primero + i, **a} for i, a in enumerate(listos)]
+            for nuevo in nuevos:
+                repo.agregar_abono(nuevo)
+            # una sola operación: una reescritura (o una línea del diario) para toda la planilla
+            return [a["id"] for a in nuevos], {"op": "abonos", "abonos": nuevos}
+        return self._escribir(cambio)
+
+    def _posiciones_abonos(self, filtro):
+        """Posiciones en repo.abonos de los que cumplen `filtro`, en orden de llegada."""
+        filtro = filtro or {}
+        repo = self._repositorio()
+        abonos = repo.abonos
+        inicio, fin = rango_fechas(filtro.get("desde"), filtro.get("hasta"))
+        if filtro.get("contrato_id"):
+            posiciones = repo.posiciones_de(filtro["contrato_id"])
+        elif filtro.get("cedula"):
+            contratos = repo.contratos_con_cedula(filtro["cedula"])
+            posiciones = repo.posiciones_de(contratos[0].id) if contratos else ()
+        elif inicio or fin:
+            # por el índice de fechas: O(log N + k) en lugar de recorrer todos los abonos
+            posiciones = sorted(repo.abonos_entre(inicio, fin))
+            inicio = fin = None
+        else:
+            posiciones = range(len(abonos))
+        if inicio or fin:
+            # los abonos de un contrato son pocos: se revisan uno por uno
+            desde = abonos.segundos_dia(inicio) if inicio else float("-inf")
+            hasta = abonos.segundos_dia(fin) if fin else float("inf")
+            segundos = map(abonos.segundos_de, posiciones)
+            posiciones = [p for p, s in zip(posiciones, segundos) if s is not None and desde <= s < hasta]
+        if filtro.get("cobrador") is not None:
+            posiciones = [p for p in posiciones if (abonos.valor(p, "cobrador") or "") == filtro["cobrador"]]
+        return posiciones
+
+    @staticmethod
+    def _clave_filtro(filtro):
+        return tuple(sorted((filtro or {}).items()))
+
+    @staticmethod
+    def _unido(repo, posicion):
+        return unir_abono(repo.abonos[posicion], repo.contrato(repo.abonos.valor(posicion, "contrato_id")))
+
+    @_sincronizado
+    def obtener_abonos(self, contrato_id=None, cedula=None):
+        abonos = self._repositorio().abonos
+        return [abonos[p] for p in self._posiciones_abonos({"contrato_id": contrato_id, "cedula": cedula})]
+
+    @_sincronizado
+    def obtener_abonos_con_contrato(self, filtro=None):
+        repo = self._repositorio()
+        return [self._unido(repo, p) for p in self._posiciones_abonos(filtro)]
+
+    @_sincronizado
+    def contar_abonos(self, filtro=None):
+        return len(self._posiciones_abonos(filtro))
+
+    def _abonos_ordenados(self, filtro, orden, descendente):
+        """Posiciones de los abonos del filtro ordenadas como base.ordenar sobre los abonos unidos."""
+        repo = self._repositorio()
+        abonos = repo.abonos
+
+        def calcular():
+            posiciones = self._posiciones_abonos(filtro)
+            if orden == "id":
+                clave = abonos.clave_orden("id")
+            else:
+                if orden in ("nombre", "cedula"):
+                    def valor(p):
+                        contrato = repo.contrato(abonos.valor(p, "contrato_id"))
+                        return contrato[orden] if contrato else ""
+                else:
+                    valor = abonos.clave_orden(orden)
+                por_id = abonos.clave_orden("id")
+
+                def clave(p):
+                    return valor(p), por_id(p)
+            return array("q", sorted(posiciones, key=clave, reverse=descendente))
+
+        return repo.vista(("abonos", self._clave_filtro(filtro), orden, descendente), calcular)
+
+    @_sincronizado
+    def obtener_abonos_pagina(self, filtro=None, offset=0, limite=100, orden="id", descendente=False):
+        validar_orden(orden, ORDEN_ABONOS)
+        repo = self._repositorio()
+        filas = self._abonos_ordenados(filtro, orden, descendente)
+        return [self._unido(repo, p) for p in filas[offset:offset + limite]]
+
+    @_sincronizado
+    def obtener_abonos_desde(self, filtro=None, despues_de=0, limite=100):
+        repo = self._repositorio()
+        filas = self._abonos_ordenados(filtro, "id", False)
+        ids = repo.vista(("ids abonos", self._clave_filtro(filtro)),
+                         lambda: array("q", map(repo.abonos.clave_orden("id"), filas)))
+        inicio = bisect.bisect_right(ids, despues_de)
+        return [self._unido(repo, p) for p in filas[inicio:inicio + limite]]
+
+    @_sincronizado
+    def obtener_abonos_entre(self, desde=None, hasta=None, cobrador=None):
+        repo = self._repositorio()
+        filas = self._abonos_ordenados({"desde": desde, "hasta": hasta, "cobrador": cobrador}, "fecha", False)
+        return [self._unido(repo, p) for p in filas]
+
+    @_sincronizado
+    def columnas_abonos(self, despues_de=0):
+        return self._repositorio().abonos.columnas_desde(despues_de)
+
+    @_sincronizado
+    def sumar_abonos(self, por=None):
+        return self._repositorio().abonos.sumar(validar_suma(por))
+
+    @_sincronizado
+    def columnas_contratos(self):
+        # de los registros y las cuentas directamente, sin armar la fila de cuenta de cada contrato
+        repo = self._repositorio()
+        contratos, cuentas = repo.contratos, repo.cuentas
+        return {"id": [c.id for c in contratos],
+                "plan": [None if c.plan is FALTA else c.plan for c in contratos],
+                "estado": [None if c.estado is FALTA else c.estado for c in contratos],
+                "mensualidad_centavos": [0 if c.mensualidad is FALTA else centavos(c.mensualidad or 0)
+                                         for c in contratos],
+                "inicio": [periodo_o(c.fecha_inicio) for c in contratos],
+                "pausa": [periodo_o(cuentas[c.id]["pausado_desde"]) for c in contratos]}
+
+    # --- estado de cuenta ---
+    def _filas_cuenta(self, estado):
+        repo = self._repositorio()
+        return [repo.fila_cuenta(c) for c in repo.contratos_con_estado(estado)]
+
+    @_sincronizado
+    def obtener_cuentas(self, estado=None):
+        return self._filas_cuenta(estado)
+
+    @_sincronizado
+    def obtener_cuentas_de(self, ids, hoy=None):
+        repo = self._repositorio()
+        contratos = (repo.contrato(i) for i in sorted(set(ids)))
+        return [estado_cuenta(repo.fila_cuenta(c), hoy) for c in contratos if c is not None]
+
+    @_sincronizado
+    def obtener_cuentas_pagina(self, estado=None, offset=0, limite=100, orden="id", descendente=False, hoy=None):
+        validar_orden(orden, ORDEN_CUENTAS)
+        hoy = hoy or date.today()
+        filas = self._repositorio().vista(
+            ("cuentas", estado, orden, descendente, hoy),
+            lambda: ordenar([estado_cuenta(f, hoy) for f in self._filas_cuenta(estado)], orden, descendente))
+        return [dict(f) for f in filas[offset:offset + limite]]
+
+    # --- cierre de caja ---
+    @_sincronizado
+    def resumen_diario(self, desde=None, hasta=None):
+        return self._repositorio().resumen.filas(*rango_fechas(desde, hasta))
+
+    @_sincronizado
+    def cerrar_dia(self, cierre):
+        def cambio(repo):
+            if cierre["dia"] in repo.cierres:
+                raise ValueError(f"El día {cierre['dia']} ya está cerrado.")
+            nuevo = copy.deepcopy(cierre)
+            repo.agregar_cierre(nuevo)
+            return None, {"op": "cierre", "cierre": nuevo}
+        self._escribir(cambio)
+
+    @_sincronizado
+    def obtener_cierres(self, desde=None, hasta=None):
+        inicio, fin = rango_fechas(desde, hasta)
+        cierres = self._repositorio().cierres
+        return [copy.deepcopy(cierres[d]) for d in sorted(cierres) if en_rango(d, inicio, fin)]
+
+    # --- volcado completo / respaldo ---
+    @_sincronizado
+    def exportar_datos(self):
+        repo = self._repositorio()
+        return {"contratos": [c.a_dict() for c in repo.contratos], "abonos": list(repo.abonos)}
+
+    @_sincronizado
+    def importar_datos(self, data):
+        # en bloque no vale la pena reintentar: se hace todo con el candado tomado
+        with self._candado:
+            repo = self._repositorio_al_dia()
+            actual = repo.documento()
+            actual["abonos"] = list(repo.abonos)
+            actual["cuentas"] = copy.deepcopy(actual.get("cuentas", {}))
+            mapa = _fusionar(actual, data)
+            self.guardar_datos(actual)
+        return mapa
+
+    @_sincronizado
+    def respaldar(self, destino):
+        copy2(self.ruta, destino)
+
+
+def _fusionar(actual, data):
+    """Agrega `data` a `actual` conservando ids libres y renumerando los ocupados."""
+    ids_contratos = {c["id"] for c in actual["contratos"]}
+    siguiente = max(ids_contratos, default=0) + 1
+    mapa = {}
+    for c in data.get("contratos", []):
+        nuevo_id = c.get("id")
+        if nuevo_id is None or nuevo_id in ids_contratos:
+            nuevo_id = siguiente
+        siguiente = max(siguiente, nuevo_id + 1)
+        ids_contratos.add(nuevo_id)
+        if c.get("id") is not None:
+            mapa[c["id"]] = nuevo_id
+        actual["contratos"].append({**normalizar(c, "mensualidad"), "id": nuevo_id})
+
+    ids_abonos = {a["id"] for a in actual["abonos"]}
+    siguiente = max(ids_abonos, default=0) + 1
+    for a in data.get("abonos", []):
+        nuevo_id = a.get("id")
+        if nuevo_id is None or nuevo_id in ids_abonos:
+            nuevo_id = siguiente
+        siguiente = max(siguiente, nuevo_id + 1)
+        ids_abonos.add(nuevo_id)
+        actual["abonos"].append({**normalizar(a, "monto"), "id": nuevo_id,
+                                 "contrato_id": mapa.get(a["contrato_id"], a["contrato_id"])})
+    return mapa
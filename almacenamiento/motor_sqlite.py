@@ -0,0 +1,764 @@
+# almacenamiento/motor_sqlite.py
+"""Motor SQLite: una fila por contrato, afiliado y abono, en modo WAL.
+
+Mensualidades, montos y saldos se guardan en centavos (INTEGER); las
+consultas los devuelven en pesos con `/ 100.0` (ver montos.py).
+"""
+import json
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date
+
+from .base import (CAMPOS_AFILIADO, CAMPOS_CONTRATO, ORDEN_ABONOS, ORDEN_CONTRATOS, ORDEN_CUENTAS,
+                   MotorAlmacenamiento, ordenar, validar_cambios_contrato, validar_orden, validar_suma)
+from .busqueda import CANDIDATOS_BUSQUEDA, ordenar_resultados, terminos, texto_contrato
+from .cuentas import estado_cuenta, registrar_cambio_estado
+from .montos import centavos
+from .rangos import GLOB_FECHA_ISO, rango_fechas
+from .resumen import CAMPOS_RESUMEN
+
+VERSION_ESQUEMA = 7
+# órdenes de página guardados a la vez (ver `_orden_guardado`)
+MAX_ORDENES = 32
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS contratos (
+    id INTEGER PRIMARY KEY,
+    nombre TEXT NOT NULL,
+    cedula TEXT NOT NULL,
+    direccion TEXT NOT NULL DEFAULT '',
+    telefono TEXT NOT NULL DEFAULT '',
+    plan TEXT NOT NULL DEFAULT '',
+    mensualidad INTEGER NOT NULL DEFAULT 0,  -- centavos
+    fecha_inicio TEXT NOT NULL DEFAULT '',
+    estado TEXT NOT NULL DEFAULT 'Activo'
+);
+CREATE INDEX IF NOT EXISTS idx_contratos_cedula ON contratos(cedula);
+CREATE INDEX IF NOT EXISTS idx_contratos_estado ON contratos(estado);
+CREATE INDEX IF NOT EXISTS idx_contratos_inicio ON contratos(fecha_inicio);
+
+CREATE TABLE IF NOT EXISTS afiliados (
+    id INTEGER PRIMARY KEY,
+    contrato_id INTEGER NOT NULL REFERENCES contratos(id) ON DELETE CASCADE,
+    posicion INTEGER NOT NULL,
+    nombre TEXT NOT NULL DEFAULT '',
+    apellido TEXT NOT NULL DEFAULT '',
+    parentesco TEXT NOT NULL DEFAULT '',
+    telefono TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_afiliados_contrato ON afiliados(contrato_id, posicion);
+
+CREATE TABLE IF NOT EXISTS abonos (
+    id INTEGER PRIMARY KEY,
+    contrato_id INTEGER NOT NULL,
+    fecha TEXT NOT NULL,
+    monto INTEGER NOT NULL,  -- centavos
+    observacion TEXT NOT NULL DEFAULT '',
+    cobrador TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_abonos_contrato ON abonos(contrato_id);
+-- consultas por rango de días (cierre de caja, conciliación del mes)
+CREATE INDEX IF NOT EXISTS idx_abonos_fecha ON abonos(fecha);
+
+-- saldo acumulado por contrato, al día con cada abono (ver cuentas.py)
+CREATE TABLE IF NOT EXISTS cuentas (
+    contrato_id INTEGER PRIMARY KEY REFERENCES contratos(id) ON DELETE CASCADE,
+    pagado INTEGER NOT NULL DEFAULT 0,  -- centavos
+    num_abonos INTEGER NOT NULL DEFAULT 0,
+    ultimo_abono TEXT NOT NULL DEFAULT '',
+    pausado_desde TEXT,
+    meses_pausados INTEGER NOT NULL DEFAULT 0
+);
+
+-- abonos por día, cobrador y plan, al día con cada abono (ver resumen.py)
+CREATE TABLE IF NOT EXISTS resumen_diario (
+    dia TEXT NOT NULL,
+    cobrador TEXT NOT NULL,
+    plan TEXT NOT NULL,
+    cantidad INTEGER NOT NULL,
+    centavos INTEGER NOT NULL,
+    min_id INTEGER NOT NULL,
+    max_id INTEGER NOT NULL,
+    PRIMARY KEY (dia, cobrador, plan)
+) WITHOUT ROWID;
+
+-- cierres de caja: los totales del día tal como estaban al cerrarlo
+CREATE TABLE IF NOT EXISTS cierres (
+    dia TEXT PRIMARY KEY,
+    cerrado_en TEXT NOT NULL,
+    responsable TEXT NOT NULL DEFAULT '',
+    cantidad INTEGER NOT NULL,
+    centavos INTEGER NOT NULL,
+    min_id INTEGER,
+    max_id INTEGER,
+    detalle TEXT NOT NULL  -- JSON: las filas del resumen del día
+);
+
+-- contador que sube con cada cambio de un contrato o de su pausa, no con los abonos (ver version_contratos)
+CREATE TABLE IF NOT EXISTS versiones (
+    tabla TEXT PRIMARY KEY,
+    numero INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS versiones_contratos_insertar AFTER INSERT ON contratos
+BEGIN UPDATE versiones SET numero = numero + 1 WHERE tabla = 'contratos'; END;
+CREATE TRIGGER IF NOT EXISTS versiones_contratos_actualizar AFTER UPDATE ON contratos
+BEGIN UPDATE versiones SET numero = numero + 1 WHERE tabla = 'contratos'; END;
+CREATE TRIGGER IF NOT EXISTS versiones_contratos_borrar AFTER DELETE ON contratos
+BEGIN UPDATE versiones SET numero = numero + 1 WHERE tabla = 'contratos'; END;
+CREATE TRIGGER IF NOT EXISTS versiones_pausas AFTER UPDATE OF pausado_desde ON cuentas
+BEGIN UPDATE versiones SET numero = numero + 1 WHERE tabla = 'contratos'; END;
+"""
+
+# columnas que entran en el texto de búsqueda
+CAMPOS_BUSCABLES = {"nombre", "cedula", "direccion", "telefono"}
+
+_POR_DEFECTO = {"direccion": "", "telefono": "", "plan": "", "mensualidad": 0, "fecha_inicio": "", "estado": "Activo"}
+# columnas en centavos de cada tabla (hasta la versión 4 eran REAL en pesos)
+COLUMNAS_CENTAVOS = {"contratos": "mensualidad", "abonos": "monto", "cuentas": "pagado"}
+
+# límite conservador de parámetros "?" por sentencia en SQLite antiguos
+_MAX_PARAMETROS = 900
+
+
+
+def _columnas_contrato(prefijo=""):
+    return ", ".join(f"{prefijo}{k} / 100.0 AS {k}" if k == "mensualidad" else f"{prefijo}{k}" for k in CAMPOS_CONTRATO)
+
+
+_SELECT_CONTRATO = "SELECT id, " + _columnas_contrato() + " FROM contratos"
+_SELECT_ABONO = "SELECT id, contrato_id, fecha, monto / 100.0 AS monto, observacion, cobrador FROM abonos"
+_SELECT_CUENTA = ("SELECT c.id, " + _columnas_contrato("c.") + ", "
+                  "COALESCE(cu.pagado, 0) / 100.0 AS pagado, COALESCE(cu.num_abonos, 0) AS num_abonos, "
+                  "COALESCE(cu.ultimo_abono, '') AS ultimo_abono, cu.pausado_desde, "
+                  "COALESCE(cu.meses_pausados, 0) AS meses_pausados "
+                  "FROM contratos c LEFT JOIN cuentas cu ON cu.contrato_id = c.id")
+# periodo (año*12 + mes - 1) de una columna de fecha ISO, -1 si no lo es
+_PERIODO = ("CASE WHEN {0} GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]*' "
+            "THEN CAST(substr({0}, 1, 4) AS INTEGER) * 12 + CAST(substr({0}, 6, 2) AS INTEGER) - 1 ELSE -1 END")
+# suma un abono (:fecha, :cobrador, :contrato_id, :centavos, :id) a su fila del resumen diario
+_SUMAR_RESUMEN = (
+    "INSERT INTO resumen_diario (dia, cobrador, plan, cantidad, centavos, min_id, max_id) "
+    "SELECT substr(:fecha, 1, 10), :cobrador, COALESCE((SELECT plan FROM contratos WHERE id = :contrato_id), ''), "
+    "1, :centavos, :id, :id WHERE " + GLOB_FECHA_ISO.format(":fecha") + " "
+    "ON CONFLICT (dia, cobrador, plan) DO UPDATE SET cantidad = cantidad + 1, centavos = centavos + excluded.centavos, "
+    "min_id = MIN(min_id, excluded.min_id), max_id = MAX(max_id, excluded.max_id)")
+# lo mismo para todos los abonos con id mayor que ?, agrupados en una sola sentencia (importación en bloque)
+_SUMAR_RESUMEN_DESDE = (
+    "INSERT INTO resumen_diario (dia, cobrador, plan, cantidad, centavos, min_id, max_id) "
+    "SELECT substr(a.fecha, 1, 10), a.cobrador, COALESCE(c.plan, ''), COUNT(*), SUM(a.monto), MIN(a.id), MAX(a.id) "
+    "FROM abonos a LEFT JOIN contratos c ON c.id = a.contrato_id WHERE a.id > ? AND " +
+    GLOB_FECHA_ISO.format("a.fecha") + " GROUP BY 1, 2, 3 "
+    "ON CONFLICT (dia, cobrador, plan) DO UPDATE SET cantidad = cantidad + excluded.cantidad, "
+    "centavos = centavos + excluded.centavos, "
+    "min_id = MIN(min_id, excluded.min_id), max_id = MAX(max_id, excluded.max_id)")
+_SELECT_ABONO_UNIDO = ("SELECT a.id, a.contrato_id, a.fecha, a.monto / 100.0 AS monto, a.observacion, a.cobrador, "
+                       "COALESCE(c.nombre, '') AS nombre, COALESCE(c.cedula, '') AS cedula "
+                       "FROM abonos a LEFT JOIN contratos c ON c.id = a.contrato_id")
+
+
+class MotorSQLite(MotorAlmacenamiento):
+    nombre = "sqlite"
+    extension_respaldo = ".sqlite3"
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        # sqlite3 no permite compartir una conexión entre hilos: una por hilo
+        self._local = threading.local()
+        # escrituras confirmadas por este proceso y órdenes de página ya calculados
+        self._escrituras = 0
+        self._ordenes = OrderedDict()  # clave -> (version, resultado); al llenarse sale el menos usado
+        self._bloqueo_ordenes = threading.Lock()
+        # conexión propia para version_datos: su data_version sube con cada commit de cualquier otra
+        self._vigia = None
+        self._bloqueo_vigia = threading.Lock()
+        self._fts = False
+        self._actualizar_esquema()
+
+    def _actualizar_esquema(self):
+        con = self._conexion()
+        version = con.execute("PRAGMA user_version").fetchone()[0]
+        if 0 < version < 4:
+            con.execute("ALTER TABLE abonos ADD COLUMN cobrador TEXT NOT NULL DEFAULT ''")
+        if 0 < version < 5:
+            self._pasar_a_centavos(con)
+        con.executescript(ESQUEMA)
+        with self._transaccion() as con:
+            if version < 2:
+                self._crear_busqueda(con)
+            if version < 3:
+                self._recalcular_cuentas(con)
+            if version < 6:
+                self._recalcular_resumen(con)
+            if version < 7:
+                con.execute("INSERT OR IGNORE INTO versiones (tabla, numero) VALUES ('contratos', 0)")
+            con.execute(f"PRAGMA user_version = {VERSION_ESQUEMA}")
+        sql = con.execute("SELECT sql FROM sqlite_master WHERE name = 'busqueda'").fetchone()[0]
+        self._fts = "fts5" in sql.lower()
+
+    def _pasar_a_centavos(self, con):
+        """Reescribe las tablas con montos REAL en pesos como INTEGER en centavos (esquema 4 -> 5).
+
+        SQLite no cambia el tipo de una columna: cada tabla se copia a una nueva
+        con el esquema actual, se borra la vieja y la nueva toma su nombre. Las
+        claves foráneas se apagan mientras tanto para que borrar `contratos` no
+        arrastre afiliados ni cuentas.
+        """
+        con.create_function("centavos", 1, lambda valor: centavos(valor or 0), deterministic=True)
+        con.execute("PRAGMA foreign_keys=OFF")
+        try:
+            with self._transaccion() as con:
+                existentes = {f[0] for f in con.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+                for tabla, columna in COLUMNAS_CENTAVOS.items():
+                    if tabla not in existentes:
+                        continue
+                    definicion = re.search(rf"CREATE TABLE IF NOT EXISTS {tabla} \(.*?\n\);", ESQUEMA, re.S)[0]
+                    con.execute(definicion.replace(f"IF NOT EXISTS {tabla} (", f"{tabla}_centavos ("))
+                    nombres = [f[1] for f in con.execute(f"PRAGMA table_info({tabla}_centavos)")]
+                    origen = ", ".join(f"centavos({n})" if n == columna else n for n in nombres)
+                    con.execute(f"INSERT INTO {tabla}_centavos ({', '.join(nombres)}) SELECT {origen} FROM {tabla}")
+                    con.execute(f"DROP TABLE {tabla}")
+                    con.execute(f"ALTER TABLE {tabla}_centavos RENAME TO {tabla}")
+        finally:
+            con.execute("PRAGMA foreign_keys=ON")
+
+    def _crear_busqueda(self, con):
+        """Tabla de texto normalizado por contrato: FTS5 con trigramas si el SQLite lo trae."""
+        try:
+            con.execute("CREATE VIRTUAL TABLE busqueda USING fts5(texto, tokenize='trigram')")
+        except sqlite3.OperationalError:
+            # sin FTS5 (o sin el tokenizador trigram) se busca con LIKE sobre la misma tabla
+            con.execute("CREATE TABLE busqueda (contrato_id INTEGER PRIMARY KEY, texto TEXT NOT NULL)")
+        filas = con.execute(_SELECT_CONTRATO).fetchall()
+        con.executemany("INSERT INTO busqueda (rowid, texto) VALUES (?, ?)",
+                        [(c["id"], texto_contrato(c)) for c in self._con_afiliados(con, filas)])
+
+    def _indexar_texto(self, con, contrato_id):
+        fila = con.execute(_SELECT_CONTRATO + " WHERE id = ?", (contrato_id,)).fetchone()
+        con.execute("DELETE FROM busqueda WHERE rowid = ?", (contrato_id,))
+        if fila:
+            contrato = self._con_afiliados(con, [fila])[0]
+            con.execute("INSERT INTO busqueda (rowid, texto) VALUES (?, ?)", (contrato_id, texto_contrato(contrato)))
+
+    @staticmethod
+    def _recalcular_cuentas(con):
+        """Rearma los saldos desde los abonos (al crear la tabla y tras importar en bloque)."""
+        con.execute("INSERT OR IGNORE INTO cuentas (contrato_id) SELECT id FROM contratos")
+        con.execute(
+            "UPDATE cuentas SET (pagado, num_abonos, ultimo_abono) = "
+            "(SELECT COALESCE(SUM(monto), 0), COUNT(*), COALESCE(MAX(fecha), '') "
+            "FROM abonos WHERE abonos.contrato_id = cuentas.contrato_id)")
+
+    @staticmethod
+    def _recalcular_resumen(con):
+        """Rearma el resumen diario desde los abonos (al crear la tabla en una base existente)."""
+        con.execute("DELETE FROM resumen_diario")
+        con.execute(
+            "INSERT INTO resumen_diario (dia, cobrador, plan, cantidad, centavos, min_id, max_id) "
+            "SELECT substr(a.fecha, 1, 10), a.cobrador, COALESCE(c.plan, ''), COUNT(*), SUM(a.monto), MIN(a.id), MAX(a.id) "
+            "FROM abonos a LEFT JOIN contratos c ON c.id = a.contrato_id WHERE " + GLOB_FECHA_ISO.format("a.fecha") +
+            " GROUP BY 1, 2, 3")
+
+    def _conexion(self):
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.ruta, isolation_level=None, check_same_thread=False)
+            con.row_factory = sqlite3.Row
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            con.execute("PRAGMA foreign_keys=ON")
+            self._local.con = con
+        return con
+
+    @contextmanager
+    def _transaccion(self):
+        con = self._conexion()
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            yield con
+            # el COMMIT también puede fallar (disco lleno, E/S, BUSY): sin ROLLBACK la conexión
+            # quedaría dentro de la transacción y todo BEGIN siguiente fallaría
+            con.execute("COMMIT")
+        except BaseException:
+            if con.in_transaction:
+                try:
+                    con.execute("ROLLBACK")
+                except sqlite3.Error:
+                    pass  # el error que importa es el original
+            raise
+        self._escrituras += 1
+
+    def version_datos(self):
+        with self._bloqueo_vigia:
+            if self._vigia is None:
+                self._vigia = sqlite3.connect(self.ruta, isolation_level=None, check_same_thread=False)
+            return self._escrituras, self._vigia.execute("PRAGMA data_version").fetchone()[0]
+
+    def version_contratos(self):
+        return self._conexion().execute("SELECT numero FROM versiones WHERE tabla = 'contratos'").fetchone()[0]
+
+    def _version(self, con):
+        """Cambia con cada escritura, propia (contador) o de otra conexión (data_version)."""
+        return (self._escrituras, con.execute("PRAGMA data_version").fetchone()[0])
+
+    # --- conversión fila -> dict ---
+    def _con_afiliados(self, con, filas):
+        contratos = [dict(f) for f in filas]
+        if not contratos:
+            return contratos
+        por_id = {c["id"]: c for c in contratos}
+        for c in contratos:
+            c["afiliados"] = []
+        if len(contratos) <= _MAX_PARAMETROS:
+            marcas = ", ".join("?" * len(por_id))
+            afis = con.execute(
+                "SELECT contrato_id, nombre, apellido, parentesco, telefono FROM afiliados "
+                f"WHERE contrato_id IN ({marcas}) ORDER BY contrato_id, posicion", tuple(por_id))
+        else:
+            afis = con.execute(
+                "SELECT contrato_id, nombre, apellido, parentesco, telefono FROM afiliados "
+                "ORDER BY contrato_id, posicion")
+        for a in afis:
+            c = por_id.get(a["contrato_id"])
+            if c is not None:
+                c["afiliados"].append({k: a[k] for k in CAMPOS_AFILIADO})
+        return contratos
+
+    @staticmethod
+    def _insertar_afiliados(con, contrato_id, afiliados):
+        con.executemany(
+            "INSERT INTO afiliados (contrato_id, posicion, nombre, apellido, parentesco, telefono) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [(contrato_id, i, *(a.get(k, "") for k in CAMPOS_AFILIADO)) for i, a in enumerate(afiliados or [])])
+
+    # --- contratos ---
+    def insertar_contrato(self, contrato, id_manual=None):
+        with self._transaccion() as con:
+            if id_manual is not None:
+                if con.execute("SELECT 1 FROM contratos WHERE id = ?", (id_manual,)).fetchone():
+                    raise ValueError(f"El ID {id_manual} ya existe.")
+            return self._insertar_contrato(con, contrato, id_manual)
+
+    @staticmethod
+    def _valores_contrato(contrato):
+        """Las columnas del contrato con sus valores por defecto y la mensualidad en centavos."""
+        valores = {**_POR_DEFECTO, **{k: v for k, v in contrato.items() if v is not None}}
+        valores["mensualidad"] = centavos(valores["mensualidad"])
+        return valores
+
+    def _insertar_contrato(self, con, contrato, contrato_id=None):
+        valores = self._valores_contrato(contrato)
+        cur = con.execute(
+            "INSERT INTO contratos (id, " + ", ".join(CAMPOS_CONTRATO) + ") VALUES (?" + ", ?" * len(CAMPOS_CONTRATO) + ")",
+            (contrato_id, *(valores[k] for k in CAMPOS_CONTRATO)))
+        contrato_id = cur.lastrowid
+        self._insertar_afiliados(con, contrato_id, contrato.get("afiliados"))
+        con.execute("INSERT INTO cuentas (contrato_id) VALUES (?)", (contrato_id,))
+        con.execute("INSERT INTO busqueda (rowid, texto) VALUES (?, ?)",
+                    (contrato_id, texto_contrato({**valores, "afiliados": contrato.get("afiliados")})))
+        return contrato_id
+
+    def obtener_contratos(self, estado=None):
+        con = self._conexion()
+        if estado:
+            filas = con.execute(_SELECT_CONTRATO + " WHERE estado = ? ORDER BY id", (estado,)).fetchall()
+        else:
+            filas = con.execute(_SELECT_CONTRATO + " ORDER BY id").fetchall()
+        return self._con_afiliados(con, filas)
+
+    def obtener_contrato_por_id(self, contrato_id):
+        con = self._conexion()
+        fila = con.execute(_SELECT_CONTRATO + " WHERE id = ?", (contrato_id,)).fetchone()
+        return self._con_afiliados(con, [fila])[0] if fila else None
+
+    def claves_contratos(self):
+        return [tuple(f) for f in self._conexion().execute("SELECT id, cedula FROM contratos")]
+
+    def buscar_contrato_por_cedula(self, cedula, estado=None):
+        con = self._conexion()
+        where, params = (" WHERE cedula = ? AND estado = ?", (cedula, estado)) if estado else (" WHERE cedula = ?", (cedula,))
+        filas = con.execute(_SELECT_CONTRATO + where + " ORDER BY id", params).fetchall()
+        return self._con_afiliados(con, filas)
+
+    def buscar_contratos(self, consulta, limite=50, estado=None):
+        lista = terminos(consulta)
+        if not lista:
+            return []
+        condiciones, params = [], []
+        cortos = lista
+        if self._fts:
+            largos = [t for t in lista if len(t) >= 3]
+            cortos = [t for t in lista if len(t) < 3]
+            if largos:
+                condiciones.append("busqueda MATCH ?")
+                params.append(" ".join('"' + t.replace('"', '""') + '"' for t in largos))
+        for t in cortos:
+            condiciones.append("texto LIKE ? ESCAPE '\\'")
+            params.append("%" + t.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+        if estado:
+            # antes del tope de candidatos, para no perder coincidencias con ese estado
+            condiciones.append("rowid IN (SELECT id FROM contratos WHERE estado = ?)")
+            params.append(estado)
+        con = self._conexion()
+        ids = [f[0] for f in con.execute(
+            f"SELECT rowid FROM busqueda WHERE {' AND '.join(condiciones)} LIMIT ?", (*params, CANDIDATOS_BUSQUEDA))]
+        if not ids:
+            return []
+        filas = con.execute(_SELECT_CONTRATO + f" WHERE id IN ({', '.join('?' * len(ids))})", ids).fetchall()
+        return ordenar_resultados(self._con_afiliados(con, filas), consulta)[:limite]
+
+    def contar_contratos(self, estado=None):
+        con = self._conexion()
+        if estado:
+            return con.execute("SELECT COUNT(*) FROM contratos WHERE estado = ?", (estado,)).fetchone()[0]
+        return con.execute("SELECT COUNT(*) FROM contratos").fetchone()[0]
+
+    def obtener_contratos_pagina(self, estado=None, offset=0, limite=100, orden="id", descendente=False):
+        validar_orden(orden, ORDEN_CONTRATOS)
+        con = self._conexion()
+        sentido = "DESC" if descendente else "ASC"
+        where, params = (" WHERE estado = ?", [estado]) if estado else ("", [])
+        filas = con.execute(
+            _SELECT_CONTRATO + where + f" ORDER BY {orden} {sentido}, id {sentido} LIMIT ? OFFSET ?",
+            (*params, limite, offset)).fetchall()
+        return self._con_afiliados(con, filas)
+
+    def obtener_contratos_iniciados(self, desde=None, hasta=None, estado=None):
+        condiciones, params = self._condiciones_rango("fecha_inicio", desde, hasta)
+        if estado:
+            condiciones.append("estado = ?")
+            params.append(estado)
+        con = self._conexion()
+        filas = con.execute(_SELECT_CONTRATO + " WHERE " + " AND ".join(condiciones) + " ORDER BY fecha_inicio, id", params).fetchall()
+        return self._con_afiliados(con, filas)
+
+    @staticmethod
+    def _condiciones_rango(columna, desde, hasta):
+        """Condiciones sobre `columna` (fecha ISO en texto) para el rango de días; usan su índice."""
+        inicio, fin = rango_fechas(desde, hasta)
+        condiciones, params = [GLOB_FECHA_ISO.format(columna)], []
+        if inicio:
+            condiciones.append(f"{columna} >= ?")
+            params.append(inicio)
+        if fin:
+            condiciones.append(f"{columna} < ?")
+            params.append(fin)
+        return condiciones, params
+
+    def obtener_contratos_desde(self, estado=None, despues_de=0, limite=100):
+        con = self._conexion()
+        where, params = (" WHERE id > ? AND estado = ?", [despues_de, estado]) if estado else (" WHERE id > ?", [despues_de])
+        filas = con.execute(_SELECT_CONTRATO + where + " ORDER BY id LIMIT ?", (*params, limite)).fetchall()
+        return self._con_afiliados(con, filas)
+
+    def editar_contrato(self, contrato_id, nuevos_datos):
+        validar_cambios_contrato(nuevos_datos)
+        campos = {k: v for k, v in nuevos_datos.items() if k != "afiliados"}
+        if "mensualidad" in campos:
+            campos["mensualidad"] = centavos(campos["mensualidad"])
+        with self._transaccion() as con:
+            if not con.execute("SELECT 1 FROM contratos WHERE id = ?", (contrato_id,)).fetchone():
+                raise ValueError("Contrato no encontrado")
+            if "estado" in campos:
+                self._registrar_cambio_estado(con, contrato_id, campos["estado"], date.today().isoformat())
+            if campos:
+                asignaciones = ", ".join(f"{k} = ?" for k in campos)
+                try:
+                    con.execute(f"UPDATE contratos SET {asignaciones} WHERE id = ?", (*campos.values(), contrato_id))
+                except sqlite3.IntegrityError as e:
+                    # p. ej. un None en una columna NOT NULL: es un dato inválido, no una falla de la base
+                    raise ValueError(f"Datos inválidos para el contrato: {e}") from None
+            if "afiliados" in nuevos_datos:
+                con.execute("DELETE FROM afiliados WHERE contrato_id = ?", (contrato_id,))
+                self._insertar_afiliados(con, contrato_id, nuevos_datos["afiliados"])
+            if "afiliados" in nuevos_datos or set(campos) & CAMPOS_BUSCABLES:
+                self._indexar_texto(con, contrato_id)
+
+    def cambiar_estado(self, contrato_id, nuevo_estado, fecha=None):
+        with self._transaccion() as con:
+            self._registrar_cambio_estado(con, contrato_id, nuevo_estado, fecha or date.today().isoformat())
+            con.execute("UPDATE contratos SET estado = ? WHERE id = ?", (nuevo_estado, contrato_id))
+
+    @staticmethod
+    def _registrar_cambio_estado(con, contrato_id, nuevo_estado, fecha):
+        fila = con.execute(_SELECT_CUENTA + " WHERE c.id = ?", (contrato_id,)).fetchone()
+        if fila is None:
+            raise ValueError("Contrato no encontrado")
+        cuenta = {"pausado_desde": fila["pausado_desde"], "meses_pausados": fila["meses_pausados"]}
+        registrar_cambio_estado(cuenta, fila["estado"], nuevo_estado, fecha)
+        con.execute("INSERT OR IGNORE INTO cuentas (contrato_id) VALUES (?)", (contrato_id,))
+        con.execute("UPDATE cuentas SET pausado_desde = ?, meses_pausados = ? WHERE contrato_id = ?",
+                    (cuenta["pausado_desde"], cuenta["meses_pausados"], contrato_id))
+
+    # --- abonos ---
+    def insertar_abono(self, abono):
+        with self._transaccion() as con:
+            return self._insertar_abono(con, abono)
+
+    def insertar_abonos(self, abonos):
+        # una sola transacción: un solo commit (y un solo fsync) para toda la planilla
+        with self._transaccion() as con:
+            return [self._insertar_abono(con, a) for a in abonos]
+
+    @staticmethod
+    def _insertar_abono(con, abono):
+        monto = centavos(abono["monto"])
+        cur = con.execute(
+            "INSERT INTO abonos (contrato_id, fecha, monto, observacion, cobrador) VALUES (?, ?, ?, ?, ?)",
+            (abono["contrato_id"], abono["fecha"], monto, abono.get("observacion") or "",
+             abono.get("cobrador") or ""))
+        con.execute(
+            "UPDATE cuentas SET pagado = pagado + ?, num_abonos = num_abonos + 1, "
+            "ultimo_abono = MAX(ultimo_abono, ?) WHERE contrato_id = ?",
+            (monto, abono["fecha"], abono["contrato_id"]))
+        con.execute(_SUMAR_RESUMEN, {"fecha": abono["fecha"], "cobrador": abono.get("cobrador") or "",
+                                     "contrato_id": abono["contrato_id"], "centavos": monto, "id": cur.lastrowid})
+        return cur.lastrowid
+
+    def obtener_abonos(self, contrato_id=None, cedula=None):
+        con = self._conexion()
+        if contrato_id:
+            filas = con.execute(_SELECT_ABONO + " WHERE contrato_id = ? ORDER BY id", (contrato_id,))
+        elif cedula:
+            contrato = con.execute("SELECT id FROM contratos WHERE cedula = ? ORDER BY id LIMIT 1", (cedula,)).fetchone()
+            if not contrato:
+                return []
+            filas = con.execute(_SELECT_ABONO + " WHERE contrato_id = ? ORDER BY id", (contrato["id"],))
+        else:
+            filas = con.execute(_SELECT_ABONO + " ORDER BY id")
+        return [dict(f) for f in filas]
+
+    @classmethod
+    def _where_abonos(cls, filtro):
+        filtro = filtro or {}
+        condiciones, params = [], []
+        if filtro.get("desde") or filtro.get("hasta"):
+            condiciones, params = cls._condiciones_rango("a.fecha", filtro.get("desde"), filtro.get("hasta"))
+        if filtro.get("contrato_id"):
+            condiciones.append("a.contrato_id = ?")
+            params.append(filtro["contrato_id"])
+        elif filtro.get("cedula"):
+            condiciones.append("a.contrato_id = (SELECT id FROM contratos WHERE cedula = ? ORDER BY id LIMIT 1)")
+            params.append(filtro["cedula"])
+        if filtro.get("cobrador") is not None:
+            condiciones.append("a.cobrador = ?")
+            params.append(filtro["cobrador"])
+        return (" WHERE " + " AND ".join(condiciones) if condiciones else ""), params
+
+    def obtener_abonos_con_contrato(self, filtro=None):
+        where, params = self._where_abonos(filtro)
+        filas = self._conexion().execute(_SELECT_ABONO_UNIDO + where + " ORDER BY a.id", params)
+        return [dict(f) for f in filas]
+
+    def contar_abonos(self, filtro=None):
+        where, params = self._where_abonos(filtro)
+        return self._conexion().execute("SELECT COUNT(*) FROM abonos a" + where, params).fetchone()[0]
+
+    def obtener_abonos_pagina(self, filtro=None, offset=0, limite=100, orden="id", descendente=False):
+        validar_orden(orden, ORDEN_ABONOS)
+        where, params = self._where_abonos(filtro)
+        sentido = "DESC" if descendente else "ASC"
+        con = self._conexion()
+        if orden == "id":
+            filas = con.execute(_SELECT_ABONO_UNIDO + where + f" ORDER BY a.id {sentido} LIMIT ? OFFSET ?",
+                                (*params, limite, offset))
+            return [dict(f) for f in filas]
+        # Ordenar por otra columna obliga a SQLite a ordenar todo en cada página;
+        # el orden completo (solo ids) se calcula una vez y se reutiliza hasta la próxima escritura.
+        clave = ("abonos", repr(sorted((filtro or {}).items())), orden, descendente)
+        version = self._version(con)
+        columna = f"c.{orden}" if orden in ("nombre", "cedula") else f"a.{orden}"
+        ids = self._orden_guardado(clave, version, lambda: [f[0] for f in con.execute(
+            "SELECT a.id FROM abonos a LEFT JOIN contratos c ON c.id = a.contrato_id" + where +
+            f" ORDER BY {columna} {sentido}, a.id {sentido}", params)])
+        ids = ids[offset:offset + limite]
+        if not ids:
+            return []
+        filas = {f["id"]: dict(f) for f in con.execute(
+            _SELECT_ABONO_UNIDO + f" WHERE a.id IN ({', '.join('?' * len(ids))})", ids)}
+        return [filas[i] for i in ids if i in filas]
+
+    def obtener_abonos_desde(self, filtro=None, despues_de=0, limite=100):
+        where, params = self._where_abonos(filtro)
+        where = (where + " AND" if where else " WHERE") + " a.id > ?"
+        filas = self._conexion().execute(_SELECT_ABONO_UNIDO + where + " ORDER BY a.id LIMIT ?",
+                                         (*params, despues_de, limite))
+        return [dict(f) for f in filas]
+
+    def obtener_abonos_entre(self, desde=None, hasta=None, cobrador=None):
+        where, params = self._where_abonos({"desde": desde, "hasta": hasta, "cobrador": cobrador})
+        filas = self._conexion().execute(_SELECT_ABONO_UNIDO + where + " ORDER BY a.fecha, a.id", params)
+        return [dict(f) for f in filas]
+
+    def columnas_abonos(self, despues_de=0):
+        filas = self._conexion().execute(
+            "SELECT id, contrato_id, " + _PERIODO.format("fecha") + ", monto, cobrador "
+            "FROM abonos WHERE id > ? ORDER BY id", (despues_de,)).fetchall()
+        ids, contrato_id, periodo, monto, cobrador = zip(*filas) if filas else ((), (), (), (), ())
+        return {"id": ids, "contrato_id": contrato_id, "periodo": periodo, "centavos": monto, "cobrador": cobrador}
+
+    def sumar_abonos(self, por=None):
+        validar_suma(por)
+        con = self._conexion()
+        if por is None:
+            return con.execute("SELECT COALESCE(SUM(monto), 0) FROM abonos").fetchone()[0]
+        clave = "contrato_id" if por == "contrato" else _PERIODO.format("fecha")
+        return dict(con.execute(f"SELECT {clave} AS clave, SUM(monto) FROM abonos GROUP BY clave").fetchall())
+
+    def columnas_contratos(self):
+        filas = self._conexion().execute(
+            "SELECT c.id, c.plan, c.estado, c.mensualidad, " + _PERIODO.format("c.fecha_inicio") + ", "
+            + _PERIODO.format("cu.pausado_desde") + " FROM contratos c "
+            "LEFT JOIN cuentas cu ON cu.contrato_id = c.id ORDER BY c.id").fetchall()
+        columnas = zip(*filas) if filas else ((),) * 6
+        return dict(zip(("id", "plan", "estado", "mensualidad_centavos", "inicio", "pausa"), columnas))
+
+    # --- estado de cuenta ---
+    def obtener_cuentas(self, estado=None):
+        where, params = (" WHERE c.estado = ?", (estado,)) if estado else ("", ())
+        return [dict(f) for f in self._conexion().execute(_SELECT_CUENTA + where + " ORDER BY c.id", params)]
+
+    def obtener_cuentas_de(self, ids, hoy=None):
+        ids = sorted(set(ids))
+        con = self._conexion()
+        filas = []
+        for i in range(0, len(ids), _MAX_PARAMETROS):
+            lote = ids[i:i + _MAX_PARAMETROS]
+            filas += con.execute(_SELECT_CUENTA + f" WHERE c.id IN ({', '.join('?' * len(lote))}) ORDER BY c.id", lote)
+        return [estado_cuenta(dict(f), hoy) for f in filas]
+
+    def obtener_cuentas_pagina(self, estado=None, offset=0, limite=100, orden="id", descendente=False, hoy=None):
+        validar_orden(orden, ORDEN_CUENTAS)
+        hoy = hoy or date.today()
+        # la deuda depende de la fecha: se calcula para todos (O(contratos)) y se guarda hasta la próxima escritura
+        clave = ("cuentas", estado, orden, descendente, hoy)
+        version = self._version(self._conexion())
+        filas = self._orden_guardado(clave, version, lambda: ordenar(
+            [estado_cuenta(f, hoy) for f in self.obtener_cuentas(estado)], orden, descendente))
+        return [dict(f) for f in filas[offset:offset + limite]]
+
+    def _orden_guardado(self, clave, version, calcular):
+        """Orden completo guardado para `clave`, recalculado si cambió la versión de los datos.
+
+        Guarda a lo sumo MAX_ORDENES claves (sale la menos usada) y descarta las
+        calculadas antes de una escritura de este proceso: ya no sirven para nada.
+        (data_version es de cada conexión y no se compara entre hilos.)
+        """
+        with self._bloqueo_ordenes:
+            guardado = self._ordenes.get(clave)
+            if guardado is not None and guardado[0] == version:
+                self._ordenes.move_to_end(clave)
+                return guardado[1]
+        resultado = calcular()
+        with self._bloqueo_ordenes:
+            for vieja in [c for c, (v, _) in self._ordenes.items() if v[0] < version[0]]:
+                del self._ordenes[vieja]
+            self._ordenes[clave] = (version, resultado)
+            self._ordenes.move_to_end(clave)
+            while len(self._ordenes) > MAX_ORDENES:
+                self._ordenes.popitem(last=False)
+        return resultado
+
+    # --- cierre de caja ---
+    def resumen_diario(self, desde=None, hasta=None):
+        condiciones, params = self._condiciones_rango("dia", desde, hasta)
+        filas = self._conexion().execute(
+            f"SELECT {', '.join(CAMPOS_RESUMEN)} FROM resumen_diario WHERE {' AND '.join(condiciones)} "
+            "ORDER BY dia, cobrador, plan", params)
+        return [dict(f) for f in filas]
+
+    def cerrar_dia(self, cierre):
+        with self._transaccion() as con:
+            if con.execute("SELECT 1 FROM cierres WHERE dia = ?", (cierre["dia"],)).fetchone():
+                raise ValueError(f"El día {cierre['dia']} ya está cerrado.")
+            con.execute(
+                "INSERT INTO cierres (dia, cerrado_en, responsable, cantidad, centavos, min_id, max_id, detalle) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (cierre["dia"], cierre["cerrado_en"], cierre.get("responsable") or "", cierre["cantidad"],
+                 cierre["centavos"], cierre.get("min_id"), cierre.get("max_id"),
+                 json.dumps(cierre.get("detalle", []), ensure_ascii=False)))
+
+    def obtener_cierres(self, desde=None, hasta=None):
+        condiciones, params = self._condiciones_rango("dia", desde, hasta)
+        filas = self._conexion().execute(
+            "SELECT dia, cerrado_en, responsable, cantidad, centavos, min_id, max_id, detalle FROM cierres "
+            f"WHERE {' AND '.join(condiciones)} ORDER BY dia", params)
+        return [{**dict(f), "detalle": json.loads(f["detalle"])} for f in filas]
+
+    # --- volcado completo / respaldo ---
+    def importar_datos(self, data):
+        # Los ids se deciden aquí (libres se conservan, ocupados o ausentes van
+        # al final) para insertar todo con executemany: con decenas de miles de
+        # filas, una sentencia por fila era la mayor parte del tiempo.
+        mapa = {}
+        with self._transaccion() as con:
+            ocupados = {f[0] for f in con.execute("SELECT id FROM contratos")}
+            siguiente = max(ocupados, default=0) + 1
+            contratos = []
+            for c in data.get("contratos", []):
+                original = c.get("id")
+                if original is None or original in ocupados:
+                    nuevo_id, siguiente = siguiente, siguiente + 1
+                else:
+                    nuevo_id = original
+                    siguiente = max(siguiente, original + 1)
+                ocupados.add(nuevo_id)
+                if original is not None:
+                    mapa[original] = nuevo_id
+                valores = self._valores_contrato(c)
+                contratos.append((nuevo_id, valores, c.get("afiliados") or []))
+            con.executemany(
+                "INSERT INTO contratos (id, " + ", ".join(CAMPOS_CONTRATO) + ") VALUES (?" + ", ?" * len(CAMPOS_CONTRATO) + ")",
+                [(i, *(v[k] for k in CAMPOS_CONTRATO)) for i, v, _ in contratos])
+            con.executemany(
+                "INSERT INTO afiliados (contrato_id, posicion, nombre, apellido, parentesco, telefono) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(i, n, *(a.get(k, "") for k in CAMPOS_AFILIADO)) for i, _, afis in contratos for n, a in enumerate(afis)])
+            con.executemany("INSERT INTO busqueda (rowid, texto) VALUES (?, ?)",
+                            [(i, texto_contrato({**v, "afiliados": afis})) for i, v, afis in contratos])
+
+            ultimo = con.execute("SELECT COALESCE(MAX(id), 0) FROM abonos").fetchone()[0]
+            siguiente, usados, abonos = ultimo + 1, set(), []
+            for a in data.get("abonos", []):
+                original = a.get("id")
+                libre = (original is not None and original not in usados and
+                         (original > ultimo or not con.execute("SELECT 1 FROM abonos WHERE id = ?",
+                                                               (original,)).fetchone()))
+                if libre:
+                    nuevo_id = original
+                    siguiente = max(siguiente, original + 1)
+                else:
+                    while siguiente in usados:
+                        siguiente += 1
+                    nuevo_id, siguiente = siguiente, siguiente + 1
+                usados.add(nuevo_id)
+                abonos.append((nuevo_id, mapa.get(a["contrato_id"], a["contrato_id"]), a.get("fecha") or "",
+                               centavos(a.get("monto") or 0), a.get("observacion") or "", a.get("cobrador") or ""))
+            con.executemany(
+                "INSERT INTO abonos (id, contrato_id, fecha, monto, observacion, cobrador) VALUES (?, ?, ?, ?, ?, ?)",
+                abonos)
+            self._recalcular_cuentas(con)
+            # los ids nuevos son mayores que `ultimo`, salvo los que ocuparon un hueco: esos se suman de a uno
+            con.execute(_SUMAR_RESUMEN_DESDE, (ultimo,))
+            con.executemany(_SUMAR_RESUMEN, [{"id": a[0], "contrato_id": a[1], "fecha": a[2], "centavos": a[3],
+                                              "cobrador": a[5]} for a in abonos if a[0] <= ultimo])
+        return mapa
+
+    def respaldar(self, destino):
+        destino_con = sqlite3.connect(destino)
+        try:
+            self._conexion().backup(destino_con)
+        finally:
+            destino_con.close()
+
+    def cerrar(self):
+        con = getattr(self._local, "con", None)
+        if con is not None:
+            con.close()
+            self._local.con = None
+        with self._bloqueo_vigia:
+            if self._vigia is not None:
+                self._vigia.close()
+                self._vigia = None
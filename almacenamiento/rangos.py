@@ -0,0 +1,97 @@
+# almacenamiento/rangos.py
+"""Rangos de fechas y el índice ordenado que los resuelve sin recorrer todas las filas.
+
+Los rangos son de días completos: `desde` y `hasta` se incluyen. Se pasan
+a los motores como textos "AAAA-MM-DD" con el fin excluido (el día
+siguiente a `hasta`), que se comparan directo con las fechas ISO de los
+abonos ("AAAA-MM-DD HH:MM:SS") y de inicio de los contratos.
+"""
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+from operator import itemgetter
+
+_FECHA_ISO = re.compile(r"\d{4}-\d\d-\d\d")
+# la misma condición en SQL: las fechas que no empiezan como ISO no entran en ningún rango
+GLOB_FECHA_ISO = "{0} GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*'"
+
+
+def es_fecha_iso(texto):
+    return type(texto) is str and _FECHA_ISO.match(texto) is not None
+
+
+def dia(valor):
+    """`valor` (date, datetime o texto "AAAA-MM-DD") como date; ValueError si no es una fecha."""
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    try:
+        return date.fromisoformat(str(valor).strip())
+    except ValueError:
+        raise ValueError(f"Fecha inválida: {valor!r} (use AAAA-MM-DD)") from None
+
+
+def rango_fechas(desde=None, hasta=None):
+    """(inicio, fin) como textos "AAAA-MM-DD": inicio incluido y fin excluido.
+
+    None en `desde` o `hasta` deja ese extremo abierto (None en el resultado).
+    """
+    inicio = dia(desde) if desde not in (None, "") else None
+    ultimo = dia(hasta) if hasta not in (None, "") else None
+    if inicio and ultimo and inicio > ultimo:
+        raise ValueError("La fecha inicial es posterior a la final")
+    try:
+        fin = ultimo + timedelta(days=1) if ultimo else None
+    except OverflowError:
+        fin = None
+    return (inicio.isoformat() if inicio else None), (fin.isoformat() if fin else None)
+
+
+def en_rango(texto, inicio, fin):
+    """Si la fecha ISO `texto` cae en [inicio, fin) (ver rango_fechas)."""
+    return es_fecha_iso(texto) and (inicio is None or texto >= inicio) and (fin is None or texto < fin)
+
+
+class IndiceOrdenado:
+    """Claves ordenadas junto con la posición de su fila: un rango sale por bisección, en O(log N + k).
+
+    Con claves repetidas las posiciones quedan en orden de llegada. `enteros`
+    guarda las claves en un array("q") (segundos desde 1970) en lugar de una lista.
+    """
+
+    def __init__(self, pares=(), enteros=False):
+        """`pares` son (clave, posición) en orden de posición."""
+        ordenados = sorted(pares, key=itemgetter(0))
+        claves = [c for c, _ in ordenados]
+        self.claves = array("q", claves) if enteros else claves
+        self.posiciones = array("q", [p for _, p in ordenados])
+
+    def __len__(self):
+        return len(self.posiciones)
+
+    def agregar(self, clave, posicion):
+        i = bisect_right(self.claves, clave)
+        if i == len(self.claves):
+            # lo común: abonos de hoy, al final sin mover nada
+            self.claves.append(clave)
+            self.posiciones.append(posicion)
+        else:
+            self.claves.insert(i, clave)
+            self.posiciones.insert(i, posicion)
+
+    def quitar(self, clave, posicion):
+        i, fin = bisect_left(self.claves, clave), bisect_right(self.claves, clave)
+        while i < fin:
+            if self.posiciones[i] == posicion:
+                del self.claves[i]
+                del self.posiciones[i]
+                return
+            i += 1
+
+    def rango(self, desde=None, hasta=None):
+        """Posiciones con clave en [desde, hasta), ordenadas por clave; None deja el extremo abierto."""
+        inicio = 0 if desde is None else bisect_left(self.claves, desde)
+        fin = len(self.claves) if hasta is None else bisect_left(self.claves, hasta)
+        return self.posiciones[inicio:fin]
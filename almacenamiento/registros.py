@@ -0,0 +1,526 @@
+# almacenamiento/registros.py
+"""Representación compacta en memoria de contratos, afiliados y abonos (motores json y diario).
+
+- Contrato y Afiliado usan __slots__: sin un dict por registro ni claves
+  repetidas. `plan`, `estado` y `parentesco` se internan, así todos los
+  contratos "Activo" comparten el mismo texto.
+- Los abonos van en ColumnasAbonos: arreglos paralelos de id, contrato,
+  fecha (segundos desde 1970) y monto en centavos, más la observación y el
+  cobrador compartidos entre filas con el mismo texto.
+
+Hacia afuera siguen siendo dicts con las claves de siempre (`a_dict()`,
+ColumnasAbonos[i]); la conversión se hace solo al entrar y salir del
+repositorio, así main.py, la API y los archivos no cambian.
+"""
+import re
+import sys
+from array import array
+from operator import attrgetter
+from collections.abc import Sequence
+from datetime import date
+
+from .base import CAMPOS_AFILIADO, CAMPOS_CONTRATO, periodo_o
+from .montos import centavos, sumar_por
+from .rangos import es_fecha_iso
+
+
+class _Falta:
+    def __repr__(self):
+        return "FALTA"
+
+
+FALTA = _Falta()  # campo ausente en el dict original (distinto de None)
+
+
+class _Registro:
+    """Base de Contrato y Afiliado: campos fijos en slots y las claves desconocidas en `extra`.
+
+    Se lee como un dict (registro["nombre"], registro.get(...)) para que
+    ordenar, texto_contrato y compañía sirvan igual con dicts y registros.
+    """
+
+    __slots__ = ("extra",)
+    CAMPOS = ()
+    INTERNADOS = ()
+
+    def __init__(self, datos):
+        self.extra = None
+        for campo in self.CAMPOS:
+            setattr(self, campo, datos.get(campo, FALTA))
+        for campo in self.INTERNADOS:
+            valor = getattr(self, campo)
+            if type(valor) is str:
+                setattr(self, campo, sys.intern(valor))
+        if not datos.keys() <= self._CONJUNTO:
+            self.extra = {k: v for k, v in datos.items() if k not in self._CONJUNTO}
+
+    def actualizar(self, datos):
+        for clave, valor in datos.items():
+            self[clave] = valor
+
+    def __setitem__(self, clave, valor):
+        if clave in self.CAMPOS:
+            if clave in self.INTERNADOS and type(valor) is str:
+                valor = sys.intern(valor)
+            setattr(self, clave, valor)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[clave] = valor
+
+    def __getitem__(self, clave):
+        if clave in self.CAMPOS:
+            valor = getattr(self, clave)
+        else:
+            valor = self.extra.get(clave, FALTA) if self.extra else FALTA
+        if valor is FALTA:
+            raise KeyError(clave)
+        return valor
+
+    def get(self, clave, defecto=None):
+        try:
+            return self[clave]
+        except KeyError:
+            return defecto
+
+    def __contains__(self, clave):
+        return self.get(clave, FALTA) is not FALTA
+
+    def items(self):
+        for campo in self.CAMPOS:
+            valor = getattr(self, campo)
+            if valor is not FALTA:
+                yield campo, valor
+        if self.extra:
+            yield from self.extra.items()
+
+    def a_dict(self):
+        """Copia como dict, con las claves en el orden de siempre."""
+        valores = self._valores(self)
+        if FALTA in valores:
+            copia = {c: v for c, v in zip(self.CAMPOS, valores) if v is not FALTA}
+        else:
+            copia = dict(zip(self.CAMPOS, valores))
+        if self.extra:
+            copia.update(self.extra)
+        return copia
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.a_dict()!r})"
+
+
+class Afiliado(_Registro):
+    __slots__ = CAMPOS_AFILIADO
+    CAMPOS = CAMPOS_AFILIADO
+    INTERNADOS = ("parentesco",)
+    _CONJUNTO = frozenset(CAMPOS)
+    _valores = staticmethod(attrgetter(*CAMPOS))
+
+
+class Contrato(_Registro):
+    __slots__ = ("id",) + CAMPOS_CONTRATO + ("afiliados",)
+    CAMPOS = ("id",) + CAMPOS_CONTRATO + ("afiliados",)
+    INTERNADOS = ("plan", "estado")
+    _CONJUNTO = frozenset(CAMPOS)
+    _valores = staticmethod(attrgetter(*CAMPOS))
+
+    def __init__(self, datos):
+        super().__init__(datos)
+        if isinstance(self.afiliados, list):
+            self.afiliados = [Afiliado(a) if isinstance(a, dict) else a for a in self.afiliados]
+
+    def __setitem__(self, clave, valor):
+        if clave == "afiliados" and isinstance(valor, list):
+            valor = [Afiliado(a) if isinstance(a, dict) else a for a in valor]
+        super().__setitem__(clave, valor)
+
+    def items(self):
+        for clave, valor in super().items():
+            if clave == "afiliados" and isinstance(valor, list):
+                valor = [a.a_dict() if isinstance(a, Afiliado) else a for a in valor]
+            yield clave, valor
+
+    def a_dict(self):
+        copia = super().a_dict()
+        if isinstance(self.afiliados, list):
+            copia["afiliados"] = [a.a_dict() if isinstance(a, Afiliado) else a for a in self.afiliados]
+        return copia
+
+
+# ---------- abonos ----------
+CAMPOS_ABONO = ("id", "contrato_id", "fecha", "monto", "observacion", "cobrador")
+_CLAVES_ABONO = frozenset(CAMPOS_ABONO)
+_DIA_ISO = re.compile(r"(\d{4})-(\d\d)-(\d\d) \Z", re.ASCII)
+_HORA_ISO = re.compile(r"(\d\d):(\d\d):(\d\d)\Z", re.ASCII)
+_EPOCA = date(1970, 1, 1).toordinal()
+_DIA = 86400
+
+
+def _centavos(monto):
+    """El monto en centavos enteros, o None si tiene fracciones de centavo (o no es finito)."""
+    try:
+        centavos = round(monto * 100)
+    except (ValueError, OverflowError):
+        return None
+    return centavos if centavos / 100 == monto else None
+
+
+class ColumnasAbonos(Sequence):
+    """Abonos en columnas paralelas; `abonos[i]` arma el dict de la fila i.
+
+    Los abonos que no caben exactamente en las columnas (claves de más o de
+    menos, fecha que no es "AAAA-MM-DD HH:MM:SS", monto con fracciones de
+    centavo) se guardan tal cual en `especiales`, para devolverlos idénticos.
+    """
+
+    def __init__(self, abonos=()):
+        self.ids = array("q")
+        self.contratos = array("q")
+        self.fechas = array("q")  # segundos desde 1970-01-01 00:00:00 (hora local, sin zona)
+        self.centavos = array("q")
+        self.observaciones = []
+        self.cobradores = []
+        self.especiales = {}  # posición -> dict original
+        self._textos = {}
+        # las fechas repiten días y horas: cada texto se valida y convierte una sola vez
+        self._inicio_dia = {}
+        self._numero_a_dia = {}
+        self._hora_a_segundos = {}
+        self._segundos_a_hora = {}
+        self._periodos = {}
+        self.extender(abonos)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def extender(self, abonos):
+        """Agrega muchos abonos de una vez: columna por columna si todos caben, si no uno por uno."""
+        if not isinstance(abonos, list):
+            abonos = list(abonos)
+        columnas = self._columnas_de(abonos) if abonos else None
+        if columnas is None:
+            for abono in abonos:
+                self.agregar(abono)
+            return
+        ids, contratos, fechas, centavos, observaciones, cobradores = columnas
+        self.ids.extend(ids)
+        self.contratos.extend(contratos)
+        self.fechas.extend(fechas)
+        self.centavos.extend(centavos)
+        self.observaciones.extend(observaciones)
+        self.cobradores.extend(cobradores)
+
+    def _columnas_de(self, abonos):
+        """Las seis columnas de `abonos`, o None si alguno no cabe en ellas (ver agregar)."""
+        if any(a.keys() != _CLAVES_ABONO for a in abonos):
+            return None
+        ids = [a["id"] for a in abonos]
+        contratos = [a["contrato_id"] for a in abonos]
+        montos = [a["monto"] for a in abonos]
+        observaciones = [a["observacion"] for a in abonos]
+        cobradores = [a["cobrador"] for a in abonos]
+        if not set(map(type, ids)) | set(map(type, contratos)) <= {int} \
+                or not set(map(type, montos)) <= {float, int} \
+                or not set(map(type, observaciones)) | set(map(type, cobradores)) <= {str}:
+            return None
+        # los montos se repiten mucho: cada valor distinto se convierte y verifica una vez
+        centavos_de = {}
+        for monto in set(montos):
+            centavos = _centavos(monto)
+            if centavos is None:
+                return None
+            centavos_de[monto] = centavos
+        centavos = [centavos_de[m] for m in montos]
+        textos_fecha = [a["fecha"] for a in abonos]
+        if set(map(type, textos_fecha)) != {str}:
+            return None
+        # cada día y cada hora distintos se validan una vez; después todo es buscar en los dicts
+        dias, horas = self._inicio_dia, self._hora_a_segundos
+        if any(self._registrar_dia(d) is None for d in {f[:11] for f in textos_fecha} - dias.keys()) \
+                or any(self._segundos_hora(h) is None for h in {f[11:] for f in textos_fecha} - horas.keys()):
+            return None
+        fechas = [dias[f[:11]] + horas[f[11:]] for f in textos_fecha]
+        textos = self._textos
+        return (ids, contratos, fechas, centavos, [textos.setdefault(t, t) for t in observaciones],
+                [textos.setdefault(t, t) for t in cobradores])
+
+    def agregar(self, abono):
+        """Agrega `abono` (dict) al final y devuelve su posición."""
+        posicion = len(self.ids)
+        if not self._agregar_en_columnas(abono):
+            # no se puede reconstruir idéntico desde las columnas: se guarda tal cual
+            self.especiales[posicion] = dict(abono)
+            abono_id, contrato_id = abono.get("id"), abono.get("contrato_id")
+            self.ids.append(abono_id if type(abono_id) is int else 0)
+            self.contratos.append(contrato_id if type(contrato_id) is int else 0)
+            self.fechas.append(0)
+            self.centavos.append(0)
+            self.observaciones.append("")
+            self.cobradores.append("")
+        return posicion
+
+    def _agregar_en_columnas(self, abono):
+        if abono.keys() != _CLAVES_ABONO:
+            return False
+        abono_id, contrato_id, monto = abono["id"], abono["contrato_id"], abono["monto"]
+        observacion, cobrador = abono["observacion"], abono["cobrador"]
+        if type(abono_id) is not int or type(contrato_id) is not int or type(observacion) is not str \
+                or type(cobrador) is not str or type(monto) not in (float, int):
+            return False
+        centavos = _centavos(monto)
+        if centavos is None:
+            return False
+        segundos = self._segundos(abono["fecha"])
+        if segundos is None:
+            return False
+        textos = self._textos
+        self.ids.append(abono_id)
+        self.contratos.append(contrato_id)
+        self.fechas.append(segundos)
+        self.centavos.append(centavos)
+        self.observaciones.append(textos.setdefault(observacion, observacion))
+        self.cobradores.append(textos.setdefault(cobrador, cobrador))
+        return True
+
+    def _segundos(self, fecha):
+        """"AAAA-MM-DD HH:MM:SS" como segundos desde 1970, o None si la fecha no tiene exactamente esa forma."""
+        if type(fecha) is not str:
+            return None
+        # la clave del día lleva el espacio: con día y hora válidos la forma completa queda verificada
+        inicio = self._inicio_dia.get(fecha[:11])
+        if inicio is None:
+            inicio = self._registrar_dia(fecha[:11])
+        segundos = self._hora_a_segundos.get(fecha[11:])
+        if segundos is None:
+            segundos = self._segundos_hora(fecha[11:])
+        if inicio is None or segundos is None:
+            return None
+        return inicio + segundos
+
+    def _registrar_dia(self, texto):
+        """"AAAA-MM-DD " como segundos de su medianoche desde 1970 (y al caché), o None si no es válido."""
+        partes = _DIA_ISO.match(texto)
+        try:
+            dia = date(int(partes[1]), int(partes[2]), int(partes[3])).toordinal() - _EPOCA
+        except (TypeError, ValueError):
+            return None
+        self._inicio_dia[texto] = dia * _DIA
+        self._numero_a_dia[dia] = texto[:10]
+        return dia * _DIA
+
+    def _segundos_hora(self, texto):
+        """"HH:MM:SS" como segundos desde medianoche (y al caché), o None si no es una hora válida."""
+        partes = _HORA_ISO.match(texto)
+        if partes is None or int(partes[1]) > 23 or int(partes[2]) > 59 or int(partes[3]) > 59:
+            return None
+        segundos = int(partes[1]) * 3600 + int(partes[2]) * 60 + int(partes[3])
+        self._hora_a_segundos[texto] = segundos
+        self._segundos_a_hora[segundos] = texto
+        return segundos
+
+    def _dia(self, numero):
+        texto = self._numero_a_dia.get(numero)
+        if texto is None:
+            texto = self._numero_a_dia[numero] = date.fromordinal(numero + _EPOCA).isoformat()
+        return texto
+
+    def _hora(self, segundos):
+        texto = self._segundos_a_hora.get(segundos)
+        if texto is None:
+            hora, resto = divmod(segundos, 3600)
+            texto = self._segundos_a_hora[segundos] = f"{hora:02d}:{resto // 60:02d}:{resto % 60:02d}"
+        return texto
+
+    def centavos_de(self, posicion):
+        """Monto de la fila en centavos (los especiales se redondean al centavo)."""
+        if self.especiales and posicion in self.especiales:
+            return centavos(self.especiales[posicion]["monto"])
+        return self.centavos[posicion]
+
+    def fecha(self, posicion):
+        if posicion in self.especiales:
+            return self.especiales[posicion].get("fecha")
+        dia, segundos = divmod(self.fechas[posicion], _DIA)
+        return f"{self._dia(dia)} {self._hora(segundos)}"
+
+    def segundos_de(self, posicion):
+        """La fecha de la fila en segundos desde 1970 (para el índice por fecha), o None si no es ISO.
+
+        De los especiales con otra forma ("AAAA-MM-DD" sola, con "T", ...) cuenta solo el día.
+        """
+        especial = self.especiales.get(posicion) if self.especiales else None
+        if especial is None:
+            return self.fechas[posicion]
+        fecha = especial.get("fecha")
+        if not es_fecha_iso(fecha):
+            return None
+        segundos = self._segundos(fecha)
+        return segundos if segundos is not None else self._segundos(fecha[:10] + " 00:00:00")
+
+    def segundos_dia(self, texto):
+        """"AAAA-MM-DD" como segundos de su medianoche desde 1970 (los límites de un rango de días)."""
+        return self._segundos(texto + " 00:00:00")
+
+    def sumar_por_dia(self, planes):
+        """{(día "AAAA-MM-DD", cobrador, plan): [cantidad, centavos, min_id, max_id]} de los abonos con fecha ISO.
+
+        `planes` es {contrato_id: plan}; la suma va columna por columna, sin armar cada fila (ver resumen.py).
+        """
+        filas = zip(self.ids, self.contratos, self.fechas, self.centavos, self.cobradores)
+        if self.especiales:
+            # sus columnas tienen valores de relleno: se suman aparte, con sus datos originales
+            especiales = self.especiales
+            filas = (f for posicion, f in enumerate(filas) if posicion not in especiales)
+        grupos = {}
+        for abono_id, contrato_id, segundos, monto, cobrador in filas:
+            clave = (segundos // _DIA, cobrador, planes.get(contrato_id, ""))
+            fila = grupos.get(clave)
+            if fila is None:
+                grupos[clave] = [1, monto, abono_id, abono_id]
+            else:
+                fila[0] += 1
+                fila[1] += monto
+                if abono_id < fila[2]:
+                    fila[2] = abono_id
+                if abono_id > fila[3]:
+                    fila[3] = abono_id
+        por_texto = {(self._dia(numero), cobrador, plan): fila for (numero, cobrador, plan), fila in grupos.items()}
+        for especial in self.especiales.values():
+            if not es_fecha_iso(especial.get("fecha")):
+                continue
+            clave = (especial["fecha"][:10], especial.get("cobrador") or "", planes.get(especial.get("contrato_id"), ""))
+            monto, abono_id = centavos(especial["monto"]), especial.get("id")
+            fila = por_texto.get(clave)
+            if fila is None:
+                por_texto[clave] = [1, monto, abono_id, abono_id]
+            else:
+                fila[0] += 1
+                fila[1] += monto
+                fila[2] = min(fila[2], abono_id)
+                fila[3] = max(fila[3], abono_id)
+        return por_texto
+
+    def valor(self, posicion, campo):
+        """Un campo de la fila sin armar el dict completo (None si falta)."""
+        if posicion in self.especiales:
+            return self.especiales[posicion].get(campo)
+        if campo == "id":
+            return self.ids[posicion]
+        if campo == "contrato_id":
+            return self.contratos[posicion]
+        if campo == "fecha":
+            return self.fecha(posicion)
+        if campo == "monto":
+            return self.centavos[posicion] / 100
+        if campo == "observacion":
+            return self.observaciones[posicion]
+        if campo == "cobrador":
+            return self.cobradores[posicion]
+        return None
+
+    def clave_orden(self, campo):
+        """Función posición -> valor para ordenar por `campo`, leyendo la columna directamente si se puede."""
+        if not self.especiales:
+            columna = {"id": self.ids, "contrato_id": self.contratos, "fecha": self.fechas, "monto": self.centavos,
+                       "observacion": self.observaciones, "cobrador": self.cobradores}.get(campo)
+            if columna is not None:
+                # segundos y centavos ordenan igual que el texto de la fecha y el monto
+                return columna.__getitem__
+        return lambda posicion: self.valor(posicion, campo)
+
+    def __getitem__(self, posicion):
+        if isinstance(posicion, slice):
+            return [self[i] for i in range(*posicion.indices(len(self)))]
+        if posicion < 0:
+            posicion += len(self)
+        especial = self.especiales.get(posicion) if self.especiales else None
+        if especial is not None:
+            return dict(especial)
+        return {"id": self.ids[posicion], "contrato_id": self.contratos[posicion], "fecha": self.fecha(posicion),
+                "monto": self.centavos[posicion] / 100, "observacion": self.observaciones[posicion],
+                "cobrador": self.cobradores[posicion]}
+
+    def __iter__(self):
+        if self.especiales:
+            for i in range(len(self.ids)):
+                yield self[i]
+            return
+        # sin especiales: un solo recorrido en paralelo de las columnas, sin indexar fila por fila
+        dias, horas = self._numero_a_dia, self._segundos_a_hora
+        for abono_id, contrato_id, segundos, monto_centavos, observacion, cobrador in zip(
+                self.ids, self.contratos, self.fechas, self.centavos, self.observaciones, self.cobradores):
+            dia, segundos = divmod(segundos, _DIA)
+            fecha = f"{dias.get(dia) or self._dia(dia)} {horas.get(segundos) or self._hora(segundos)}"
+            yield {"id": abono_id, "contrato_id": contrato_id, "fecha": fecha, "monto": monto_centavos / 100,
+                   "observacion": observacion, "cobrador": cobrador}
+
+    def como_columnas(self):
+        """{campo: [valores]} para el formato binario, o None si hay abonos especiales."""
+        if self.especiales:
+            return None
+        fechas = []
+        for segundos in self.fechas:
+            dia, segundos = divmod(segundos, _DIA)
+            fechas.append(f"{self._dia(dia)} {self._hora(segundos)}")
+        return {"id": self.ids.tolist(), "contrato_id": self.contratos.tolist(), "fecha": fechas,
+                "monto": [c / 100 for c in self.centavos], "observacion": list(self.observaciones),
+                "cobrador": list(self.cobradores)}
+
+    def _periodo(self, posicion):
+        """Mes de la fecha como año*12 + mes - 1, como base.periodo_o."""
+        return self._periodo_dia(self.fechas[posicion] // _DIA)
+
+    def _periodo_dia(self, dia):
+        periodo = self._periodos.get(dia)
+        if periodo is None:
+            fecha = date.fromordinal(dia + _EPOCA)
+            periodo = self._periodos[dia] = fecha.year * 12 + fecha.month - 1
+        return periodo
+
+    def columnas_desde(self, despues_de):
+        """Lo mismo que base.columnas_de sobre estos abonos, sin armar un dict por fila."""
+        ids = self.ids
+        posiciones = [i for i in range(len(ids)) if ids[i] > despues_de]
+        posiciones.sort(key=ids.__getitem__)
+        columnas = {"id": [], "contrato_id": [], "periodo": [], "centavos": [], "cobrador": []}
+        for i in posiciones:
+            especial = self.especiales.get(i) if self.especiales else None
+            if especial is not None:
+                columnas["id"].append(especial["id"])
+                columnas["contrato_id"].append(especial["contrato_id"])
+                columnas["periodo"].append(periodo_o(especial.get("fecha")))
+                columnas["centavos"].append(centavos(especial["monto"]))
+                columnas["cobrador"].append(especial.get("cobrador") or "")
+                continue
+            columnas["id"].append(ids[i])
+            columnas["contrato_id"].append(self.contratos[i])
+            columnas["periodo"].append(self._periodo(i))
+            columnas["centavos"].append(self.centavos[i])
+            columnas["cobrador"].append(self.cobradores[i])
+        return columnas
+
+    def sumar(self, por=None):
+        """Total en centavos, o por "contrato" / "periodo" (ver MotorAlmacenamiento.sumar_abonos)."""
+        fechas, contratos, montos = self.fechas, self.contratos, self.centavos
+        if self.especiales:
+            normales = [i for i in range(len(self.ids)) if i not in self.especiales]
+            fechas = [fechas[i] for i in normales]
+            contratos = [contratos[i] for i in normales]
+            montos = [montos[i] for i in normales]
+        especiales = list(self.especiales.values())
+        montos_especiales = [centavos(e["monto"]) for e in especiales]
+        if por is None:
+            return sum(montos) + sum(montos_especiales)
+        if por == "contrato":
+            totales = sumar_por(contratos, montos)
+            claves = [e["contrato_id"] for e in especiales]
+        else:
+            # primero por día (pocos distintos) y después cada día a su mes
+            totales = {}
+            for dia, total in sumar_por([f // _DIA for f in fechas], montos).items():
+                periodo = self._periodo_dia(dia)
+                totales[periodo] = totales.get(periodo, 0) + total
+            claves = [periodo_o(e.get("fecha")) for e in especiales]
+        for clave, monto in zip(claves, montos_especiales):
+            totales[clave] = totales.get(clave, 0) + monto
+        return totales
@@ -0,0 +1,264 @@
+# almacenamiento/repositorio.py
+"""Datos en memoria con índices hash, para no recorrer listas en cada consulta."""
+import itertools
+from array import array
+from collections import defaultdict
+from datetime import date
+
+from .busqueda import IndiceTrigramas, texto_contrato
+from .cuentas import cuenta_vacia, fila_cuenta, registrar_abono, registrar_cambio_estado
+from .rangos import IndiceOrdenado, es_fecha_iso
+from .registros import ColumnasAbonos, Contrato
+from .resumen import ResumenDiario, plan_de
+
+_CLAVES_PROPIAS = ("version", "contratos", "abonos", "cuentas", "cierres")
+# cada repositorio construido lleva un número distinto (ver MotorJSON.version_datos)
+_numeros = itertools.count(1)
+
+
+def _posiciones():
+    return array("q")
+
+
+class RepositorioIndexado:
+    """Mantiene los índices id→contrato, cedula→[contratos], estado→{contratos} y
+    contrato_id→[abonos], más el saldo de cada contrato (id→cuenta). Los índices
+    por fecha (de los abonos y de inicio de los contratos) se arman la primera
+    vez que se consulta un rango, y el resumen diario la primera vez que se pide.
+
+    Se construye una vez a partir del documento completo y luego se actualiza
+    fila por fila en cada escritura. Los contratos quedan como registros
+    Contrato y los abonos en columnas (ver registros.py); `documento()` arma
+    de nuevo el documento para serializarlo.
+    """
+
+    def __init__(self, data):
+        self.version = data.get("version", 0)
+        # claves del documento que el repositorio no interpreta: se vuelven a guardar tal cual
+        self.otros = {k: v for k, v in data.items() if k not in _CLAVES_PROPIAS}
+        self.contratos = []
+        self.abonos = ColumnasAbonos()
+        self.contratos_por_id = {}
+        self.contratos_por_cedula = defaultdict(list)
+        # estado -> posiciones en self.contratos; id -> posición, para moverlo al cambiar de estado
+        self.contratos_por_estado = defaultdict(set)
+        self._posicion_contrato = {}
+        # contrato_id -> posiciones en self.abonos
+        self.abonos_por_contrato = defaultdict(_posiciones)
+        self.max_id = {"contratos": 0, "abonos": 0}
+        # resultados derivados (listas ordenadas para paginar); se vacía en cada escritura
+        self.vistas = {}
+        self.numero = next(_numeros)
+        # sube con cada escritura aplicada a este repositorio; la segunda, solo con las de contratos
+        self.generacion = 0
+        self.generacion_contratos = 0
+        self._indice_texto = None
+        self._indice_fechas = None
+        self._indice_inicios = None
+        self._resumen = None
+        # cierres de caja por día; se guardan en el documento tal cual
+        self.cierres = {c["dia"]: c for c in data.get("cierres", [])}
+        # el total pagado sale de los abonos; solo las pausas se guardan en el documento ("cuentas")
+        self.cuentas = {}
+        self.pausas = data.get("cuentas")
+        for posicion, c in enumerate(data["contratos"]):
+            contrato = Contrato(c)
+            self.contratos.append(contrato)
+            self._indexar_contrato(contrato, posicion)
+            self.cuentas[contrato.id].update((self.pausas or {}).get(str(contrato.id), {}))
+        # los abonos se cargan en bloque a las columnas y después se indexan
+        abonos = data["abonos"]
+        self.abonos.extender(abonos)
+        self.max_id["abonos"] = max(self.abonos.ids, default=0)
+        centavos_de = self.abonos.centavos_de
+        for posicion, abono in enumerate(abonos):
+            self.abonos_por_contrato[abono["contrato_id"]].append(posicion)
+            cuenta = self.cuentas.get(abono["contrato_id"])
+            if cuenta is not None:
+                registrar_abono(cuenta, centavos_de(posicion), abono.get("fecha"))
+
+    def documento(self):
+        """El documento para serializar; los abonos van como secuencia de dicts que se arman al recorrerla."""
+        documento = {"version": self.version} if self.version else {}
+        documento["contratos"] = [c.a_dict() for c in self.contratos]
+        documento["abonos"] = self.abonos
+        if self.pausas is not None:
+            documento["cuentas"] = self.pausas
+        if self.cierres:
+            documento["cierres"] = [self.cierres[d] for d in sorted(self.cierres)]
+        documento.update(self.otros)
+        return documento
+
+    def _indexar_contrato(self, contrato, posicion):
+        self.contratos_por_id[contrato.id] = contrato
+        self.contratos_por_cedula[contrato.cedula].append(contrato)
+        self.contratos_por_estado[contrato.estado].add(posicion)
+        self._posicion_contrato[contrato.id] = posicion
+        self.max_id["contratos"] = max(self.max_id["contratos"], contrato.id)
+        self.cuentas.setdefault(contrato.id, cuenta_vacia())
+
+    def _indexar_abono(self, abono):
+        posicion = self.abonos.agregar(abono)
+        self.abonos_por_contrato[abono["contrato_id"]].append(posicion)
+        self.max_id["abonos"] = max(self.max_id["abonos"], abono["id"])
+        cuenta = self.cuentas.get(abono["contrato_id"])
+        if cuenta is not None:
+            registrar_abono(cuenta, self.abonos.centavos_de(posicion), abono.get("fecha"))
+        if self._indice_fechas is not None:
+            segundos = self.abonos.segundos_de(posicion)
+            if segundos is not None:
+                self._indice_fechas.agregar(segundos, posicion)
+        if self._resumen is not None and es_fecha_iso(abono.get("fecha")):
+            self._resumen.sumar(abono["fecha"][:10], abono.get("cobrador") or "",
+                                plan_de(self.contrato(abono["contrato_id"])), self.abonos.centavos_de(posicion),
+                                abono["id"])
+
+    def siguiente_id(self, coleccion):
+        return self.max_id[coleccion] + 1
+
+    # --- escrituras ---
+    def agregar_contrato(self, contrato):
+        """`contrato` es un dict; se guarda convertido a Contrato."""
+        self.vistas.clear()
+        self.generacion += 1
+        self.generacion_contratos += 1
+        contrato = Contrato(contrato)
+        self.contratos.append(contrato)
+        self._indexar_contrato(contrato, len(self.contratos) - 1)
+        if self._indice_texto is not None:
+            self._indice_texto.agregar(contrato.id, texto_contrato(contrato))
+        if self._indice_inicios is not None and es_fecha_iso(contrato.fecha_inicio):
+            self._indice_inicios.agregar(contrato.fecha_inicio, len(self.contratos) - 1)
+
+    def actualizar_contrato(self, contrato_id, nuevos_datos, fecha=None):
+        """`fecha` es el día del cambio de estado, si lo hay (por defecto hoy)."""
+        self.vistas.clear()
+        self.generacion += 1
+        self.generacion_contratos += 1
+        contrato = self.contratos_por_id[contrato_id]
+        if "estado" in nuevos_datos:
+            self._registrar_pausa(contrato, nuevos_datos["estado"], fecha or date.today().isoformat())
+        cedula_anterior, estado_anterior, inicio_anterior = contrato.cedula, contrato.estado, contrato.fecha_inicio
+        contrato.actualizar(nuevos_datos)
+        posicion = self._posicion_contrato[contrato_id]
+        if contrato.estado != estado_anterior:
+            self.contratos_por_estado[estado_anterior].discard(posicion)
+            self.contratos_por_estado[contrato.estado].add(posicion)
+        if self._indice_inicios is not None and contrato.fecha_inicio != inicio_anterior:
+            if es_fecha_iso(inicio_anterior):
+                self._indice_inicios.quitar(inicio_anterior, posicion)
+            if es_fecha_iso(contrato.fecha_inicio):
+                self._indice_inicios.agregar(contrato.fecha_inicio, posicion)
+        if contrato.cedula != cedula_anterior:
+            anteriores = self.contratos_por_cedula[cedula_anterior]
+            anteriores.remove(contrato)
+            if not anteriores:
+                del self.contratos_por_cedula[cedula_anterior]
+            self.contratos_por_cedula[contrato.cedula].append(contrato)
+        if self._indice_texto is not None:
+            self._indice_texto.agregar(contrato_id, texto_contrato(contrato))
+        return contrato
+
+    def _registrar_pausa(self, contrato, nuevo_estado, fecha):
+        cuenta = self.cuentas[contrato.id]
+        registrar_cambio_estado(cuenta, contrato.estado, nuevo_estado, fecha)
+        if self.pausas is None:
+            self.pausas = {}
+        if cuenta["pausado_desde"] or cuenta["meses_pausados"]:
+            self.pausas[str(contrato.id)] = {"pausado_desde": cuenta["pausado_desde"],
+                                             "meses_pausados": cuenta["meses_pausados"]}
+        else:
+            self.pausas.pop(str(contrato.id), None)
+
+    def agregar_abono(self, abono):
+        self.vistas.clear()
+        self.generacion += 1
+        self._indexar_abono(abono)
+
+    def agregar_cierre(self, cierre):
+        self.vistas.clear()
+        self.generacion += 1
+        self.cierres[cierre["dia"]] = cierre
+
+    def vista(self, clave, calcular):
+        """Resultado derivado memorizado hasta la próxima escritura."""
+        if clave not in self.vistas:
+            self.vistas[clave] = calcular()
+        return self.vistas[clave]
+
+    @property
+    def indice_texto(self):
+        """Índice de trigramas; se arma la primera vez que alguien busca por texto."""
+        if self._indice_texto is None:
+            indice = IndiceTrigramas()
+            for c in self.contratos:
+                indice.agregar(c.id, texto_contrato(c))
+            self._indice_texto = indice
+        return self._indice_texto
+
+    @property
+    def indice_fechas(self):
+        """Posiciones de los abonos ordenadas por fecha (segundos desde 1970); se arma la primera vez."""
+        if self._indice_fechas is None:
+            abonos = self.abonos
+            if abonos.especiales:
+                pares = ((abonos.segundos_de(p), p) for p in range(len(abonos)))
+                indice = IndiceOrdenado([(s, p) for s, p in pares if s is not None], enteros=True)
+            else:
+                # sin especiales la columna de fechas ya sirve de clave: se ordenan solo las posiciones
+                indice = IndiceOrdenado(enteros=True)
+                orden = sorted(range(len(abonos)), key=abonos.fechas.__getitem__)
+                indice.posiciones.extend(orden)
+                indice.claves.extend(abonos.fechas[p] for p in orden)
+            self._indice_fechas = indice
+        return self._indice_fechas
+
+    @property
+    def indice_inicios(self):
+        """Posiciones de los contratos ordenadas por fecha_inicio; se arma la primera vez."""
+        if self._indice_inicios is None:
+            self._indice_inicios = IndiceOrdenado(
+                (c.fecha_inicio, p) for p, c in enumerate(self.contratos) if es_fecha_iso(c.fecha_inicio))
+        return self._indice_inicios
+
+    @property
+    def resumen(self):
+        """Resumen diario de los abonos (ver resumen.py); se arma la primera vez con el plan actual de cada contrato."""
+        if self._resumen is None:
+            planes = {c.id: plan_de(c) for c in self.contratos}
+            self._resumen = ResumenDiario.de_grupos(self.abonos.sumar_por_dia(planes))
+        return self._resumen
+
+    # --- consultas ---
+    def contrato(self, contrato_id):
+        return self.contratos_por_id.get(contrato_id)
+
+    def contratos_con_estado(self, estado):
+        """Los contratos con ese estado (o todos si es None), en el orden de self.contratos."""
+        if not estado:
+            return self.contratos
+        return [self.contratos[p] for p in sorted(self.contratos_por_estado.get(estado, ()))]
+
+    def contratos_iniciados_entre(self, inicio, fin):
+        """Contratos con fecha_inicio en [inicio, fin) ("AAAA-MM-DD"; None deja el extremo abierto)."""
+        return [self.contratos[p] for p in self.indice_inicios.rango(inicio, fin)]
+
+    def abonos_entre(self, inicio, fin):
+        """Posiciones de los abonos con fecha en [inicio, fin) (ver rangos.rango_fechas), por fecha."""
+        segundos = self.abonos.segundos_dia
+        return self.indice_fechas.rango(inicio and segundos(inicio), fin and segundos(fin))
+
+    def contratos_con_cedula(self, cedula):
+        return self.contratos_por_cedula.get(cedula, [])
+
+    def posiciones_de(self, contrato_id):
+        """Posiciones en self.abonos de los abonos del contrato."""
+        return self.abonos_por_contrato.get(contrato_id, ())
+
+    def abonos_de(self, contrato_id):
+        """Los abonos del contrato como dicts nuevos."""
+        return [self.abonos[p] for p in self.posiciones_de(contrato_id)]
+
+    def fila_cuenta(self, contrato):
+        """Contrato sin afiliados junto con su cuenta (`pagado` en pesos)."""
+        return fila_cuenta(contrato, self.cuentas[contrato.id])
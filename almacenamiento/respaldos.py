@@ -0,0 +1,362 @@
+# almacenamiento/respaldos.py
+"""Respaldos incrementales con bloques direccionados por contenido.
+
+Cada instantánea se parte en bloques; un bloque se guarda una sola vez
+(bloques/<sha256>) y la instantánea es solo un manifiesto con la lista de
+bloques. Dos respaldos seguidos comparten todo salvo lo que cambió.
+
+La aplicación de escritorio y el backend suelen usar la misma carpeta:
+guardar, podar y restaurar toman el candado entre procesos
+`<carpeta>/respaldos.lock`, así podar nunca borra bloques de una
+instantánea que otro proceso todavía está escribiendo.
+
+Uso:
+    python -m almacenamiento.respaldos listar
+    python -m almacenamiento.respaldos restaurar 20251102_113044_123456 [--destino archivo]
+    python -m almacenamiento.respaldos podar
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import zlib
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+
+from . import contadores
+from .bloqueo import CandadoArchivo, reemplazar
+
+# Cortes definidos por contenido: se corta al final de una línea cuyo crc32
+# cae en 1/64 de los casos, con tamaño mínimo y máximo por bloque. Así una
+# inserción en medio del archivo solo cambia los bloques vecinos.
+BLOQUE_MINIMO = 32 * 1024
+BLOQUE_MAXIMO = 256 * 1024
+MASCARA_CORTE = 63
+
+# Retención por defecto: todo lo de las últimas horas y luego uno por hora/día/mes
+RETENCION = {"recientes_horas": 2, "horarias": 48, "diarias": 30, "mensuales": 12}
+
+FORMATO_ID = "%Y%m%d_%H%M%S_%f"
+
+_log = logging.getLogger(__name__)
+
+
+def partir_en_bloques(ruta):
+    """Genera los bloques de un archivo con cortes definidos por contenido."""
+    with open(ruta, "rb") as f:
+        actual = []
+        tamano = 0
+        for linea in f:
+            # líneas enormes (datos binarios sin saltos) se trocean al máximo
+            while len(linea) > BLOQUE_MAXIMO:
+                if actual:
+                    yield b"".join(actual)
+                    actual, tamano = [], 0
+                yield linea[:BLOQUE_MAXIMO]
+                linea = linea[BLOQUE_MAXIMO:]
+            actual.append(linea)
+            tamano += len(linea)
+            if tamano >= BLOQUE_MAXIMO or (
+                    tamano >= BLOQUE_MINIMO and zlib.crc32(linea) & MASCARA_CORTE == 0):
+                yield b"".join(actual)
+                actual, tamano = [], 0
+        if actual:
+            yield b"".join(actual)
+
+
+def _escribir_atomico(ruta, contenido):
+    # temporal con nombre propio: dos procesos que escriben el mismo bloque no se pisan el archivo
+    fd, temporal = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=os.path.dirname(ruta))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(contenido)
+            f.flush()
+            os.fsync(f.fileno())
+        reemplazar(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+    contadores.sumar("respaldos", escritos=len(contenido))
+
+
+def _reservar(ruta):
+    """Crea `ruta` vacía solo si no existía (O_EXCL); False si ya estaba."""
+    try:
+        os.close(os.open(ruta, os.O_WRONLY | os.O_CREAT | os.O_EXCL))
+    except FileExistsError:
+        return False
+    return True
+
+
+class AlmacenRespaldos:
+    def __init__(self, directorio, retencion=None):
+        self.directorio = directorio
+        self.dir_bloques = os.path.join(directorio, "bloques")
+        self.dir_instantaneas = os.path.join(directorio, "instantaneas")
+        self.retencion = {**RETENCION, **(retencion or {})}
+        self._candado = CandadoArchivo(os.path.join(directorio, "respaldos"))
+
+    def _exclusivo(self):
+        """El candado de la carpeta, entre hilos y entre procesos (crea la carpeta si hace falta)."""
+        os.makedirs(self.directorio, exist_ok=True)
+        return self._candado
+
+    def _ruta_bloque(self, digest):
+        return os.path.join(self.dir_bloques, digest[:2], digest)
+
+    def _ruta_manifiesto(self, id_instantanea):
+        return os.path.join(self.dir_instantaneas, id_instantanea + ".json")
+
+    # --- creación ---
+    def guardar(self, ruta_archivo, meta=None):
+        """Guarda `ruta_archivo` como instantánea nueva. Devuelve la ruta del manifiesto."""
+        with self._exclusivo():
+            os.makedirs(self.dir_instantaneas, exist_ok=True)
+            total = hashlib.sha256()
+            bloques = []
+            nuevos = 0
+            tamano_total = 0
+            for bloque in partir_en_bloques(ruta_archivo):
+                total.update(bloque)
+                tamano_total += len(bloque)
+                digest = hashlib.sha256(bloque).hexdigest()
+                bloques.append(digest)
+                ruta = self._ruta_bloque(digest)
+                if not os.path.exists(ruta):
+                    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+                    _escribir_atomico(ruta, zlib.compress(bloque, 6))
+                    nuevos += 1
+
+            ahora = datetime.now()
+            id_instantanea = ahora.strftime(FORMATO_ID)
+            while not _reservar(self._ruta_manifiesto(id_instantanea)):
+                ahora += timedelta(microseconds=1)
+                id_instantanea = ahora.strftime(FORMATO_ID)
+            manifiesto = {
+                "id": id_instantanea,
+                "fecha": ahora.strftime("%Y-%m-%d %H:%M:%S"),
+                "tamano": tamano_total,
+                "sha256": total.hexdigest(),
+                "bloques": bloques,
+                "bloques_nuevos": nuevos,
+                **(meta or {}),
+            }
+            contadores.sumar("respaldos", leidos=tamano_total)
+            ruta = self._ruta_manifiesto(id_instantanea)
+            _escribir_atomico(ruta, json.dumps(manifiesto, ensure_ascii=False).encode("utf-8"))
+        self.podar()
+        return ruta
+
+    # --- consulta / restauración ---
+    def listar(self):
+        """Manifiestos ordenados del más viejo al más nuevo."""
+        if not os.path.isdir(self.dir_instantaneas):
+            return []
+        manifiestos = []
+        # con el candado: un manifiesto reservado todavía vacío no se ve a medias
+        with self._exclusivo():
+            for nombre in sorted(os.listdir(self.dir_instantaneas)):
+                if nombre.endswith(".json"):
+                    with open(os.path.join(self.dir_instantaneas, nombre), "r", encoding="utf-8") as f:
+                        manifiestos.append(json.load(f))
+        return manifiestos
+
+    def restaurar(self, id_instantanea, destino, extension=None):
+        """Reconstruye la instantánea en `destino` (verificando el sha256 completo).
+
+        `extension` es la del motor que usa `destino` (por defecto, la del
+        archivo si ya existe); si la instantánea es de otro formato no se toca
+        nada y se lanza ValueError. `destino` no debe estar abierto: en
+        Windows no se puede reemplazar un archivo en uso.
+        """
+        # con el candado: podar no puede borrar bloques mientras se leen
+        with self._exclusivo():
+            with open(self._ruta_manifiesto(id_instantanea), "r", encoding="utf-8") as f:
+                manifiesto = json.load(f)
+            guardada = manifiesto.get("extension")
+            esperada = extension or (os.path.splitext(destino)[1] if os.path.exists(destino) else None)
+            if guardada and esperada and guardada != esperada:
+                raise ValueError(f"La instantánea {id_instantanea} es de una base {manifiesto.get('motor', '?')} "
+                                 f"({guardada}); no se puede restaurar sobre {destino} ({esperada}).")
+            total = hashlib.sha256()
+            temporal = destino + ".restaurando"
+            with open(temporal, "wb") as salida:
+                for digest in manifiesto["bloques"]:
+                    with open(self._ruta_bloque(digest), "rb") as f:
+                        bloque = zlib.decompress(f.read())
+                    if hashlib.sha256(bloque).hexdigest() != digest:
+                        raise ValueError(f"Bloque dañado: {digest}")
+                    total.update(bloque)
+                    salida.write(bloque)
+                salida.flush()
+                os.fsync(salida.fileno())
+            if total.hexdigest() != manifiesto["sha256"]:
+                os.remove(temporal)
+                raise ValueError(f"La instantánea {id_instantanea} no coincide con su sha256")
+            # restos del WAL (sqlite) o del diario de la base anterior corromperían la restaurada;
+            # las columnas de reportes (.reportes) serían las de la base anterior
+            for sufijo in ("-wal", "-shm", ".diario", ".reportes"):
+                if os.path.exists(destino + sufijo):
+                    os.remove(destino + sufijo)
+            reemplazar(temporal, destino)
+            return destino
+
+    # --- retención ---
+    def a_conservar(self, manifiestos, ahora=None):
+        """Ids que sobreviven a la política de retención."""
+        ahora = ahora or datetime.now()
+        r = self.retencion
+        conservar = set()
+        vistos = {"hora": set(), "dia": set(), "mes": set()}
+        # recorrer del más nuevo al más viejo: el primero de cada periodo es el que queda
+        for m in sorted(manifiestos, key=lambda m: m["id"], reverse=True):
+            fecha = datetime.strptime(m["id"], FORMATO_ID)
+            edad = ahora - fecha
+            claves = {
+                "hora": fecha.strftime("%Y%m%d%H"),
+                "dia": fecha.strftime("%Y%m%d"),
+                "mes": fecha.strftime("%Y%m"),
+            }
+            if not conservar or edad <= timedelta(hours=r["recientes_horas"]):
+                conservar.add(m["id"])
+            if edad <= timedelta(hours=r["horarias"]) and claves["hora"] not in vistos["hora"]:
+                conservar.add(m["id"])
+            if edad <= timedelta(days=r["diarias"]) and claves["dia"] not in vistos["dia"]:
+                conservar.add(m["id"])
+            if edad <= timedelta(days=31 * r["mensuales"]) and claves["mes"] not in vistos["mes"]:
+                conservar.add(m["id"])
+            for periodo, clave in claves.items():
+                vistos[periodo].add(clave)
+        return conservar
+
+    def podar(self, ahora=None):
+        """Borra instantáneas fuera de la retención y los bloques que quedan huérfanos."""
+        with self._exclusivo():
+            manifiestos = self.listar()
+            conservar = self.a_conservar(manifiestos, ahora)
+            borrados = [m for m in manifiestos if m["id"] not in conservar]
+            if not borrados:
+                return 0
+            for m in borrados:
+                os.remove(self._ruta_manifiesto(m["id"]))
+            en_uso = {d for m in manifiestos if m["id"] in conservar for d in m["bloques"]}
+            for subdir in os.listdir(self.dir_bloques):
+                carpeta = os.path.join(self.dir_bloques, subdir)
+                for digest in os.listdir(carpeta):
+                    if digest not in en_uso:
+                        os.remove(os.path.join(carpeta, digest))
+            return len(borrados)
+
+
+class RespaldoEnSegundoPlano:
+    """Hilo que toma los respaldos fuera del camino de escritura.
+
+    `solicitar()` es instantáneo; varias solicitudes seguidas se agrupan en
+    un único respaldo cuando pasan `espera` segundos sin cambios nuevos.
+    Un respaldo fallido se registra en el log y queda en `ultimo_error`
+    (fecha, texto) hasta que otro salga bien, para avisarlo en la interfaz.
+    """
+
+    def __init__(self, tomar_respaldo, espera=30.0):
+        self.tomar_respaldo = tomar_respaldo
+        self.espera = espera
+        self._pendiente = threading.Event()
+        self._ultima_solicitud = 0.0
+        self._hilo = None
+        self._bloqueo = threading.Lock()
+        self.ultimo_respaldo = None
+        self.ultimo_error = None
+
+    def solicitar(self):
+        self._ultima_solicitud = time.monotonic()
+        self._pendiente.set()
+        with self._bloqueo:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._ciclo, name="respaldos", daemon=True)
+                self._hilo.start()
+
+    def _ciclo(self):
+        while True:
+            self._pendiente.wait()
+            while time.monotonic() - self._ultima_solicitud < self.espera:
+                time.sleep(min(self.espera, 0.5))
+            self._pendiente.clear()
+            # un respaldo fallido no debe tumbar el hilo; se reintenta en el próximo cambio
+            self._tomar()
+
+    def _tomar(self):
+        try:
+            self.tomar_respaldo()
+        except Exception as e:
+            self.ultimo_error = (datetime.now(), f"{type(e).__name__}: {e}")
+            _log.exception("Falló el respaldo automático")
+            return False
+        self.ultimo_respaldo = datetime.now()
+        self.ultimo_error = None
+        return True
+
+    def vaciar(self):
+        """Toma ya el respaldo pendiente, si lo hay (al cerrar la aplicación)."""
+        if self._pendiente.is_set():
+            self._pendiente.clear()
+            self._tomar()
+
+
+def tomar_instantanea(motor, almacen, bloqueo=None):
+    """Copia consistente del motor a un temporal y de ahí al almacén de bloques.
+
+    `bloqueo` (opcional) se mantiene solo mientras se copia, no al partir en bloques.
+    """
+    os.makedirs(almacen.directorio, exist_ok=True)
+    fd, temporal = tempfile.mkstemp(suffix=motor.extension_respaldo, dir=almacen.directorio)
+    os.close(fd)
+    try:
+        with bloqueo or nullcontext():
+            motor.respaldar(temporal)
+        return almacen.guardar(temporal, {"motor": motor.nombre, "extension": motor.extension_respaldo,
+                                          "origen": os.path.abspath(motor.ruta)})
+    finally:
+        os.remove(temporal)
+
+
+def main(argv=None):
+    import database
+    from almacenamiento import clase_motor
+
+    parser = argparse.ArgumentParser(description="Respaldos incrementales de la base de datos.")
+    sub = parser.add_subparsers(dest="accion", required=True)
+    sub.add_parser("listar")
+    p_rest = sub.add_parser("restaurar")
+    p_rest.add_argument("id")
+    p_rest.add_argument("--destino", help="archivo a sobrescribir (por defecto, la base en uso)")
+    sub.add_parser("podar")
+    args = parser.parse_args(argv)
+
+    almacen = database.obtener_almacen_respaldos()
+    if args.accion == "listar":
+        for m in almacen.listar():
+            print(f"{m['id']}  {m['fecha']}  {m.get('motor', '?'):<7} {m['tamano']:>12} bytes  "
+                  f"{len(m['bloques'])} bloques ({m['bloques_nuevos']} nuevos)")
+    elif args.accion == "restaurar":
+        # la ruta sale de la configuración sin abrir el motor: con la base abierta
+        # por este proceso no se podría reemplazar (Windows), y si faltara se crearía una nueva
+        extension = None
+        destino = args.destino
+        if destino is None:
+            destino = database.ruta_configurada()
+            extension = clase_motor(database.DB_MOTOR).extension_respaldo
+        try:
+            print(f"Restaurada en {almacen.restaurar(args.id, destino, extension)}")
+        except ValueError as e:
+            parser.exit(1, f"Error: {e}\n")
+    else:
+        print(f"{almacen.podar()} instantáneas eliminadas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# almacenamiento/resumen.py
+"""Resumen diario de abonos: cantidad, total, primer y último id por día, cobrador y plan.
+
+Es lo que lee el cierre de caja: un día o un mes de cierres se arma con
+unas pocas filas por día, sin volver a recorrer el historial de abonos.
+SQLite lo guarda en una tabla y cada abono suma el plan que su contrato
+tenía al registrarlo; los motores de archivo lo arman al abrir (con los
+planes de ese momento) y lo siguen igual. Los abonos cuya fecha no es ISO
+no entran (como en los rangos de rangos.py).
+"""
+from bisect import bisect_left, insort
+
+CAMPOS_RESUMEN = ("dia", "cobrador", "plan", "cantidad", "centavos", "min_id", "max_id")
+
+
+def plan_de(contrato):
+    """El plan de un contrato (dict o Contrato) como texto; "" si no hay contrato o no tiene plan."""
+    plan = contrato.get("plan") if contrato is not None else None
+    return plan if type(plan) is str else ""
+
+
+class ResumenDiario:
+    """{dia: {(cobrador, plan): [cantidad, centavos, min_id, max_id]}}, con los días ordenados aparte."""
+
+    def __init__(self):
+        self.por_dia = {}
+        self.dias = []
+
+    @classmethod
+    def de_grupos(cls, grupos):
+        """Desde {(dia, cobrador, plan): [cantidad, centavos, min_id, max_id]} ya sumados."""
+        resumen = cls()
+        for (dia, cobrador, plan), fila in grupos.items():
+            resumen.por_dia.setdefault(dia, {})[(cobrador, plan)] = fila
+        resumen.dias = sorted(resumen.por_dia)
+        return resumen
+
+    def sumar(self, dia, cobrador, plan, centavos, abono_id):
+        grupos = self.por_dia.get(dia)
+        if grupos is None:
+            grupos = self.por_dia[dia] = {}
+            if not self.dias or dia > self.dias[-1]:
+                self.dias.append(dia)
+            else:
+                insort(self.dias, dia)
+        fila = grupos.get((cobrador, plan))
+        if fila is None:
+            grupos[(cobrador, plan)] = [1, centavos, abono_id, abono_id]
+        else:
+            fila[0] += 1
+            fila[1] += centavos
+            fila[2] = min(fila[2], abono_id)
+            fila[3] = max(fila[3], abono_id)
+
+    def filas(self, inicio=None, fin=None):
+        """Filas (dicts de CAMPOS_RESUMEN) de los días en [inicio, fin), por día, cobrador y plan."""
+        primero = 0 if inicio is None else bisect_left(self.dias, inicio)
+        ultimo = len(self.dias) if fin is None else bisect_left(self.dias, fin)
+        filas = []
+        for dia in self.dias[primero:ultimo]:
+            for (cobrador, plan), (cantidad, centavos, min_id, max_id) in sorted(self.por_dia[dia].items()):
+                filas.append({"dia": dia, "cobrador": cobrador, "plan": plan, "cantidad": cantidad,
+                              "centavos": centavos, "min_id": min_id, "max_id": max_id})
+        return filas
@@ -0,0 +1,256 @@
+# almacenamiento/serializacion.py
+"""Formatos del archivo de datos de los motores json y diario.
+
+- "json": JSON compacto con un registro por línea (así los respaldos por
+  bloques siguen deduplicando); usa orjson si está instalado.
+- "json-legible": el formato histórico con sangría, para abrirlo a mano.
+- "msgpack": MessagePack, si está instalado.
+- "binario": columnas con prefijo de longitud (enteros y reales como
+  arreglos de 8 bytes, textos como un bloque UTF-8 con sus largos); no
+  necesita nada fuera de la biblioteca estándar.
+
+Al leer, el formato se reconoce por los primeros bytes, así que cambiar
+CRISTOREY_FORMATO no obliga a convertir nada: el archivo se reescribe en el
+formato nuevo en el siguiente guardado. Los formatos binarios llevan una
+cabecera fija con la versión del documento, igual que `{"version": N` en
+JSON, para el compare-and-swap entre cajas.
+
+Una lista del documento puede ser cualquier secuencia de dicts (por ejemplo
+las columnas de abonos del repositorio): se recorre fila por fila sin armar
+la lista completa, y si ofrece `como_columnas()` el formato binario toma
+las columnas directamente.
+"""
+import json
+import os
+import re
+import struct
+from array import array
+from collections.abc import Sequence
+from itertools import accumulate
+
+from . import contadores
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except Exception:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except Exception:
+    MSGPACK_AVAILABLE = False
+
+FORMATOS = ("json", "json-legible", "msgpack", "binario")
+FORMATO_POR_DEFECTO = "json"
+
+_MAGIA_MSGPACK = b"CRMP"
+_MAGIA_BINARIO = b"CRBN"
+_CABECERA = struct.Struct("<4sQ")  # magia, versión del documento
+_VERSION_JSON = re.compile(rb'\{\s*"version"\s*:\s*(\d+)')
+
+_SECCION_JSON = 0
+_SECCION_TABLA = 1
+_FALTA = object()  # clave ausente en un registro (distinto de None)
+
+_codificador = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def validar_formato(formato):
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato de archivo desconocido: {formato}")
+    if formato == "msgpack" and not MSGPACK_AVAILABLE:
+        raise ValueError("Para el formato msgpack instale msgpack.")
+    return formato
+
+
+def detectar(inicio):
+    """Formato de un archivo según sus primeros bytes (los JSON dan "json", con o sin sangría)."""
+    if inicio.startswith(_MAGIA_BINARIO):
+        return "binario"
+    if inicio.startswith(_MAGIA_MSGPACK):
+        return "msgpack"
+    return "json"
+
+
+def version_de(inicio):
+    """Versión del documento leída de la cabecera; 0 si no tiene."""
+    if inicio[:4] in (_MAGIA_BINARIO, _MAGIA_MSGPACK):
+        return _CABECERA.unpack_from(inicio)[1] if len(inicio) >= _CABECERA.size else 0
+    encontrada = _VERSION_JSON.match(inicio)
+    return int(encontrada.group(1)) if encontrada else 0
+
+
+# ---------- escribir ----------
+def _es_lista(valor):
+    return isinstance(valor, Sequence) and not isinstance(valor, (str, bytes, bytearray, memoryview))
+
+
+def _con_listas(documento):
+    """El documento con las secuencias convertidas en listas, para json y msgpack."""
+    return {clave: valor if isinstance(valor, list) or not _es_lista(valor) else list(valor)
+            for clave, valor in documento.items()}
+
+
+def serializar(documento, formato=FORMATO_POR_DEFECTO):
+    """Bytes del documento en `formato`; si tiene "version", va primero."""
+    if formato == "json":
+        return _json_por_lineas(documento)
+    if formato == "json-legible":
+        return json.dumps(_con_listas(documento), indent=4, ensure_ascii=False).encode("utf-8")
+    cabecera = _CABECERA.pack(_MAGIA_MSGPACK if formato == "msgpack" else _MAGIA_BINARIO,
+                              documento.get("version", 0))
+    if formato == "msgpack":
+        return cabecera + msgpack.packb(_con_listas(documento), use_bin_type=True)
+    if formato == "binario":
+        return cabecera + b"".join(_seccion(clave, valor) for clave, valor in documento.items())
+    raise ValueError(f"Formato de archivo desconocido: {formato}")
+
+
+def escribir(ruta, documento, formato=FORMATO_POR_DEFECTO):
+    """Escribe y sincroniza `ruta` (normalmente un temporal que luego se renombra)."""
+    contenido = serializar(documento, formato)
+    with open(ruta, "wb") as f:
+        f.write(contenido)
+        f.flush()
+        os.fsync(f.fileno())
+    contadores.sumar("datos", escritos=len(contenido))
+    return len(contenido)
+
+
+def _json_por_lineas(documento):
+    if ORJSON_AVAILABLE:
+        volcar = orjson.dumps
+    else:
+        def volcar(valor):
+            return _codificador.encode(valor).encode("utf-8")
+    partes = []
+    for clave, valor in documento.items():
+        if _es_lista(valor) and len(valor):
+            cuerpo = b",\n".join([volcar(v) for v in valor])
+            partes.append(volcar(clave) + b":[\n" + cuerpo + b"\n]")
+        elif _es_lista(valor):
+            partes.append(volcar(clave) + b":[]")
+        else:
+            partes.append(volcar(clave) + b":" + volcar(valor))
+    return b"{" + b",".join(partes) + b"}\n"
+
+
+def _seccion(clave, valor):
+    columnas = valor.como_columnas() if hasattr(valor, "como_columnas") else None
+    if columnas is not None:
+        tipo, cuerpo = _SECCION_TABLA, _tabla_de_columnas(len(valor), list(columnas), columnas.pop)
+    else:
+        if _es_lista(valor) and not isinstance(valor, list):
+            valor = list(valor)  # se recorre una vez por columna: mejor armarla una sola vez
+        if isinstance(valor, list) and all(isinstance(v, dict) for v in valor):
+            tipo, cuerpo = _SECCION_TABLA, _tabla(valor)
+        else:
+            tipo, cuerpo = _SECCION_JSON, _codificador.encode(valor).encode("utf-8")
+    nombre = clave.encode("utf-8")
+    return struct.pack("<H", len(nombre)) + nombre + struct.pack("<BQ", tipo, len(cuerpo)) + cuerpo
+
+
+def _tabla(filas):
+    claves = list(dict.fromkeys(k for f in filas for k in f))
+    return _tabla_de_columnas(len(filas), claves, lambda clave: [f.get(clave, _FALTA) for f in filas])
+
+
+def _tabla_de_columnas(n, claves, columna):
+    """`columna(clave)` da los valores de una columna; se pide de a una para no tenerlas todas a la vez."""
+    partes = [struct.pack("<II", n, len(claves))]
+    for clave in claves:
+        tipo, datos = _columna(columna(clave))
+        nombre = clave.encode("utf-8")
+        partes.append(struct.pack("<H", len(nombre)) + nombre + struct.pack("<cQ", tipo, len(datos)) + datos)
+    return b"".join(partes)
+
+
+def _columna(valores):
+    tipos = set(map(type, valores))
+    if tipos == {int} and all(-2**63 <= v < 2**63 for v in valores):
+        return b"i", array("q", valores).tobytes()
+    if tipos == {float}:
+        return b"f", array("d", valores).tobytes()
+    if tipos <= {str}:
+        return b"s", _textos(valores)
+    # mezcla de tipos, listas, None o claves ausentes: cada valor como JSON ("" si falta)
+    return b"j", _textos(["" if v is _FALTA else _codificador.encode(v) for v in valores])
+
+
+def _textos(valores):
+    return array("I", map(len, valores)).tobytes() + "".join(valores).encode("utf-8")
+
+
+# ---------- leer ----------
+def deserializar(contenido):
+    formato = detectar(contenido[:_CABECERA.size])
+    if formato == "json":
+        return orjson.loads(contenido) if ORJSON_AVAILABLE else json.loads(contenido.decode("utf-8"))
+    if formato == "msgpack":
+        if not MSGPACK_AVAILABLE:
+            raise ValueError("El archivo está en formato msgpack: instale msgpack para leerlo.")
+        return msgpack.unpackb(memoryview(contenido)[_CABECERA.size:], raw=False, strict_map_key=False)
+    return _leer_binario(memoryview(contenido))
+
+
+def leer(ruta):
+    with open(ruta, "rb") as f:
+        contenido = f.read()
+    contadores.sumar("datos", leidos=len(contenido))
+    return deserializar(contenido)
+
+
+def _leer_binario(datos):
+    documento = {}
+    pos = _CABECERA.size
+    while pos < len(datos):
+        (largo,) = struct.unpack_from("<H", datos, pos)
+        clave = bytes(datos[pos + 2:pos + 2 + largo]).decode("utf-8")
+        tipo, largo_cuerpo = struct.unpack_from("<BQ", datos, pos + 2 + largo)
+        pos += 2 + largo + 9
+        cuerpo = datos[pos:pos + largo_cuerpo]
+        pos += largo_cuerpo
+        documento[clave] = _leer_tabla(cuerpo) if tipo == _SECCION_TABLA else json.loads(bytes(cuerpo))
+    return documento
+
+
+def _leer_tabla(datos):
+    n, n_columnas = struct.unpack_from("<II", datos)
+    pos = 8
+    claves, columnas, con_faltas = [], [], []
+    for _ in range(n_columnas):
+        (largo,) = struct.unpack_from("<H", datos, pos)
+        clave = bytes(datos[pos + 2:pos + 2 + largo]).decode("utf-8")
+        tipo, largo_datos = struct.unpack_from("<cQ", datos, pos + 2 + largo)
+        pos += 2 + largo + 9
+        valores = _leer_columna(tipo, datos[pos:pos + largo_datos], n)
+        pos += largo_datos
+        if tipo == b"j" and any(v is _FALTA for v in valores):
+            con_faltas.append(clave)
+        claves.append(clave)
+        columnas.append(valores)
+    filas = [dict(zip(claves, fila)) for fila in zip(*columnas)] if columnas else [{} for _ in range(n)]
+    for clave in con_faltas:
+        for f in filas:
+            if f[clave] is _FALTA:
+                del f[clave]
+    return filas
+
+
+def _leer_columna(tipo, datos, n):
+    if tipo in (b"i", b"f"):
+        return array("q" if tipo == b"i" else "d", bytes(datos)).tolist()
+    largos = array("I", bytes(datos[:4 * n]))
+    texto = bytes(datos[4 * n:]).decode("utf-8")
+    cortes = list(accumulate(largos, initial=0))
+    valores = [texto[a:b] for a, b in zip(cortes, cortes[1:])]
+    if tipo == b"s":
+        return valores
+    # todos los presentes en un solo json.loads: mucho más rápido que uno por valor
+    presentes = json.loads("[" + ",".join(v for v in valores if v) + "]")
+    if len(presentes) == n:
+        return presentes
+    siguiente = iter(presentes)
+    return [next(siguiente) if v else _FALTA for v in valores]
@@ -1,11 +1,33 @@
-from fastapi import FastAPI
-from routers import contratos
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.middleware.gzip import GZipMiddleware
+
+import metricas
+from routers import abonos, contratos, metricas as rutas_metricas, reportes
 
 app = FastAPI()
 
-# Registrar el router de contratos
+# Listas grandes viajan comprimidas si el cliente acepta gzip
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+
+# Registrar los routers
 app.include_router(contratos.router)
+app.include_router(abonos.router)
+app.include_router(reportes.router)
+app.include_router(rutas_metricas.router)
+
+if metricas.HABILITADO:
+    @app.middleware("http")
+    async def medir_peticion(request: Request, call_next):
+        inicio = time.perf_counter()
+        respuesta = await call_next(request)
+        # por plantilla de ruta ("/contratos/{contrato_id}"), no por URL: si no, cada id sería una métrica
+        ruta = request.scope.get("route")
+        nombre = f"api.{request.method} {ruta.path if ruta else 'sin ruta'}"
+        metricas.registrar(nombre, time.perf_counter() - inicio, respuesta.status_code >= 500)
+        return respuesta
 
 @app.get("/")
 def inicio():
-    return {"mensaje": "Bienvenido al backend de Funeraria Cristo Rey"}
\ No newline at end of file
+    return {"mensaje": "Bienvenido al backend de Funeraria Cristo Rey"}
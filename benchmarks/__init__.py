@@ -0,0 +1,2 @@
+# benchmarks/__init__.py
+"""Mediciones de rendimiento. No forman parte de la app empaquetada."""
@@ -0,0 +1,116 @@
+# benchmarks/bench_abonos_contrato.py
+"""Compara la vista "Ver Abonos" antigua (una búsqueda de contrato por abono)
+con obtener_abonos_con_contrato (una sola pasada).
+
+Uso:
+    python -m benchmarks.bench_abonos_contrato --abonos 10000 100000 --motor sqlite json
+
+Con el motor json también se estima el costo del código original, que volvía
+a leer y parsear contratos.json en cada obtener_contrato_por_id.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from almacenamiento import crear_motor
+
+# La versión N+1 con 100k abonos tarda minutos; se mide una muestra y se extrapola.
+MUESTRA_N_MAS_1 = 2000
+MUESTRA_ORIGINAL = 20
+
+
+def datos_sinteticos(n_abonos, abonos_por_contrato=10, semilla=1):
+    rnd = random.Random(semilla)
+    n_contratos = max(1, n_abonos // abonos_por_contrato)
+    contratos = [{
+        "id": i,
+        "nombre": f"cliente {i}",
+        "cedula": f"{rnd.randrange(10**9, 10**10)}",
+        "direccion": f"calle {rnd.randrange(1, 200)}",
+        "telefono": f"04{rnd.randrange(10**8, 10**9)}",
+        "plan": rnd.choice(("plan familiar 10", "plan individual", "plan fam 5")),
+        "mensualidad": float(rnd.choice((10, 15, 20))),
+        "fecha_inicio": "2025-01-01",
+        "estado": "Activo",
+        "afiliados": [],
+    } for i in range(1, n_contratos + 1)]
+    abonos = [{
+        "id": i,
+        "contrato_id": rnd.randrange(1, n_contratos + 1),
+        "fecha": "2025-06-01 10:00:00",
+        "monto": 15.0,
+        "observacion": "",
+    } for i in range(1, n_abonos + 1)]
+    return {"contratos": contratos, "abonos": abonos}
+
+
+def medir(funcion):
+    inicio = time.perf_counter()
+    resultado = funcion()
+    return time.perf_counter() - inicio, resultado
+
+
+def n_mas_1(motor, abonos):
+    """Lo que hacía VerAbonosFrame.mostrar_todos: un obtener_contrato_por_id por abono."""
+    filas = []
+    for a in abonos:
+        contrato = motor.obtener_contrato_por_id(a["contrato_id"])
+        filas.append((a["id"], contrato["nombre"] if contrato else ""))
+    return filas
+
+
+def n_mas_1_original(ruta, abonos):
+    filas = []
+    for a in abonos:
+        with open(ruta, "r", encoding="utf-8") as f:
+            contratos = json.load(f)["contratos"]
+        contrato = next((c for c in contratos if c["id"] == a["contrato_id"]), None)
+        filas.append((a["id"], contrato["nombre"] if contrato else ""))
+    return filas
+
+
+def ejecutar(nombre_motor, n_abonos):
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = os.path.join(tmp, "datos." + ("json" if nombre_motor == "json" else "sqlite3"))
+        motor = crear_motor(nombre_motor, ruta)
+        motor.importar_datos(datos_sinteticos(n_abonos))
+
+        t_carga, abonos = medir(motor.obtener_abonos)
+        total = len(abonos)
+        muestra = abonos[:MUESTRA_N_MAS_1]
+        t_muestra, _ = medir(lambda: n_mas_1(motor, muestra))
+        estimado = t_carga + t_muestra * total / len(muestra)
+        original = None
+        if nombre_motor == "json":
+            muestra = abonos[:MUESTRA_ORIGINAL]
+            t_muestra, _ = medir(lambda: n_mas_1_original(ruta, muestra))
+            original = t_muestra * total / len(muestra)
+        t_nuevo, unidos = medir(motor.obtener_abonos_con_contrato)
+        assert len(unidos) == total
+        motor.cerrar()
+    return {"motor": nombre_motor, "abonos": n_abonos, "original_s": original,
+            "n_mas_1_s": estimado, "join_s": t_nuevo}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--abonos", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--motor", nargs="+", default=["sqlite", "json"])
+    args = parser.parse_args(argv)
+
+    print(f"{'motor':<8}{'abonos':>10}{'original (s)':>14}{'N+1 (s)':>12}{'join (s)':>12}{'mejora':>10}")
+    for nombre in args.motor:
+        for n in args.abonos:
+            r = ejecutar(nombre, n)
+            original = f"{r['original_s']:>14.1f}" if r["original_s"] is not None else f"{'-':>14}"
+            print(f"{r['motor']:<8}{r['abonos']:>10}{original}{r['n_mas_1_s']:>12.3f}{r['join_s']:>12.3f}"
+                  f"{r['n_mas_1_s'] / r['join_s']:>9.1f}x")
+    print(f"(N+1 medido sobre {MUESTRA_N_MAS_1} abonos y original sobre {MUESTRA_ORIGINAL}, "
+          "extrapolados al total; mejora = N+1 / join)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# benchmarks/bench_arranque.py
+"""Tiempo de arranque de la aplicación de escritorio hasta que el menú está a la vista.
+
+Uso:
+    python -m benchmarks.bench_arranque [--repeticiones 5] [--ejecutable dist/main.exe]
+
+Lanza main.py (o el ejecutable de PyInstaller) con CRISTOREY_ARRANQUE=1:
+la aplicación imprime cuánto tardó desde que empezó a importar main.py y se
+cierra. Se informa además el tiempo total del proceso, que incluye arrancar
+el intérprete (y, en el ejecutable onefile, descomprimirse). Corre en una
+carpeta temporal (o --directorio, para probar con datos reales). Sin
+pantalla solo se mide `import main`.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def hay_pantalla():
+    if sys.platform == "win32":
+        return True
+    try:
+        import tkinter
+        tkinter.Tk().destroy()
+        return True
+    except Exception:
+        return False
+
+
+def lanzar(comando, directorio, entorno):
+    inicio = time.perf_counter()
+    salida = subprocess.run(comando, cwd=directorio, env=entorno, capture_output=True, text=True, timeout=120)
+    total = time.perf_counter() - inicio
+    for linea in salida.stdout.splitlines():
+        if linea.startswith("arranque "):
+            return float(linea.split()[1]), total
+    raise SystemExit(f"{' '.join(comando)} no informó el arranque:\n{salida.stderr}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--ejecutable", help="ejecutable de PyInstaller en lugar de main.py")
+    parser.add_argument("--directorio", help="carpeta de trabajo con la base de datos (por defecto, una vacía)")
+    args = parser.parse_args()
+    directorio = args.directorio or tempfile.mkdtemp(prefix="bench_arranque_")
+
+    entorno = dict(os.environ, CRISTOREY_ARRANQUE="1", PYTHONPATH=RAIZ)
+    if args.ejecutable:
+        comando = [os.path.abspath(args.ejecutable)]
+        nombre = args.ejecutable
+    elif hay_pantalla():
+        comando, nombre = [sys.executable, os.path.join(RAIZ, "main.py")], "main.py"
+    else:
+        nombre = "import main (sin pantalla)"
+        codigo = "import time; t = time.perf_counter(); import main; print(f'arranque {time.perf_counter() - t:.3f}')"
+        comando = [sys.executable, "-c", codigo]
+
+    menu, proceso = zip(*(lanzar(comando, directorio, entorno) for _ in range(args.repeticiones)))
+    print(nombre)
+    print(f"  menú a la vista: mediana {statistics.median(menu):.3f}s, mínimo {min(menu):.3f}s")
+    print(f"  proceso completo: mediana {statistics.median(proceso):.3f}s, mínimo {min(proceso):.3f}s")
+
+
+if __name__ == "__main__":
+    main()
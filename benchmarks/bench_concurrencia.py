@@ -0,0 +1,82 @@
+# benchmarks/bench_concurrencia.py
+"""Varias cajas (procesos) registrando abonos a la vez sobre el mismo archivo.
+
+Uso:
+    python -m benchmarks.bench_concurrencia --procesos 4 --abonos 200 --motor json diario
+
+Al final se comprueba que no se perdió ninguna escritura: tiene que haber
+exactamente procesos × abonos abonos, con ids distintos, y el contrato que
+todos editan tiene que conservar el campo que tocó cada uno (solo hay
+campos de texto para las primeras cinco cajas; las demás no editan).
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+from almacenamiento import crear_motor
+
+# campo del contrato que edita cada caja; deben ser campos reales, los motores rechazan los demás
+CAMPO_DE_CAJA = ("direccion", "telefono", "plan", "nombre", "cedula")
+
+
+def _caja(motor, ruta, numero, n_abonos, salida):
+    m = crear_motor(motor, ruta)
+    inicio = time.perf_counter()
+    for i in range(n_abonos):
+        m.insertar_abono({"contrato_id": 1, "fecha": "2024-01-01 10:00:00", "monto": 1.0,
+                          "observacion": f"caja {numero} abono {i}"})
+    # cada caja edita un campo distinto del mismo contrato: ninguna edición debe pisar a otra
+    if numero < len(CAMPO_DE_CAJA):
+        m.editar_contrato(1, {CAMPO_DE_CAJA[numero]: f"caja {numero}"})
+    salida.put((time.perf_counter() - inicio, getattr(m, "conflictos", 0), m._candado.espera_total))
+    m.cerrar()
+
+
+def medir(motor, procesos, n_abonos):
+    ruta = os.path.join(tempfile.mkdtemp(prefix="bench_concurrencia_"), "contratos.json")
+    m = crear_motor(motor, ruta)
+    m.insertar_contrato({"nombre": "Prueba", "cedula": "1", "direccion": "", "telefono": "", "plan": "Básico",
+                         "mensualidad": 10.0, "fecha_inicio": "2024-01-01", "estado": "Activo", "afiliados": []})
+    m.cerrar()
+
+    salida = multiprocessing.Queue()
+    cajas = [multiprocessing.Process(target=_caja, args=(motor, ruta, n, n_abonos, salida)) for n in range(procesos)]
+    inicio = time.perf_counter()
+    for c in cajas:
+        c.start()
+    resultados = [salida.get() for _ in cajas]
+    for c in cajas:
+        c.join()
+    segundos = time.perf_counter() - inicio
+
+    final = crear_motor(motor, ruta)
+    abonos = final.obtener_abonos()
+    contrato = final.obtener_contrato_por_id(1)
+    ids = {a["id"] for a in abonos}
+    editores = min(procesos, len(CAMPO_DE_CAJA))
+    notas = sum(1 for n in range(editores) if contrato[CAMPO_DE_CAJA[n]] == f"caja {n}")
+    esperados = procesos * n_abonos
+    print(f"{motor}: {procesos} cajas x {n_abonos} abonos en {segundos:.2f} s "
+          f"({esperados / segundos:,.0f} abonos/s)")
+    print(f"  abonos: {len(abonos)} de {esperados}, ids distintos: {len(ids)}, ediciones conservadas: "
+          f"{notas} de {editores}")
+    print(f"  choques de versión: {sum(r[1] for r in resultados)}, "
+          f"espera por el candado: {sum(r[2] for r in resultados):.2f} s")
+    if len(abonos) != esperados or len(ids) != esperados or notas != editores:
+        raise SystemExit(f"{motor}: se perdieron escrituras")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--procesos", type=int, default=4)
+    parser.add_argument("--abonos", type=int, default=200)
+    parser.add_argument("--motor", nargs="+", default=["json", "diario"], choices=("json", "diario"))
+    args = parser.parse_args()
+    for motor in args.motor:
+        medir(motor, args.procesos, args.abonos)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# benchmarks/bench_importacion.py
+"""Importación en bloque contra el camino de un contrato a la vez (guardar_contrato).
+
+Uso:
+    python -m benchmarks.bench_importacion --contratos 50000 --motor sqlite json
+
+El camino uno a uno se mide con una muestra y se extrapola: con el motor
+json cada contrato reescribe el archivo completo y tarda horas.
+"""
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.bench_abonos_contrato import datos_sinteticos
+
+MUESTRA_UNO_A_UNO = 200
+
+_UNO_A_UNO = """
+import json, sys, time
+import database
+contratos = json.load(open("muestra.json", encoding="utf-8"))
+inicio = time.perf_counter()
+for c in contratos:
+    database.guardar_contrato(c["nombre"], c["cedula"], c["direccion"], c["telefono"], c["plan"],
+                              c["mensualidad"], c["fecha_inicio"], c["afiliados"])
+print(time.perf_counter() - inicio)
+"""
+
+_EN_BLOQUE = """
+import importacion
+r = importacion.importar_archivos(["contratos.csv", "abonos.csv"])
+print(r["segundos"], r["contratos"], r["abonos"], len(r["rechazos"]))
+"""
+
+
+def escribir_archivos(directorio, n_contratos):
+    data = datos_sinteticos(n_contratos * 4, abonos_por_contrato=4)
+    for c in data["contratos"]:
+        c["afiliados"] = [{"nombre": "afiliado", "apellido": str(c["id"]), "parentesco": "hijo", "telefono": ""}]
+    with open(os.path.join(directorio, "contratos.csv"), "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["ID", "Nombre", "Cédula", "Dirección", "Teléfono", "Plan", "Mensualidad", "Fecha", "Afiliados"])
+        w.writerows((c["id"], c["nombre"], c["cedula"], c["direccion"], c["telefono"], c["plan"], c["mensualidad"],
+                     c["fecha_inicio"], json.dumps(c["afiliados"])) for c in data["contratos"])
+    with open(os.path.join(directorio, "abonos.csv"), "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["ID Contrato", "Fecha", "Monto"])
+        w.writerows((a["contrato_id"], a["fecha"], a["monto"]) for a in data["abonos"])
+    return data
+
+
+def correr(codigo, directorio, motor):
+    # un proceso por medición: database.py abre la base del directorio actual al importarse
+    entorno = dict(os.environ, CRISTOREY_MOTOR=motor,
+                   PYTHONPATH=os.pathsep.join([os.getcwd(), os.environ.get("PYTHONPATH", "")]))
+    salida = subprocess.run([sys.executable, "-W", "ignore", "-c", codigo], cwd=directorio, env=entorno,
+                            capture_output=True, text=True, check=True)
+    return salida.stdout.split()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--contratos", type=int, default=50_000)
+    parser.add_argument("--motor", nargs="+", default=["sqlite", "json"], choices=("sqlite", "json", "diario"))
+    args = parser.parse_args()
+
+    for motor in args.motor:
+        en_bloque = tempfile.mkdtemp(prefix="bench_importacion_")
+        data = escribir_archivos(en_bloque, args.contratos)
+        segundos, contratos, abonos, rechazos = correr(_EN_BLOQUE, en_bloque, motor)
+
+        uno_a_uno = tempfile.mkdtemp(prefix="bench_importacion_")
+        with open(os.path.join(uno_a_uno, "muestra.json"), "w", encoding="utf-8") as f:
+            json.dump(data["contratos"][:MUESTRA_UNO_A_UNO], f)
+        muestra = float(correr(_UNO_A_UNO, uno_a_uno, motor)[0])
+        # en json cada guardado reescribe todo: el costo crece con el archivo, así que esto es una cota baja
+        estimado = muestra / MUESTRA_UNO_A_UNO * int(contratos)
+
+        print(f"{motor}: {contratos} contratos y {abonos} abonos ({rechazos} rechazos)")
+        print(f"  en bloque:  {float(segundos):.2f} s")
+        print(f"  uno a uno:  ~{estimado:,.0f} s solo los contratos (muestra de {MUESTRA_UNO_A_UNO}, extrapolado)")
+
+
+if __name__ == "__main__":
+    main()
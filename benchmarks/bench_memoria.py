@@ -0,0 +1,50 @@
+# benchmarks/bench_memoria.py
+"""Memoria que ocupan en RAM los datos de los motores json y diario.
+
+Uso:
+    python -m benchmarks.bench_memoria --abonos 100000 1000000
+
+Para cada escala compara el documento tal como sale del archivo (una lista
+de dicts por contrato y por abono, lo que el repositorio guardaba antes)
+con el repositorio en memoria (registros con __slots__ y columnas de
+abonos, ver almacenamiento/registros.py), medidos con tracemalloc.
+"""
+import argparse
+import gc
+import tracemalloc
+
+from almacenamiento.repositorio import RepositorioIndexado
+from benchmarks.generador import generar
+
+ABONOS_POR_CONTRATO = 20.5  # promedio de benchmarks.generador
+
+
+def medir_memoria(construir):
+    """Bytes que quedan ocupados por lo que devuelve `construir()`."""
+    gc.collect()
+    tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    objeto = construir()
+    gc.collect()
+    despues = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return objeto, despues - antes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--abonos", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'abonos':>10}{'contratos':>11}{'dicts':>11}{'registros':>11}{'reducción':>11}")
+    for n in args.abonos:
+        contratos = max(1, round(n / ABONOS_POR_CONTRATO))
+        datos, en_dicts = medir_memoria(lambda: generar(contratos))
+        repo, en_registros = medir_memoria(lambda: RepositorioIndexado(datos))
+        print(f"{len(datos['abonos']):>10,}{contratos:>11,}{en_dicts / 2**20:>9.1f}MB{en_registros / 2**20:>9.1f}MB"
+              f"{en_dicts / en_registros:>10.1f}x")
+        del datos, repo
+
+
+if __name__ == "__main__":
+    main()
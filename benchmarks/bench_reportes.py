@@ -0,0 +1,127 @@
+# benchmarks/bench_reportes.py
+"""Tiempo de reportes.reporte_anual sobre una base sintética.
+
+Uso:
+    python -m benchmarks.bench_reportes --abonos 1000000 --motor sqlite
+    python -m benchmarks.bench_reportes --guardar-linea-base   # fija la referencia en esta máquina
+
+"primera vez" lee todos los abonos de la base (aún no hay `<base>.reportes`);
+"en frío" es un proceso nuevo, que lee las columnas de ese archivo; "al día"
+es el caso normal, con todo en memoria y un abono nuevo desde el último
+reporte; "tras un contrato" rearma además las columnas de contratos.
+Los tiempos se comparan con linea_base_reportes.json (misma escala y motor);
+más lentos que UMBRAL veces la base son regresión y el proceso termina con 1.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+
+from almacenamiento import crear_motor
+from benchmarks.bench_abonos_contrato import datos_sinteticos, medir
+
+ANIO = 2025
+LINEA_BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "linea_base_reportes.json")
+UMBRAL = 1.25
+# cada caso se corre REPETICIONES veces y cuenta la mejor: una sola corrida varía mucho
+REPETICIONES = 3
+
+
+def preparar(directorio, motor, n_abonos):
+    data = datos_sinteticos(n_abonos)
+    rnd = random.Random(2)
+    for c in data["contratos"]:
+        c["fecha_inicio"] = f"{rnd.choice((ANIO - 1, ANIO))}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}"
+        c["estado"] = rnd.choice(("Activo",) * 8 + ("Suspendido", "Cancelado"))
+    for a in data["abonos"]:
+        a["fecha"] = f"{ANIO}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d} 10:00:00"
+        a["cobrador"] = rnd.choice(("Luis", "Marta", "Pedro", ""))
+    ruta = os.path.join(directorio, "cristorey_datos.sqlite3" if motor == "sqlite" else "contratos.json")
+    m = crear_motor(motor, ruta)
+    m.importar_datos(data)
+    m.cerrar()
+
+
+def mejor_de(antes, funcion, repeticiones=REPETICIONES):
+    """El menor tiempo de `funcion` en `repeticiones` corridas, cada una precedida por `antes()`."""
+    mejor = resultado = None
+    for _ in range(repeticiones):
+        antes()
+        segundos, resultado = medir(funcion)
+        mejor = segundos if mejor is None else min(mejor, segundos)
+    return mejor, resultado
+
+
+def _leer_linea_base(ruta):
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--abonos", type=int, default=1_000_000)
+    parser.add_argument("--motor", default="sqlite", choices=("sqlite", "json", "diario"))
+    parser.add_argument("--linea-base", default=LINEA_BASE)
+    parser.add_argument("--guardar-linea-base", action="store_true")
+    parser.add_argument("--umbral", type=float, default=UMBRAL)
+    args = parser.parse_args()
+    linea_base = os.path.abspath(args.linea_base)
+
+    directorio = tempfile.mkdtemp(prefix="bench_reportes_")
+    preparar(directorio, args.motor, args.abonos)
+    # database.py abre la base del directorio actual al importarse
+    os.chdir(directorio)
+    os.environ["CRISTOREY_MOTOR"] = args.motor
+    import database
+    import reportes
+
+    database.contar_abonos()  # abrir la base no es parte del reporte
+    reporte = lambda: reportes.reporte_anual(ANIO)
+
+    def proceso_nuevo():
+        # nada en memoria; las columnas de abonos, si existen, en <base>.reportes
+        reportes._abonos = reportes.ColumnasAbonos()
+        reportes._contratos = reportes.ColumnasContratos()
+        database._cache.invalidar()
+
+    def sin_archivo():
+        proceso_nuevo()
+        ruta = database.ruta_base_datos() + reportes.EXTENSION_COLUMNAS
+        if os.path.exists(ruta):
+            os.remove(ruta)
+
+    estados = iter(("Cancelado", "Activo") * REPETICIONES)
+    tiempos = {}
+    tiempos["primera vez"], _ = mejor_de(sin_archivo, reporte)
+    tiempos["en frío"], _ = mejor_de(proceso_nuevo, reporte)
+    tiempos["al día"], r = mejor_de(lambda: database.agregar_abono(1, 15.0, "", "Luis"), reporte)
+    tiempos["tras un contrato"], _ = mejor_de(lambda: database.cambiar_estado(2, next(estados)), reporte)
+
+    clave = f"{args.motor}/{args.abonos}"
+    base = _leer_linea_base(linea_base)
+    print(f"{args.motor}, {args.abonos} abonos, cálculo con {r['motor_calculo']}")
+    regresiones = []
+    for caso, segundos in tiempos.items():
+        referencia = base.get(clave, {}).get(caso)
+        comparacion = f"  (base {referencia:.3f} s)" if referencia else ""
+        print(f"  {caso + ':':18s}{segundos:.3f} s{comparacion}")
+        if referencia and segundos > referencia * args.umbral:
+            regresiones.append(caso)
+    if args.guardar_linea_base:
+        base[clave] = {caso: round(segundos, 3) for caso, segundos in tiempos.items()}
+        with open(linea_base, "w", encoding="utf-8") as f:
+            json.dump(base, f, ensure_ascii=False, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Línea base guardada en {linea_base}")
+    elif regresiones:
+        print(f"Más lentos que {args.umbral} veces la base: {', '.join(regresiones)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
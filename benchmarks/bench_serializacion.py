@@ -0,0 +1,59 @@
+# benchmarks/bench_serializacion.py
+"""Guardar y cargar contratos.json en cada formato de almacenamiento.serializacion.
+
+Uso:
+    python -m benchmarks.bench_serializacion --registros 10000 100000 1000000
+
+`--registros` es la cantidad de abonos; los contratos son una cuarta parte.
+Se mide el guardado completo (serializar, escribir, fsync y renombrar) y la
+carga (leer y reconocer el formato), como lo hacen los motores.
+"""
+import argparse
+import os
+import tempfile
+
+from almacenamiento import serializacion
+from almacenamiento.bloqueo import reemplazar
+from benchmarks.bench_abonos_contrato import datos_sinteticos, medir
+
+
+def formatos_disponibles():
+    return [f for f in serializacion.FORMATOS if f != "msgpack" or serializacion.MSGPACK_AVAILABLE]
+
+
+def guardar(ruta, documento, formato):
+    temporal = ruta + ".tmp"
+    serializacion.escribir(temporal, documento, formato)
+    reemplazar(temporal, ruta)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--registros", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--formato", nargs="+", default=formatos_disponibles(), choices=serializacion.FORMATOS)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp(prefix="bench_serializacion_")
+    print(f"orjson: {'sí' if serializacion.ORJSON_AVAILABLE else 'no'}, "
+          f"msgpack: {'sí' if serializacion.MSGPACK_AVAILABLE else 'no'}")
+    for n in args.registros:
+        documento = {"version": 1, **datos_sinteticos(n, abonos_por_contrato=4)}
+        for c in documento["contratos"][::3]:
+            c["afiliados"] = [{"nombre": "afiliado", "apellido": str(c["id"]), "parentesco": "hijo", "telefono": ""}]
+        print(f"\n{n:,} abonos, {len(documento['contratos']):,} contratos")
+        print(f"  {'formato':<14}{'guardar':>10}{'cargar':>10}{'tamaño':>12}")
+        for formato in args.formato:
+            ruta = os.path.join(directorio, f"contratos_{formato}")
+            guardado = min(medir(lambda: guardar(ruta, documento, formato))[0] for _ in range(args.repeticiones))
+            carga, leido = min((medir(lambda: serializacion.leer(ruta)) for _ in range(args.repeticiones)),
+                               key=lambda r: r[0])
+            if leido != documento:
+                raise SystemExit(f"{formato}: lo leído no coincide con lo guardado")
+            tamano = os.path.getsize(ruta) / 2**20
+            print(f"  {formato:<14}{guardado:>9.2f}s{carga:>9.2f}s{tamano:>9.1f} MB")
+            os.remove(ruta)
+
+
+if __name__ == "__main__":
+    main()
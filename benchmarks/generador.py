@@ -0,0 +1,122 @@
+# benchmarks/generador.py
+"""Datos sintéticos realistas y reproducibles: contratos con afiliados y su historial de abonos.
+
+Uso:
+    python -m benchmarks.generador --contratos 10000 --salida contratos.json [--formato binario]
+
+Con la misma semilla salen exactamente los mismos datos. Cada contrato
+paga casi todos los meses desde su fecha de inicio (a veces dos cuotas
+juntas, a veces se salta una) y los suspendidos o cancelados dejan de
+pagar; así hay morosos, cohortes y cobradores de verdad en los reportes.
+Los ids de abono siguen el orden de las fechas, como al registrarlos.
+"""
+import argparse
+import random
+from datetime import date
+
+NOMBRES = ("maría", "josé", "luis", "carmen", "ana", "carlos", "rosa", "juan", "jorge", "martha", "pedro",
+           "gloria", "miguel", "patricia", "manuel", "sandra", "víctor", "mónica", "fernando", "lucía",
+           "alejandro", "isis", "andrés", "verónica", "ricardo", "elena", "raúl", "silvia", "diego", "paola")
+APELLIDOS = ("garcía", "rodríguez", "pérez", "gonzález", "sánchez", "ramírez", "torres", "flores", "vera",
+             "mendoza", "cedeño", "zambrano", "moreira", "carrión", "guerrero", "macías", "castro", "villacís",
+             "bravo", "chávez", "alvarado", "ortiz", "león", "suárez", "intriago", "madero", "salazar", "ruiz")
+CALLES = ("calle 3", "avenida 4", "10 de agosto", "9 de octubre", "boyacá", "chile", "rumichaca", "colón",
+          "luque", "aguirre", "sucre", "olmedo", "machala", "quito", "la ría", "pedro carbo")
+PARENTESCOS = ("esposo", "esposa", "hijo", "hija", "padre", "madre", "hermano", "hermana", "primo", "nieto")
+# (plan, mensualidad, afiliados máximos); con las variantes de escritura de los datos reales
+PLANES = (("plan individual", 10.0, 0), ("plan familiar 5", 15.0, 5), ("plan fam 5", 15.0, 5),
+          ("plan familiar 10", 20.0, 10), ("plan fam 10", 20.0, 10))
+COBRADORES = ("Luis", "Marta", "Pedro", "Rosa", "")  # "" = pagó en oficina
+OBSERVACIONES = ("", "", "", "", "pago", "abono mensual", "pago en efectivo", "transferencia")
+
+DESDE = date(2022, 1, 1)
+HASTA = date(2025, 12, 31)
+
+
+def _cedula(rnd, i):
+    """Diez dígitos únicos por `i`: provincia, cuerpo y dígito verificador (módulo 10)."""
+    digitos = f"{rnd.randint(1, 24):02d}{(i * 7_919_113) % 10**7:07d}"
+    suma = 0
+    for posicion, d in enumerate(digitos):
+        d = int(d) * (2 if posicion % 2 == 0 else 1)
+        suma += d - 9 if d > 9 else d
+    return digitos + str((10 - suma % 10) % 10)
+
+
+def _persona(rnd):
+    return f"{rnd.choice(NOMBRES)} {rnd.choice(APELLIDOS)} {rnd.choice(APELLIDOS)}"
+
+
+def _telefono(rnd):
+    return f"09{rnd.randrange(10**8):08d}"
+
+
+def _meses(desde, hasta):
+    return (hasta.year - desde.year) * 12 + hasta.month - desde.month
+
+
+def generar(contratos, semilla=1, desde=DESDE, hasta=HASTA):
+    """{"contratos": [...], "abonos": [...]} listo para importar_datos o para guardar como contratos.json."""
+    rnd = random.Random(semilla)
+    total_meses = _meses(desde, hasta)
+    lista_contratos, pagos = [], []
+    for i in range(1, contratos + 1):
+        plan, mensualidad, maximo = rnd.choice(PLANES)
+        inicio = rnd.randint(0, total_meses)
+        anio, mes = divmod(desde.year * 12 + desde.month - 1 + inicio, 12)
+        estado = rnd.choices(("Activo", "Suspendido", "Cancelado"), (84, 10, 6))[0]
+        nombre = _persona(rnd)
+        lista_contratos.append({
+            "id": i,
+            "nombre": nombre,
+            "cedula": _cedula(rnd, i),
+            "direccion": f"{rnd.choice(CALLES)} y {rnd.choice(CALLES)}",
+            "telefono": _telefono(rnd),
+            "plan": plan,
+            "mensualidad": mensualidad,
+            "fecha_inicio": f"{anio:04d}-{mes + 1:02d}-{rnd.randint(1, 28):02d}",
+            "estado": estado,
+            "afiliados": [{"nombre": rnd.choice(NOMBRES), "apellido": nombre.split()[1],
+                           "parentesco": rnd.choice(PARENTESCOS), "telefono": _telefono(rnd)}
+                          for _ in range(rnd.randint(0, maximo))],
+        })
+
+        # los que ya no están activos dejaron de pagar en algún mes entre el inicio y hoy
+        ultimo = total_meses if estado == "Activo" else rnd.randint(inicio, total_meses)
+        puntual = rnd.random() < 0.7
+        m = inicio
+        while m <= ultimo:
+            if not puntual and rnd.random() < 0.25:
+                m += 1  # se saltó el mes
+                continue
+            cuotas = 2 if rnd.random() < 0.05 else 1
+            a, n = divmod(desde.year * 12 + desde.month - 1 + m, 12)
+            fecha = f"{a:04d}-{n + 1:02d}-{rnd.randint(1, 28):02d} {rnd.randint(8, 17):02d}:{rnd.randrange(60):02d}:00"
+            pagos.append((fecha, i, mensualidad * cuotas, "paga dos meses" if cuotas == 2 else rnd.choice(OBSERVACIONES),
+                          rnd.choice(COBRADORES)))
+            m += cuotas
+
+    pagos.sort()
+    abonos = [{"id": n, "contrato_id": c, "fecha": f, "monto": monto, "observacion": obs, "cobrador": cobrador}
+              for n, (f, c, monto, obs, cobrador) in enumerate(pagos, start=1)]
+    return {"contratos": lista_contratos, "abonos": abonos}
+
+
+def main():
+    from almacenamiento import serializacion
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--contratos", type=int, default=10_000)
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--salida", default="contratos.json")
+    parser.add_argument("--formato", default=serializacion.FORMATO_POR_DEFECTO, choices=serializacion.FORMATOS)
+    args = parser.parse_args()
+
+    data = generar(args.contratos, args.semilla)
+    tamano = serializacion.escribir(args.salida, data, serializacion.validar_formato(args.formato))
+    print(f"{len(data['contratos'])} contratos y {len(data['abonos'])} abonos en {args.salida} "
+          f"({tamano / 2**20:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,402 @@
+# benchmarks/suite.py
+"""Todas las funciones públicas de database.py, el respaldo, la exportación y las listas de la UI.
+
+Uso:
+    python -m benchmarks.suite --contratos 10000 --motor sqlite json diario
+    python -m benchmarks.suite --guardar-linea-base      # fija la referencia en esta máquina
+    python -m benchmarks.suite --umbral 1.3              # falla si algo es 30 % más lento
+
+Cada motor corre en su propio proceso, en un directorio temporal con datos
+de benchmarks.generador (siempre los mismos para la misma escala y semilla).
+El resultado se escribe en JSON (--salida) y se compara caso por caso con la
+línea base (--linea-base); los casos más lentos que `umbral` veces la base se
+marcan como regresión y el proceso termina con código 1.
+
+Las listas de Tk (ListaVirtual con las consultas de Ver Abonos, Contratos y
+Morosos) usan una pantalla real si la hay, por ejemplo con
+`xvfb-run python -m benchmarks.suite`; si no, un Treeview falso en memoria,
+que mide todo menos el dibujo.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from types import SimpleNamespace
+
+from benchmarks.generador import generar
+
+LINEA_BASE = os.path.join(os.path.dirname(__file__), "linea_base.json")
+UMBRAL = 1.25
+# por caso: hasta REPETICIONES corridas o PRESUPUESTO segundos, lo que llegue antes (al menos una)
+REPETICIONES = 5
+PRESUPUESTO = 3.0
+# por debajo de esto el ruido del reloj pesa más que cualquier cambio real
+MINIMO_COMPARABLE = 0.001
+
+
+# ---------- medición ----------
+def medir(funcion, repeticiones=REPETICIONES, presupuesto=PRESUPUESTO):
+    tiempos = []
+    limite = time.perf_counter() + presupuesto
+    while len(tiempos) < repeticiones and (not tiempos or time.perf_counter() < limite):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return {"min": min(tiempos), "mediana": statistics.median(tiempos), "corridas": len(tiempos)}
+
+
+# ---------- Tk sin pantalla ----------
+class _ArbolFalso:
+    """Lo que ListaVirtual usa de ttk.Treeview, guardado en un dict."""
+
+    def __init__(self, *args, **kwargs):
+        self.filas = {}
+        self._seleccion = ()
+
+    def heading(self, *args, **kwargs):
+        pass
+
+    column = pack = bind = focus = heading
+
+    def get_children(self):
+        return tuple(self.filas)
+
+    def insert(self, padre, indice, iid, values):
+        self.filas[iid] = values
+
+    def item(self, iid, option=None, values=None):
+        if values is not None:
+            self.filas[iid] = values
+        return self.filas[iid] if option == "values" else {"values": self.filas[iid]}
+
+    def delete(self, iid):
+        del self.filas[iid]
+
+    def selection(self):
+        return self._seleccion
+
+    def selection_set(self, iid):
+        self._seleccion = (iid,)
+
+    def selection_remove(self, *iids):
+        self._seleccion = ()
+
+    def index(self, iid):
+        return list(self.filas).index(iid)
+
+
+class _BarraFalsa:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def pack(self, *args, **kwargs):
+        pass
+
+    set = pack
+
+
+@contextmanager
+def raiz_tk():
+    """(raíz, "tk") con una pantalla disponible; (None, "falsa") si no la hay."""
+    import tkinter as tk
+    try:
+        raiz = tk.Tk()
+    except tk.TclError:
+        yield None, "falsa"
+        return
+    raiz.withdraw()
+    try:
+        yield raiz, "tk"
+    finally:
+        raiz.destroy()
+
+
+def crear_lista(raiz, columnas, contar, pagina, orden="id", visibles=30):
+    import lista_virtual
+    if raiz is not None:
+        lista = lista_virtual.ListaVirtual(raiz, columnas, contar, pagina, orden)
+        lista.visibles = visibles
+        return lista
+    # sin pantalla: el Frame se crea sobre un intérprete Tcl sin Tk donde "frame" no hace nada,
+    # y el Treeview y la barra son los falsos de arriba
+    import tkinter as tk
+    interprete = tk.Tcl()
+    interprete.tk.eval("proc frame args {}")
+    ttk_real = lista_virtual.ttk
+    lista_virtual.ttk = SimpleNamespace(Treeview=_ArbolFalso, Scrollbar=_BarraFalsa)
+    try:
+        lista = lista_virtual.ListaVirtual(interprete, columnas, contar, pagina, orden)
+    finally:
+        lista_virtual.ttk = ttk_real
+    lista.visibles = visibles
+    return lista
+
+
+def _refrescar(raiz):
+    if raiz is not None:
+        raiz.update_idletasks()
+
+
+# ---------- casos ----------
+def casos(n_contratos, raiz):
+    """{nombre: función sin argumentos}; corre con el directorio y el motor ya preparados."""
+    import database
+    import documentos
+    import exportar
+    import reportes
+
+    # el respaldo se mide aparte (backup_db); el automático no debe caer en medio de otro caso
+    database._respaldo_automatico.espera = float("inf")
+
+    contador = itertools.count(10**9)
+    medio = max(1, n_contratos // 2)
+    cedula = database.obtener_contrato_por_id(medio)["cedula"]
+    n_abonos = database.contar_abonos()
+    estados = itertools.cycle(("Suspendido", "Activo"))
+    salida_csv = os.path.abspath("abonos.csv")
+    # una planilla de cobro típica: 400 abonos repartidos entre los contratos
+    planilla = [{"contrato_id": 1 + (i * 7919) % n_contratos, "monto": 15.0, "observacion": "ronda"}
+                for i in range(400)]
+
+    def nuevo_contrato():
+        n = next(contador)
+        database.guardar_contrato(f"cliente {n}", str(n), "calle 3 y avenida 4", "0999999999", "plan individual",
+                                  10.0, "2025-01-15", [])
+
+    def preparar_bloque(claves):
+        datos = generar(100, semilla=next(contador))
+        for c in datos["contratos"]:
+            c["cedula"] = str(next(contador))
+        return datos
+
+    lista = {
+        "database.obtener_motor": database.obtener_motor,
+        "database.ruta_base_datos": database.ruta_base_datos,
+        "database.cargar_datos": database.cargar_datos,
+        "database.guardar_contrato": nuevo_contrato,
+        "database.obtener_contratos": database.obtener_contratos,
+        "database.obtener_contratos[Activo]": lambda: database.obtener_contratos("Activo"),
+        "database.obtener_contrato_por_id": lambda: database.obtener_contrato_por_id(medio),
+        "database.buscar_contrato_por_cedula": lambda: database.buscar_contrato_por_cedula(cedula),
+        "database.buscar_contratos": lambda: database.buscar_contratos("maria garcia"),
+        "database.contar_contratos": database.contar_contratos,
+        "database.obtener_contratos_pagina": lambda: database.obtener_contratos_pagina(
+            None, n_contratos // 2, 100, "nombre"),
+        "database.obtener_contratos_desde": lambda: database.obtener_contratos_desde(None, medio, 100),
+        "database.obtener_contratos_iniciados_entre[mes]": lambda: database.obtener_contratos_iniciados_entre(
+            "2024-03-01", "2024-03-31", "Activo"),
+        "database.editar_contrato": lambda: database.editar_contrato(medio, {"telefono": str(next(contador))}),
+        "database.cambiar_estado": lambda: database.cambiar_estado(medio, next(estados)),
+        "database.agregar_abono": lambda: database.agregar_abono(medio, 15.0, "pago", "Luis"),
+        "database.agregar_abonos_lote[400]": lambda: database.agregar_abonos_lote(planilla, "Luis"),
+        "database.obtener_abonos": database.obtener_abonos,
+        "database.obtener_abonos[contrato]": lambda: database.obtener_abonos(medio),
+        "database.obtener_abonos[cedula]": lambda: database.obtener_abonos(cedula=cedula),
+        "database.obtener_abonos_con_contrato": database.obtener_abonos_con_contrato,
+        "database.obtener_columnas_abonos": database.obtener_columnas_abonos,
+        "database.obtener_columnas_contratos": database.obtener_columnas_contratos,
+        "database.obtener_totales_abonos": database.obtener_totales_abonos,
+        "database.obtener_totales_abonos[contrato]": lambda: database.obtener_totales_abonos("contrato"),
+        "database.obtener_totales_abonos[periodo]": lambda: database.obtener_totales_abonos("periodo"),
+        "database.contar_abonos": database.contar_abonos,
+        "database.contar_abonos[cedula]": lambda: database.contar_abonos({"cedula": cedula}),
+        "database.obtener_abonos_pagina": lambda: database.obtener_abonos_pagina(
+            None, n_abonos // 2, 100, "fecha", True),
+        "database.obtener_abonos_desde": lambda: database.obtener_abonos_desde(None, n_abonos // 2, 100),
+        # cierre de un día de un cobrador y conciliación de un mes
+        "database.obtener_abonos_entre[dia]": lambda: database.obtener_abonos_entre("2025-06-16", cobrador="Luis"),
+        "database.contar_abonos[mes]": lambda: database.contar_abonos({"desde": "2025-06-01", "hasta": "2025-06-30"}),
+        # cierre de caja: un mes sale del resumen diario y de los cierres, sin leer abonos
+        "database.obtener_resumen_diario[mes]": lambda: database.obtener_resumen_diario("2025-06-01", "2025-06-30"),
+        "database.obtener_cierres[mes]": lambda: database.obtener_cierres("2025-06-01", "2025-06-30"),
+        "database.importar_en_bloque": lambda: database.importar_en_bloque(preparar_bloque),
+        "database.obtener_cuentas_pagina": lambda: database.obtener_cuentas_pagina(
+            "Activo", n_contratos // 2, 100, "deuda", True),
+        "database.obtener_cuentas": database.obtener_cuentas,
+        "database.obtener_morosos": database.obtener_morosos,
+        "database.obtener_almacen_respaldos": database.obtener_almacen_respaldos,
+        "database.backup_db": database.backup_db,
+        "exportar.exportar_abonos[csv]": lambda: exportar.exportar_abonos(salida_csv),
+        "reportes.reporte_anual": lambda: reportes.reporte_anual(2025),
+        # el recibo que sale con cada abono y la reimpresión de un día completo, en este proceso
+        "documentos.recibo": lambda: documentos.recibo(n_abonos // 2),
+        "documentos.reimprimir_recibos[dia]": lambda: documentos.reimprimir_recibos(
+            os.path.abspath("recibos.pdf"), "2025-06-16", procesos=1),
+    }
+    lista.update(casos_ui(raiz))
+    return lista
+
+
+def casos_ui(raiz):
+    """Ver Abonos, Contratos y Morosos con las mismas consultas de main.py y una ListaVirtual."""
+    try:
+        import main
+    except ImportError:
+        return {}
+    ver_abonos = SimpleNamespace(filtro={})
+    contratos = SimpleNamespace(estado="Activo", _fila=main.ContratosFrame._fila)
+    morosos = SimpleNamespace(filas=[], orden_filas=None, COLUMNAS=main.MorososFrame.COLUMNAS,
+                              MONEDA=main.MorososFrame.MONEDA)
+
+    lista_abonos = crear_lista(raiz, [(k, k) for k in ("id", "contrato_id", "nombre", "cedula", "fecha", "monto",
+                                                      "observacion")],
+                               lambda: main.contar_abonos(ver_abonos.filtro),
+                               lambda *a: main.VerAbonosFrame.pagina(ver_abonos, *a))
+    lista_contratos = crear_lista(raiz, [(f"c{k}", f"c{k}") for k in range(11)],
+                                  lambda: main.contar_contratos(contratos.estado),
+                                  lambda *a: main.ContratosFrame.pagina(contratos, *a))
+    lista_morosos = crear_lista(raiz, main.MorososFrame.COLUMNAS, lambda: len(morosos.filas),
+                                lambda *a: main.MorososFrame.pagina(morosos, *a), orden="deuda")
+
+    def mostrar_todos():
+        # VerAbonosFrame.mostrar_todos: contar, primera página y pintar
+        ver_abonos.filtro = {}
+        lista_abonos.inicio = 0
+        lista_abonos.recargar()
+        _refrescar(raiz)
+
+    def desplazar():
+        # arrastrar la barra de punta a punta: 40 saltos, cada uno con su página
+        for i in range(40):
+            lista_abonos._desplazar("moveto", i / 40)
+        _refrescar(raiz)
+
+    def ordenar():
+        lista_abonos.ordenar_por("nombre")
+        _refrescar(raiz)
+
+    def mostrar_contratos():
+        lista_contratos.inicio = 0
+        lista_contratos.recargar()
+        _refrescar(raiz)
+
+    def mostrar_morosos():
+        morosos.filas = main.obtener_morosos()
+        morosos.orden_filas = None
+        lista_morosos.recargar()
+        _refrescar(raiz)
+
+    return {
+        "ui.ver_abonos.mostrar_todos": mostrar_todos,
+        "ui.ver_abonos.desplazar": desplazar,
+        "ui.ver_abonos.ordenar": ordenar,
+        "ui.contratos.mostrar": mostrar_contratos,
+        "ui.morosos.mostrar": mostrar_morosos,
+    }
+
+
+# ---------- un motor (proceso hijo) ----------
+def correr_motor(motor, n_contratos, semilla, filtro=None):
+    # database.py abre la base del directorio actual al importarse
+    os.environ["CRISTOREY_MOTOR"] = motor
+    directorio = tempfile.mkdtemp(prefix=f"bench_suite_{motor}_")
+    os.chdir(directorio)
+    import database
+    database.obtener_motor().importar_datos(generar(n_contratos, semilla))
+    resultados = {}
+    with raiz_tk() as (raiz, pantalla):
+        for nombre, funcion in casos(n_contratos, raiz).items():
+            if filtro and not any(f in nombre for f in filtro):
+                continue
+            resultados[nombre] = medir(funcion)
+    return {"pantalla": pantalla, "directorio": directorio, "casos": resultados}
+
+
+# ---------- comparación ----------
+def comparar(actual, base, umbral):
+    """Filas (motor, caso, base, actual, razón, regresión) de los casos presentes en ambos."""
+    filas = []
+    for motor, datos in actual["motores"].items():
+        casos_base = base.get("motores", {}).get(motor, {}).get("casos", {})
+        for caso, r in datos["casos"].items():
+            anterior = casos_base.get(caso)
+            if anterior is None:
+                filas.append((motor, caso, None, r["min"], None, False))
+                continue
+            razon = r["min"] / anterior["min"] if anterior["min"] else None
+            regresion = (razon is not None and razon > umbral
+                         and r["min"] - anterior["min"] > MINIMO_COMPARABLE)
+            filas.append((motor, caso, anterior["min"], r["min"], razon, regresion))
+    return filas
+
+
+def _ms(segundos):
+    return f"{segundos * 1000:10.2f}" if segundos is not None else f"{'-':>10}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--contratos", type=int, default=10_000)
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--motor", nargs="+", default=["sqlite", "json", "diario"], choices=("sqlite", "json", "diario"))
+    parser.add_argument("--casos", nargs="*", help="solo los casos cuyo nombre contenga alguno de estos textos")
+    parser.add_argument("--salida", default="resultados_suite.json")
+    parser.add_argument("--linea-base", default=LINEA_BASE)
+    parser.add_argument("--guardar-linea-base", action="store_true")
+    parser.add_argument("--umbral", type=float, default=UMBRAL)
+    parser.add_argument("--trabajador", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.trabajador:
+        print(json.dumps(correr_motor(args.trabajador, args.contratos, args.semilla, args.casos)))
+        return
+
+    resultado = {
+        "fecha": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "maquina": {"python": platform.python_version(), "sistema": platform.platform(),
+                    "procesador": platform.processor() or platform.machine(), "cpus": os.cpu_count()},
+        "contratos": args.contratos,
+        "semilla": args.semilla,
+        "motores": {},
+    }
+    raiz_repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    entorno = dict(os.environ, PYTHONPATH=os.pathsep.join([raiz_repo, os.environ.get("PYTHONPATH", "")]))
+    for motor in args.motor:
+        orden = [sys.executable, "-W", "ignore", "-m", "benchmarks.suite", "--trabajador", motor,
+                 "--contratos", str(args.contratos), "--semilla", str(args.semilla)]
+        if args.casos:
+            orden += ["--casos", *args.casos]
+        salida = subprocess.run(orden, env=entorno, capture_output=True, text=True)
+        if salida.returncode:
+            sys.stderr.write(salida.stderr)
+            raise SystemExit(f"{motor}: la suite falló")
+        resultado["motores"][motor] = json.loads(salida.stdout.splitlines()[-1])
+        print(f"{motor}: {len(resultado['motores'][motor]['casos'])} casos "
+              f"(pantalla {resultado['motores'][motor]['pantalla']})")
+
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+
+    base = {}
+    if os.path.exists(args.linea_base):
+        with open(args.linea_base, encoding="utf-8") as f:
+            base = json.load(f)
+        if base.get("contratos") != args.contratos:
+            print(f"Aviso: la línea base es de {base.get('contratos')} contratos, no de {args.contratos}.")
+
+    filas = comparar(resultado, base, args.umbral)
+    print(f"\n{'motor':<8}{'caso':<44}{'base ms':>10}{'ahora ms':>10}{'razón':>8}")
+    for motor, caso, anterior, actual, razon, regresion in filas:
+        marca = "  <-- REGRESIÓN" if regresion else ""
+        texto_razon = f"{razon:7.2f}x" if razon is not None else f"{'-':>8}"
+        print(f"{motor:<8}{caso:<44}{_ms(anterior)}{_ms(actual)}{texto_razon}{marca}")
+    print(f"\nResultados en {os.path.abspath(args.salida)}")
+
+    if args.guardar_linea_base:
+        with open(args.linea_base, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2)
+        print(f"Línea base guardada en {args.linea_base}")
+    elif any(f[-1] for f in filas):
+        raise SystemExit(f"{sum(1 for f in filas if f[-1])} casos más lentos que {args.umbral}x la línea base")
+
+
+if __name__ == "__main__":
+    main()
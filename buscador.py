@@ -0,0 +1,87 @@
+# buscador.py
+"""Sugerencias de contratos mientras se escribe en un Entry."""
+import tkinter as tk
+
+from database import buscar_contratos
+
+ESPERA_MS = 250
+MINIMO_CARACTERES = 2
+TECLAS_IGNORADAS = {"Up", "Down", "Left", "Right", "Return", "Escape", "Tab", "Shift_L", "Shift_R",
+                    "Control_L", "Control_R", "Alt_L", "Alt_R"}
+
+
+class SugerenciasContrato:
+    """Lista desplegable bajo `entry` con los contratos que coinciden con lo escrito.
+
+    La consulta se lanza `ESPERA_MS` después de la última tecla (las anteriores
+    se descartan) y corre en el `ejecutor` de tareas. Al elegir una sugerencia
+    se llama `al_elegir(contrato)`.
+    """
+
+    def __init__(self, entry, contenedor, ejecutor, al_elegir):
+        self.entry = entry
+        self.ejecutor = ejecutor
+        self.al_elegir = al_elegir
+        self.resultados = []
+        self._programada = None
+        self.lista = tk.Listbox(contenedor, height=8, width=70, activestyle="dotbox")
+        entry.bind("<KeyRelease>", self._al_teclear, add="+")
+        entry.bind("<Down>", self._entrar_lista, add="+")
+        entry.bind("<Escape>", lambda e: self.ocultar(), add="+")
+        entry.bind("<FocusOut>", lambda e: entry.after(150, self._ocultar_si_fuera), add="+")
+        self.lista.bind("<Return>", self._elegir)
+        self.lista.bind("<Double-1>", self._elegir)
+        self.lista.bind("<Escape>", lambda e: (self.ocultar(), self.entry.focus_set()))
+
+    def _al_teclear(self, event):
+        if event.keysym in TECLAS_IGNORADAS:
+            return
+        if self._programada is not None:
+            self.entry.after_cancel(self._programada)
+        self._programada = self.entry.after(ESPERA_MS, self._consultar)
+
+    def _consultar(self):
+        self._programada = None
+        texto = self.entry.get().strip()
+        if len(texto) < MINIMO_CARACTERES:
+            self.ejecutor.cancelar(("sugerencias", id(self)))
+            self.ocultar()
+            return
+        self.ejecutor.ejecutar(buscar_contratos, texto, grupo=("sugerencias", id(self)), al_terminar=self._mostrar)
+
+    def _mostrar(self, contratos):
+        self.resultados = contratos
+        self.lista.delete(0, tk.END)
+        if not contratos:
+            self.ocultar()
+            return
+        for c in contratos:
+            self.lista.insert(tk.END, f"{c['id']} - {c['nombre']} - {c['cedula']} - {c.get('direccion', '')}")
+        self.lista.place(in_=self.entry, x=0, rely=1.0, y=2)
+        self.lista.lift()
+
+    def ocultar(self):
+        self.lista.place_forget()
+
+    def _ocultar_si_fuera(self):
+        if self.lista.focus_get() is not self.lista:
+            self.ocultar()
+
+    def _entrar_lista(self, event):
+        if self.resultados and self.lista.winfo_ismapped():
+            self.lista.focus_set()
+            self.lista.selection_clear(0, tk.END)
+            self.lista.selection_set(0)
+            self.lista.activate(0)
+            return "break"
+
+    def _elegir(self, event):
+        sel = self.lista.curselection()
+        if not sel:
+            return
+        contrato = self.resultados[sel[0]]
+        self.ocultar()
+        self.entry.delete(0, tk.END)
+        self.entry.insert(0, str(contrato["id"]))
+        self.entry.focus_set()
+        self.al_elegir(contrato)
@@ -0,0 +1,147 @@
+# cambios.py
+"""Aviso de cambios y caché de consultas entre database.py y las pantallas.
+
+database.py publica un cambio por cada escritura (`publicar`) y las
+pantallas se suscriben (`suscribir`) para corregir solo las filas
+afectadas en lugar de recargar la lista entera. Los mismos avisos vacían
+las entradas de la `CacheConsultas` que dependen de la tabla tocada.
+
+Un cambio es un dict:
+    {"tabla": "contratos", "abonos" o "cierres" (cierres de caja, por día),
+     "accion": "insertar", "actualizar" o "recargar" (cambió todo, p. ej. una importación),
+     "ids": [...],        # filas de `tabla` (días "AAAA-MM-DD" en cierres); no está en "recargar"
+     "contratos": [...],  # en abonos: el contrato de cada id, en el mismo orden
+     "campos": [...]}     # en "actualizar" de contratos: los campos que cambiaron
+"""
+import threading
+from collections import OrderedDict
+
+# las tablas de las listas de contratos y abonos; "cierres" solo le importa al cierre de caja
+TABLAS = ("contratos", "abonos")
+
+_bloqueo = threading.Lock()
+_suscriptores = []
+
+
+# ---------- aviso de cambios ----------
+def suscribir(funcion):
+    """`funcion(cambio)` se llama después de cada escritura, en el hilo que escribió.
+
+    Devuelve una función sin argumentos que cancela la suscripción.
+    """
+    with _bloqueo:
+        _suscriptores.append(funcion)
+
+    def cancelar():
+        with _bloqueo:
+            if funcion in _suscriptores:
+                _suscriptores.remove(funcion)
+    return cancelar
+
+
+def publicar(cambio):
+    with _bloqueo:
+        suscriptores = list(_suscriptores)
+    for funcion in suscriptores:
+        funcion(cambio)
+
+
+# ---------- caché de consultas ----------
+def _copia(valor):
+    """Copia de listas y dicts anidados (filas, afiliados): quien la recibe puede modificarla."""
+    if type(valor) is list:
+        return [_copia(v) for v in valor]
+    if type(valor) is dict:
+        copia = dict(valor)
+        for k, v in copia.items():
+            if type(v) is list or type(v) is dict:
+                copia[k] = _copia(v)
+        return copia
+    return valor
+
+
+def _plano(fila):
+    return not any(type(v) is list or type(v) is dict for v in fila.values())
+
+
+def _copiar_filas(filas):
+    return [dict(f) for f in filas]
+
+
+def _sin_copia(valor):
+    return valor
+
+
+def _copiador(valor):
+    """La forma más barata de copiar `valor` sin compartir nada modificable; se elige una vez al guardarlo.
+
+    Casi todo son listas de filas planas (sin afiliados): con dict() por fila
+    la copia cuesta una fracción de la consulta.
+    """
+    if type(valor) is list:
+        if all(type(f) is dict and _plano(f) for f in valor):
+            return _copiar_filas
+        return _copia
+    if type(valor) is dict:
+        return dict if _plano(valor) else _copia
+    return _sin_copia if type(valor) in (int, float, str, tuple, type(None)) else _copia
+
+
+def congelar(valor):
+    """`valor` como clave de dict: los dicts (filtros) pasan a tuplas ordenadas."""
+    if isinstance(valor, dict):
+        return tuple(sorted((k, congelar(v)) for k, v in valor.items()))
+    if isinstance(valor, (list, tuple)):
+        return tuple(congelar(v) for v in valor)
+    return valor
+
+
+class CacheConsultas:
+    """Resultados de consultas por clave (función y argumentos); al llenarse sale el menos usado.
+
+    Cada entrada recuerda de qué tablas depende y la `version` del motor con
+    que se calculó: un cambio publicado en este proceso la borra enseguida, y
+    una versión distinta la descarta si escribió otra caja sobre el mismo archivo.
+    """
+
+    def __init__(self, maximo=256):
+        self.maximo = maximo
+        self._entradas = OrderedDict()  # clave -> (version, tablas, resultado, copiador)
+        self._bloqueo = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, clave, version, calcular, tablas=TABLAS):
+        with self._bloqueo:
+            entrada = self._entradas.get(clave)
+            if entrada is not None and entrada[0] == version:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+            else:
+                entrada = None
+                self.fallos += 1
+        if entrada is not None:
+            # lo guardado no se modifica nunca: se puede copiar sin el bloqueo
+            return entrada[3](entrada[2])
+        # fuera del bloqueo: dos hilos pueden calcular lo mismo a la vez, pero nadie espera a una consulta ajena.
+        # `version` se tomó antes de consultar: si alguien escribió entre medio, la entrada ya nace vieja.
+        resultado = calcular()
+        copiador = _copiador(resultado)
+        with self._bloqueo:
+            self._entradas[clave] = (version, tablas, resultado, copiador)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.maximo:
+                self._entradas.popitem(last=False)
+        return copiador(resultado)
+
+    def invalidar(self, tabla=None):
+        """Borra las entradas que dependen de `tabla` (todas si es None)."""
+        with self._bloqueo:
+            if tabla is None:
+                self._entradas.clear()
+                return
+            for clave in [c for c, entrada in self._entradas.items() if tabla in entrada[1]]:
+                del self._entradas[clave]
+
+    def __len__(self):
+        return len(self._entradas)
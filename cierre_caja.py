@@ -0,0 +1,231 @@
+# cierre_caja.py
+"""Cierre de caja diario: totales del día por cobrador y plan, el mes de cierres y su PDF.
+
+Todo sale del resumen diario que guardan los motores (una fila por día,
+cobrador y plan, actualizada con cada abono) y de los cierres ya hechos:
+ver un día o un mes no recorre el historial de abonos. Un día cerrado se
+muestra como quedó al cerrarlo; lo cobrado con esa fecha después del
+cierre aparece aparte como diferencia.
+"""
+import calendar
+from datetime import date, datetime
+
+from almacenamiento.rangos import dia as a_dia
+from database import obtener_cierres, obtener_resumen_diario
+from pdf import MILIMETRO, DocumentoPDF
+from utils import fecha_corta, formato_centavos
+
+SIN_DATO = "(sin dato)"
+EMPRESA = "Cristo Rey - Servicios Funerarios"
+
+
+# ---------- cifras ----------
+def _agrupar(filas, campo):
+    """[(valor de `campo`, cantidad, centavos)] sumando las filas del resumen, de mayor a menor total."""
+    grupos = {}
+    for f in filas:
+        grupo = grupos.setdefault(f[campo] or SIN_DATO, [0, 0])
+        grupo[0] += f["cantidad"]
+        grupo[1] += f["centavos"]
+    return sorted(((k, n, c) for k, (n, c) in grupos.items()), key=lambda g: (-g[2], g[0]))
+
+
+def _totales(filas):
+    return {
+        "cantidad": sum(f["cantidad"] for f in filas),
+        "centavos": sum(f["centavos"] for f in filas),
+        "min_id": min((f["min_id"] for f in filas), default=None),
+        "max_id": max((f["max_id"] for f in filas), default=None),
+    }
+
+
+def resumen_dia(dia):
+    """El día `dia` como se muestra y se imprime.
+
+    Cerrado: las cifras del cierre, y en "posteriores" lo cobrado con esa
+    fecha después de cerrar. Abierto: las cifras de ahora ("cierre" None).
+    """
+    dia = a_dia(dia)
+    actuales = obtener_resumen_diario(dia)
+    cierres = obtener_cierres(dia)
+    cierre = cierres[0] if cierres else None
+    filas = cierre["detalle"] if cierre else actuales
+    ahora = _totales(actuales)
+    return {
+        "dia": dia.isoformat(),
+        "cierre": cierre,
+        "filas": filas,
+        **_totales(filas),
+        "por_cobrador": _agrupar(filas, "cobrador"),
+        "por_plan": _agrupar(filas, "plan"),
+        "posteriores": {
+            "cantidad": ahora["cantidad"] - cierre["cantidad"] if cierre else 0,
+            "centavos": ahora["centavos"] - cierre["centavos"] if cierre else 0,
+        },
+    }
+
+
+def limites_mes(anio, mes):
+    """(primer día, último día) del mes como date."""
+    return date(anio, mes, 1), date(anio, mes, calendar.monthrange(anio, mes)[1])
+
+
+def resumen_mes(anio, mes):
+    """Un renglón por día del mes con abonos o con cierre, más los totales del mes.
+
+    Cada renglón: dia, cantidad y centavos cobrados (hasta ahora), y del
+    cierre si lo hay: cerrado_en, responsable, centavos_cierre y diferencia
+    (lo cobrado con esa fecha después de cerrar).
+    """
+    primero, ultimo = limites_mes(anio, mes)
+    dias = {}
+
+    def renglon_de(dia):
+        if dia not in dias:
+            dias[dia] = {"dia": dia, "cantidad": 0, "centavos": 0, "cerrado_en": None, "responsable": "",
+                         "centavos_cierre": None, "diferencia": 0}
+        return dias[dia]
+
+    for f in obtener_resumen_diario(primero, ultimo):
+        renglon = renglon_de(f["dia"])
+        renglon["cantidad"] += f["cantidad"]
+        renglon["centavos"] += f["centavos"]
+    for c in obtener_cierres(primero, ultimo):
+        renglon_de(c["dia"]).update(cerrado_en=c["cerrado_en"], responsable=c["responsable"],
+                                    centavos_cierre=c["centavos"])
+    for renglon in dias.values():
+        if renglon["centavos_cierre"] is not None:
+            renglon["diferencia"] = renglon["centavos"] - renglon["centavos_cierre"]
+    renglones = [dias[d] for d in sorted(dias)]
+    return {
+        "anio": anio,
+        "mes": mes,
+        "dias": renglones,
+        "cantidad": sum(r["cantidad"] for r in renglones),
+        "centavos": sum(r["centavos"] for r in renglones),
+        "cerrados": sum(1 for r in renglones if r["cerrado_en"]),
+    }
+
+
+# ---------- PDF ----------
+MARGEN = 18 * MILIMETRO
+
+
+class _Hoja:
+    """Escribe renglones de arriba hacia abajo y pasa a otra página cuando no entran."""
+
+    def __init__(self, titulo):
+        self.documento = DocumentoPDF(titulo)
+        self.titulo = titulo
+        self.nueva_pagina()
+
+    def nueva_pagina(self):
+        self.pagina = self.documento.pagina()
+        self.y = MARGEN
+        self.pagina.texto(MARGEN, self.y + 12, EMPRESA, 15, "negrita")
+        self.pagina.texto(MARGEN, self.y + 30, self.titulo, 12)
+        self.pagina.texto(self.pagina.ancho - MARGEN, self.y + 30,
+                          f"Página {len(self.documento.paginas)}", 8, alinear="derecha")
+        self.pagina.linea(MARGEN, self.y + 38, self.pagina.ancho - MARGEN, self.y + 38, 1)
+        self.y += 56
+
+    def lugar(self, alto):
+        if self.y + alto > self.pagina.alto - MARGEN:
+            self.nueva_pagina()
+
+    def renglon(self, texto, tamano=10, fuente="normal"):
+        self.lugar(tamano + 4)
+        self.pagina.texto(MARGEN, self.y + tamano, texto, tamano, fuente)
+        self.y += tamano + 5
+
+    def tabla(self, titulo, columnas, filas, total=None):
+        """`columnas` son (título, ancho en mm, alinear); `total` es un renglón final en negrita."""
+        self.lugar(60)
+        self.y += 6
+        self.renglon(titulo, 11, "negrita")
+        self._fila(columnas, [t for t, _, _ in columnas], "negrita", gris=0.88)
+        for fila in filas:
+            self._fila(columnas, fila)
+        if total is not None:
+            self.pagina.linea(MARGEN, self.y, MARGEN + sum(a for _, a, _ in columnas) * MILIMETRO, self.y)
+            self._fila(columnas, total, "negrita")
+        self.y += 6
+
+    def _fila(self, columnas, valores, fuente="normal", gris=None):
+        alto = 15
+        if self.y + alto > self.pagina.alto - MARGEN:
+            self.nueva_pagina()
+        if gris is not None:
+            self.pagina.rectangulo(MARGEN, self.y, sum(a for _, a, _ in columnas) * MILIMETRO, alto, gris)
+        x = MARGEN
+        for (_, ancho, alinear), valor in zip(columnas, valores):
+            ancho *= MILIMETRO
+            if alinear == "derecha":
+                self.pagina.texto(x + ancho - 4, self.y + 11, valor, 9, fuente, "derecha")
+            else:
+                self.pagina.texto(x + 4, self.y + 11, valor, 9, fuente)
+            x += ancho
+        self.y += alto
+
+    def firmas(self, *titulos):
+        self.lugar(70)
+        self.y += 45
+        ancho = (self.pagina.ancho - 2 * MARGEN) / len(titulos)
+        for i, titulo in enumerate(titulos):
+            x = MARGEN + i * ancho
+            self.pagina.linea(x + 15, self.y, x + ancho - 15, self.y)
+            self.pagina.texto(x + ancho / 2, self.y + 12, titulo, 9, alinear="centro")
+        self.y += 20
+
+    def guardar(self, ruta):
+        self.pagina.texto(MARGEN, self.pagina.alto - MARGEN / 2,
+                          f"Generado el {datetime.now().strftime('%d/%m/%Y %H:%M')}", 7)
+        return self.documento.guardar(ruta)
+
+
+def pdf_dia(ruta, dia):
+    """El cierre de caja del día `dia` en PDF (provisorio si el día sigue abierto)."""
+    datos = resumen_dia(dia)
+    hoja = _Hoja(f"Cierre de caja del {fecha_corta(datos['dia'])}")
+    cierre = datos["cierre"]
+    if cierre:
+        responsable = f" por {cierre['responsable']}" if cierre["responsable"] else ""
+        hoja.renglon(f"Cerrado el {fecha_corta(cierre['cerrado_en'])} a las {cierre['cerrado_en'][11:16]}{responsable}.")
+    else:
+        hoja.renglon("Día sin cerrar: cifras provisorias.", fuente="negrita")
+    hoja.renglon(f"Abonos: {datos['cantidad']}    Total: {formato_centavos(datos['centavos'])}", 11, "negrita")
+    if datos["min_id"] is not None:
+        hoja.renglon(f"Recibos del N° {datos['min_id']} al N° {datos['max_id']}")
+    if datos["posteriores"]["cantidad"]:
+        hoja.renglon(f"Registrados con esta fecha después del cierre: {datos['posteriores']['cantidad']} abonos por "
+                     f"{formato_centavos(datos['posteriores']['centavos'])} (no incluidos).")
+
+    total = ["Total", str(datos["cantidad"]), formato_centavos(datos["centavos"])]
+    for titulo, columna, grupos in (("Por cobrador", "Cobrador", datos["por_cobrador"]),
+                                    ("Por plan", "Plan", datos["por_plan"])):
+        hoja.tabla(titulo, [(columna, 90, "izquierda"), ("Abonos", 25, "derecha"), ("Total", 40, "derecha")],
+                   [(g, str(n), formato_centavos(c)) for g, n, c in grupos], total)
+    hoja.tabla("Detalle", [("Cobrador", 50, "izquierda"), ("Plan", 40, "izquierda"), ("Abonos", 20, "derecha"),
+                           ("Recibos", 35, "derecha"), ("Total", 30, "derecha")],
+               [(f["cobrador"] or SIN_DATO, f["plan"] or SIN_DATO, str(f["cantidad"]),
+                 f"{f['min_id']} - {f['max_id']}", formato_centavos(f["centavos"])) for f in datos["filas"]])
+    hoja.firmas("Entregó", "Recibió")
+    return hoja.guardar(ruta)
+
+
+def pdf_mes(ruta, anio, mes):
+    """Los cierres del mes en PDF: un renglón por día con lo cobrado y si se cerró."""
+    datos = resumen_mes(anio, mes)
+    hoja = _Hoja(f"Cierres de caja de {mes:02d}/{anio}")
+    hoja.renglon(f"Días con cierre: {datos['cerrados']} de {len(datos['dias'])}    "
+                 f"Total cobrado: {formato_centavos(datos['centavos'])}", 11, "negrita")
+    filas = []
+    for r in datos["dias"]:
+        cerrado = r["cerrado_en"] is not None
+        filas.append((fecha_corta(r["dia"]), str(r["cantidad"]), formato_centavos(r["centavos"]),
+                      fecha_corta(r["cerrado_en"]) if cerrado else "Abierto", r["responsable"] if cerrado else "",
+                      formato_centavos(r["diferencia"]) if r["diferencia"] else ""))
+    hoja.tabla("Días", [("Día", 25, "izquierda"), ("Abonos", 20, "derecha"), ("Cobrado", 32, "derecha"),
+                        ("Cierre", 25, "izquierda"), ("Responsable", 40, "izquierda"), ("Después", 30, "derecha")],
+               filas, ["Total", str(datos["cantidad"]), formato_centavos(datos["centavos"]), "", "", ""])
+    return hoja.guardar(ruta)
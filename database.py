@@ -1,161 +1,428 @@
 # database.py
-import json
+import atexit
+import functools
 import os
-from datetime import datetime
-from shutil import copy2
+import threading
+from datetime import date, datetime
+
+import cambios
+from almacenamiento import crear_motor, rangos
+from almacenamiento.montos import redondear
+from almacenamiento.respaldos import AlmacenRespaldos, RespaldoEnSegundoPlano, tomar_instantanea
+from metricas import medido
 
 DB_FILE = "contratos.json"
+SQLITE_FILE = "cristorey_datos.sqlite3"
 BACKUP_DIR = "backups"
 
-
-def _crear_base_si_no_existe():
-    if not os.path.exists(DB_FILE):
-        data = {"contratos": [], "abonos": []}
-        with open(DB_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
-
-
+# Motor de almacenamiento: "sqlite" (por defecto), "json" (contratos.json de siempre)
+# o "diario" (contratos.json como instantánea + contratos.json.diario de solo-anexar)
+DB_MOTOR = os.environ.get("CRISTOREY_MOTOR", "sqlite")
+# Formato de contratos.json para los motores json y diario: "json" (compacto, por defecto),
+# "json-legible", "msgpack" o "binario". Al leer se reconoce solo; ver almacenamiento/serializacion.py
+DB_FORMATO = os.environ.get("CRISTOREY_FORMATO")
+
+_motor = None
+_almacen = None
+# un solo escritor a la vez dentro del proceso; el respaldo lo toma para copiar
+# (entre cajas que comparten el archivo excluye cada motor: candado `.lock` en json/diario, WAL en sqlite)
+_escritura = threading.RLock()
+# resultados de consultas hasta que una escritura (de este proceso o de otra caja) los vuelva viejos
+_cache = cambios.CacheConsultas()
+cambios.suscribir(lambda cambio: _cache.invalidar(cambio["tabla"]))
+
+
+@medido
+def obtener_motor():
+    """Devuelve el motor configurado, creándolo la primera vez."""
+    global _motor
+    if _motor is None:
+        if DB_MOTOR == "sqlite":
+            nueva = not os.path.exists(SQLITE_FILE)
+            _motor = crear_motor("sqlite", SQLITE_FILE)
+            if nueva and os.path.exists(DB_FILE):
+                # primera ejecución tras actualizar: traer los datos de contratos.json
+                from almacenamiento.migracion import migrar
+                migrar(_motor, DB_FILE)
+        else:
+            _motor = crear_motor(DB_MOTOR, DB_FILE, DB_FORMATO)
+    return _motor
+
+
+def _en_cache(*tablas):
+    """Decorador: guarda el resultado en la caché de consultas; se invalida con cambios de `tablas`."""
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            version = obtener_motor().version_datos()
+            if version is None:
+                return funcion(*args, **kwargs)
+            clave = (funcion.__name__, cambios.congelar(args), cambios.congelar(kwargs))
+            return _cache.obtener(clave, version, lambda: funcion(*args, **kwargs), tablas)
+        return envoltura
+    return decorador
+
+
+@medido
+def ruta_base_datos():
+    return obtener_motor().ruta
+
+
+def ruta_configurada():
+    """La ruta de la base según la configuración, sin abrir el motor (para restaurar encima)."""
+    return SQLITE_FILE if DB_MOTOR == "sqlite" else DB_FILE
+
+
+@medido
 def cargar_datos():
-    _crear_base_si_no_existe()
-    with open(DB_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-
-def guardar_datos(data):
-    with open(DB_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
-
-
-def generar_id(lista, campo="id"):
-    if not lista:
-        return 1
-    return max(item.get(campo, 0) for item in lista) + 1
+    return obtener_motor().exportar_datos()
 
 
 # -----------------------------
 # CONTRATOS
 # -----------------------------
+@medido
 def guardar_contrato(nombre, cedula, direccion, telefono, plan, mensualidad, fecha_inicio, afiliados, id_manual=None):
-    data = cargar_datos()
-    contratos = data["contratos"]
-
-    if id_manual is not None:
-        if any(c["id"] == id_manual for c in contratos):
-            raise ValueError(f"El ID {id_manual} ya existe.")
-        contrato_id = id_manual
-    else:
-        contrato_id = generar_id(contratos)
-
     contrato = {
-        "id": contrato_id,
         "nombre": nombre,
         "cedula": cedula,
         "direccion": direccion,
         "telefono": telefono,
         "plan": plan,
-        "mensualidad": float(mensualidad),
+        "mensualidad": redondear(mensualidad),
         "fecha_inicio": fecha_inicio,
         "estado": "Activo",
         "afiliados": afiliados  # lista de dicts {nombre, apellido, parentesco, telefono}
     }
-
-    contratos.append(contrato)
-    guardar_datos(data)
-    backup_db()  # respaldo automático
+    with _escritura:
+        contrato_id = obtener_motor().insertar_contrato(contrato, id_manual)
+    cambios.publicar({"tabla": "contratos", "accion": "insertar", "ids": [contrato_id]})
+    _respaldo_automatico.solicitar()
     return contrato_id
 
 
+@medido
 def obtener_contratos(estado=None):
-    data = cargar_datos()
-    contratos = data["contratos"]
-    if estado:
-        return [c for c in contratos if c["estado"] == estado]
-    return contratos
+    return obtener_motor().obtener_contratos(estado)
 
 
+@medido
+@_en_cache("contratos")
 def obtener_contrato_por_id(contrato_id):
-    contratos = cargar_datos()["contratos"]
-    return next((c for c in contratos if c["id"] == contrato_id), None)
+    return obtener_motor().obtener_contrato_por_id(contrato_id)
+
+
+@medido
+@_en_cache("contratos")
+def buscar_contrato_por_cedula(cedula, estado=None):
+    return obtener_motor().buscar_contrato_por_cedula(cedula, estado)
+
+
+@medido
+@_en_cache("contratos")
+def buscar_contratos(texto, limite=50, estado=None):
+    """Contratos por texto parcial (titular, dirección, teléfono o afiliados), sin tildes ni mayúsculas."""
+    return obtener_motor().buscar_contratos(texto, limite, estado)
+
 
+@medido
+@_en_cache("contratos")
+def contar_contratos(estado=None):
+    return obtener_motor().contar_contratos(estado)
 
-def buscar_contrato_por_cedula(cedula):
-    contratos = cargar_datos()["contratos"]
-    return [c for c in contratos if c["cedula"] == cedula]
 
+@medido
+@_en_cache("contratos")
+def obtener_contratos_pagina(estado=None, offset=0, limite=100, orden="id", descendente=False):
+    """Contratos [offset, offset+limite) ordenados por `orden` (para listas virtuales)."""
+    return obtener_motor().obtener_contratos_pagina(estado, offset, limite, orden, descendente)
 
+
+@medido
+@_en_cache("contratos")
+def obtener_contratos_iniciados_entre(desde, hasta=None, estado=None):
+    """Contratos con fecha de inicio entre `desde` y `hasta` (días incluidos; sin `hasta`, solo ese día),
+    por fecha de inicio. Las fechas son date o texto "AAAA-MM-DD"."""
+    return obtener_motor().obtener_contratos_iniciados(desde, desde if hasta is None else hasta, estado)
+
+
+@medido
+def obtener_contratos_desde(estado=None, despues_de=0, limite=100):
+    """Los siguientes `limite` contratos con id mayor que `despues_de` (paginación por cursor)."""
+    return obtener_motor().obtener_contratos_desde(estado, despues_de, limite)
+
+
+@medido
 def editar_contrato(contrato_id, nuevos_datos):
-    data = cargar_datos()
-    updated = False
-    for c in data["contratos"]:
-        if c["id"] == contrato_id:
-            c.update(nuevos_datos)
-            updated = True
-            break
-    if updated:
-        guardar_datos(data)
-        backup_db()
-    else:
-        raise ValueError("Contrato no encontrado")
+    with _escritura:
+        obtener_motor().editar_contrato(contrato_id, nuevos_datos)
+    cambios.publicar({"tabla": "contratos", "accion": "actualizar", "ids": [contrato_id],
+                      "campos": list(nuevos_datos)})
+    _respaldo_automatico.solicitar()
 
 
+@medido
 def cambiar_estado(contrato_id, nuevo_estado):
-    data = cargar_datos()
-    for c in data["contratos"]:
-        if c["id"] == contrato_id:
-            c["estado"] = nuevo_estado
-            guardar_datos(data)
-            backup_db()
-            return
-    raise ValueError("Contrato no encontrado")
+    with _escritura:
+        obtener_motor().cambiar_estado(contrato_id, nuevo_estado)
+    cambios.publicar({"tabla": "contratos", "accion": "actualizar", "ids": [contrato_id], "campos": ["estado"]})
+    _respaldo_automatico.solicitar()
 
 
 # -----------------------------
 # ABONOS
 # -----------------------------
-def agregar_abono(contrato_id, monto, observacion=""):
-    data = cargar_datos()
-    abonos = data["abonos"]
-    fecha_actual = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+@medido
+def agregar_abono(contrato_id, monto, observacion="", cobrador=""):
     nuevo = {
-        "id": generar_id(abonos),
         "contrato_id": contrato_id,
-        "fecha": fecha_actual,
-        "monto": float(monto),
-        "observacion": observacion
+        "fecha": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "monto": redondear(monto),
+        "observacion": observacion,
+        "cobrador": cobrador
     }
-    abonos.append(nuevo)
-    guardar_datos(data)
-    backup_db()
-    return nuevo["id"]
+    with _escritura:
+        abono_id = obtener_motor().insertar_abono(nuevo)
+    cambios.publicar({"tabla": "abonos", "accion": "insertar", "ids": [abono_id], "contratos": [contrato_id]})
+    _respaldo_automatico.solicitar()
+    return abono_id
+
+
+@medido
+def agregar_abonos_lote(abonos, cobrador=""):
+    """Registra una planilla de cobro completa: una sola escritura y un solo respaldo.
+
+    `abonos` son dicts con contrato_id, monto y, opcionales, observacion y
+    cobrador (si falta se usa `cobrador`); todos quedan con la misma fecha.
+    Las líneas con contrato inexistente o monto inválido no se registran.
+    Devuelve {"registrados": [{"linea", "id"}], "rechazos": [{"linea", "motivo"}]},
+    con `linea` la posición en `abonos` contando desde 1.
+    """
+    fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    motor = obtener_motor()
+    nuevos, lineas, rechazos = [], [], []
+    with _escritura:
+        # con la escritura tomada: la revisión y el guardado ven los mismos contratos
+        ids = {contrato_id for contrato_id, _ in motor.claves_contratos()}
+        for n, abono in enumerate(abonos, 1):
+            try:
+                monto = redondear(abono["monto"])
+            except (KeyError, TypeError, ValueError):
+                rechazos.append({"linea": n, "motivo": f"monto inválido: {abono.get('monto')!r}"})
+                continue
+            if abono.get("contrato_id") not in ids:
+                rechazos.append({"linea": n, "motivo": f"no existe el contrato {abono.get('contrato_id')}"})
+            elif monto <= 0:
+                rechazos.append({"linea": n, "motivo": "el monto debe ser mayor que cero"})
+            else:
+                nuevos.append({"contrato_id": abono["contrato_id"], "fecha": fecha, "monto": monto,
+                               "observacion": abono.get("observacion") or "",
+                               "cobrador": abono.get("cobrador") or cobrador})
+                lineas.append(n)
+        ids_nuevos = motor.insertar_abonos(nuevos) if nuevos else []
+    if nuevos:
+        cambios.publicar({"tabla": "abonos", "accion": "insertar", "ids": list(ids_nuevos),
+                          "contratos": [a["contrato_id"] for a in nuevos]})
+        _respaldo_automatico.solicitar()
+    return {"registrados": [{"linea": n, "id": i} for n, i in zip(lineas, ids_nuevos)], "rechazos": rechazos}
+
+
+@medido
+def obtener_abonos(contrato_id=None, cedula=None):
+    return obtener_motor().obtener_abonos(contrato_id, cedula)
 
 
-def obtener_abonos(contrato_id=None, cedula=None):
-    data = cargar_datos()
-    abonos = data["abonos"]
-    if contrato_id:
-        return [a for a in abonos if a["contrato_id"] == contrato_id]
-    if cedula:
-        contratos = data["contratos"]
-        contrato = next((c for c in contratos if c["cedula"] == cedula), None)
-        if contrato:
-            return [a for a in abonos if a["contrato_id"] == contrato["id"]]
-        return []
-    return abonos
+@medido
+def obtener_abonos_con_contrato(filtro=None):
+    """Abonos junto con el nombre y la cédula de su contrato.
+
+    `filtro` es un dict opcional con `contrato_id` o `cedula`, y también
+    `desde`/`hasta` (días incluidos, date o "AAAA-MM-DD") y `cobrador`.
+    """
+    return obtener_motor().obtener_abonos_con_contrato(filtro)
+
+
+@medido
+@_en_cache("contratos", "abonos")
+def obtener_abonos_entre(desde, hasta=None, cobrador=None):
+    """Abonos unidos con su contrato entre `desde` y `hasta` (días incluidos; sin `hasta`, solo ese día),
+    por fecha. Con `cobrador`, solo los suyos: obtener_abonos_entre(date.today(), cobrador="Caja 1")."""
+    return obtener_motor().obtener_abonos_entre(desde, desde if hasta is None else hasta, cobrador)
+
+
+@medido
+def obtener_columnas_abonos(despues_de=0):
+    """Abonos con id mayor que `despues_de` como columnas paralelas (id, contrato_id, periodo, centavos, cobrador)."""
+    return obtener_motor().columnas_abonos(despues_de)
+
+
+@medido
+@_en_cache("abonos")
+def obtener_totales_abonos(por=None):
+    """Total cobrado en centavos exactos: un entero, o {contrato_id: centavos} / {periodo: centavos} según `por`."""
+    return obtener_motor().sumar_abonos(por)
+
+
+@medido
+def obtener_columnas_contratos():
+    """Contratos como columnas paralelas (id, plan, estado, mensualidad_centavos, inicio, pausa) para reportes."""
+    return obtener_motor().columnas_contratos()
+
+
+@medido
+def version_contratos():
+    """Marca que cambia con cada cambio de contratos (no de abonos), también de otra caja; None si el motor no la da."""
+    return obtener_motor().version_contratos()
+
+
+@medido
+@_en_cache("contratos", "abonos")
+def contar_abonos(filtro=None):
+    return obtener_motor().contar_abonos(filtro)
+
+
+@medido
+@_en_cache("contratos", "abonos")
+def obtener_abonos_pagina(filtro=None, offset=0, limite=100, orden="id", descendente=False):
+    """Abonos unidos con su contrato, [offset, offset+limite) ordenados por `orden`."""
+    return obtener_motor().obtener_abonos_pagina(filtro, offset, limite, orden, descendente)
+
+
+@medido
+def obtener_abonos_desde(filtro=None, despues_de=0, limite=100):
+    """Los siguientes `limite` abonos unidos con id mayor que `despues_de`."""
+    return obtener_motor().obtener_abonos_desde(filtro, despues_de, limite)
+
+
+# -----------------------------
+# IMPORTACIÓN EN BLOQUE
+# -----------------------------
+@medido
+def importar_en_bloque(preparar):
+    """Guarda de una vez lo que devuelva `preparar(claves)` y pide un solo respaldo.
+
+    `preparar` recibe los pares (id, cédula) ya registrados y devuelve
+    {"contratos": [...], "abonos": [...]}; corre con la escritura tomada, así
+    nadie registra la misma cédula entre la revisión y la importación.
+    """
+    motor = obtener_motor()
+    with _escritura:
+        data = preparar(motor.claves_contratos())
+        if data["contratos"] or data["abonos"]:
+            motor.importar_datos(data)
+    if data["contratos"] or data["abonos"]:
+        for tabla in cambios.TABLAS:
+            cambios.publicar({"tabla": tabla, "accion": "recargar"})
+        _respaldo_automatico.solicitar()
+    return data
+
+
+# -----------------------------
+# ESTADO DE CUENTA
+# -----------------------------
+@medido
+@_en_cache("contratos", "abonos")
+def obtener_cuentas_pagina(estado=None, offset=0, limite=100, orden="id", descendente=False):
+    """Contratos con pagado, cuotas cubiertas, próximo vencimiento y deuda a hoy, ordenados por `orden`."""
+    return obtener_motor().obtener_cuentas_pagina(estado, offset, limite, orden, descendente)
+
+
+@medido
+def obtener_cuentas_de(ids):
+    """Estados de cuenta de los contratos `ids`, para refrescar filas sueltas después de un cambio."""
+    return obtener_motor().obtener_cuentas_de(ids)
+
+
+@medido
+@_en_cache("contratos", "abonos")
+def obtener_cuentas(estado=None):
+    """Todos los contratos (sin afiliados) con su saldo acumulado, en una pasada."""
+    return obtener_motor().obtener_cuentas(estado)
+
+
+@medido
+@_en_cache("contratos", "abonos")
+def obtener_morosos(estado="Activo"):
+    """Contratos con cuotas vencidas sin pagar, de mayor a menor deuda."""
+    return obtener_motor().obtener_morosos(estado)
+
+
+# -----------------------------
+# CIERRE DE CAJA
+# -----------------------------
+@medido
+@_en_cache("abonos")
+def obtener_resumen_diario(desde, hasta=None):
+    """Resumen de abonos por día, cobrador y plan (cantidad, centavos, min_id, max_id) entre `desde` y
+    `hasta` (días incluidos; sin `hasta`, solo ese día). Sale del resumen guardado, no de los abonos."""
+    return obtener_motor().resumen_diario(desde, desde if hasta is None else hasta)
+
+
+@medido
+@_en_cache("cierres")
+def obtener_cierres(desde, hasta=None):
+    """Cierres de caja de los días entre `desde` y `hasta` (incluidos; sin `hasta`, solo ese día), por día."""
+    return obtener_motor().obtener_cierres(desde, desde if hasta is None else hasta)
+
+
+@medido
+def cerrar_dia(dia, responsable=""):
+    """Cierra la caja de `dia`: guarda los totales de su resumen tal como están ahora.
+
+    Los abonos que se registren después con esa fecha quedan fuera del
+    cierre (el reporte los muestra aparte). ValueError si el día es futuro o
+    ya estaba cerrado. Devuelve el cierre guardado.
+    """
+    dia = rangos.dia(dia)
+    if dia > date.today():
+        raise ValueError("No se puede cerrar un día que todavía no llegó.")
+    motor = obtener_motor()
+    with _escritura:
+        # con la escritura tomada: ningún abono de esta caja entra entre el resumen y el cierre
+        detalle = [{k: v for k, v in f.items() if k != "dia"} for f in motor.resumen_diario(dia, dia)]
+        cierre = {
+            "dia": dia.isoformat(),
+            "cerrado_en": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "responsable": responsable,
+            "cantidad": sum(f["cantidad"] for f in detalle),
+            "centavos": sum(f["centavos"] for f in detalle),
+            "min_id": min((f["min_id"] for f in detalle), default=None),
+            "max_id": max((f["max_id"] for f in detalle), default=None),
+            "detalle": detalle,
+        }
+        motor.cerrar_dia(cierre)
+    cambios.publicar({"tabla": "cierres", "accion": "insertar", "ids": [cierre["dia"]]})
+    _respaldo_automatico.solicitar()
+    return cierre
 
 
 # -----------------------------
 # BACKUP
 # -----------------------------
+@medido
+def obtener_almacen_respaldos():
+    global _almacen
+    if _almacen is None:
+        _almacen = AlmacenRespaldos(BACKUP_DIR)
+    return _almacen
+
+
+@medido
 def backup_db():
-    if not os.path.exists(DB_FILE):
+    """Toma una instantánea ahora mismo y devuelve la ruta de su manifiesto."""
+    motor = obtener_motor()
+    if not os.path.exists(motor.ruta):
         return None
-    if not os.path.exists(BACKUP_DIR):
-        os.makedirs(BACKUP_DIR)
-    fecha = datetime.now().strftime("%Y%m%d_%H%M%S")
-    destino = os.path.join(BACKUP_DIR, f"backup_CristoRey_{fecha}.json")
-    copy2(DB_FILE, destino)
-    return os.path.abspath(destino)
+    return os.path.abspath(tomar_instantanea(motor, obtener_almacen_respaldos(), _escritura))
+
+
+# Las escrituras solo piden respaldo; el hilo lo toma cuando hay una pausa
+_respaldo_automatico = RespaldoEnSegundoPlano(backup_db)
+atexit.register(_respaldo_automatico.vaciar)
+
 
+@medido
+def estado_respaldo():
+    """Cuándo salió bien el último respaldo automático y el último fallo (fecha, texto) si no se resolvió."""
+    return {"ultimo": _respaldo_automatico.ultimo_respaldo, "error": _respaldo_automatico.ultimo_error}
 
-# Initialization: ensure DB exists
-_crear_base_si_no_existe()
@@ -0,0 +1,352 @@
+# documentos.py
+"""Recibos de abono y documentos de contrato en PDF.
+
+Cada documento sale de una plantilla: una lista de elementos (texto, línea,
+rectángulo, imagen y un bloque de filas que se repite, como los afiliados).
+La plantilla se compila una vez por proceso: lo fijo queda convertido a
+instrucciones PDF y de los textos con campos `{...}` solo queda formatear
+los datos de cada recibo. El logo se lee una vez y se incrusta como JPEG,
+sin decodificar.
+
+Los documentos se arman en `cola`, un hilo aparte de los de la base: el
+cajero sigue registrando mientras se genera el recibo. La reimpresión de un
+rango de fechas reparte las páginas entre procesos (pdf.py es Python puro y
+el trabajo es todo de CPU) y las junta en un solo PDF.
+"""
+import functools
+import os
+import string
+import subprocess
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+
+import metricas
+from database import obtener_abonos_desde, obtener_abonos_entre, obtener_contrato_por_id, obtener_cuentas_de
+from pdf import A4, A5, DocumentoPDF, ImagenJPEG, Pagina, flujo
+from utils import fecha_corta, formato_moneda
+
+LOGO_FILE = "Logo_cristorey.jpeg"
+DOCUMENTOS_DIR = "documentos"
+# por debajo de esto la reimpresión no reparte: arrancar un proceso cuesta unos 0,2 s, lo que
+# tardan en armarse un par de miles de recibos
+MINIMO_PROCESOS = 2000
+SIN_DATO = "-"
+
+# un solo hilo: los documentos salen en el orden en que se pidieron
+cola = ThreadPoolExecutor(max_workers=1, thread_name_prefix="documentos", initializer=metricas.perfilar_hilo)
+
+
+# ---------- plantillas ----------
+def _dato(y, etiqueta, campo, x=36, x_valor=140, tamano=10):
+    """Etiqueta en negrita y su valor en el mismo renglón."""
+    return [("texto", x, y, etiqueta, tamano, "negrita"), ("texto", x_valor, y, "{%s}" % campo, tamano)]
+
+
+def _encabezado(ancho, titulo):
+    derecha = ancho - 30
+    return [
+        ("imagen", "Logo", 30, 24, 60, 60),
+        ("texto", 100, 48, "CRISTO REY", 18, "negrita"),
+        ("texto", 100, 66, "Servicios Funerarios", 10),
+        ("texto", derecha, 48, titulo, 12, "negrita", "derecha"),
+        ("texto", derecha, 68, "N° {numero}", 14, "negrita", "derecha"),
+        ("linea", 30, 96, derecha, 96, 1),
+    ]
+
+
+PLANTILLAS = {
+    "recibo": {
+        "tamano": A5,
+        "elementos": [
+            *_encabezado(A5[0], "RECIBO DE PAGO"),
+            *_dato(124, "Fecha:", "fecha"),
+            *_dato(142, "Contrato N°:", "contrato"),
+            *_dato(160, "Titular:", "nombre"),
+            *_dato(178, "Cédula:", "cedula"),
+            *_dato(196, "Plan:", "plan"),
+            *_dato(214, "Cobrador:", "cobrador"),
+            *_dato(232, "Observación:", "observacion"),
+            ("rectangulo", 30, 252, A5[0] - 60, 40, 0.9),
+            ("texto", 42, 277, "MONTO RECIBIDO", 11, "negrita"),
+            ("texto", A5[0] - 42, 279, "{monto}", 16, "negrita", "derecha"),
+            ("texto", 30, 322, "Estado de cuenta al {impreso}", 10, "negrita"),
+            ("linea", 30, 328, A5[0] - 30, 328),
+            *_dato(346, "Total pagado:", "pagado"),
+            *_dato(364, "Cuotas cubiertas:", "cubiertas"),
+            *_dato(382, "Próximo vencimiento:", "proximo"),
+            *_dato(400, "Saldo vencido:", "deuda"),
+            ("linea", A5[0] - 200, 490, A5[0] - 30, 490),
+            ("texto", A5[0] - 115, 503, "Firma y sello", 9, "normal", "centro"),
+            ("texto", 30, A5[1] - 24, "Generado el {generado}", 7),
+        ],
+    },
+    "contrato": {
+        "tamano": A4,
+        "elementos": [
+            *_encabezado(A4[0], "CONTRATO DE SERVICIO"),
+            ("texto", 30, 126, "Datos del titular", 12, "negrita"),
+            *_dato(146, "Nombre:", "nombre"),
+            *_dato(164, "Cédula:", "cedula"),
+            *_dato(182, "Dirección:", "direccion"),
+            *_dato(200, "Teléfono:", "telefono"),
+            ("texto", 30, 234, "Plan contratado", 12, "negrita"),
+            *_dato(254, "Plan:", "plan"),
+            *_dato(272, "Mensualidad:", "mensualidad"),
+            *_dato(290, "Fecha de inicio:", "inicio"),
+            *_dato(308, "Estado:", "estado"),
+            ("texto", 30, 342, "Afiliados", 12, "negrita"),
+            ("texto", A4[0] - 30, 342, "{afiliados_total}", 9, "normal", "derecha"),
+            ("rectangulo", 30, 350, A4[0] - 60, 18, 0.88),
+            ("texto", 36, 363, "Nombre", 10, "negrita"),
+            ("texto", 280, 363, "Parentesco", 10, "negrita"),
+            ("texto", 420, 363, "Teléfono", 10, "negrita"),
+            ("filas", "afiliados", 386, 17, 700, [(36, "{nombre}", 10), (280, "{parentesco}", 10),
+                                                  (420, "{telefono}", 10)]),
+            ("linea", 50, 770, 250, 770),
+            ("texto", 150, 783, "El contratante", 9, "normal", "centro"),
+            ("linea", A4[0] - 250, 770, A4[0] - 50, 770),
+            ("texto", A4[0] - 150, 783, "Por Cristo Rey", 9, "normal", "centro"),
+            ("texto", 30, A4[1] - 24, "Generado el {generado}", 7),
+            ("texto", A4[0] - 30, A4[1] - 24, "Hoja {hoja} de {hojas}", 7, "normal", "derecha"),
+        ],
+    },
+}
+
+
+def _campos(formato):
+    """Los nombres de campo `{...}` de un texto de plantilla."""
+    return [campo for _, campo, _, _ in string.Formatter().parse(formato) if campo is not None]
+
+
+class Plantilla:
+    """Una plantilla compilada: bytes con lo fijo y funciones que dibujan lo que depende de los datos.
+
+    Admite un solo bloque de filas; si no entran en la hoja, la hoja se repite
+    con las siguientes (los campos {hoja} y {hojas} dicen cuál es).
+    """
+
+    def __init__(self, definicion, imagenes):
+        self.tamano = definicion["tamano"]
+        self.partes = []
+        self.campo_filas = None
+        self.por_hoja = 0
+        fijo = Pagina(*self.tamano)
+        for tipo, *args in definicion["elementos"]:
+            if tipo == "imagen" and args[0] not in imagenes:
+                continue  # sin logo el documento sale igual
+            if tipo == "filas":
+                campo, y, alto, limite, columnas = args
+                self.campo_filas = campo
+                self.por_hoja = int((limite - y) // alto) + 1
+                variable = _filas(campo, y, alto, columnas)
+            elif tipo == "texto" and _campos(args[2]):
+                variable = _texto(*args)
+            else:
+                getattr(fijo, tipo)(*args)
+                continue
+            if fijo.contenido():
+                self.partes.append(fijo.contenido())
+                fijo = Pagina(*self.tamano)
+            self.partes.append(variable)
+        if fijo.contenido():
+            self.partes.append(fijo.contenido())
+
+    def paginas(self, datos):
+        """Las hojas de un documento con `datos` (los valores de los campos, ya como texto)."""
+        trozos = [[]]
+        if self.campo_filas:
+            filas = datos[self.campo_filas]
+            trozos = [filas[i:i + self.por_hoja] for i in range(0, len(filas), self.por_hoja)] or trozos
+        paginas = []
+        for hoja, trozo in enumerate(trozos, 1):
+            valores = {**datos, "hoja": hoja, "hojas": len(trozos)}
+            if self.campo_filas:
+                valores[self.campo_filas] = trozo
+            pagina = Pagina(*self.tamano)
+            for parte in self.partes:
+                if type(parte) is bytes:
+                    pagina.agregar(parte)
+                else:
+                    parte(pagina, valores)
+            paginas.append(pagina)
+        return paginas
+
+
+def _texto(x, y, formato, tamano=10, fuente="normal", alinear="izquierda"):
+    def dibujar(pagina, datos):
+        pagina.texto(x, y, formato.format_map(datos), tamano, fuente, alinear)
+    return dibujar
+
+
+def _filas(campo, y, alto, columnas):
+    def dibujar(pagina, datos):
+        for i, fila in enumerate(datos[campo]):
+            for x, formato, *estilo in columnas:
+                pagina.texto(x, y + i * alto, formato.format_map(fila), *estilo)
+    return dibujar
+
+
+@functools.lru_cache(maxsize=1)
+def logo():
+    """El logo como ImagenJPEG, leído una sola vez; None si el archivo no está o no se puede usar."""
+    try:
+        return ImagenJPEG.abrir(LOGO_FILE)
+    except (OSError, ValueError):
+        return None
+
+
+def imagenes():
+    """Las imágenes que pueden usar las plantillas, por nombre."""
+    imagen = logo()
+    return {"Logo": imagen} if imagen is not None else {}
+
+
+_plantillas = {}
+_bloqueo = threading.Lock()
+
+
+def plantilla(nombre):
+    """La plantilla `nombre` de PLANTILLAS, compilada la primera vez que se pide."""
+    with _bloqueo:
+        compilada = _plantillas.get(nombre)
+        if compilada is None:
+            compilada = _plantillas[nombre] = Plantilla(PLANTILLAS[nombre], imagenes())
+        return compilada
+
+
+def _documento(nombre, titulo):
+    """Un DocumentoPDF del tamaño de la plantilla `nombre` con las imágenes ya registradas."""
+    documento = DocumentoPDF(titulo, plantilla(nombre).tamano)
+    for nombre_imagen, imagen in imagenes().items():
+        documento.agregar_imagen(nombre_imagen, imagen)
+    return documento
+
+
+def _guardar(documento, carpeta, archivo):
+    os.makedirs(carpeta, exist_ok=True)
+    return documento.guardar(os.path.join(carpeta, archivo))
+
+
+# ---------- datos ----------
+def _texto_o_nada(valor):
+    return str(valor) if valor not in (None, "") else SIN_DATO
+
+
+def datos_recibo(abono, cuenta, impreso=None):
+    """Los campos del recibo de `abono` (unido con su contrato) y el estado de cuenta `cuenta` al imprimirlo."""
+    impreso = impreso or datetime.now()
+    cuenta = cuenta or {}
+    return {
+        "numero": f"{abono['id']:06d}",
+        "fecha": f"{fecha_corta(abono['fecha'])} {abono['fecha'][11:16]}".strip(),
+        "contrato": abono["contrato_id"],
+        "nombre": _texto_o_nada(abono["nombre"]),
+        "cedula": _texto_o_nada(abono["cedula"]),
+        "plan": _texto_o_nada(cuenta.get("plan")),
+        "cobrador": _texto_o_nada(abono["cobrador"]),
+        "observacion": _texto_o_nada(abono["observacion"]),
+        "monto": formato_moneda(abono["monto"]),
+        "impreso": impreso.strftime("%d/%m/%Y"),
+        "pagado": formato_moneda(cuenta["pagado"]) if cuenta else SIN_DATO,
+        "cubiertas": _texto_o_nada(cuenta.get("meses_cubiertos")),
+        "proximo": fecha_corta(cuenta.get("proximo_vencimiento")) or SIN_DATO,
+        "deuda": formato_moneda(cuenta["deuda"]) if cuenta else SIN_DATO,
+        "generado": impreso.strftime("%d/%m/%Y %H:%M"),
+    }
+
+
+def datos_contrato(contrato, impreso=None):
+    impreso = impreso or datetime.now()
+    afiliados = [{"nombre": f"{a.get('nombre', '')} {a.get('apellido', '')}".strip() or SIN_DATO,
+                  "parentesco": _texto_o_nada(a.get("parentesco")),
+                  "telefono": _texto_o_nada(a.get("telefono"))} for a in contrato.get("afiliados") or []]
+    return {
+        "numero": f"{contrato['id']:06d}",
+        "nombre": _texto_o_nada(contrato["nombre"]),
+        "cedula": _texto_o_nada(contrato["cedula"]),
+        "direccion": _texto_o_nada(contrato["direccion"]),
+        "telefono": _texto_o_nada(contrato["telefono"]),
+        "plan": _texto_o_nada(contrato["plan"]),
+        "mensualidad": formato_moneda(contrato["mensualidad"]),
+        "inicio": fecha_corta(contrato["fecha_inicio"]) or SIN_DATO,
+        "estado": _texto_o_nada(contrato.get("estado")),
+        "afiliados": afiliados,
+        "afiliados_total": f"{len(afiliados)} registrados" if afiliados else "Sin afiliados registrados",
+        "generado": impreso.strftime("%d/%m/%Y %H:%M"),
+    }
+
+
+# ---------- documentos ----------
+def recibo(abono_id, carpeta=os.path.join(DOCUMENTOS_DIR, "recibos")):
+    """Genera el recibo del abono `abono_id` y devuelve la ruta del PDF."""
+    abonos = obtener_abonos_desde(None, abono_id - 1, 1)
+    if not abonos or abonos[0]["id"] != abono_id:
+        raise ValueError(f"No existe el abono N° {abono_id}.")
+    abono = abonos[0]
+    cuentas = obtener_cuentas_de([abono["contrato_id"]])
+    documento = _documento("recibo", f"Recibo N° {abono_id}")
+    documento.paginas.extend(plantilla("recibo").paginas(datos_recibo(abono, cuentas[0] if cuentas else None)))
+    return _guardar(documento, carpeta, f"recibo_{abono_id:06d}.pdf")
+
+
+def documento_contrato(contrato_id, carpeta=os.path.join(DOCUMENTOS_DIR, "contratos")):
+    """Genera el documento del contrato `contrato_id` (con sus afiliados) y devuelve la ruta del PDF."""
+    contrato = obtener_contrato_por_id(contrato_id)
+    if not contrato:
+        raise ValueError(f"No existe el contrato N° {contrato_id}.")
+    documento = _documento("contrato", f"Contrato N° {contrato_id}")
+    documento.paginas.extend(plantilla("contrato").paginas(datos_contrato(contrato)))
+    return _guardar(documento, carpeta, f"contrato_{contrato_id:06d}.pdf")
+
+
+def _flujos_recibos(lote):
+    """En un proceso aparte: las páginas de los recibos de `lote` ya listas para agregar_flujo."""
+    compilada = plantilla("recibo")
+    return [flujo(pagina.contenido()) for datos in lote for pagina in compilada.paginas(datos)]
+
+
+def reimprimir_recibos(ruta, desde, hasta=None, cobrador=None, procesos=None):
+    """Todos los recibos de los días [desde, hasta] en un PDF (uno por hoja); devuelve cuántos son.
+
+    Con muchos recibos las hojas se arman en `procesos` procesos (por defecto
+    uno por núcleo); el estado de cuenta de cada recibo es el de hoy.
+    """
+    abonos = obtener_abonos_entre(desde, hasta, cobrador)
+    if not abonos:
+        raise ValueError("No hay abonos en esas fechas.")
+    cuentas = {c["id"]: c for c in obtener_cuentas_de(list({a["contrato_id"] for a in abonos}))}
+    impreso = datetime.now()
+    lista = [datos_recibo(a, cuentas.get(a["contrato_id"]), impreso) for a in abonos]
+
+    documento = _documento("recibo", f"Recibos del {desde} al {hasta or desde}")
+    procesos = procesos or os.cpu_count() or 1
+    if procesos == 1 or len(lista) < MINIMO_PROCESOS:
+        compilada = plantilla("recibo")
+        for datos in lista:
+            documento.paginas.extend(compilada.paginas(datos))
+    else:
+        tamano = -(-len(lista) // (procesos * 4))  # unos lotes por proceso, para repartir parejo
+        lotes = [lista[i:i + tamano] for i in range(0, len(lista), tamano)]
+        # "spawn": el proceso nuevo no hereda los hilos ni la ventana de Tk de este
+        with ProcessPoolExecutor(procesos, mp_context=get_context("spawn")) as pool:
+            for flujos in pool.map(_flujos_recibos, lotes):
+                for flujo_pagina in flujos:
+                    documento.agregar_flujo(flujo_pagina)
+    documento.guardar(ruta)
+    return len(lista)
+
+
+def abrir(ruta):
+    """Abre el PDF con el visor del sistema; False si no hay con qué abrirlo."""
+    try:
+        if sys.platform.startswith("win"):
+            os.startfile(ruta)
+        else:
+            subprocess.Popen(["open" if sys.platform == "darwin" else "xdg-open", ruta],
+                             stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return True
+    except OSError:
+        return False
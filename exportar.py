@@ -0,0 +1,181 @@
+# exportar.py
+"""Exportación de abonos y listados a CSV, XLSX o Parquet en memoria constante.
+
+Las filas salen de la base por lotes con paginación por id
+(`obtener_abonos_desde`) y se escriben a medida que llegan, así que exportar
+todo el historial usa la misma memoria que exportar un solo contrato. El
+archivo se escribe con otro nombre y se renombra al terminar: si la
+exportación se cancela o falla no queda un archivo a medias.
+"""
+import csv
+import io
+import os
+
+from almacenamiento import contadores
+from database import contar_abonos, obtener_abonos_desde
+
+try:
+    import openpyxl
+    OPENPYXL_AVAILABLE = True
+except Exception:
+    OPENPYXL_AVAILABLE = False
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except Exception:
+    PYARROW_AVAILABLE = False
+
+LOTE = 2000
+
+COLUMNAS_ABONOS = [("id", "ID Abono"), ("contrato_id", "ID Contrato"), ("nombre", "Nombre"), ("cedula", "Cédula"),
+                   ("fecha", "Fecha"), ("monto", "Monto"), ("observacion", "Observación"), ("cobrador", "Cobrador")]
+
+
+class ExportacionCancelada(Exception):
+    pass
+
+
+def tipos_de_archivo():
+    """Opciones para `filedialog.asksaveasfilename`, solo con los formatos que se pueden escribir."""
+    tipos = [("CSV", "*.csv")]
+    if OPENPYXL_AVAILABLE:
+        tipos.append(("Excel", "*.xlsx"))
+    if PYARROW_AVAILABLE:
+        tipos.append(("Parquet", "*.parquet"))
+    return tipos
+
+
+# ---------- origen de las filas ----------
+def lotes_abonos(filtro=None, lote=LOTE):
+    """Abonos unidos con su contrato, de `lote` en `lote` y en orden de id."""
+    ultimo = 0
+    while True:
+        filas = obtener_abonos_desde(filtro, ultimo, lote)
+        if filas:
+            yield filas
+        if len(filas) < lote:
+            return
+        ultimo = filas[-1]["id"]
+
+
+def lotes_de_lista(filas, lote=LOTE):
+    """Una lista ya en memoria (por ejemplo, el reporte de morosos) partida en lotes."""
+    for i in range(0, len(filas), lote):
+        yield filas[i:i + lote]
+
+
+# ---------- escritores ----------
+def lineas_csv(columnas, lotes, avanzar=None):
+    """Texto CSV (encabezado y luego un bloque por lote) para escribir o enviar por partes."""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow([t for _, t in columnas])
+    for filas in lotes:
+        escritor.writerows([f.get(k) for k, _ in columnas] for f in filas)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        if avanzar:
+            avanzar(len(filas))
+    if buffer.tell():
+        yield buffer.getvalue()  # solo encabezado: no hubo filas
+
+
+def _escribir_csv(ruta, columnas, lotes, avanzar):
+    with open(ruta, "w", newline="", encoding="utf-8") as f:
+        for texto in lineas_csv(columnas, lotes, avanzar):
+            f.write(texto)
+
+
+def _escribir_xlsx(ruta, columnas, lotes, avanzar):
+    # en modo write_only openpyxl vuelca cada fila a disco y no arma la hoja en memoria
+    libro = openpyxl.Workbook(write_only=True)
+    hoja = libro.create_sheet("Datos")
+    hoja.append([t for _, t in columnas])
+    for filas in lotes:
+        for f in filas:
+            hoja.append([f.get(k) for k, _ in columnas])
+        avanzar(len(filas))
+    libro.save(ruta)
+
+
+def _tipo_parquet(columna, filas):
+    valor = next((f.get(columna) for f in filas if f.get(columna) is not None), None)
+    if isinstance(valor, bool):
+        return pa.bool_()
+    if isinstance(valor, int):
+        return pa.int64()
+    if isinstance(valor, float):
+        return pa.float64()
+    return pa.string()
+
+
+def _escribir_parquet(ruta, columnas, lotes, avanzar):
+    escritor = None
+    try:
+        for filas in lotes:
+            if escritor is None:
+                esquema = pa.schema([(k, _tipo_parquet(k, filas)) for k, _ in columnas])
+                escritor = pq.ParquetWriter(ruta, esquema)
+            datos = {k: [f.get(k) for f in filas] for k, _ in columnas}
+            escritor.write_table(pa.Table.from_pydict(datos, schema=escritor.schema))
+            avanzar(len(filas))
+        if escritor is None:
+            pq.write_table(pa.table({k: pa.array([], pa.string()) for k, _ in columnas}), ruta)
+    finally:
+        if escritor is not None:
+            escritor.close()
+
+
+_ESCRITORES = {".csv": _escribir_csv, ".xlsx": _escribir_xlsx, ".parquet": _escribir_parquet}
+
+
+def _escritor_para(ruta):
+    extension = os.path.splitext(ruta)[1].lower()
+    if extension == ".xlsx" and not OPENPYXL_AVAILABLE:
+        raise ValueError("Para exportar a Excel instale openpyxl.")
+    if extension == ".parquet" and not PYARROW_AVAILABLE:
+        raise ValueError("Para exportar a Parquet instale pyarrow.")
+    return _ESCRITORES.get(extension, _escribir_csv)
+
+
+# ---------- exportación ----------
+def exportar(ruta, columnas, lotes, total=None, al_avanzar=None, cancelar=None):
+    """Escribe `lotes` en `ruta` (formato según la extensión; CSV si no se reconoce).
+
+    `columnas` son pares (clave, título). `al_avanzar(hechas, total)` se llama
+    después de cada lote, desde el mismo hilo que exporta. Si `cancelar` (un
+    threading.Event) se activa, se detiene en el lote siguiente con
+    ExportacionCancelada. Devuelve la cantidad de filas escritas.
+    """
+    escribir = _escritor_para(ruta)
+    raiz, extension = os.path.splitext(ruta)
+    temporal = f"{raiz}.parcial{extension}"
+    hechas = 0
+
+    def avanzar(n):
+        nonlocal hechas
+        hechas += n
+        if al_avanzar:
+            al_avanzar(hechas, total)
+        if cancelar is not None and cancelar.is_set():
+            raise ExportacionCancelada()
+
+    try:
+        escribir(temporal, columnas, lotes, avanzar)
+        os.replace(temporal, ruta)
+        contadores.sumar("exportacion", escritos=os.path.getsize(ruta))
+    except BaseException:
+        try:
+            os.remove(temporal)
+        except OSError:
+            pass
+        raise
+    return hechas
+
+
+def exportar_abonos(ruta, filtro=None, al_avanzar=None, cancelar=None):
+    """Todos los abonos que cumplen `filtro` (el mismo dict de la búsqueda en pantalla)."""
+    return exportar(ruta, COLUMNAS_ABONOS, lotes_abonos(filtro), contar_abonos(filtro), al_avanzar, cancelar)
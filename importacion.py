@@ -0,0 +1,321 @@
+# importacion.py
+"""Importación en bloque de contratos (con afiliados) y abonos desde CSV o JSON.
+
+Cada fila se valida por separado y luego se revisa contra un índice de
+cédulas e ids ya registrados (y contra las demás filas del archivo). Todo
+lo aceptado entra con una sola llamada a `importar_datos`: una transacción
+en SQLite, una sola reescritura en los motores JSON, y un solo respaldo al
+final. Las filas rechazadas vuelven con el motivo.
+
+Uso:
+    python -m importacion contratos.csv abonos.csv --rechazos rechazos.csv
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import time
+import unicodedata
+from datetime import datetime
+from functools import lru_cache
+
+from almacenamiento.base import CAMPOS_AFILIADO, ESTADOS
+from database import importar_en_bloque
+
+MAX_AFILIADOS = 10
+
+# encabezados alternativos, incluidos los títulos de los CSV que exporta el sistema
+_ALIAS = {"id_contrato": "contrato_id", "id_abono": "id", "contrato": "contrato_id", "observaciones": "observacion",
+          "fecha_de_inicio": "fecha_inicio", "inicio": "fecha_inicio", "cuota": "mensualidad"}
+
+
+# ---------- lectura ----------
+def _clave(encabezado):
+    texto = unicodedata.normalize("NFKD", str(encabezado or "").strip().lower())
+    texto = "".join(ch for ch in texto if not unicodedata.combining(ch)).replace(" ", "_").replace(".", "")
+    return _ALIAS.get(texto, texto)
+
+
+def _leer_csv(ruta):
+    # utf-8-sig: los CSV guardados desde Excel empiezan con BOM; Excel en español separa con ";"
+    with open(ruta, "r", newline="", encoding="utf-8-sig") as f:
+        muestra = f.read(4096)
+        f.seek(0)
+        try:
+            dialecto = csv.Sniffer().sniff(muestra, delimiters=",;\t")
+        except csv.Error:
+            dialecto = csv.excel
+        lector = csv.reader(f, dialecto)
+        encabezado = [_clave(e) for e in next(lector, [])]
+        filas = [dict(zip(encabezado, fila)) for fila in lector if any(v.strip() for v in fila)]
+    if "monto" in encabezado:
+        return [], filas
+    return filas, []
+
+
+def _leer_json(ruta):
+    with open(ruta, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        return data, []
+    return data.get("contratos", []), data.get("abonos", [])
+
+
+def leer_archivo(ruta):
+    """(contratos, abonos) de un archivo: JSON como contratos.json (o una lista de contratos) o CSV.
+
+    Un CSV con columna "monto" se toma como abonos y si no, como contratos.
+    """
+    if os.path.splitext(ruta)[1].lower() == ".json":
+        return _leer_json(ruta)
+    return _leer_csv(ruta)
+
+
+# ---------- validación de una fila ----------
+def _texto(fila, campo):
+    valor = fila.get(campo)
+    return "" if valor is None else str(valor).strip()
+
+
+def _numero(texto):
+    texto = str(texto).strip().replace(" ", "")
+    if "," in texto and "." not in texto:
+        texto = texto.replace(",", ".")  # 12,50
+    elif "," in texto:
+        texto = texto.replace(",", "")  # 1,234.50
+    return float(texto)
+
+
+def _entero(texto):
+    texto = str(texto).strip()
+    return int(float(texto)) if texto else None
+
+
+_FECHA = re.compile(r"(?:(\d{4})-(\d{1,2})-(\d{1,2})|(\d{1,2})/(\d{1,2})/(\d{4}))"
+                    r"(?:[ T](\d{1,2}):(\d{2})(?::(\d{2}))?)?")
+
+
+@lru_cache(maxsize=8192)
+def _fecha(texto, con_hora):
+    """ISO (con o sin hora) o dd/mm/yyyy, devuelta en ISO; ValueError si no se entiende.
+
+    Con una expresión regular y caché: strptime probando formatos era lo más
+    lento de validar, y en un archivo las mismas fechas se repiten mucho.
+    """
+    m = _FECHA.fullmatch(texto.strip())
+    if m is None:
+        raise ValueError(f"fecha inválida: {texto!r}")
+    anio, mes, dia = (m[1], m[2], m[3]) if m[1] else (m[6], m[5], m[4])
+    try:
+        fecha = datetime(int(anio), int(mes), int(dia), int(m[7] or 0), int(m[8] or 0), int(m[9] or 0))
+    except ValueError:
+        raise ValueError(f"fecha inválida: {texto!r}") from None
+    if con_hora and m[7]:
+        return fecha.strftime("%Y-%m-%d %H:%M:%S")
+    return fecha.strftime("%Y-%m-%d")
+
+
+def _afiliados(valor):
+    if valor in (None, ""):
+        return []
+    lista = json.loads(valor) if isinstance(valor, str) else valor
+    if not isinstance(lista, list):
+        raise ValueError("afiliados debe ser una lista")
+    if len(lista) > MAX_AFILIADOS:
+        raise ValueError(f"más de {MAX_AFILIADOS} afiliados")
+    afiliados = []
+    for a in lista:
+        afiliado = {k: _texto(a, k) for k in CAMPOS_AFILIADO}
+        if not afiliado["nombre"]:
+            raise ValueError("afiliado sin nombre")
+        afiliados.append(afiliado)
+    return afiliados
+
+
+def validar_contrato(fila, hoy):
+    """Contrato listo para guardar a partir de una fila; ValueError con el motivo si no sirve."""
+    contrato = {k: _texto(fila, k) for k in ("nombre", "cedula", "direccion", "telefono", "plan")}
+    faltan = [k for k in ("nombre", "cedula", "plan") if not contrato[k]]
+    if faltan or _texto(fila, "mensualidad") == "":
+        raise ValueError("faltan campos obligatorios: " + ", ".join(faltan or ["mensualidad"]))
+    try:
+        contrato["mensualidad"] = _numero(fila["mensualidad"])
+    except ValueError:
+        raise ValueError(f"mensualidad inválida: {fila['mensualidad']!r}") from None
+    if contrato["mensualidad"] < 0:
+        raise ValueError("mensualidad negativa")
+    # "Fecha" es el título de esa columna en la lista de contratos exportada
+    inicio = _texto(fila, "fecha_inicio") or _texto(fila, "fecha")
+    contrato["fecha_inicio"] = _fecha(inicio, False) if inicio else hoy
+    estado = _texto(fila, "estado").capitalize() or "Activo"
+    if estado not in ESTADOS:
+        raise ValueError(f"estado inválido: {estado!r}")
+    contrato["estado"] = estado
+    try:
+        contrato["afiliados"] = _afiliados(fila.get("afiliados"))
+    except (TypeError, AttributeError, json.JSONDecodeError):
+        raise ValueError("afiliados ilegibles") from None
+    try:
+        contrato["id"] = _entero(_texto(fila, "id"))
+    except ValueError:
+        raise ValueError(f"ID inválido: {fila['id']!r}") from None
+    if contrato["id"] is not None and contrato["id"] <= 0:
+        raise ValueError("ID inválido")
+    return contrato
+
+
+def validar_abono(fila):
+    """Abono (con `contrato_id` o `cedula` para ubicar su contrato); ValueError si no sirve."""
+    try:
+        abono = {"contrato_id": _entero(_texto(fila, "contrato_id")), "cedula": _texto(fila, "cedula")}
+    except ValueError:
+        raise ValueError(f"ID de contrato inválido: {fila['contrato_id']!r}") from None
+    if abono["contrato_id"] is None and not abono["cedula"]:
+        raise ValueError("falta el ID de contrato o la cédula")
+    try:
+        abono["monto"] = _numero(fila.get("monto", ""))
+    except ValueError:
+        raise ValueError(f"monto inválido: {fila.get('monto')!r}") from None
+    if abono["monto"] <= 0:
+        raise ValueError("el monto debe ser mayor que cero")
+    abono["fecha"] = _fecha(_texto(fila, "fecha"), True)
+    abono["observacion"] = _texto(fila, "observacion")
+    abono["cobrador"] = _texto(fila, "cobrador")
+    return abono
+
+
+def validar_filas(tipo, filas, hoy):
+    """[(dato, None) o (None, motivo)] por fila, en el mismo orden."""
+    resultado = []
+    for fila in filas:
+        try:
+            if not isinstance(fila, dict):
+                raise ValueError("fila ilegible")
+            resultado.append((validar_contrato(fila, hoy) if tipo == "contrato" else validar_abono(fila), None))
+        except (ValueError, KeyError) as e:
+            resultado.append((None, str(e)))
+    return resultado
+
+
+# ---------- duplicados e ids ----------
+def _rechazo(origen, tipo, motivo):
+    return {"archivo": origen[0], "fila": origen[1], "tipo": tipo, "motivo": motivo}
+
+
+def _revisar(contratos, abonos, claves, rechazos):
+    """Descarta duplicados contra `claves` (id, cédula) y asigna el id final de cada contrato.
+
+    Los ids se fijan aquí, con la escritura tomada, para poder ubicar los
+    abonos del mismo archivo por el id original o por la cédula.
+    """
+    por_cedula, ids = {}, set()
+    for contrato_id, cedula in claves:
+        ids.add(contrato_id)
+        por_cedula.setdefault(str(cedula).strip(), contrato_id)
+    en_archivo, rechazados, aceptados = {}, set(), []
+
+    for origen, c in contratos:
+        if c["cedula"] in por_cedula:
+            motivo = (f"cédula repetida en la fila {en_archivo[c['cedula']][1]}" if c["cedula"] in en_archivo
+                      else f"cédula ya registrada en el contrato {por_cedula[c['cedula']]}")
+        elif c["id"] is not None and c["id"] in ids:
+            motivo = f"el ID {c['id']} ya existe"
+        else:
+            if c["id"] is not None:
+                ids.add(c["id"])
+            por_cedula[c["cedula"]] = c["id"]
+            en_archivo[c["cedula"]] = origen
+            aceptados.append(c)
+            continue
+        rechazos.append(_rechazo(origen, "contrato", motivo))
+        if c["id"] is not None:
+            rechazados.add(c["id"])
+
+    siguiente = max(ids, default=0) + 1
+    por_id_archivo = {}
+    for c in aceptados:
+        original = c["id"]
+        if original is None:
+            c["id"] = siguiente
+            siguiente += 1
+            por_cedula[c["cedula"]] = c["id"]
+        else:
+            por_id_archivo[original] = c["id"]
+
+    listos = []
+    for origen, a in abonos:
+        if a["contrato_id"] is not None:
+            if contratos:
+                # si el archivo trae contratos, los abonos usan sus ids
+                contrato_id = por_id_archivo.get(a["contrato_id"])
+                motivo = ("su contrato fue rechazado" if a["contrato_id"] in rechazados
+                          else f"no hay contrato con ID {a['contrato_id']} en el archivo")
+            else:
+                contrato_id = a["contrato_id"] if a["contrato_id"] in ids else None
+                motivo = f"no existe el contrato {a['contrato_id']}"
+        else:
+            contrato_id = por_cedula.get(a["cedula"])
+            motivo = f"no hay contrato con cédula {a['cedula']}"
+        if contrato_id is None:
+            rechazos.append(_rechazo(origen, "abono", motivo))
+            continue
+        listos.append({"contrato_id": contrato_id, "fecha": a["fecha"], "monto": a["monto"],
+                       "observacion": a["observacion"], "cobrador": a["cobrador"]})
+    return {"contratos": aceptados, "abonos": listos}
+
+
+# ---------- importación ----------
+def importar_archivos(rutas):
+    """Importa juntos los archivos indicados (así los abonos pueden referirse a contratos nuevos).
+
+    Devuelve {"contratos", "abonos", "rechazos", "segundos"}; cada rechazo
+    trae "archivo", "fila", "tipo" y "motivo", en el orden de los archivos.
+    """
+    inicio = time.perf_counter()
+    hoy = datetime.now().strftime("%Y-%m-%d")
+    contratos, abonos, rechazos = [], [], []
+    posicion = {}
+    for ruta in rutas:
+        nombre = os.path.basename(ruta)
+        posicion.setdefault(nombre, len(posicion))
+        filas_c, filas_a = leer_archivo(ruta)
+        # en CSV la fila 1 es el encabezado
+        primera = 1 if ruta.lower().endswith(".json") else 2
+        for tipo, filas, destino in (("contrato", filas_c, contratos), ("abono", filas_a, abonos)):
+            for n, (dato, motivo) in enumerate(validar_filas(tipo, filas, hoy), primera):
+                if motivo is None:
+                    destino.append(((nombre, n), dato))
+                else:
+                    rechazos.append(_rechazo((nombre, n), tipo, motivo))
+
+    importado = importar_en_bloque(lambda claves: _revisar(contratos, abonos, claves, rechazos))
+    rechazos.sort(key=lambda r: (posicion[r["archivo"]], r["fila"]))
+    return {"contratos": len(importado["contratos"]), "abonos": len(importado["abonos"]),
+            "rechazos": rechazos, "segundos": round(time.perf_counter() - inicio, 2)}
+
+
+def guardar_rechazos(ruta, rechazos):
+    with open(ruta, "w", newline="", encoding="utf-8") as f:
+        escritor = csv.writer(f)
+        escritor.writerow(["Archivo", "Fila", "Tipo", "Motivo"])
+        escritor.writerows((r["archivo"], r["fila"], r["tipo"], r["motivo"]) for r in rechazos)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Importa contratos y abonos en bloque desde CSV o JSON.")
+    parser.add_argument("archivos", nargs="+", help="archivos .csv o .json")
+    parser.add_argument("--rechazos", help="CSV donde guardar las filas rechazadas")
+    args = parser.parse_args(argv)
+
+    r = importar_archivos(args.archivos)
+    print(f"{r['contratos']} contratos y {r['abonos']} abonos importados en {r['segundos']} s, "
+          f"{len(r['rechazos'])} filas rechazadas")
+    if args.rechazos and r["rechazos"]:
+        guardar_rechazos(args.rechazos, r["rechazos"])
+    for rechazo in r["rechazos"][:20]:
+        print(f"  {rechazo['archivo']}, fila {rechazo['fila']} ({rechazo['tipo']}): {rechazo['motivo']}")
+
+
+if __name__ == "__main__":
+    main()
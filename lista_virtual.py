@@ -0,0 +1,284 @@
+# lista_virtual.py
+"""Treeview virtual: solo existen en Tk las filas visibles.
+
+Los datos se piden por páginas (offset/limite) a medida que el usuario se
+desplaza, y el orden por columna lo resuelve el almacenamiento. Después de
+una escritura se pueden corregir filas sueltas (`actualizar_filas`,
+`agregar_al_final`) sin volver a pedir las páginas, y al pintar solo se
+tocan los ítems del Treeview cuyo contenido cambió.
+"""
+import tkinter as tk
+from collections import OrderedDict
+from tkinter import ttk
+
+TAMANO_PAGINA = 200
+PAGINAS_EN_CACHE = 8
+ALTO_FILA = 20
+ALTO_ENCABEZADO = 25
+
+
+class ListaVirtual(tk.Frame):
+    """`columnas` es una lista de (clave, título).
+
+    `contar()` devuelve el total de filas y `pagina(offset, limite, orden, descendente)`
+    devuelve una lista de tuplas en el orden de `columnas`. Con un `ejecutor`
+    (tareas.EjecutorTareas) ambas corren en segundo plano: mientras llega una
+    página se muestran filas vacías.
+    """
+
+    def __init__(self, parent, columnas, contar, pagina, orden="id", ejecutor=None, **kw):
+        super().__init__(parent, **kw)
+        self.columnas = columnas
+        self._contar = contar
+        self._pagina = pagina
+        self.ejecutor = ejecutor
+        # sube en cada recarga/orden para descartar páginas pedidas antes
+        self._generacion = 0
+        self._pendientes = set()
+        self.orden = orden
+        self.descendente = False
+        self.total = 0
+        self.inicio = 0
+        self.visibles = 1
+        self._paginas = OrderedDict()
+        self._seleccion = None
+        # lo último pintado en cada ítem, para no reconfigurar los que no cambian
+        self._pintadas = []
+
+        self.titulos = [t for _, t in columnas]
+        self.tree = ttk.Treeview(self, columns=self.titulos, show="headings", height=1, selectmode="browse")
+        for clave, titulo in columnas:
+            self.tree.heading(titulo, text=titulo, command=lambda c=clave: self.ordenar_por(c))
+            self.tree.column(titulo, width=130)
+        self.barra = ttk.Scrollbar(self, orient="vertical", command=self._desplazar)
+        self.barra.pack(side="right", fill="y")
+        self.tree.pack(side="left", fill="both", expand=True)
+
+        self.tree.bind("<Configure>", self._al_redimensionar)
+        self.tree.bind("<<TreeviewSelect>>", self._al_seleccionar)
+        self.tree.bind("<MouseWheel>", lambda e: self._mover(-3 if e.delta > 0 else 3))
+        self.tree.bind("<Button-4>", lambda e: self._mover(-3))
+        self.tree.bind("<Button-5>", lambda e: self._mover(3))
+        self.tree.bind("<Up>", lambda e: self._teclado(-1))
+        self.tree.bind("<Down>", lambda e: self._teclado(1))
+        self.tree.bind("<Prior>", lambda e: self._teclado(-self.visibles))
+        self.tree.bind("<Next>", lambda e: self._teclado(self.visibles))
+
+    # --- datos ---
+    def recargar(self):
+        """Vuelve a contar y descarta las páginas en caché (tras un cambio o filtro)."""
+        self._generacion += 1
+        self._pendientes.clear()
+        if self.ejecutor is None:
+            self._al_contar(self._generacion, self._contar())
+        else:
+            generacion = self._generacion
+            self.ejecutor.ejecutar(self._contar, grupo=("conteo", id(self)),
+                                   al_terminar=lambda total: self._al_contar(generacion, total))
+
+    def _al_contar(self, generacion, total):
+        if generacion != self._generacion:
+            return
+        self._paginas.clear()
+        self.total = total
+        self.inicio = max(0, min(self.inicio, self.total - self.visibles))
+        self._pintar()
+
+    def _al_llegar_pagina(self, generacion, numero, filas):
+        self._pendientes.discard((generacion, numero))
+        if generacion != self._generacion:
+            return
+        self._guardar_pagina(numero, filas)
+        self._pintar()
+
+    def _guardar_pagina(self, numero, filas):
+        self._paginas[numero] = filas
+        if len(self._paginas) > PAGINAS_EN_CACHE:
+            self._paginas.popitem(last=False)
+
+    def _descartar_pendientes(self):
+        # las páginas pedidas antes del cambio traerían datos viejos: que se descarten al llegar
+        self._generacion += 1
+        self._pendientes.clear()
+
+    def actualizar_filas(self, filas):
+        """Corrige en las páginas cargadas las filas cuya primera columna está en `filas`.
+
+        `filas` es {clave: tupla nueva o None}; None quita la fila (las de
+        abajo suben una posición). Devuelve las claves que no estaban en las
+        páginas cargadas: si alguna debería aparecer, le toca al frame recargar.
+        """
+        pendientes = dict(filas)
+        quitar = []
+        for numero, pagina in self._paginas.items():
+            for i, fila in enumerate(pagina):
+                if fila[0] in pendientes:
+                    nueva = pendientes.pop(fila[0])
+                    if nueva is None:
+                        quitar.append((numero, i))
+                    else:
+                        pagina[i] = nueva
+        # de la última a la primera: quitar una fila solo mueve las que están debajo
+        for numero, i in sorted(quitar, reverse=True):
+            self._quitar(numero, i)
+        if len(pendientes) < len(filas):
+            self._descartar_pendientes()
+            self.inicio = max(0, min(self.inicio, self.total - self.visibles))
+            self._pintar()
+        return set(pendientes)
+
+    def _quitar(self, numero, indice):
+        """Quita una fila y sube las siguientes, completando cada página con la primera de la que sigue."""
+        pagina = self._paginas.get(numero)
+        if pagina is not None:
+            del pagina[indice]
+        self.total -= 1
+        ultima = max(0, self.total - 1) // TAMANO_PAGINA
+        while pagina is not None:
+            siguiente = self._paginas.get(numero + 1)
+            if siguiente is None:
+                if numero < ultima:
+                    del self._paginas[numero]  # quedó corta y no hay con qué completarla: se vuelve a pedir
+                break
+            if siguiente:
+                pagina.append(siguiente.pop(0))
+            numero, pagina = numero + 1, siguiente
+        # las páginas después de un hueco quedaron corridas una fila, y las de más allá del final sobran
+        for n in [n for n in self._paginas if n > numero or n > ultima]:
+            del self._paginas[n]
+
+    def agregar_al_final(self, cantidad):
+        """`cantidad` filas nuevas que en el orden actual van después de todas (p. ej. ids nuevos por id ascendente)."""
+        if cantidad <= 0:
+            return
+        # la última página cargada puede estar incompleta: se vuelve a pedir si hace falta
+        for numero in [n for n in self._paginas if n >= self.total // TAMANO_PAGINA]:
+            del self._paginas[numero]
+        self.total += cantidad
+        self._descartar_pendientes()
+        self._pintar()
+
+    def ordenar_por(self, clave):
+        self.descendente = not self.descendente if clave == self.orden else False
+        self.orden = clave
+        self.inicio = 0
+        for c, titulo in self.columnas:
+            flecha = (" ▼" if self.descendente else " ▲") if c == clave else ""
+            self.tree.heading(titulo, text=titulo + flecha)
+        self.recargar()
+
+    def _filas(self, inicio, cantidad):
+        filas = []
+        posicion = inicio
+        fin = min(inicio + cantidad, self.total)
+        while posicion < fin:
+            numero = posicion // TAMANO_PAGINA
+            pagina = self._paginas.get(numero)
+            if pagina is None and self.ejecutor is not None:
+                self._pedir_pagina(numero)
+                hasta = min(fin, (numero + 1) * TAMANO_PAGINA)
+                filas.extend([("",) * len(self.columnas)] * (hasta - posicion))
+                posicion = hasta
+                continue
+            if pagina is None:
+                pagina = self._pagina(numero * TAMANO_PAGINA, TAMANO_PAGINA, self.orden, self.descendente)
+                self._guardar_pagina(numero, pagina)
+            else:
+                self._paginas.move_to_end(numero)
+            desde = posicion - numero * TAMANO_PAGINA
+            trozo = pagina[desde:desde + fin - posicion]
+            if not trozo:
+                break  # el almacenamiento tiene menos filas que el conteo (cambió entre medio)
+            filas.extend(trozo)
+            posicion += len(trozo)
+        return filas
+
+    def _pedir_pagina(self, numero):
+        clave = (self._generacion, numero)
+        if clave in self._pendientes:
+            return
+        self._pendientes.add(clave)
+        generacion = self._generacion
+        self.ejecutor.ejecutar(self._pagina, numero * TAMANO_PAGINA, TAMANO_PAGINA, self.orden, self.descendente,
+                               al_terminar=lambda filas: self._al_llegar_pagina(generacion, numero, filas),
+                               al_fallar=lambda e: self._pendientes.discard(clave))
+
+    # --- dibujo ---
+    def _pintar(self):
+        filas = self._filas(self.inicio, self.visibles)
+        pintadas = self._pintadas
+        for i, valores in enumerate(filas):
+            if i >= len(pintadas):
+                self.tree.insert("", tk.END, iid=str(i), values=valores)
+            elif pintadas[i] != valores:
+                self.tree.item(str(i), values=valores)
+        for i in range(len(filas), len(pintadas)):
+            self.tree.delete(str(i))
+        self._pintadas = list(filas)
+
+        marcada = next((str(i) for i, v in enumerate(filas) if self._seleccion and str(v[0]) == self._seleccion), None)
+        if marcada is not None:
+            self.tree.selection_set(marcada)
+            self.tree.focus(marcada)
+        elif self.tree.selection():
+            self.tree.selection_remove(self.tree.selection())
+
+        if self.total:
+            self.barra.set(self.inicio / self.total, min(1.0, (self.inicio + self.visibles) / self.total))
+        else:
+            self.barra.set(0.0, 1.0)
+
+    def _al_redimensionar(self, event):
+        visibles = max(1, (event.height - ALTO_ENCABEZADO) // ALTO_FILA)
+        if visibles != self.visibles:
+            self.visibles = visibles
+            self.inicio = max(0, min(self.inicio, self.total - self.visibles))
+            self._pintar()
+
+    def _al_seleccionar(self, event):
+        sel = self.tree.selection()
+        if sel:
+            clave = str(self.tree.item(sel[0], "values")[0])
+            if clave:  # las filas vacías (página en camino) no cuentan como selección
+                self._seleccion = clave
+
+    # --- desplazamiento ---
+    def _ir_a(self, inicio):
+        inicio = max(0, min(inicio, self.total - self.visibles))
+        if inicio != self.inicio:
+            self.inicio = inicio
+            self._pintar()
+
+    def _mover(self, filas):
+        self._ir_a(self.inicio + filas)
+        return "break"
+
+    def _desplazar(self, accion, cantidad, unidad=None):
+        if accion == "moveto":
+            self._ir_a(int(float(cantidad) * self.total))
+        elif unidad == "pages":
+            self._mover(int(cantidad) * self.visibles)
+        else:
+            self._mover(int(cantidad))
+
+    def _teclado(self, delta):
+        sel = self.tree.selection()
+        actual = self.tree.index(sel[0]) if sel else 0
+        destino = actual + delta
+        if destino < 0 or destino >= self.visibles:
+            self._mover(delta)
+            destino = max(0, min(destino, len(self.tree.get_children()) - 1))
+        children = self.tree.get_children()
+        if children:
+            destino = max(0, min(destino, len(children) - 1))
+            self.tree.selection_set(children[destino])
+            self.tree.focus(children[destino])
+        return "break"
+
+    # --- consultas para los frames ---
+    def valores_seleccionados(self):
+        sel = self.tree.selection()
+        if not sel:
+            return None
+        valores = self.tree.item(sel[0])["values"]
+        return valores if valores and valores[0] != "" else None
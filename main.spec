@@ -1,4 +1,14 @@
 # -*- mode: python ; coding: utf-8 -*-
+# Ejecutable de escritorio. Medir el arranque con:
+#   python -m benchmarks.bench_arranque --ejecutable dist/main.exe
+
+# la API (backend_main.py) se empaqueta aparte; nada de esto lo usa la aplicación de escritorio
+EXCLUIR = [
+    'fastapi', 'starlette', 'pydantic', 'pydantic_core', 'uvicorn', 'anyio', 'httpx', 'h11',
+    'backend_main', 'routers', 'benchmarks',
+    'unittest', 'doctest', 'pydoc', 'pdb', 'lib2to3', 'xmlrpc', 'test', 'tkinter.test', 'idlelib',
+    'matplotlib', 'scipy', 'pandas', 'IPython',
+]
 
 
 a = Analysis(
@@ -6,11 +16,12 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[],
-    hiddenimports=[],
+    # almacenamiento importa cada motor por nombre al pedirlo (PyInstaller no lo ve solo)
+    hiddenimports=['almacenamiento.motor_sqlite', 'almacenamiento.motor_json', 'almacenamiento.motor_diario'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    excludes=EXCLUIR,
     noarchive=False,
     optimize=0,
 )
@@ -26,7 +37,8 @@ exe = EXE(
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
+    # sin UPX: en cada arranque onefile habría que descomprimir además cada DLL
+    upx=False,
     upx_exclude=[],
     runtime_tmpdir=None,
     console=False,
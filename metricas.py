@@ -0,0 +1,188 @@
+# metricas.py
+"""Instrumentación opcional: tiempos por operación, bytes de archivo y perfil de la sesión.
+
+- CRISTOREY_METRICAS=1 activa los tiempos: cada función de database.py,
+  cada manejador de las pantallas de main.py, cada tarea en segundo plano
+  y cada petición a la API quedan en un histograma con las últimas
+  VENTANA duraciones. Se ven en la pantalla oculta "Diagnóstico"
+  (Ctrl+Shift+D) y en GET /metrics. Desactivado, `medido` devuelve la
+  misma función sin envolver: no cuesta nada.
+- CRISTOREY_PERFIL=sesion.prof guarda al salir un perfil cProfile de toda
+  la sesión (hilo de Tk y los hilos de la base); se lee con
+  `python -m pstats sesion.prof`.
+
+Los bytes leídos y escritos se cuentan siempre (almacenamiento.contadores).
+"""
+import atexit
+import cProfile
+import functools
+import os
+import threading
+import time
+import types
+from collections import deque
+
+from almacenamiento import contadores
+
+HABILITADO = os.environ.get("CRISTOREY_METRICAS", "") not in ("", "0")
+RUTA_PERFIL = os.environ.get("CRISTOREY_PERFIL") or None
+
+VENTANA = 1000
+# límites superiores de los tramos del histograma, en segundos
+TRAMOS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+INICIO = time.time()
+
+
+# ---------- histogramas ----------
+class Histograma:
+    """Últimas VENTANA duraciones de una operación, más cuenta, suma y errores desde el arranque."""
+
+    def __init__(self):
+        self.muestras = deque(maxlen=VENTANA)
+        self.cuenta = 0
+        self.suma = 0.0
+        self.errores = 0
+
+    def registrar(self, segundos, error=False):
+        self.muestras.append(segundos)
+        self.cuenta += 1
+        self.suma += segundos
+        if error:
+            self.errores += 1
+
+    def resumen(self):
+        muestras = sorted(self.muestras)
+        n = len(muestras)
+
+        def percentil(p):
+            return muestras[min(n - 1, int(p * n))] if n else 0.0
+
+        tramos, i = [], 0
+        for limite in TRAMOS:
+            while i < n and muestras[i] <= limite:
+                i += 1
+            tramos.append(i)
+        return {"cuenta": self.cuenta, "suma": self.suma, "errores": self.errores, "ventana": n,
+                "p50": percentil(0.5), "p95": percentil(0.95), "p99": percentil(0.99),
+                "maximo": muestras[-1] if n else 0.0, "tramos": tramos}
+
+
+_bloqueo = threading.Lock()
+_histogramas = {}
+
+
+def registrar(nombre, segundos, error=False):
+    with _bloqueo:
+        histograma = _histogramas.get(nombre)
+        if histograma is None:
+            histograma = _histogramas[nombre] = Histograma()
+        histograma.registrar(segundos, error)
+
+
+def instantanea():
+    """Todo lo medido hasta ahora, listo para mostrar o devolver como JSON."""
+    with _bloqueo:
+        operaciones = {nombre: h.resumen() for nombre, h in sorted(_histogramas.items())}
+    return {"habilitado": HABILITADO, "perfil": RUTA_PERFIL, "segundos_activo": time.time() - INICIO,
+            "tramos": list(TRAMOS), "operaciones": operaciones, "bytes": contadores.bytes_por_categoria()}
+
+
+def reiniciar():
+    with _bloqueo:
+        _histogramas.clear()
+    contadores.reiniciar()
+
+
+# ---------- decoradores ----------
+def medido(funcion, prefijo=None):
+    """Envuelve `funcion` para registrar su duración como "<prefijo>.<nombre>" (el módulo si no hay prefijo)."""
+    if not HABILITADO:
+        return funcion
+    nombre = f"{prefijo or funcion.__module__}.{getattr(funcion, '__qualname__', type(funcion).__name__)}"
+
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        inicio = time.perf_counter()
+        error = True
+        try:
+            resultado = funcion(*args, **kwargs)
+            error = False
+            return resultado
+        finally:
+            registrar(nombre, time.perf_counter() - inicio, error)
+    return envoltura
+
+
+def medir_metodos(clase):
+    """Decorador de clase: mide `__init__` y los métodos públicos (los manejadores de una pantalla)."""
+    if not HABILITADO:
+        return clase
+    for nombre, valor in list(vars(clase).items()):
+        # solo funciones comunes: un staticmethod envuelto dejaría de serlo
+        if isinstance(valor, types.FunctionType) and (nombre == "__init__" or not nombre.startswith("_")):
+            setattr(clase, nombre, medido(valor, "ui"))
+    return clase
+
+
+# ---------- exposición ----------
+def _etiqueta(texto):
+    return texto.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def texto_prometheus():
+    """Las métricas en el formato de texto de Prometheus (resumen con cuantiles de la ventana)."""
+    datos = instantanea()
+    lineas = ["# HELP cristorey_duracion_segundos Duración de cada operación (cuantiles de las últimas "
+              f"{VENTANA} llamadas).",
+              "# TYPE cristorey_duracion_segundos summary"]
+    for nombre, r in datos["operaciones"].items():
+        etiqueta = _etiqueta(nombre)
+        for cuantil, clave in (("0.5", "p50"), ("0.95", "p95"), ("0.99", "p99")):
+            valor = r[clave]
+            lineas.append(f'cristorey_duracion_segundos{{operacion="{etiqueta}",quantile="{cuantil}"}} '
+                          f'{valor:.6f}')
+        lineas.append(f'cristorey_duracion_segundos_sum{{operacion="{etiqueta}"}} {r["suma"]:.6f}')
+        lineas.append(f'cristorey_duracion_segundos_count{{operacion="{etiqueta}"}} {r["cuenta"]}')
+    lineas += ["# HELP cristorey_errores_total Llamadas que terminaron en excepción.",
+               "# TYPE cristorey_errores_total counter"]
+    for nombre, r in datos["operaciones"].items():
+        lineas.append(f'cristorey_errores_total{{operacion="{_etiqueta(nombre)}"}} {r["errores"]}')
+    lineas += ["# HELP cristorey_bytes_total Bytes leídos y escritos en archivos.",
+               "# TYPE cristorey_bytes_total counter"]
+    for categoria, b in datos["bytes"].items():
+        lineas.append(f'cristorey_bytes_total{{categoria="{categoria}",sentido="leidos"}} {b["leidos"]}')
+        lineas.append(f'cristorey_bytes_total{{categoria="{categoria}",sentido="escritos"}} {b["escritos"]}')
+    lineas.append(f"cristorey_segundos_activo {datos['segundos_activo']:.0f}")
+    return "\n".join(lineas) + "\n"
+
+
+# ---------- perfil de la sesión ----------
+_perfiles = []
+
+
+def perfilar_hilo():
+    """Empieza a perfilar el hilo actual si CRISTOREY_PERFIL está definido (initializer de los pools)."""
+    if RUTA_PERFIL:
+        perfil = cProfile.Profile()
+        with _bloqueo:
+            _perfiles.append(perfil)
+        perfil.enable()
+
+
+def _guardar_perfil():
+    import pstats
+    with _bloqueo:
+        perfiles = list(_perfiles)
+    for perfil in perfiles:
+        perfil.disable()
+    estadisticas = pstats.Stats(perfiles[0])
+    for perfil in perfiles[1:]:
+        estadisticas.add(perfil)
+    estadisticas.dump_stats(RUTA_PERFIL)
+
+
+if RUTA_PERFIL:
+    # desde la primera importación (database.py la importa muy temprano) hasta el cierre
+    perfilar_hilo()
+    atexit.register(_guardar_perfil)
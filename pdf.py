@@ -0,0 +1,250 @@
+# pdf.py
+"""Escritura de PDF sencillos (reportes, recibos, contratos) sin bibliotecas externas.
+
+Texto con las fuentes estándar del visor (Helvetica, Helvetica-Bold y
+Courier, que no se incrustan), líneas, rectángulos e imágenes JPEG, que se
+incrustan tal cual (el visor las decodifica). Las coordenadas de
+`Pagina` van en puntos desde la esquina superior izquierda, como se lee la
+hoja; al escribir se pasan a las del PDF (desde abajo). El texto se
+codifica en WinAnsi (cp1252): tildes, ñ y el signo $ salen bien, y lo que
+no existe ahí se cambia por "?".
+"""
+import os
+import unicodedata
+import zlib
+
+from almacenamiento import contadores
+
+A4 = (595.28, 841.89)
+A5 = (419.53, 595.28)
+MILIMETRO = 72 / 25.4
+
+# nombre corto en el contenido -> fuente estándar
+FUENTES = {"normal": ("F1", "Helvetica"), "negrita": ("F2", "Helvetica-Bold"), "fija": ("F3", "Courier")}
+
+# anchos (milésimas del tamaño) de los caracteres 32..126, de las métricas AFM de Adobe
+_ANCHOS = {
+    "normal": (
+        278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+        556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+        1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+        667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+        333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+        556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584),
+    "negrita": (
+        278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+        556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+        975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+        667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+        333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+        611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584),
+}
+
+
+def _ancho_caracter(caracter, fuente):
+    if fuente == "fija":
+        return 600
+    codigo = ord(caracter)
+    if not 32 <= codigo <= 126:
+        # letras con tilde: el ancho de la letra sin tilde (á -> a, Ñ -> N)
+        base = unicodedata.normalize("NFD", caracter)[:1]
+        codigo = ord(base) if base else 0
+        if not 32 <= codigo <= 126:
+            return 556
+    return _ANCHOS[fuente][codigo - 32]
+
+
+def ancho_texto(texto, tamano=10, fuente="normal"):
+    """Ancho en puntos de `texto` escrito con `fuente` a `tamano` puntos."""
+    return sum(_ancho_caracter(c, fuente) for c in texto) * tamano / 1000
+
+
+def _cadena(texto):
+    """`texto` como cadena literal de PDF: en cp1252 y con \\, ( y ) escapados."""
+    datos = texto.encode("cp1252", errors="replace")
+    return b"(" + datos.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def _numero(valor):
+    return f"{valor:.2f}".rstrip("0").rstrip(".")
+
+
+def flujo(datos, comprimir=True):
+    """El objeto stream de PDF con el contenido de una página (para DocumentoPDF.agregar_flujo)."""
+    if comprimir:
+        datos = zlib.compress(datos)
+        return b"<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream" % (len(datos), datos)
+    return b"<< /Length %d >>\nstream\n%s\nendstream" % (len(datos), datos)
+
+
+# ---------- imágenes ----------
+# marcadores SOF de JPEG (los que traen alto, ancho y componentes); C4, C8 y CC son otra cosa
+_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+_ESPACIOS = {1: b"/DeviceGray", 3: b"/DeviceRGB", 4: b"/DeviceCMYK"}
+
+
+class ImagenJPEG:
+    """Un JPEG listo para incrustar: solo se leen sus medidas, los datos van al PDF sin decodificar."""
+
+    def __init__(self, datos):
+        self.datos = bytes(datos)
+        self.ancho, self.alto, self.componentes = _medidas_jpeg(self.datos)
+
+    @classmethod
+    def abrir(cls, ruta):
+        with open(ruta, "rb") as f:
+            return cls(f.read())
+
+    def objeto(self):
+        decodificar = b" /Decode [1 0 1 0 1 0 1 0]" if self.componentes == 4 else b""  # CMYK de Adobe, invertido
+        return b"<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace %s /BitsPerComponent 8%s " \
+               b"/Filter /DCTDecode /Length %d >>\nstream\n%s\nendstream" % (
+                   self.ancho, self.alto, _ESPACIOS[self.componentes], decodificar, len(self.datos), self.datos)
+
+
+def _medidas_jpeg(datos):
+    """(ancho, alto, componentes) del primer SOF; ValueError si no es un JPEG que el PDF pueda mostrar."""
+    if datos[:2] != b"\xff\xd8":
+        raise ValueError("La imagen no es un JPEG.")
+    i = 2
+    while i + 4 <= len(datos):
+        if datos[i] != 0xFF:
+            break
+        marcador = datos[i + 1]
+        if marcador == 0xFF:
+            i += 1  # relleno entre segmentos
+            continue
+        largo = int.from_bytes(datos[i + 2:i + 4], "big")
+        if marcador in _SOF and i + 10 <= len(datos):
+            alto = int.from_bytes(datos[i + 5:i + 7], "big")
+            ancho = int.from_bytes(datos[i + 7:i + 9], "big")
+            componentes = datos[i + 9]
+            if componentes not in _ESPACIOS or not ancho or not alto:
+                break
+            return ancho, alto, componentes
+        i += 2 + largo
+    raise ValueError("No se pudieron leer las medidas del JPEG.")
+
+
+class Pagina:
+    """Una hoja: junta las instrucciones de dibujo; DocumentoPDF las escribe al guardar."""
+
+    def __init__(self, ancho, alto):
+        self.ancho = ancho
+        self.alto = alto
+        self._contenido = []
+
+    def texto(self, x, y, texto, tamano=10, fuente="normal", alinear="izquierda"):
+        """Escribe `texto` con la línea base en `y`; con alinear "derecha" o "centro", `x` es ese borde."""
+        texto = str(texto)
+        if alinear == "derecha":
+            x -= ancho_texto(texto, tamano, fuente)
+        elif alinear == "centro":
+            x -= ancho_texto(texto, tamano, fuente) / 2
+        nombre = FUENTES[fuente][0]
+        self._contenido.append(b"BT /%s %s Tf %s %s Td %s Tj ET" % (
+            nombre.encode(), _numero(tamano).encode(), _numero(x).encode(), _numero(self.alto - y).encode(),
+            _cadena(texto)))
+
+    def linea(self, x1, y1, x2, y2, grosor=0.5):
+        self._contenido.append(f"{_numero(grosor)} w {_numero(x1)} {_numero(self.alto - y1)} m "
+                               f"{_numero(x2)} {_numero(self.alto - y2)} l S".encode())
+
+    def imagen(self, nombre, x, y, ancho, alto):
+        """Dibuja la imagen registrada como `nombre` en el documento (ver DocumentoPDF.agregar_imagen)."""
+        self._contenido.append(f"q {_numero(ancho)} 0 0 {_numero(alto)} {_numero(x)} {_numero(self.alto - y - alto)} "
+                               f"cm /{nombre} Do Q".encode())
+
+    def rectangulo(self, x, y, ancho, alto, gris=None, grosor=0.5):
+        """Rectángulo con la esquina superior izquierda en (x, y); con `gris` (0 negro a 1 blanco) va relleno."""
+        figura = f"{_numero(x)} {_numero(self.alto - y - alto)} {_numero(ancho)} {_numero(alto)} re"
+        if gris is None:
+            self._contenido.append(f"{_numero(grosor)} w {figura} S".encode())
+        else:
+            self._contenido.append(f"q {_numero(gris)} g {figura} f Q".encode())
+
+    def agregar(self, contenido):
+        """Agrega instrucciones ya armadas (por ejemplo, lo fijo de una plantilla compilada)."""
+        self._contenido.append(contenido)
+
+    def contenido(self):
+        return b"\n".join(self._contenido)
+
+
+class DocumentoPDF:
+    """Un PDF de páginas del mismo tamaño: `pagina()` agrega una hoja y `guardar(ruta)` lo escribe.
+
+    Las imágenes se registran una vez por documento y todas las páginas las
+    comparten. `agregar_flujo` recibe una página ya armada con `flujo()`, por
+    ejemplo en otro proceso.
+    """
+
+    def __init__(self, titulo="", tamano=A4, comprimir=True):
+        self.titulo = titulo
+        self.tamano = tamano
+        self.comprimir = comprimir
+        self.paginas = []  # Pagina o el objeto stream ya armado
+        self.imagenes = {}
+
+    def pagina(self):
+        pagina = Pagina(*self.tamano)
+        self.paginas.append(pagina)
+        return pagina
+
+    def agregar_flujo(self, flujo_pagina):
+        self.paginas.append(flujo_pagina)
+
+    def agregar_imagen(self, nombre, imagen):
+        self.imagenes[nombre] = imagen
+
+    def a_bytes(self):
+        paginas = self.paginas or [Pagina(*self.tamano)]
+        # objetos: 1 catálogo, 2 árbol de páginas, 3 recursos, 4 información,
+        # un par (hoja, contenido) por página y al final las imágenes
+        fuentes = b" ".join(b"/%s << /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>" % (
+            nombre.encode(), base.encode()) for nombre, base in FUENTES.values())
+        primera_imagen = 5 + 2 * len(paginas)
+        imagenes = b" ".join(b"/%s %d 0 R" % (nombre.encode(), primera_imagen + i)
+                             for i, nombre in enumerate(self.imagenes))
+        ancho, alto = (_numero(v).encode() for v in self.tamano)
+        hojas = [b"%d 0 R" % (5 + 2 * i) for i in range(len(paginas))]
+        objetos = [
+            b"<< /Type /Catalog /Pages 2 0 R >>",
+            b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(hojas), len(paginas)),
+            b"<< /Font << %s >> /XObject << %s >> >>" % (fuentes, imagenes),
+            b"<< /Title %s /Producer (Cristo Rey) >>" % _cadena(self.titulo),
+        ]
+        for i, pagina in enumerate(paginas):
+            objetos.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %s %s] /Resources 3 0 R /Contents %d 0 R >>"
+                           % (ancho, alto, 6 + 2 * i))
+            objetos.append(pagina if type(pagina) is bytes else flujo(pagina.contenido(), self.comprimir))
+        objetos.extend(imagen.objeto() for imagen in self.imagenes.values())
+
+        salida = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        posiciones = []
+        for numero, objeto in enumerate(objetos, 1):
+            posiciones.append(len(salida))
+            salida += b"%d 0 obj\n%s\nendobj\n" % (numero, objeto)
+        inicio_xref = len(salida)
+        salida += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1)
+        salida += b"".join(b"%010d 00000 n \n" % p for p in posiciones)
+        salida += b"trailer\n<< /Size %d /Root 1 0 R /Info 4 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+            len(objetos) + 1, inicio_xref)
+        return bytes(salida)
+
+    def guardar(self, ruta):
+        """Escribe el PDF en `ruta` con otro nombre y lo renombra al terminar, como exportar.py."""
+        datos = self.a_bytes()
+        temporal = ruta + ".parcial"
+        try:
+            with open(temporal, "wb") as f:
+                f.write(datos)
+            os.replace(temporal, ruta)
+        except BaseException:
+            try:
+                os.remove(temporal)
+            except OSError:
+                pass
+            raise
+        contadores.sumar("exportacion", escritos=len(datos))
+        return ruta
@@ -0,0 +1,79 @@
+# planilla.py
+"""Planillas de cobro: las líneas (contrato, monto, observación) que trae un cobrador de su ronda.
+
+Cada línea se revisa mientras se escribe contra un índice en memoria de los
+contratos (por ID y por cédula), sin ir a la base. Al final toda la planilla
+se registra con una sola llamada a `agregar_abonos_lote`: una escritura y un
+solo respaldo, en lugar de uno por abono.
+"""
+import re
+
+from almacenamiento.montos import centavos, pesos
+from database import agregar_abonos_lote, obtener_cuentas
+
+_MONTO = re.compile(r"\d{1,3}(?:\.\d{3})+(?:,\d{1,2})?|\d+(?:[.,]\d{1,2})?")
+
+
+class IndiceContratos:
+    """Contratos por ID y por cédula; cada uno como la fila de obtener_cuentas (sin afiliados)."""
+
+    def __init__(self, filas):
+        self.por_id = {}
+        self.por_cedula = {}
+        for fila in filas:
+            self.por_id[fila["id"]] = fila
+            self.por_cedula.setdefault(fila["cedula"], []).append(fila)
+
+    @classmethod
+    def cargar(cls):
+        return cls(obtener_cuentas())
+
+    def __len__(self):
+        return len(self.por_id)
+
+    def buscar(self, clave):
+        """El contrato con ese ID o, si no hay, con esa cédula; ValueError con el motivo si no se encuentra."""
+        clave = clave.strip()
+        if not clave:
+            raise ValueError("falta el ID de contrato o la cédula")
+        if clave.isdigit() and int(clave) in self.por_id:
+            return self.por_id[int(clave)]
+        contratos = self.por_cedula.get(clave, [])
+        if len(contratos) > 1:
+            raise ValueError(f"la cédula {clave} tiene {len(contratos)} contratos: use el ID")
+        if not contratos:
+            raise ValueError(f"no existe el contrato {clave}")
+        return contratos[0]
+
+
+def leer_monto(texto):
+    """Centavos a partir de lo escrito: "1500", "1500.50", "1500,50" o "1.500,50" (con o sin "$")."""
+    limpio = texto.replace("$", "").replace(" ", "")
+    if not _MONTO.fullmatch(limpio):
+        raise ValueError(f"monto inválido: {texto.strip()!r}")
+    if "," in limpio:
+        # como lo muestra la pantalla: punto de miles y coma decimal
+        limpio = limpio.replace(".", "").replace(",", ".")
+    elif limpio.count(".") > 1 or re.fullmatch(r"\d{1,3}\.\d{3}", limpio):
+        limpio = limpio.replace(".", "")  # 1.500 o 1.500.000: puntos de miles
+    monto = centavos(limpio)
+    if monto <= 0:
+        raise ValueError("el monto debe ser mayor que cero")
+    return monto
+
+
+def revisar_linea(indice, clave, monto, observacion=""):
+    """Línea lista para registrar: {"contrato_id", "nombre", "estado", "centavos", "observacion"}.
+
+    Lanza ValueError con el motivo si el contrato o el monto no sirven.
+    """
+    contrato = indice.buscar(clave)
+    return {"contrato_id": contrato["id"], "nombre": contrato["nombre"], "estado": contrato["estado"],
+            "centavos": leer_monto(monto), "observacion": observacion.strip()}
+
+
+def registrar_planilla(lineas, cobrador=""):
+    """Registra las líneas revisadas; devuelve lo mismo que agregar_abonos_lote."""
+    abonos = [{"contrato_id": l["contrato_id"], "monto": pesos(l["centavos"]), "observacion": l["observacion"]}
+              for l in lineas]
+    return agregar_abonos_lote(abonos, cobrador)
@@ -0,0 +1,411 @@
+# reportes.py
+"""Reportes de cobranza: totales por mes, plan, estado y cobrador, esperado vs. cobrado y cohortes.
+
+Los abonos se guardan en memoria como columnas (arreglos NumPy, o `array`
+si NumPy no está instalado) y cada cifra sale de una agrupación vectorizada
+con bincount, sin diccionarios recorridos fila por fila. Como los abonos no
+se editan ni se borran, las columnas se cargan una vez y en cada reporte
+solo se agregan los abonos con id mayor al último visto; además se guardan
+junto a la base (`<base>.reportes`), así un proceso nuevo no vuelve a leer
+todos los abonos. Las columnas de contratos se rearman solo cuando cambió
+algún contrato (`version_contratos`). Montos y mensualidades van en
+centavos enteros, así los totales son exactos; pasan a pesos solo en el
+resultado.
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+from array import array
+
+from almacenamiento.bloqueo import reemplazar
+from almacenamiento.montos import pesos
+from database import (contar_abonos, obtener_columnas_abonos, obtener_columnas_contratos, obtener_totales_abonos,
+                      ruta_base_datos, version_contratos)
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except Exception:
+    NUMPY_AVAILABLE = False
+
+SIN_DATO = "(sin dato)"
+SIN_CONTRATO = "(sin contrato)"
+MESES = 12
+
+# columnas de abonos guardadas junto a la base; el archivo se reescribe cuando le
+# falta más de 1/GUARDAR_CADA de los abonos (los que faltan se piden a la base)
+EXTENSION_COLUMNAS = ".reportes"
+FORMATO_COLUMNAS = 1
+GUARDAR_CADA = 20
+
+
+# ---------- columnas ----------
+def _enteros(valores):
+    return np.asarray(valores, dtype=np.int64) if NUMPY_AVAILABLE else array("q", valores)
+
+
+def _de_bytes(datos):
+    """Enteros de 64 bits en el orden de bytes de esta máquina (lo que escribe tobytes)."""
+    if NUMPY_AVAILABLE:
+        return np.frombuffer(datos, dtype=np.int64)
+    columna = array("q")
+    columna.frombytes(datos)
+    return columna
+
+
+def _concatenar(a, b):
+    if NUMPY_AVAILABLE:
+        return np.concatenate((a, b))
+    a.extend(b)
+    return a
+
+
+def _filtrar(columna, posiciones):
+    """Elementos de `columna` en `posiciones` (máscara booleana con NumPy, lista de índices sin él)."""
+    if NUMPY_AVAILABLE:
+        return columna[posiciones]
+    return array(columna.typecode, [columna[i] for i in posiciones])
+
+
+def _tomar(tabla, indices):
+    """tabla[i] para cada i de `indices`."""
+    if NUMPY_AVAILABLE:
+        return tabla[indices]
+    return array(tabla.typecode, [tabla[i] for i in indices])
+
+
+def _desplazar(a, k):
+    if NUMPY_AVAILABLE:
+        return a - k
+    return array("q", [x - k for x in a])
+
+
+def _combinar(a, b, n_b):
+    """Una clave por par: a * n_b + b."""
+    if NUMPY_AVAILABLE:
+        return a * n_b + b
+    return array("q", [x * n_b + y for x, y in zip(a, b)])
+
+
+def _sumar(claves, centavos, n):
+    """Total de `centavos` por clave 0..n-1 (np.bincount), en centavos enteros."""
+    if NUMPY_AVAILABLE:
+        # bincount suma en float64: con enteros es exacto hasta 2**53 centavos
+        return np.bincount(claves, weights=centavos, minlength=n)[:n].astype(np.int64).tolist()
+    totales = [0] * n
+    for k, c in zip(claves, centavos):
+        totales[k] += c
+    return totales
+
+
+def _contar(claves, n):
+    if NUMPY_AVAILABLE:
+        return np.bincount(claves, minlength=n)[:n].tolist()
+    totales = [0] * n
+    for k in claves:
+        totales[k] += 1
+    return totales
+
+
+def _codificar(valores):
+    """(códigos enteros, etiquetas) para una columna de textos."""
+    etiquetas = {}
+    codigos = [etiquetas.setdefault(v, len(etiquetas)) for v in valores]
+    return codigos, list(etiquetas)
+
+
+def _por_contrato(ids, codigos, max_id, vacio):
+    """Tabla id de contrato -> código; la posición 0 (ningún id real) queda para `vacio`."""
+    if NUMPY_AVAILABLE:
+        tabla = np.full(max_id + 1, vacio, dtype=np.int64)
+        tabla[np.asarray(ids, dtype=np.int64)] = codigos
+        return tabla
+    tabla = array("q", [vacio]) * (max_id + 1)
+    for i, c in zip(ids, codigos):
+        tabla[i] = c
+    return tabla
+
+
+def _ids_validos(contrato_ids, max_id):
+    """Los ids de abonos sin contrato conocido pasan a 0."""
+    if NUMPY_AVAILABLE:
+        ids = np.asarray(contrato_ids, dtype=np.int64)
+        return np.where((ids > 0) & (ids <= max_id), ids, 0)
+    return array("q", [i if 0 < i <= max_id else 0 for i in contrato_ids])
+
+
+def _matriz(totales, etiquetas):
+    """Lista plana (grupo, mes) de centavos -> {grupo: [12 meses en pesos]} sin los grupos vacíos."""
+    filas = {}
+    for g, etiqueta in enumerate(etiquetas):
+        fila = [pesos(v) for v in totales[g * MESES:(g + 1) * MESES]]
+        if any(fila):
+            filas[etiqueta] = fila
+    return filas
+
+
+# ---------- abonos en memoria ----------
+class ColumnasAbonos:
+    """Todos los abonos como columnas: id, contrato_id, periodo, centavos y código de cobrador.
+
+    Son las de la base en `ruta_base_datos()`; si cambia la ruta (otra base) se empieza de nuevo.
+    """
+
+    def __init__(self):
+        self._bloqueo = threading.Lock()
+        self._ruta = None
+        self._vaciar()
+
+    def _vaciar(self):
+        self.id = _enteros([])
+        self.contrato_id = _enteros([])
+        self.periodo = _enteros([])
+        self.centavos = _enteros([])
+        self.cobrador = _enteros([])
+        self.cobradores = {}
+        self.en_archivo = 0  # filas que ya tiene el archivo junto a la base
+
+    def _columnas(self):
+        return self.id, self.contrato_id, self.periodo, self.centavos, self.cobrador
+
+    def _agregar(self, nuevas):
+        self.id = _concatenar(self.id, _enteros(nuevas["id"]))
+        self.contrato_id = _concatenar(self.contrato_id, _enteros(nuevas["contrato_id"]))
+        self.periodo = _concatenar(self.periodo, _enteros(nuevas["periodo"]))
+        self.centavos = _concatenar(self.centavos, _enteros(nuevas["centavos"]))
+        codigos = [self.cobradores.setdefault(c or SIN_DATO, len(self.cobradores)) for c in nuevas["cobrador"]]
+        self.cobrador = _concatenar(self.cobrador, _enteros(codigos))
+
+    def actualizar(self):
+        """Trae los abonos nuevos; si el total no cuadra (restauración, importación) recarga todo."""
+        with self._bloqueo:
+            ruta = ruta_base_datos()
+            leidas = False
+            if ruta != self._ruta:
+                self._vaciar()
+                self._ruta = ruta
+                leidas = self._leer()
+            ultimo = int(self.id[-1]) if len(self.id) else 0
+            self._agregar(obtener_columnas_abonos(ultimo))
+            # lo leído del archivo se compara también por monto: otra caja pudo restaurar la base
+            if len(self.id) != contar_abonos() or (leidas and self._total() != obtener_totales_abonos()):
+                self._vaciar()
+                self._agregar(obtener_columnas_abonos(0))
+            if len(self.id) - self.en_archivo > len(self.id) // GUARDAR_CADA:
+                self._guardar()
+
+    def _total(self):
+        return int(self.centavos.sum()) if NUMPY_AVAILABLE else sum(self.centavos)
+
+    def _leer(self):
+        """Carga las columnas del archivo junto a la base; False si no hay o no sirve (se leen de la base)."""
+        try:
+            with open(self._ruta + EXTENSION_COLUMNAS, "rb") as f:
+                cabecera = json.loads(f.readline())
+                datos = f.read()
+        except (OSError, ValueError):
+            return False
+        if not isinstance(cabecera, dict) or cabecera.get("formato") != FORMATO_COLUMNAS \
+                or cabecera.get("orden") != sys.byteorder:
+            return False
+        filas, cobradores = cabecera.get("filas"), cabecera.get("cobradores")
+        if not isinstance(filas, int) or not isinstance(cobradores, list) or len(datos) != 5 * 8 * filas:
+            return False
+        tamano = 8 * filas
+        self.id, self.contrato_id, self.periodo, self.centavos, self.cobrador = (
+            _de_bytes(datos[i * tamano:(i + 1) * tamano]) for i in range(5))
+        self.cobradores = {c: i for i, c in enumerate(cobradores)}
+        self.en_archivo = filas
+        return True
+
+    def _guardar(self):
+        """Escribe las columnas junto a la base (temporal y reemplazo, como los respaldos).
+
+        Es solo una caché: si la carpeta no deja escribir, los reportes siguen sin ella.
+        """
+        destino = self._ruta + EXTENSION_COLUMNAS
+        cabecera = {"formato": FORMATO_COLUMNAS, "orden": sys.byteorder, "filas": len(self.id),
+                    "cobradores": list(self.cobradores)}
+        try:
+            fd, temporal = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=os.path.dirname(os.path.abspath(destino)))
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(json.dumps(cabecera, ensure_ascii=False).encode("utf-8") + b"\n")
+                for columna in self._columnas():
+                    f.write(columna.tobytes())
+            reemplazar(temporal, destino)
+        except OSError:
+            try:
+                os.remove(temporal)
+            except OSError:
+                pass
+            return
+        self.en_archivo = len(self.id)
+
+    def del_periodo(self, desde, hasta):
+        """(contrato_id, periodo, centavos, cobrador) de los abonos con desde <= periodo < hasta."""
+        with self._bloqueo:
+            if NUMPY_AVAILABLE:
+                posiciones = (self.periodo >= desde) & (self.periodo < hasta)
+            else:
+                posiciones = [i for i, p in enumerate(self.periodo) if desde <= p < hasta]
+            return tuple(_filtrar(c, posiciones) for c in (self.contrato_id, self.periodo, self.centavos, self.cobrador))
+
+
+_abonos = ColumnasAbonos()
+
+
+# ---------- contratos en memoria ----------
+def _tablas_contratos(contratos):
+    """Las columnas de contratos ya codificadas, y las tablas id -> código de plan y de estado."""
+    ids = contratos["id"]
+    max_id = max(ids, default=0)
+    planes, nombres_plan = _codificar([p or SIN_DATO for p in contratos["plan"]])
+    estados, nombres_estado = _codificar([e or SIN_DATO for e in contratos["estado"]])
+    nombres_plan.append(SIN_CONTRATO)
+    nombres_estado.append(SIN_CONTRATO)
+    return {
+        "ids": _enteros(ids),
+        "max_id": max_id,
+        "nombres_plan": nombres_plan,
+        "nombres_estado": nombres_estado,
+        "plan_de": _por_contrato(ids, planes, max_id, len(nombres_plan) - 1),
+        "estado_de": _por_contrato(ids, estados, max_id, len(nombres_estado) - 1),
+        "estados": _enteros(estados),
+        "inicio": _enteros(contratos["inicio"]),
+        "pausa": _enteros(contratos["pausa"]),
+        "mensualidad": _enteros(contratos["mensualidad_centavos"]),
+    }
+
+
+class ColumnasContratos:
+    """Las tablas de `_tablas_contratos`, rearmadas solo si cambió algún contrato (o la base)."""
+
+    def __init__(self):
+        self._bloqueo = threading.Lock()
+        self._clave = None
+        self._tablas = None
+
+    def actualizar(self):
+        # la versión se toma antes de leer: si un contrato cambia entremedio, el próximo reporte relee
+        clave = (ruta_base_datos(), version_contratos())
+        with self._bloqueo:
+            if clave[1] is None or clave != self._clave:
+                self._tablas = _tablas_contratos(obtener_columnas_contratos())
+                self._clave = clave
+            return self._tablas
+
+
+_contratos = ColumnasContratos()
+
+
+# ---------- reporte ----------
+def reporte_anual(anio):
+    """Todas las cifras del año `anio`, listas para mostrar o devolver como JSON."""
+    base = anio * MESES
+    contratos = _contratos.actualizar()
+    _abonos.actualizar()
+    contrato, mes, centavos, cobradores = _abonos.del_periodo(base, base + MESES)
+    nombres_cobrador = list(_abonos.cobradores)
+
+    max_id = contratos["max_id"]
+    nombres_plan, nombres_estado = contratos["nombres_plan"], contratos["nombres_estado"]
+    plan_de, estado_de, estados = contratos["plan_de"], contratos["estado_de"], contratos["estados"]
+
+    contrato = _ids_validos(contrato, max_id)
+    mes = _desplazar(mes, base)
+
+    cobrado = _sumar(mes, centavos, MESES)
+    por_plan = _sumar(_combinar(_tomar(plan_de, contrato), mes, MESES), centavos, len(nombres_plan) * MESES)
+    por_estado = _sumar(_combinar(_tomar(estado_de, contrato), mes, MESES), centavos, len(nombres_estado) * MESES)
+    por_cobrador = _sumar(_combinar(cobradores, mes, MESES), centavos, len(nombres_cobrador) * MESES)
+
+    activo = nombres_estado.index("Activo") if "Activo" in nombres_estado else -1
+    inicio = contratos["inicio"]
+    esperado = _esperado_por_mes(inicio, contratos["pausa"], estados, activo, contratos["mensualidad"], base)
+    activos = _contar(estados, len(nombres_estado))
+    return {
+        "anio": anio,
+        "meses": [f"{anio:04d}-{m + 1:02d}" for m in range(MESES)],
+        "cobrado": [pesos(c) for c in cobrado],
+        "total_cobrado": pesos(sum(cobrado)),
+        "esperado": [pesos(e) for e in esperado],
+        "cumplimiento": [round(c / e, 4) if e else None for c, e in zip(cobrado, esperado)],
+        "por_plan": _matriz(por_plan, nombres_plan),
+        "por_estado": _matriz(por_estado, nombres_estado),
+        "por_cobrador": _matriz(por_cobrador, nombres_cobrador),
+        "contratos_activos": activos[activo] if activo >= 0 else 0,
+        "cohortes": _cohortes(contratos["ids"], inicio, contrato, mes, anio, max_id),
+        "motor_calculo": "numpy" if NUMPY_AVAILABLE else "array",
+    }
+
+
+def _meses_de_cobro(inicio, pausa, estados, activo, base):
+    """Por contrato, primer mes y mes siguiente al último (0..12) del año en que corre cuota.
+
+    `inicio` y `pausa` son periodos (-1 si no hay fecha). Sin fecha de inicio
+    no se espera nada; fuera de "Activo" y sin fecha de pausa, tampoco.
+    """
+    if NUMPY_AVAILABLE:
+        desde = np.where(inicio >= 0, np.clip(inicio - base, 0, MESES), MESES)
+        hasta = np.where(pausa >= 0, pausa - base, np.where(estados == activo, MESES, desde))
+        return desde, np.clip(np.maximum(hasta, desde), 0, MESES)
+    desde, hasta = array("q"), array("q")
+    for i, p, e in zip(inicio, pausa, estados):
+        d = min(max(i - base, 0), MESES) if i >= 0 else MESES
+        h = p - base if p >= 0 else (MESES if e == activo else d)
+        desde.append(d)
+        hasta.append(min(max(h, d), MESES))
+    return desde, hasta
+
+
+def _esperado_por_mes(inicio, pausa, estados, activo, mensualidad, base):
+    """Suma de mensualidades exigibles en cada mes, en centavos (arreglo de diferencias + suma acumulada)."""
+    desde, hasta = _meses_de_cobro(inicio, pausa, estados, activo, base)
+    altas = _sumar(desde, mensualidad, MESES + 1)
+    bajas = _sumar(hasta, mensualidad, MESES + 1)
+    esperado, acumulado = [], 0
+    for m in range(MESES):
+        acumulado += altas[m] - bajas[m]
+        esperado.append(acumulado)
+    return esperado
+
+
+def _cohortes(ids, inicio, contrato, mes, anio, max_id):
+    """Por mes de alta dentro del año: qué fracción de esos contratos abonó 0, 1, 2... meses después."""
+    base = anio * MESES
+    if NUMPY_AVAILABLE:
+        cohorte = np.where((inicio >= base) & (inicio < base + MESES), inicio - base, -1)
+        tamanos = _contar(cohorte[cohorte >= 0], MESES)
+    else:
+        cohorte = array("q", [i - base if base <= i < base + MESES else -1 for i in inicio])
+        tamanos = _contar([m for m in cohorte if m >= 0], MESES)
+    cohorte_de = _por_contrato(ids, cohorte, max_id, -1)
+    de_abono = _tomar(cohorte_de, contrato)
+
+    if NUMPY_AVAILABLE:
+        validos = (de_abono >= 0) & (mes >= de_abono)
+        # un contrato cuenta una vez por mes aunque haya abonado varias veces: se marca su
+        # casilla (contrato, mes) y las marcadas salen ya ordenadas, sin ordenar el millón de pares
+        marcas = np.zeros((max_id + 1) * MESES, dtype=bool)
+        marcas[contrato[validos] * MESES + mes[validos]] = True
+        pares = np.flatnonzero(marcas)
+        contratos_mes = pares % MESES
+        cohortes_par = cohorte_de[pares // MESES]
+    else:
+        pares = sorted({c * MESES + m for c, m, k in zip(contrato, mes, de_abono) if k >= 0 and m >= k})
+        contratos_mes = array("q", [p % MESES for p in pares])
+        cohortes_par = array("q", [cohorte_de[p // MESES] for p in pares])
+    pagaron = _contar(_combinar(cohortes_par, contratos_mes, MESES), MESES * MESES)
+
+    resultado = []
+    for k in range(MESES):
+        if not tamanos[k]:
+            continue
+        retencion = [round(pagaron[k * MESES + m] / tamanos[k], 4) for m in range(k, MESES)]
+        resultado.append({"cohorte": f"{anio:04d}-{k + 1:02d}", "contratos": tamanos[k], "retencion": retencion})
+    return resultado
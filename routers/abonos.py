@@ -0,0 +1,53 @@
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+from database import obtener_abonos_desde
+from exportar import COLUMNAS_ABONOS, lineas_csv, lotes_abonos
+from routers.comun import LIMITE_MAXIMO, LIMITE_POR_DEFECTO, decodificar_cursor, pagina_con_cursor, respuesta_json
+
+router = APIRouter(
+    prefix="/abonos",
+    tags=["Abonos"]
+)
+
+
+def _filtro(contrato_id, cedula, desde, hasta):
+    filtro = {"contrato_id": contrato_id} if contrato_id else {"cedula": cedula} if cedula else {}
+    if desde or hasta:
+        if desde and hasta and desde > hasta:
+            raise HTTPException(status_code=400, detail="La fecha inicial es posterior a la final")
+        filtro.update(desde=desde, hasta=hasta)
+    return filtro or None
+
+
+@router.get("/")
+def obtener_abonos(request: Request,
+                   contrato_id: Optional[int] = None,
+                   cedula: Optional[str] = None,
+                   desde: Optional[date] = Query(default=None, description="Primer día incluido (AAAA-MM-DD)"),
+                   hasta: Optional[date] = Query(default=None, description="Último día incluido (AAAA-MM-DD)"),
+                   cursor: Optional[str] = None,
+                   limite: int = Query(default=LIMITE_POR_DEFECTO, ge=1, le=LIMITE_MAXIMO)):
+    filtro = _filtro(contrato_id, cedula, desde, hasta)
+    filas = obtener_abonos_desde(filtro, decodificar_cursor(cursor), limite + 1)
+    return respuesta_json(request, pagina_con_cursor(filas, limite))
+
+
+@router.get("/exportar.csv")
+def exportar_abonos_csv(contrato_id: Optional[int] = None, cedula: Optional[str] = None,
+                        desde: Optional[date] = None, hasta: Optional[date] = None):
+    # se genera por lotes mientras se envía: el historial completo nunca está entero en memoria
+    filtro = _filtro(contrato_id, cedula, desde, hasta)
+    return StreamingResponse(lineas_csv(COLUMNAS_ABONOS, lotes_abonos(filtro)), media_type="text/csv; charset=utf-8",
+                             headers={"Content-Disposition": 'attachment; filename="abonos.csv"'})
+
+
+@router.get("/{abono_id}")
+def obtener_abono(request: Request, abono_id: int):
+    filas = obtener_abonos_desde(None, abono_id - 1, 1)
+    if not filas or filas[0]["id"] != abono_id:
+        raise HTTPException(status_code=404, detail="Abono no encontrado")
+    return respuesta_json(request, filas[0])
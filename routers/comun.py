@@ -0,0 +1,67 @@
+# routers/comun.py
+"""Respuestas JSON con ETag y cursores de paginación, compartidos por los routers."""
+import base64
+import hashlib
+import json
+
+from fastapi import HTTPException, Request, Response
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except Exception:
+    ORJSON_AVAILABLE = False
+
+LIMITE_POR_DEFECTO = 100
+LIMITE_MAXIMO = 500
+
+
+def serializar(contenido):
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(contenido)
+    return json.dumps(contenido, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _coincide(etag, if_none_match):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # comparación débil: la compresión gzip no cambia el contenido
+    etiquetas = (e.strip().removeprefix("W/") for e in if_none_match.split(","))
+    return etag.removeprefix("W/") in etiquetas
+
+
+def respuesta_json(request: Request, contenido, status_code=200, headers=None):
+    """Serializa `contenido`; en un GET agrega ETag y responde 304 si el cliente ya lo tiene."""
+    cuerpo = serializar(contenido)
+    headers = dict(headers or {})
+    if request.method == "GET" and status_code == 200:
+        etag = 'W/"' + hashlib.blake2b(cuerpo, digest_size=16).hexdigest() + '"'
+        headers["ETag"] = etag
+        headers["Cache-Control"] = "no-cache"
+        if _coincide(etag, request.headers.get("if-none-match")):
+            return Response(status_code=304, headers=headers)
+    return Response(cuerpo, status_code=status_code, media_type="application/json", headers=headers)
+
+
+def codificar_cursor(ultimo_id):
+    return base64.urlsafe_b64encode(str(ultimo_id).encode("ascii")).decode("ascii").rstrip("=")
+
+
+def decodificar_cursor(cursor):
+    """Id después del cual sigue la página; sin cursor, desde el principio."""
+    if not cursor:
+        return 0
+    try:
+        return int(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("ascii"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido") from None
+
+
+def pagina_con_cursor(filas, limite):
+    """{"datos": [...], "siguiente": cursor o None}; `filas` trae limite+1 para saber si hay más."""
+    hay_mas = len(filas) > limite
+    filas = filas[:limite]
+    siguiente = codificar_cursor(filas[-1]["id"]) if hay_mas else None
+    return {"datos": filas, "siguiente": siguiente}
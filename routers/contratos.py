@@ -1,10 +1,164 @@
-from fastapi import APIRouter
+from datetime import date
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from pydantic import BaseModel, Field, field_validator
+
+from almacenamiento.base import ESTADOS
+from database import (
+    agregar_abono, buscar_contrato_por_cedula, buscar_contratos, cambiar_estado, editar_contrato,
+    guardar_contrato, obtener_abonos_desde, obtener_contrato_por_id, obtener_contratos_desde
+)
+from routers.comun import LIMITE_MAXIMO, LIMITE_POR_DEFECTO, decodificar_cursor, pagina_con_cursor, respuesta_json
 
 router = APIRouter(
     prefix="/contratos",
     tags=["Contratos"]
 )
 
+Estado = Literal[ESTADOS]
+
+
+class Afiliado(BaseModel):
+    nombre: str
+    apellido: str = ""
+    parentesco: str = ""
+    telefono: str = ""
+
+
+class ContratoNuevo(BaseModel):
+    nombre: str = Field(min_length=1)
+    cedula: str = Field(min_length=1)
+    direccion: str = ""
+    telefono: str = ""
+    plan: str = Field(min_length=1)
+    mensualidad: float = Field(ge=0)
+    fecha_inicio: Optional[date] = None  # AAAA-MM-DD; otra cosa es 422 (reportes y morosos la necesitan)
+    afiliados: List[Afiliado] = []
+    id: Optional[int] = Field(default=None, gt=0)
+
+
+class ContratoCambios(BaseModel):
+    """Solo los campos enviados cambian; None es "no enviado", un null explícito se rechaza (422)."""
+    nombre: Optional[str] = Field(default=None, min_length=1)
+    cedula: Optional[str] = Field(default=None, min_length=1)
+    direccion: Optional[str] = None
+    telefono: Optional[str] = None
+    plan: Optional[str] = Field(default=None, min_length=1)
+    mensualidad: Optional[float] = Field(default=None, ge=0)
+    fecha_inicio: Optional[date] = None
+    afiliados: Optional[List[Afiliado]] = None
+
+    @field_validator("*", mode="before")
+    @classmethod
+    def _sin_nulos(cls, valor):
+        # los valores por defecto no pasan por aquí: solo llega el null que mandó el cliente
+        if valor is None:
+            raise ValueError("no puede ser null; omita el campo para no cambiarlo")
+        return valor
+
+
+class CambioEstado(BaseModel):
+    estado: Estado
+
+
+class AbonoNuevo(BaseModel):
+    monto: float = Field(gt=0)
+    observacion: str = ""
+    cobrador: str = ""
+
+
+def _contrato_o_404(contrato_id):
+    contrato = obtener_contrato_por_id(contrato_id)
+    if contrato is None:
+        raise HTTPException(status_code=404, detail="Contrato no encontrado")
+    return contrato
+
+
+# Las rutas son `def` (no `async def`): FastAPI las corre en su pool de hilos y
+# database.py serializa las escrituras, así que nunca hay dos a la vez.
 @router.get("/")
-def obtener_contratos():
-    return {"mensaje": "Aquí iría la lista de contratos"}
\ No newline at end of file
+def obtener_contratos(request: Request,
+                      estado: Optional[Estado] = None,
+                      cedula: Optional[str] = None,
+                      q: Optional[str] = Query(default=None, description="Texto parcial: nombre, cédula, dirección, afiliados"),
+                      cursor: Optional[str] = None,
+                      limite: int = Query(default=LIMITE_POR_DEFECTO, ge=1, le=LIMITE_MAXIMO)):
+    if q:
+        return respuesta_json(request, {"datos": buscar_contratos(q, limite, estado), "siguiente": None})
+    if cedula:
+        return respuesta_json(request, {"datos": buscar_contrato_por_cedula(cedula, estado)[:limite],
+                                        "siguiente": None})
+    filas = obtener_contratos_desde(estado, decodificar_cursor(cursor), limite + 1)
+    return respuesta_json(request, pagina_con_cursor(filas, limite))
+
+
+@router.post("/", status_code=201)
+def crear_contrato(request: Request, datos: ContratoNuevo):
+    try:
+        contrato_id = guardar_contrato(datos.nombre, datos.cedula, datos.direccion, datos.telefono, datos.plan,
+                                       datos.mensualidad, (datos.fecha_inicio or date.today()).isoformat(),
+                                       [a.model_dump() for a in datos.afiliados], id_manual=datos.id)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e)) from None
+    return respuesta_json(request, obtener_contrato_por_id(contrato_id), status_code=201,
+                          headers={"Location": f"/contratos/{contrato_id}"})
+
+
+@router.get("/{contrato_id}")
+def obtener_contrato(request: Request, contrato_id: int):
+    return respuesta_json(request, _contrato_o_404(contrato_id))
+
+
+@router.patch("/{contrato_id}")
+def modificar_contrato(request: Request, contrato_id: int, cambios: ContratoCambios):
+    _contrato_o_404(contrato_id)
+    nuevos = cambios.model_dump(mode="json", exclude_unset=True, exclude_none=True)  # fechas en ISO
+    if nuevos:
+        try:
+            editar_contrato(contrato_id, nuevos)
+        except ValueError as e:
+            # lo que el motor no acepta para lo ya guardado (no lo que el modelo ya validó)
+            raise HTTPException(status_code=409, detail=str(e)) from None
+    return respuesta_json(request, obtener_contrato_por_id(contrato_id))
+
+
+# Sin DELETE a propósito: los abonos de un contrato son registros de caja y el
+# almacenamiento no borra contratos; para darlo de baja se cancela (PUT /estado).
+@router.put("/{contrato_id}/estado")
+def actualizar_estado(request: Request, contrato_id: int, cambio: CambioEstado):
+    _contrato_o_404(contrato_id)
+    cambiar_estado(contrato_id, cambio.estado)
+    return respuesta_json(request, obtener_contrato_por_id(contrato_id))
+
+
+# --- afiliados ---
+@router.get("/{contrato_id}/afiliados")
+def obtener_afiliados(request: Request, contrato_id: int):
+    return respuesta_json(request, _contrato_o_404(contrato_id).get("afiliados") or [])
+
+
+@router.put("/{contrato_id}/afiliados")
+def reemplazar_afiliados(request: Request, contrato_id: int, afiliados: List[Afiliado]):
+    _contrato_o_404(contrato_id)
+    editar_contrato(contrato_id, {"afiliados": [a.model_dump() for a in afiliados]})
+    return respuesta_json(request, obtener_contrato_por_id(contrato_id)["afiliados"])
+
+
+# --- abonos de un contrato ---
+@router.get("/{contrato_id}/abonos")
+def obtener_abonos_contrato(request: Request, contrato_id: int,
+                            cursor: Optional[str] = None,
+                            limite: int = Query(default=LIMITE_POR_DEFECTO, ge=1, le=LIMITE_MAXIMO)):
+    _contrato_o_404(contrato_id)
+    filas = obtener_abonos_desde({"contrato_id": contrato_id}, decodificar_cursor(cursor), limite + 1)
+    return respuesta_json(request, pagina_con_cursor(filas, limite))
+
+
+@router.post("/{contrato_id}/abonos", status_code=201)
+def registrar_abono(request: Request, contrato_id: int, abono: AbonoNuevo):
+    _contrato_o_404(contrato_id)
+    abono_id = agregar_abono(contrato_id, abono.monto, abono.observacion, abono.cobrador)
+    creado = obtener_abonos_desde({"contrato_id": contrato_id}, abono_id - 1, 1)
+    return respuesta_json(request, creado[0] if creado else {"id": abono_id}, status_code=201,
+                          headers={"Location": f"/abonos/{abono_id}"})
@@ -0,0 +1,16 @@
+from typing import Literal
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+import metricas
+
+router = APIRouter(tags=["Diagnóstico"])
+
+
+@router.get("/metrics")
+def obtener_metricas(formato: Literal["prometheus", "json"] = "prometheus"):
+    """Tiempos por operación y bytes de archivo; los tiempos solo se toman con CRISTOREY_METRICAS=1."""
+    if formato == "json":
+        return JSONResponse(metricas.instantanea())
+    return PlainTextResponse(metricas.texto_prometheus(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,24 @@
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, Query, Request
+
+from database import obtener_morosos
+from reportes import reporte_anual
+from routers.comun import respuesta_json
+
+router = APIRouter(
+    prefix="/reportes",
+    tags=["Reportes"]
+)
+
+
+@router.get("/anual")
+def obtener_reporte_anual(request: Request, anio: Optional[int] = Query(default=None, ge=1900, le=2200)):
+    """Cobrado por mes, plan, estado y cobrador; esperado vs. cobrado; cohortes por mes de alta."""
+    return respuesta_json(request, reporte_anual(anio or date.today().year))
+
+
+@router.get("/morosos")
+def obtener_reporte_morosos(request: Request):
+    return respuesta_json(request, obtener_morosos())
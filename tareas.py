@@ -0,0 +1,122 @@
+# tareas.py
+"""Ejecución de llamadas a la base de datos fuera del hilo de Tk.
+
+Las funciones corren en un pool de hilos; los resultados vuelven al hilo de
+la interfaz por una cola que se revisa con `root.after`, que es el único
+lugar desde donde se puede tocar un widget.
+"""
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import metricas
+
+INTERVALO_MS = 30
+
+
+class EjecutorTareas:
+    def __init__(self, root, hilos=2, al_cambiar_ocupado=None):
+        self.root = root
+        self.al_cambiar_ocupado = al_cambiar_ocupado
+        self._pool = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="db", initializer=metricas.perfilar_hilo)
+        self._resultados = queue.Queue()
+        self._avisos = queue.Queue()
+        self._activas = 0
+        self._revisando = False
+        # por grupo, el número de la última tarea enviada: las anteriores quedan superadas
+        self._ultimas = {}
+        self._futuros = {}
+        self._proxima_revision = 0.0
+
+    def ejecutar(self, funcion, *args, al_terminar=None, al_fallar=None, grupo=None, cola=None, **kwargs):
+        """Corre `funcion(*args, **kwargs)` en segundo plano.
+
+        `al_terminar(resultado)` y `al_fallar(excepcion)` se llaman en el hilo de Tk.
+        Con `grupo`, enviar una tarea nueva cancela la anterior del mismo grupo:
+        si aún no empezó no se ejecuta y si ya terminó su resultado se descarta.
+        Con `cola` (otro executor, como documentos.cola) la tarea corre ahí y no
+        ocupa los hilos de la base.
+        """
+        numero = None
+        if grupo is not None:
+            numero = self._ultimas.get(grupo, 0) + 1
+            self._ultimas[grupo] = numero
+            anterior = self._futuros.pop(grupo, None)
+            if anterior is not None and anterior.cancel():
+                self._finalizar_una()
+
+        if metricas.HABILITADO:
+            funcion = metricas.medido(funcion, "tarea")
+            al_terminar = al_terminar and metricas.medido(al_terminar, "tk")
+            al_fallar = al_fallar and metricas.medido(al_fallar, "tk")
+        futuro = (cola or self._pool).submit(funcion, *args, **kwargs)
+        if grupo is not None:
+            self._futuros[grupo] = futuro
+        self._activas += 1
+        if self._activas == 1 and self.al_cambiar_ocupado:
+            self.al_cambiar_ocupado(True)
+        futuro.add_done_callback(
+            lambda f: f.cancelled() or self._resultados.put((f, grupo, numero, al_terminar, al_fallar)))
+        if not self._revisando:
+            self._revisando = True
+            self._programar_revision()
+        return futuro
+
+    def cancelar(self, grupo):
+        """Descarta la tarea pendiente de `grupo` (por ejemplo, al salir de la pantalla)."""
+        self._ultimas[grupo] = self._ultimas.get(grupo, 0) + 1
+        futuro = self._futuros.pop(grupo, None)
+        if futuro is not None and futuro.cancel():
+            self._finalizar_una()
+
+    def en_hilo_tk(self, funcion, *args):
+        """Desde una tarea en curso, pide correr `funcion(*args)` en el hilo de Tk (p. ej. avances)."""
+        self._avisos.put((funcion, args))
+
+    def ocupado(self):
+        return self._activas > 0
+
+    def _finalizar_una(self):
+        self._activas -= 1
+        if self._activas == 0 and self.al_cambiar_ocupado:
+            self.al_cambiar_ocupado(False)
+
+    def _programar_revision(self):
+        self._proxima_revision = time.perf_counter() + INTERVALO_MS / 1000
+        self.root.after(INTERVALO_MS, self._revisar)
+
+    def _revisar(self):
+        if metricas.HABILITADO:
+            # cuánto tarde llegó la revisión: si el hilo de Tk está bloqueado, la pantalla está congelada
+            metricas.registrar("tk.retraso", max(0.0, time.perf_counter() - self._proxima_revision))
+        while True:
+            try:
+                funcion, args = self._avisos.get_nowait()
+            except queue.Empty:
+                break
+            funcion(*args)
+        while True:
+            try:
+                futuro, grupo, numero, al_terminar, al_fallar = self._resultados.get_nowait()
+            except queue.Empty:
+                break
+            if grupo is not None and self._futuros.get(grupo) is futuro:
+                del self._futuros[grupo]
+            self._finalizar_una()
+            if grupo is not None and numero != self._ultimas.get(grupo):
+                continue  # superada por una tarea más nueva del mismo grupo
+            error = futuro.exception()
+            if error is not None:
+                if al_fallar:
+                    al_fallar(error)
+                else:
+                    self.root.report_callback_exception(type(error), error, error.__traceback__)
+            elif al_terminar:
+                al_terminar(futuro.result())
+        if self._activas > 0:
+            self._programar_revision()
+        else:
+            self._revisando = False
+
+    def cerrar(self):
+        self._pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,148 @@
+# tests/test_api.py
+"""La API REST (backend_main) sobre una base temporal, con los motores sqlite y json."""
+import pytest
+from fastapi.testclient import TestClient
+
+import backend_main
+import database
+from almacenamiento.respaldos import RespaldoEnSegundoPlano
+from routers import contratos as rutas_contratos
+
+CONTRATO = {"nombre": "María Pérez", "cedula": "1001", "plan": "Plan Familiar", "mensualidad": 25.5,
+            "fecha_inicio": "2024-01-15"}
+
+
+@pytest.fixture(params=["sqlite", "json"])
+def cliente(request, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(database, "DB_MOTOR", request.param)
+    monkeypatch.setattr(database, "SQLITE_FILE", str(tmp_path / "api.sqlite3"))
+    monkeypatch.setattr(database, "DB_FILE", str(tmp_path / "contratos.json"))
+    monkeypatch.setattr(database, "BACKUP_DIR", str(tmp_path / "backups"))
+    monkeypatch.setattr(database, "_motor", None)
+    monkeypatch.setattr(database, "_almacen", None)
+    # el respaldo automático no debe dispararse durante el test
+    monkeypatch.setattr(database, "_respaldo_automatico", RespaldoEnSegundoPlano(database.backup_db, espera=3600))
+    database._cache.invalidar()
+    yield TestClient(backend_main.app)
+    if database._motor is not None:
+        database._motor.cerrar()
+    database._cache.invalidar()
+
+
+def _crear(cliente, **cambios):
+    respuesta = cliente.post("/contratos/", json={**CONTRATO, **cambios})
+    assert respuesta.status_code == 201, respuesta.text
+    return respuesta.json()
+
+
+def test_crear_y_obtener(cliente):
+    respuesta = cliente.post("/contratos/", json={**CONTRATO, "afiliados": [{"nombre": "Luis"}]})
+    assert respuesta.status_code == 201
+    assert respuesta.headers["Location"] == "/contratos/1"
+    contrato = cliente.get("/contratos/1").json()
+    assert (contrato["nombre"], contrato["mensualidad"], contrato["fecha_inicio"]) == ("María Pérez", 25.5,
+                                                                                       "2024-01-15")
+    assert [a["nombre"] for a in cliente.get("/contratos/1/afiliados").json()] == ["Luis"]
+    assert cliente.get("/contratos/99").status_code == 404
+
+
+@pytest.mark.parametrize("cambios", [{"fecha_inicio": "no-es-fecha"}, {"fecha_inicio": "2024-02-30"},
+                                     {"nombre": ""}, {"mensualidad": -1}])
+def test_crear_con_datos_invalidos_es_422(cliente, cambios):
+    assert cliente.post("/contratos/", json={**CONTRATO, **cambios}).status_code == 422
+    assert cliente.get("/contratos/").json()["datos"] == []
+
+
+def test_id_repetido_es_409(cliente):
+    _crear(cliente, id=7)
+    respuesta = cliente.post("/contratos/", json={**CONTRATO, "id": 7})
+    assert respuesta.status_code == 409
+
+
+def test_paginacion_por_cursor(cliente):
+    for i in range(5):
+        _crear(cliente, cedula=str(i))
+    ids, cursor = [], None
+    while True:
+        pagina = cliente.get("/contratos/", params={"limite": 2, **({"cursor": cursor} if cursor else {})}).json()
+        ids += [c["id"] for c in pagina["datos"]]
+        cursor = pagina["siguiente"]
+        if cursor is None:
+            break
+    assert ids == [1, 2, 3, 4, 5]
+    assert cliente.get("/contratos/", params={"cursor": "no es un cursor"}).status_code == 400
+
+
+def test_etag_y_304(cliente):
+    _crear(cliente)
+    primera = cliente.get("/contratos/")
+    etag = primera.headers["ETag"]
+    assert cliente.get("/contratos/", headers={"If-None-Match": etag}).status_code == 304
+    cliente.patch("/contratos/1", json={"telefono": "555"})
+    segunda = cliente.get("/contratos/", headers={"If-None-Match": etag})
+    assert segunda.status_code == 200
+    assert segunda.headers["ETag"] != etag
+
+
+def test_listas_grandes_van_comprimidas(cliente):
+    for i in range(20):
+        _crear(cliente, cedula=str(i))
+    respuesta = cliente.get("/contratos/", headers={"Accept-Encoding": "gzip"})
+    assert respuesta.headers["Content-Encoding"] == "gzip"
+    assert len(respuesta.json()["datos"]) == 20
+
+
+def test_modificar_contrato(cliente):
+    _crear(cliente)
+    respuesta = cliente.patch("/contratos/1", json={"telefono": "555", "fecha_inicio": "2023-12-01"})
+    assert respuesta.status_code == 200
+    assert (respuesta.json()["telefono"], respuesta.json()["fecha_inicio"]) == ("555", "2023-12-01")
+    for cuerpo in ({"nombre": None}, {"mensualidad": None}, {"fecha_inicio": "ayer"}, {"nombre": ""}):
+        assert cliente.patch("/contratos/1", json=cuerpo).status_code == 422
+    assert cliente.patch("/contratos/99", json={"telefono": "1"}).status_code == 404
+    assert cliente.get("/contratos/1").json()["nombre"] == "María Pérez"
+
+
+def test_modificar_lo_que_el_motor_rechaza_es_409(cliente, monkeypatch):
+    _crear(cliente)
+
+    def rechazar(contrato_id, nuevos_datos):
+        raise ValueError("Datos inválidos para el contrato")
+    monkeypatch.setattr(rutas_contratos, "editar_contrato", rechazar)
+    respuesta = cliente.patch("/contratos/1", json={"telefono": "555"})
+    assert respuesta.status_code == 409
+    assert respuesta.json()["detail"] == "Datos inválidos para el contrato"
+
+
+def test_busqueda_filtra_el_estado_antes_del_limite(cliente):
+    for i in range(3):
+        _crear(cliente, cedula="2002")
+    cliente.put("/contratos/3/estado", json={"estado": "Cancelado"})
+    encontrados = cliente.get("/contratos/", params={"q": "maria", "estado": "Cancelado", "limite": 1}).json()
+    assert [c["id"] for c in encontrados["datos"]] == [3]
+    por_cedula = cliente.get("/contratos/", params={"cedula": "2002", "estado": "Cancelado", "limite": 1}).json()
+    assert [c["id"] for c in por_cedula["datos"]] == [3]
+    activos = cliente.get("/contratos/", params={"cedula": "2002", "estado": "Activo", "limite": 5}).json()
+    assert [c["id"] for c in activos["datos"]] == [1, 2]
+
+
+def test_abonos_de_un_contrato(cliente):
+    _crear(cliente)
+    for monto in (10, 20.5, 30):
+        respuesta = cliente.post("/contratos/1/abonos", json={"monto": monto, "cobrador": "Ana"})
+        assert respuesta.status_code == 201
+    assert cliente.post("/contratos/1/abonos", json={"monto": 0}).status_code == 422
+    assert cliente.post("/contratos/99/abonos", json={"monto": 5}).status_code == 404
+    pagina = cliente.get("/contratos/1/abonos", params={"limite": 2}).json()
+    assert [a["monto"] for a in pagina["datos"]] == [10, 20.5]
+    resto = cliente.get("/abonos/", params={"contrato_id": 1, "cursor": pagina["siguiente"]}).json()
+    assert [a["monto"] for a in resto["datos"]] == [30]
+    assert resto["siguiente"] is None
+
+
+def test_los_contratos_no_se_borran(cliente):
+    # un contrato con abonos se cancela (PUT /estado), no se borra
+    _crear(cliente)
+    assert cliente.delete("/contratos/1").status_code == 405
+    assert cliente.put("/contratos/1/estado", json={"estado": "Cancelado"}).json()["estado"] == "Cancelado"
@@ -0,0 +1,72 @@
+# tests/test_concurrencia_archivo.py
+"""Varias cajas sobre el mismo archivo (motores json y diario).
+
+El escenario de benchmarks/bench_concurrencia.py convertido en test: ningún
+abono ni edición se pierde, con compare-and-swap, con la escritura exclusiva
+de respaldo y con compactaciones en medio.
+"""
+import multiprocessing
+
+import pytest
+
+from almacenamiento import clase_motor, motor_json
+from almacenamiento.motor_diario import MotorDiario
+
+CAJAS = 4
+ABONOS_POR_CAJA = 30
+# cada caja edita un campo distinto del mismo contrato: ninguna edición debe pisar a otra
+CAMPO_DE_CAJA = ("direccion", "telefono", "plan", "nombre")
+
+CONTRATO = {"nombre": "Prueba", "cedula": "1", "direccion": "", "telefono": "", "plan": "Básico",
+            "mensualidad": 10.0, "fecha_inicio": "2024-01-01", "estado": "Activo", "afiliados": []}
+
+
+def _abono(texto):
+    return {"contrato_id": 1, "fecha": "2024-01-01 10:00:00", "monto": 1.0, "observacion": texto, "cobrador": ""}
+
+
+def _abrir(motor, ruta, opciones):
+    if motor == "diario":
+        return MotorDiario(ruta, compactar_cada=opciones.get("compactar_cada", 1000))
+    return clase_motor(motor)(ruta)
+
+
+def _caja(motor, ruta, numero, opciones):
+    if "reintentos" in opciones:
+        motor_json.REINTENTOS = opciones["reintentos"]
+    m = _abrir(motor, ruta, opciones)
+    for i in range(ABONOS_POR_CAJA):
+        m.insertar_abono(_abono(f"caja {numero} abono {i}"))
+    m.editar_contrato(1, {CAMPO_DE_CAJA[numero]: f"caja {numero}"})
+    m.cerrar()
+
+
+@pytest.mark.parametrize("motor, opciones", [
+    ("json", {}),
+    ("json", {"reintentos": 0}),  # todas por la escritura exclusiva, sin compare-and-swap
+    ("diario", {}),
+    ("diario", {"compactar_cada": 7}),  # compactaciones mientras las demás anexan
+], ids=["json-cas", "json-exclusivo", "diario", "diario-compactando"])
+def test_varias_cajas_no_pierden_escrituras(tmp_path, motor, opciones):
+    ruta = str(tmp_path / "contratos.json")
+    m = _abrir(motor, ruta, opciones)
+    m.insertar_contrato(CONTRATO)
+    m.cerrar()
+
+    contexto = multiprocessing.get_context("spawn")
+    cajas = [contexto.Process(target=_caja, args=(motor, ruta, n, opciones)) for n in range(CAJAS)]
+    for c in cajas:
+        c.start()
+    for c in cajas:
+        c.join(120)
+    assert [c.exitcode for c in cajas] == [0] * CAJAS
+
+    final = _abrir(motor, ruta, opciones)
+    abonos = final.obtener_abonos()
+    assert len(abonos) == CAJAS * ABONOS_POR_CAJA
+    assert len({a["id"] for a in abonos}) == len(abonos)
+    assert {a["observacion"] for a in abonos} == {f"caja {n} abono {i}" for n in range(CAJAS)
+                                                  for i in range(ABONOS_POR_CAJA)}
+    contrato = final.obtener_contrato_por_id(1)
+    assert [contrato[CAMPO_DE_CAJA[n]] for n in range(CAJAS)] == [f"caja {n}" for n in range(CAJAS)]
+    final.cerrar()
@@ -0,0 +1,79 @@
+# tests/test_diario.py
+"""Motor diario: relectura sobre la instantánea, líneas cortadas o dañadas y compactación."""
+import os
+import shutil
+
+import pytest
+
+from almacenamiento.motor_diario import DiarioDanado, MotorDiario
+
+CONTRATO = {"nombre": "Prueba", "cedula": "1", "direccion": "", "telefono": "", "plan": "Básico",
+            "mensualidad": 10.0, "fecha_inicio": "2024-01-01", "estado": "Activo", "afiliados": []}
+
+
+def _abono(texto):
+    return {"contrato_id": 1, "fecha": "2024-01-01 10:00:00", "monto": 1.0, "observacion": texto, "cobrador": ""}
+
+
+@pytest.fixture
+def diario(tmp_path):
+    """Un diario con un contrato y 5 abonos sin compactar (el motor no se cierra: cerrar compacta)."""
+    ruta = str(tmp_path / "contratos.json")
+    m = MotorDiario(ruta, compactar_cada=1000)
+    m.insertar_contrato(CONTRATO)
+    for i in range(5):
+        m.insertar_abono(_abono(f"abono {i}"))
+    return ruta
+
+
+def test_reproduce_el_diario_sobre_la_instantanea(diario):
+    assert os.path.getsize(diario + ".diario") > 0
+    m = MotorDiario(diario)
+    assert [a["observacion"] for a in m.obtener_abonos()] == [f"abono {i}" for i in range(5)]
+
+
+def test_ultima_linea_cortada_se_descarta(diario):
+    tamano = os.path.getsize(diario + ".diario")
+    with open(diario + ".diario", "ab") as f:
+        f.write(b'{"seq":7,"op":"abono","abono":{"id":6,"contr')  # se cortó la luz a mitad de escribir
+    m = MotorDiario(diario)
+    assert len(m.obtener_abonos()) == 5
+    # al anexar con el candado tomado se trunca la cola rota y se sigue la secuencia
+    nuevo = m.insertar_abono(_abono("después del corte"))
+    assert nuevo == 6
+    assert os.path.getsize(diario + ".diario") > tamano
+    otra = MotorDiario(diario)
+    assert [a["observacion"] for a in otra.obtener_abonos()][-2:] == ["abono 4", "después del corte"]
+
+
+def test_linea_ilegible_en_medio_es_un_error(diario):
+    with open(diario + ".diario", "rb") as f:
+        lineas = f.readlines()
+    lineas[2] = b"{basura}\n"
+    with open(diario + ".diario", "wb") as f:
+        f.writelines(lineas)
+    with pytest.raises(DiarioDanado):
+        MotorDiario(diario).obtener_abonos()
+
+
+def test_compactar_pliega_el_diario(diario):
+    m = MotorDiario(diario)
+    antes = m.obtener_abonos()
+    m.compactar()
+    assert not os.path.exists(diario + ".diario")
+    m.insertar_abono(_abono("tras compactar"))
+    otra = MotorDiario(diario)
+    assert otra.obtener_abonos() == antes + [otra.obtener_abonos()[-1]]
+    assert otra.obtener_abonos()[-1]["id"] == 6
+
+
+def test_compactacion_interrumpida_no_duplica(diario):
+    # la instantánea nueva quedó escrita pero el diario viejo no se llegó a borrar
+    copia = diario + ".copia"
+    shutil.copy(diario + ".diario", copia)
+    m = MotorDiario(diario)
+    m.compactar()
+    shutil.copy(copia, diario + ".diario")
+    otra = MotorDiario(diario)
+    assert [a["id"] for a in otra.obtener_abonos()] == [1, 2, 3, 4, 5]
+    assert otra.insertar_abono(_abono("sigue")) == 6
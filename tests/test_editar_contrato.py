@@ -0,0 +1,40 @@
+# tests/test_editar_contrato.py
+"""editar_contrato acepta y rechaza lo mismo en los tres motores."""
+import pytest
+
+from almacenamiento import clase_motor
+
+CONTRATO = {"nombre": "Prueba", "cedula": "1", "direccion": "", "telefono": "", "plan": "Básico",
+            "mensualidad": 10.0, "fecha_inicio": "2024-01-01", "estado": "Activo", "afiliados": []}
+RUTAS = {"sqlite": "datos.sqlite3", "json": "contratos.json", "diario": "contratos.json"}
+
+
+@pytest.fixture(params=sorted(RUTAS))
+def motor(request, tmp_path):
+    m = clase_motor(request.param)(str(tmp_path / RUTAS[request.param]))
+    m.insertar_contrato(dict(CONTRATO))
+    yield m
+    m.cerrar()
+
+
+def test_edita_campos_del_contrato(motor):
+    motor.editar_contrato(1, {"telefono": "555", "mensualidad": 12.5,
+                              "afiliados": [{"nombre": "Ana", "apellido": "Pérez", "parentesco": "Hija",
+                                             "telefono": ""}]})
+    contrato = motor.obtener_contrato_por_id(1)
+    assert (contrato["telefono"], contrato["mensualidad"]) == ("555", 12.5)
+    assert [a["nombre"] for a in contrato["afiliados"]] == ["Ana"]
+
+
+@pytest.mark.parametrize("datos, mensaje", [
+    ({"nota": "x"}, "Campos desconocidos: nota"),
+    ({"telefono": "555", "color": "azul", "alias": "y"}, "Campos desconocidos: alias, color"),
+    ({"nombre": None}, "Campos sin valor: nombre"),
+    ({"mensualidad": None}, "Campos sin valor: mensualidad"),
+])
+def test_rechaza_campos_invalidos_sin_tocar_el_contrato(motor, datos, mensaje):
+    with pytest.raises(ValueError, match=mensaje):
+        motor.editar_contrato(1, datos)
+    contrato = motor.obtener_contrato_por_id(1)
+    assert "nota" not in contrato and "color" not in contrato
+    assert (contrato["nombre"], contrato["telefono"], contrato["mensualidad"]) == ("Prueba", "", 10.0)
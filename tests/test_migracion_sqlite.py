@@ -0,0 +1,162 @@
+# tests/test_migracion_sqlite.py
+"""Una base SQLite del esquema 1 (montos REAL en pesos) abierta con el motor actual, y sus transacciones."""
+import sqlite3
+
+import pytest
+
+from almacenamiento.montos import centavos, pesos
+from almacenamiento.motor_sqlite import VERSION_ESQUEMA, MotorSQLite
+
+# el esquema con el que salió el motor SQLite (user_version 1)
+ESQUEMA_V1 = """
+CREATE TABLE contratos (
+    id INTEGER PRIMARY KEY,
+    nombre TEXT NOT NULL,
+    cedula TEXT NOT NULL,
+    direccion TEXT NOT NULL DEFAULT '',
+    telefono TEXT NOT NULL DEFAULT '',
+    plan TEXT NOT NULL DEFAULT '',
+    mensualidad REAL NOT NULL DEFAULT 0,
+    fecha_inicio TEXT NOT NULL DEFAULT '',
+    estado TEXT NOT NULL DEFAULT 'Activo'
+);
+CREATE INDEX idx_contratos_cedula ON contratos(cedula);
+CREATE INDEX idx_contratos_estado ON contratos(estado);
+CREATE TABLE afiliados (
+    id INTEGER PRIMARY KEY,
+    contrato_id INTEGER NOT NULL REFERENCES contratos(id) ON DELETE CASCADE,
+    posicion INTEGER NOT NULL,
+    nombre TEXT NOT NULL DEFAULT '',
+    apellido TEXT NOT NULL DEFAULT '',
+    parentesco TEXT NOT NULL DEFAULT '',
+    telefono TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX idx_afiliados_contrato ON afiliados(contrato_id, posicion);
+CREATE TABLE abonos (
+    id INTEGER PRIMARY KEY,
+    contrato_id INTEGER NOT NULL,
+    fecha TEXT NOT NULL,
+    monto REAL NOT NULL,
+    observacion TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX idx_abonos_contrato ON abonos(contrato_id);
+PRAGMA user_version = 1;
+"""
+
+CONTRATOS = [
+    (1, "maría pérez", "0101", "Plan Familiar", 10.005, "2024-01-15"),
+    (2, "josé ñúñez", "0202", "Plan Individual", 12.5, "2024-02-01"),
+    (3, "ana ruiz", "0303", "", 33.33, "2024-03-10"),
+]
+ABONOS = [
+    (1, 1, "2024-02-15 10:00:00", 10.005),
+    (2, 1, "2024-03-15 10:30:00", 0.1),
+    (3, 1, "2024-03-15 11:00:00", 0.2),
+    (4, 2, "2024-03-15 12:00:00", 12.5),
+    (5, 3, "2024-04-10 09:00:00", 33.33),
+    (6, 3, "2024-04-10 09:15:00", 1.005),
+    (7, 2, "fecha vieja", 7.77),  # no ISO: cuenta en el saldo, no en el resumen diario
+]
+
+
+@pytest.fixture
+def base_v1(tmp_path):
+    ruta = str(tmp_path / "v1.sqlite3")
+    con = sqlite3.connect(ruta)
+    con.executescript(ESQUEMA_V1)
+    con.executemany("INSERT INTO contratos (id, nombre, cedula, plan, mensualidad, fecha_inicio) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", CONTRATOS)
+    con.execute("INSERT INTO afiliados (contrato_id, posicion, nombre, apellido, parentesco) "
+                "VALUES (1, 0, 'luis', 'pérez', 'hijo')")
+    con.executemany("INSERT INTO abonos (id, contrato_id, fecha, monto) VALUES (?, ?, ?, ?)", ABONOS)
+    con.commit()
+    con.close()
+    return ruta
+
+
+@pytest.fixture
+def motor(base_v1):
+    motor = MotorSQLite(base_v1)
+    yield motor
+    motor.cerrar()
+
+
+def test_queda_en_la_version_actual_con_centavos_enteros(motor):
+    con = motor._conexion()
+    assert con.execute("PRAGMA user_version").fetchone()[0] == VERSION_ESQUEMA
+    assert {t for (t,) in con.execute("SELECT DISTINCT typeof(monto) FROM abonos")} == {"integer"}
+    assert {t for (t,) in con.execute("SELECT DISTINCT typeof(mensualidad) FROM contratos")} == {"integer"}
+    assert [m for (m,) in con.execute("SELECT monto FROM abonos ORDER BY id")] == [centavos(a[3]) for a in ABONOS]
+    assert con.execute("SELECT mensualidad FROM contratos WHERE id = 1").fetchone()[0] == 1001
+
+
+def test_conserva_contratos_afiliados_y_abonos(motor):
+    contrato = motor.obtener_contrato_por_id(1)
+    assert contrato["mensualidad"] == 10.01
+    assert contrato["afiliados"] == [{"nombre": "luis", "apellido": "pérez", "parentesco": "hijo", "telefono": ""}]
+    assert [a["id"] for a in motor.obtener_abonos()] == [a[0] for a in ABONOS]
+    assert {a["cobrador"] for a in motor.obtener_abonos()} == {""}
+    assert [c["id"] for c in motor.buscar_contratos("nunez")] == [2]
+
+
+def test_mismos_totales_que_antes(motor):
+    esperado = {}
+    for _, contrato_id, _, monto in ABONOS:
+        esperado[contrato_id] = esperado.get(contrato_id, 0) + centavos(monto)
+    cuentas = {c["id"]: c for c in motor.obtener_cuentas()}
+    assert {i: centavos(c["pagado"]) for i, c in cuentas.items()} == esperado
+    assert {i: c["num_abonos"] for i, c in cuentas.items()} == {1: 3, 2: 2, 3: 2}
+
+    resumen = motor.resumen_diario()
+    assert sum(f["cantidad"] for f in resumen) == len(ABONOS) - 1
+    assert sum(f["centavos"] for f in resumen) == sum(esperado.values()) - centavos(7.77)
+    dia = [f for f in resumen if f["dia"] == "2024-03-15"]
+    assert {(f["plan"], f["cantidad"], f["centavos"]) for f in dia} == {("Plan Familiar", 2, 30),
+                                                                       ("Plan Individual", 1, 1250)}
+
+
+def test_reabrir_no_vuelve_a_convertir(base_v1):
+    MotorSQLite(base_v1).cerrar()
+    motor = MotorSQLite(base_v1)
+    try:
+        assert pesos(motor._conexion().execute("SELECT SUM(monto) FROM abonos").fetchone()[0]) == \
+            pesos(sum(centavos(a[3]) for a in ABONOS))
+    finally:
+        motor.cerrar()
+
+
+def test_commit_fallido_no_deja_la_transaccion_abierta(tmp_path):
+    motor = MotorSQLite(str(tmp_path / "nueva.sqlite3"))
+    try:
+        motor.insertar_contrato({"nombre": "Ana", "cedula": "1", "direccion": "", "telefono": "", "plan": "Básico",
+                                 "mensualidad": 10.0, "fecha_inicio": "2024-01-01", "estado": "Activo",
+                                 "afiliados": []})
+        # con las claves foráneas diferidas la violación aparece recién en el COMMIT
+        with pytest.raises(sqlite3.IntegrityError):
+            with motor._transaccion() as con:
+                con.execute("PRAGMA defer_foreign_keys = ON")
+                con.execute("INSERT INTO afiliados (contrato_id, posicion, nombre) VALUES (999, 0, 'nadie')")
+        assert not motor._conexion().in_transaction
+        motor.insertar_abono({"contrato_id": 1, "fecha": "2024-05-01 10:00:00", "monto": 5.0})
+        assert [a["monto"] for a in motor.obtener_abonos()] == [5.0]
+    finally:
+        motor.cerrar()
+
+
+@pytest.mark.parametrize("valor, esperado", [
+    (10.005, 1001),
+    ("10.005", 1001),
+    (1.005, 101),
+    (2.675, 268),
+    (0.1 + 0.2, 30),
+    (-10.005, -1001),
+    (12, 1200),
+])
+def test_redondeo_a_centavos(valor, esperado):
+    assert centavos(valor) == esperado
+
+
+@pytest.mark.parametrize("valor", ["abc", float("nan"), float("inf"), None])
+def test_monto_invalido(valor):
+    with pytest.raises(ValueError):
+        centavos(valor)
@@ -0,0 +1,81 @@
+# tests/test_reportes.py
+"""reporte_anual con sus columnas en memoria y en `<base>.reportes`, con los motores sqlite y json."""
+from datetime import date
+
+import pytest
+
+import database
+import reportes
+from almacenamiento.respaldos import RespaldoEnSegundoPlano
+
+ANIO = date.today().year
+
+
+@pytest.fixture(params=["sqlite", "json"])
+def base(request, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(database, "DB_MOTOR", request.param)
+    monkeypatch.setattr(database, "SQLITE_FILE", str(tmp_path / "reportes.sqlite3"))
+    monkeypatch.setattr(database, "DB_FILE", str(tmp_path / "contratos.json"))
+    monkeypatch.setattr(database, "BACKUP_DIR", str(tmp_path / "backups"))
+    monkeypatch.setattr(database, "_motor", None)
+    monkeypatch.setattr(database, "_almacen", None)
+    monkeypatch.setattr(database, "_respaldo_automatico", RespaldoEnSegundoPlano(database.backup_db, espera=3600))
+    _proceso_nuevo(monkeypatch)
+    database._cache.invalidar()
+    for cedula in ("1", "2"):
+        database.guardar_contrato("Ana", cedula, "", "", "Plan Familiar", 20, "2024-01-15", [])
+    database.agregar_abono(1, 10, cobrador="Luis")
+    database.agregar_abono(2, 5.25, cobrador="Marta")
+    yield database.ruta_base_datos() + reportes.EXTENSION_COLUMNAS
+    if database._motor is not None:
+        database._motor.cerrar()
+    database._cache.invalidar()
+
+
+def _proceso_nuevo(monkeypatch):
+    """Lo que ve un proceso recién abierto: nada en memoria."""
+    monkeypatch.setattr(reportes, "_abonos", reportes.ColumnasAbonos())
+    monkeypatch.setattr(reportes, "_contratos", reportes.ColumnasContratos())
+    database._cache.invalidar()
+
+
+def test_un_cambio_de_contrato_llega_al_reporte(base):
+    antes = reportes.reporte_anual(ANIO)
+    assert antes["total_cobrado"] == 15.25
+    assert antes["contratos_activos"] == 2
+    database.cambiar_estado(2, "Cancelado")
+    despues = reportes.reporte_anual(ANIO)
+    assert despues["contratos_activos"] == 1
+    assert despues["por_estado"] != antes["por_estado"]
+    database.agregar_abono(1, 4.75)
+    assert reportes.reporte_anual(ANIO)["total_cobrado"] == 20
+
+
+def test_un_proceso_nuevo_lee_las_columnas_del_archivo(base, monkeypatch):
+    esperado = reportes.reporte_anual(ANIO)
+    pedidos = []
+    leer = reportes.obtener_columnas_abonos
+    monkeypatch.setattr(reportes, "obtener_columnas_abonos", lambda desde: pedidos.append(desde) or leer(desde))
+    _proceso_nuevo(monkeypatch)
+    assert reportes.reporte_anual(ANIO) == esperado
+    # solo se piden a la base los abonos posteriores a los del archivo
+    assert pedidos == [int(reportes._abonos.id[-1])]
+    database.agregar_abono(2, 1)
+    assert reportes.reporte_anual(ANIO)["total_cobrado"] == 16.25
+
+
+def test_un_archivo_que_no_cuadra_se_descarta(base, monkeypatch):
+    esperado = reportes.reporte_anual(ANIO)
+    # mismos abonos pero otros montos, como los de una base que después se restauró
+    viejas = reportes.ColumnasAbonos()
+    viejas.actualizar()
+    viejas.centavos = reportes._enteros([c + 100 for c in viejas.centavos])
+    viejas._guardar()
+    _proceso_nuevo(monkeypatch)
+    assert reportes.reporte_anual(ANIO) == esperado
+
+    with open(base, "wb") as f:
+        f.write(b"esto no son columnas")
+    _proceso_nuevo(monkeypatch)
+    assert reportes.reporte_anual(ANIO) == esperado
@@ -1,19 +1,33 @@
 import os
 import shutil
 from datetime import datetime
+from functools import lru_cache
+
+from almacenamiento.montos import centavos
 
 # === FORMATO DE NÚMEROS Y FECHAS ===
 def formato_moneda(valor):
-    """Devuelve el valor con formato de moneda."""
+    """Devuelve el valor (en pesos) con formato de moneda: $1.234,50."""
     try:
-        return f"${valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+        return formato_centavos(centavos(valor))
     except Exception:
         return "$0.00"
 
+@lru_cache(maxsize=4096)
+def formato_centavos(valor_centavos):
+    """Formato de moneda de un monto en centavos; los montos se repiten mucho, así que se memoriza."""
+    signo = "-" if valor_centavos < 0 else ""
+    enteros, resto = divmod(abs(valor_centavos), 100)
+    return f"${signo}{enteros:,}".replace(",", ".") + f",{resto:02d}"
+
 def fecha_hoy():
     """Devuelve la fecha actual en formato dd/mm/yyyy."""
     return datetime.now().strftime("%d/%m/%Y")
 
+def fecha_corta(texto):
+    """"AAAA-MM-DD..." como "DD/MM/AAAA", el formato de fecha de la interfaz."""
+    return f"{texto[8:10]}/{texto[5:7]}/{texto[:4]}" if texto else ""
+
 
 # === CÁLCULOS DE ABONOS Y SALDOS ===
 def calcular_nuevo_saldo(saldo_actual, abono):